@@ -8,7 +8,9 @@ from apps.models import (
     Succursale,
     Zone,
     Hotel,
+    GeocodeCache,
     Dossier,
+    ImportJob,
     FicheMouvement,
     Vehicule,
     VehiculeTarifZone,
@@ -70,9 +72,22 @@ class ZoneAdmin(admin.ModelAdmin):
 
 @admin.register(Hotel)
 class HotelAdmin(admin.ModelAdmin):
-    list_display = ("nom", "zone", "agence")
+    list_display = ("nom", "zone", "zone_manuelle", "agence")
     search_fields = ("nom",)
-    list_filter = ("zone", "agence")
+    list_filter = ("zone", "zone_manuelle", "agence")
+
+    def save_model(self, request, obj, form, change):
+        # zone changée à la main : figée (vider la zone rend le calcul automatique)
+        if "zone" in form.changed_data:
+            obj.zone_manuelle = obj.zone_id is not None
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ("provider", "kind", "query", "hits", "created_at", "expires_at")
+    search_fields = ("query",)
+    list_filter = ("provider", "kind")
 
 
 @admin.register(Dossier)
@@ -82,6 +97,13 @@ class DossierAdmin(admin.ModelAdmin):
     list_filter = ("agence", "type_mouvement", "date")
 
 
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "agence", "status", "processed_rows", "errors_count", "created_at", "finished_at")
+    list_filter = ("kind", "status", "agence")
+    readonly_fields = ("report", "erreurs")
+
+
 @admin.register(FicheMouvement)
 class FicheMouvementAdmin(admin.ModelAdmin):
     exclude = ("observation",)
@@ -0,0 +1,18 @@
+# backend1/apps/management/commands/backfill_mission_windows.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.services.mission_window import backfill_mission_windows
+
+
+class Command(BaseCommand):
+    help = "Recopie sur Mission la fenêtre / le statut / les lieux de ses affectations (MissionRessource)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Missions par lot.")
+
+    def handle(self, *args, **opts):
+        updated = backfill_mission_windows(batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Missions mises à jour: {updated}"))
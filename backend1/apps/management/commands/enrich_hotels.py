@@ -0,0 +1,53 @@
+# backend1/apps/management/commands/enrich_hotels.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.services.hotel_enrichment import enrich_pending_hotels
+from apps.services.hotels import assign_hotel_zones, reassign_all_hotel_zones
+
+
+class Command(BaseCommand):
+    help = "Géocode les hôtels en attente (lat/lng, adresse, zone) et complète Dossier.zone_fk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Nombre max d'hôtels traités.")
+        parser.add_argument("--concurrency", type=int, default=None, help="Appels réseau simultanés.")
+        parser.add_argument("--retry-failed", action="store_true", help="Retente aussi les hôtels en échec.")
+        parser.add_argument(
+            "--zones-only",
+            action="store_true",
+            help="Sans appel réseau : affecte une zone aux hôtels déjà géocodés qui n'en ont pas.",
+        )
+        parser.add_argument(
+            "--reassign-zones",
+            action="store_true",
+            help="Sans appel réseau : recalcule la zone de TOUS les hôtels géocodés.",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["reassign_zones"]:
+            stats = reassign_all_hotel_zones()
+            self.stdout.write(self.style.SUCCESS(
+                "Hôtels vérifiés: {hotels_checked} — zones modifiées: {hotels_updated} — "
+                "dossiers mis à jour: {dossiers_updated}".format(**stats)
+            ))
+            return
+
+        if opts["zones_only"]:
+            stats = assign_hotel_zones()
+            self.stdout.write(self.style.SUCCESS(
+                "Hôtels avec zone: {hotels_updated} — dossiers complétés: {dossiers_updated}".format(**stats)
+            ))
+            return
+
+        stats = enrich_pending_hotels(
+            limit=opts["limit"],
+            concurrency=opts["concurrency"],
+            retry_failed=opts["retry_failed"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Hôtels traités: {processed} (géocodés: {done}, introuvables: {not_found}, "
+            "échecs: {failed}, à retenter: {retry}) — dossiers complétés: {dossiers_updated}".format(**stats)
+        ))
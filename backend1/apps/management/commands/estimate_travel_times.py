@@ -0,0 +1,18 @@
+# backend1/apps/management/commands/estimate_travel_times.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.services.travel_times import TRAVEL_TIME_SPEED_KMH, estimate_travel_times
+
+
+class Command(BaseCommand):
+    help = "Estime les temps de trajet entre zones (centres, haversine) ; les temps mesurés sont conservés."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--speed", type=float, default=TRAVEL_TIME_SPEED_KMH, help="Vitesse moyenne (km/h).")
+
+    def handle(self, *args, **opts):
+        written = estimate_travel_times(speed_kmh=opts["speed"])
+        self.stdout.write(self.style.SUCCESS(f"Temps de trajet estimés: {written}"))
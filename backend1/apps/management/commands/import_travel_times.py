@@ -0,0 +1,21 @@
+# backend1/apps/management/commands/import_travel_times.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.services.travel_times import import_travel_times
+
+
+class Command(BaseCommand):
+    help = "Importe des temps de trajet mesurés (CSV origine;destination;minutes, zones par nom ou id)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier CSV (UTF-8, séparateur ';').")
+
+    def handle(self, *args, **opts):
+        with open(opts["path"], encoding="utf-8-sig", newline="") as fh:
+            written, errors = import_travel_times(fh)
+        for err in errors:
+            self.stderr.write(err)
+        self.stdout.write(self.style.SUCCESS(f"Temps de trajet importés: {written} — erreurs: {len(errors)}"))
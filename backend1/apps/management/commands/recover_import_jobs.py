@@ -0,0 +1,20 @@
+# backend1/apps/management/commands/recover_import_jobs.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.services.import_jobs import recover_import_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprise des imports en arrière-plan : jobs 'running' abandonnés -> échec, "
+        "jobs 'pending' relancés (à lancer au démarrage ou périodiquement)."
+    )
+
+    def handle(self, *args, **opts):
+        stats = recover_import_jobs()
+        self.stdout.write(self.style.SUCCESS(
+            "Jobs interrompus marqués en échec: {failed} — agences relancées: {agences}".format(**stats)
+        ))
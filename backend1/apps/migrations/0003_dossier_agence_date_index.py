@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-16 22:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0002_alter_agencevoyage_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dossier',
+            index=models.Index(fields=['agence', 'date', 'type_mouvement'], name='apps_dossie_agence__a10fbd_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-16 22:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0003_dossier_agence_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('dossiers', 'Dossiers'), ('fiches', 'Fiches mouvement'), ('vehicules', 'Véhicules'), ('chauffeurs', 'Chauffeurs')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Échec')], db_index=True, default='pending', max_length=10)),
+                ('fichier', models.FileField(blank=True, null=True, upload_to='imports/%Y/%m/')),
+                ('nom_fichier', models.CharField(blank=True, default='', max_length=255)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('processed_rows', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('updated_count', models.PositiveIntegerField(default=0)),
+                ('ignored_count', models.PositiveIntegerField(default=0)),
+                ('errors_count', models.PositiveIntegerField(default=0)),
+                ('erreurs', models.JSONField(blank=True, default=list)),
+                ('report', models.JSONField(blank=True, default=dict)),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('agence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='apps.agencevoyage')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['agence', 'created_at'], name='apps_import_agence__72ccc9_idx')],
+            },
+        ),
+    ]
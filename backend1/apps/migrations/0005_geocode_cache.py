@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0004_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20)),
+                ('kind', models.CharField(choices=[('forward', 'Adresse -> coordonnées'), ('reverse', 'Coordonnées -> adresse')], max_length=10)),
+                ('key', models.CharField(max_length=64)),
+                ('query', models.CharField(blank=True, default='', max_length=500)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('provider', 'kind', 'key'), name='uniq_geocode_cache_key')],
+            },
+        ),
+    ]
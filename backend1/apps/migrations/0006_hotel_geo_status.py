@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-16 22:53
+
+from django.db import migrations, models
+
+
+def mark_geocoded_hotels(apps, schema_editor):
+    """Hôtels déjà géocodés (coords + zone + adresse) : rien à refaire."""
+    Hotel = apps.get_model("apps", "Hotel")
+    (
+        Hotel.objects.filter(lat__isnull=False, lng__isnull=False, zone__isnull=False)
+        .exclude(adresse__isnull=True)
+        .exclude(adresse="")
+        .update(geo_status="done")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0005_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='geo_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='geo_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='geo_hint',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='geo_status',
+            field=models.CharField(choices=[('pending', 'À géocoder'), ('done', 'Géocodé'), ('not_found', 'Introuvable'), ('failed', 'Échec')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_geocoded_hotels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-16 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0006_hotel_geo_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zone',
+            name='polygon',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-16 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0007_zone_polygon'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mission',
+            name='date_heure_debut',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='date_heure_fin',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='lieu_arrivee',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='lieu_depart',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='statut',
+            field=models.CharField(blank=True, choices=[('PLANNED', 'Planifiée'), ('CANCELLED', 'Annulée')], max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['agence', 'date_heure_debut'], name='apps_missio_agence__306c8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['vehicule', 'date_heure_fin'], name='apps_missio_vehicul_5d686c_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0008_mission_window'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agence_id', models.PositiveIntegerField()),
+                ('resource', models.CharField(max_length=30)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('agence_id', 'resource')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-16 23:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0009_resource_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minutes', models.PositiveSmallIntegerField()),
+                ('source', models.CharField(choices=[('estimate', 'Estimé'), ('measured', 'Mesuré')], default='estimate', max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='apps.zone')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='apps.zone')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('origin', 'destination'), name='uniq_travel_time_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 00:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0010_travel_time'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='importjob',
+            index=models.Index(fields=['agence', 'status'], name='apps_import_agence__49f57f_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0011_import_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='zone_manuelle',
+            field=models.BooleanField(default=False),
+        ),
+    ]
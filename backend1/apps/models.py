@@ -13,7 +13,6 @@ from django.dispatch import receiver
 from django.utils import timezone
 from numpy import sin
 
-from apps.services.geocoding import lookup_hotel_address
 from django.utils.crypto import get_random_string
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -25,7 +24,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 import logging
-from math import radians, sin, cos, asin, sqrt
+from math import radians, sin, cos, asin, sqrt, ceil
 
 from django.db import models
 
@@ -438,6 +437,9 @@ class Zone(models.Model):
     east = models.FloatField(blank=True, null=True)
     west = models.FloatField(blank=True, null=True)
 
+    # Polygone : sommets (lat, lng) en "encoded polyline" (apps.services.polygons)
+    polygon = models.TextField(blank=True, null=True)
+
     code_postal = models.CharField(max_length=20, blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
@@ -448,19 +450,55 @@ class Zone(models.Model):
     def __str__(self):
         return self.nom
 
-    # ---------- helpers ----------
-    def _contains_circle(self, lat: float, lng: float) -> bool:
-        if not all(v is not None for v in [self.center_lat, self.center_lng, self.radius_m]):
-            return False
+    # ---------- polygone ----------
+    def polygon_vertices(self):
+        """Sommets décodés (tableau (n, 2)) ou None ; décodage mis en cache sur l'instance."""
+        from apps.services.polygons import decode_polyline
 
+        if not self.polygon:
+            return None
+        cached = getattr(self, "_vertices_cache", None)
+        if cached is None or cached[0] != self.polygon:
+            verts = decode_polyline(self.polygon)
+            cached = (self.polygon, verts if len(verts) >= 3 else None)
+            self._vertices_cache = cached
+        return cached[1]
+
+    def set_polygon(self, points) -> None:
+        """
+        points: [{lat, lng}] | [[lat, lng]] (>= 3 sommets).
+        Renseigne aussi bbox + cercle englobant (emprise, anciens consommateurs).
+        """
+        from apps.services.polygons import encode_polyline, normalize_points
+
+        pts = normalize_points(points)
+        if len(pts) < 3:
+            raise ValidationError({"points": "Un polygone doit avoir au moins 3 sommets."})
+        self.type = "polygon"
+        self.polygon = encode_polyline(pts)
+        verts = self.polygon_vertices()
+        self.south, self.north = float(verts[:, 0].min()), float(verts[:, 0].max())
+        self.west, self.east = float(verts[:, 1].min()), float(verts[:, 1].max())
+        self.center_lat = (self.south + self.north) / 2
+        self.center_lng = (self.west + self.east) / 2
+        self.radius_m = int(ceil(max(self._distance_m(self.center_lat, self.center_lng, la, lo) for la, lo in verts)))
+
+    # ---------- helpers ----------
+    @staticmethod
+    def _distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         # Haversine (mètres)
         R = 6371000
-        lat1, lon1, lat2, lon2 = map(radians, [self.center_lat, self.center_lng, lat, lng])
+        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
         dlat = lat2 - lat1
         dlon = lon2 - lon1
         a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
         c = 2 * asin(sqrt(a))
-        return (R * c) <= float(self.radius_m)
+        return R * c
+
+    def _contains_circle(self, lat: float, lng: float) -> bool:
+        if not all(v is not None for v in [self.center_lat, self.center_lng, self.radius_m]):
+            return False
+        return self._distance_m(self.center_lat, self.center_lng, lat, lng) <= float(self.radius_m)
 
     def _contains_bbox(self, lat: float, lng: float) -> bool:
         if not all(v is not None for v in [self.north, self.south, self.east, self.west]):
@@ -473,7 +511,8 @@ class Zone(models.Model):
         Vérifie si le point (lat,lng) appartient à la zone.
         - circle: haversine
         - rectangle: bbox
-        - polygon: fallback bbox si dispo, sinon cercle si dispo (car on n'a pas les sommets du polygone)
+        - polygon: point dans polygone (ray casting) si sommets enregistrés ;
+          sinon fallback bbox si dispo, sinon cercle si dispo
         """
         try:
             if lat is None or lng is None:
@@ -488,7 +527,13 @@ class Zone(models.Model):
                 return self._contains_bbox(lat, lng)
 
             if t == "polygon":
-                # ✅ IMPORTANT : tu n'as pas de sommets => on fallback
+                verts = self.polygon_vertices()
+                if verts is not None:
+                    from apps.services.polygons import points_in_polygon
+
+                    return bool(points_in_polygon([float(lat)], [float(lng)], verts)[0])
+
+                # ✅ IMPORTANT : pas de sommets (zone ancienne) => on fallback
                 if self._contains_bbox(lat, lng):
                     return True
                 if self._contains_circle(lat, lng):
@@ -518,8 +563,28 @@ class Hotel(models.Model):
     formatted_address = models.TextField(null=True, blank=True)
 
     zone = models.ForeignKey("apps.Zone", on_delete=models.SET_NULL, null=True, blank=True, related_name="hotels")
+    # zone choisie à la main (admin) : jamais recalculée depuis le tracé des zones
+    zone_manuelle = models.BooleanField(default=False)
     agence = models.ForeignKey("apps.AgenceVoyage", on_delete=models.SET_NULL, null=True, blank=True, related_name="hotels")
 
+    # ===== Enrichissement différé (apps/services/hotel_enrichment.py) =====
+    GEO_PENDING = "pending"
+    GEO_DONE = "done"
+    GEO_NOT_FOUND = "not_found"
+    GEO_FAILED = "failed"
+
+    GEO_STATUS_CHOICES = [
+        (GEO_PENDING, "À géocoder"),
+        (GEO_DONE, "Géocodé"),
+        (GEO_NOT_FOUND, "Introuvable"),
+        (GEO_FAILED, "Échec"),
+    ]
+
+    geo_status = models.CharField(max_length=10, choices=GEO_STATUS_CHOICES, default=GEO_PENDING, db_index=True)
+    geo_hint = models.CharField(max_length=255, blank=True, default="")   # ex: "Sousse, 4000" (ville/cp du fichier)
+    geo_attempts = models.PositiveSmallIntegerField(default=0)
+    geo_checked_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ["nom"]
 
@@ -527,6 +592,80 @@ class Hotel(models.Model):
         return self.nom
 
 
+# =========================
+# Cache de géocodage
+# =========================
+
+class GeocodeCache(models.Model):
+    """
+    Résultats des géocodeurs externes (Google / Nominatim), partagés par
+    tous les appels (voir apps/services/geocache.py).
+      - key    : sha256 de la requête normalisée (ou des coordonnées arrondies)
+      - result : None = "aucun résultat" (cache négatif, TTL plus court)
+    """
+    KIND_FORWARD = "forward"
+    KIND_REVERSE = "reverse"
+
+    KIND_CHOICES = [
+        (KIND_FORWARD, "Adresse -> coordonnées"),
+        (KIND_REVERSE, "Coordonnées -> adresse"),
+    ]
+
+    provider = models.CharField(max_length=20)           # ex: "google", "nominatim"
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=64)
+    query = models.CharField(max_length=500, blank=True, default="")  # lisible (admin / debug)
+
+    result = models.JSONField(null=True, blank=True)
+
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "kind", "key"], name="uniq_geocode_cache_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}/{self.kind} {self.query[:60]}"
+
+
+# =========================
+# Temps de trajet
+# =========================
+
+class TravelTime(models.Model):
+    """
+    Durée de trajet (minutes) d'une zone à une autre ; les aéroports sont des
+    zones. Chargée en mémoire en matrice NumPy (apps/services/travel_times.py).
+      - estimate : haversine entre centres (manage.py estimate_travel_times)
+      - measured : temps mesurés importés (manage.py import_travel_times), jamais
+                   écrasés par une estimation
+    """
+    SOURCE_ESTIMATE = "estimate"
+    SOURCE_MEASURED = "measured"
+
+    SOURCE_CHOICES = [
+        (SOURCE_ESTIMATE, "Estimé"),
+        (SOURCE_MEASURED, "Mesuré"),
+    ]
+
+    origin = models.ForeignKey("apps.Zone", on_delete=models.CASCADE, related_name="+")
+    destination = models.ForeignKey("apps.Zone", on_delete=models.CASCADE, related_name="+")
+    minutes = models.PositiveSmallIntegerField()
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=SOURCE_ESTIMATE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["origin", "destination"], name="uniq_travel_time_pair"),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_id} -> {self.destination_id} : {self.minutes} min"
+
+
 
 # =========================
 # Dossier
@@ -585,6 +724,11 @@ class Dossier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["agence", "date", "type_mouvement"]),
+        ]
+
     def __str__(self):
         return f"{self.reference} ({self.pax} pax)"
 
@@ -616,14 +760,18 @@ class ReferenceSequence(models.Model):
         return f"{self.prefix}-{self.day} ({self.last_number})"
 
 
-def generate_daily_reference(prefix: str, day=None) -> str:
+def reserve_daily_references(prefix: str, day=None, n: int = 1) -> list[str]:
     """
-    PREFIX-YYYYMMDD-0001 ... 9999
-    Safe concurrence (select_for_update)
+    Réserve un bloc de n références PREFIX-YYYYMMDD-0001 ... 9999 en UNE mise à
+    jour verrouillée (select_for_update) : les créations en lot distribuent
+    ensuite les références sans repasser par la ligne du compteur.
+    Tout ou rien : si le bloc dépasse 9999, rien n'est réservé.
     """
     prefix = (prefix or "").strip().upper()
     if not prefix:
         raise ValidationError("Prefix de référence invalide.")
+    if n < 1:
+        return []
 
     if day is None:
         day = timezone.localdate()
@@ -636,14 +784,123 @@ def generate_daily_reference(prefix: str, day=None) -> str:
             day=day,
             defaults={"last_number": 0},
         )
-        nxt = int(seq.last_number or 0) + 1
-        if nxt > 9999:
+        first = int(seq.last_number or 0) + 1
+        last = first + n - 1
+        if last > 9999:
             raise ValidationError(f"Limite atteinte: {prefix}-{ymd}-9999 (trop d'objets ce jour).")
 
-        seq.last_number = nxt
+        seq.last_number = last
         seq.save(update_fields=["last_number"])
 
-    return f"{prefix}-{ymd}-{nxt:04d}"
+    return [f"{prefix}-{ymd}-{k:04d}" for k in range(first, last + 1)]
+
+
+def generate_daily_reference(prefix: str, day=None) -> str:
+    """
+    PREFIX-YYYYMMDD-0001 ... 9999
+    Safe concurrence (select_for_update)
+    """
+    return reserve_daily_references(prefix, day, 1)[0]
+
+
+class ResourceVersion(models.Model):
+    """
+    Compteur de changements par agence et type de ressource (mission, fiche, ...)
+    -> ETag des listes (apps.services.versions)
+    agence_id sans FK : incrémenté aussi pendant la suppression en cascade d'une agence.
+    """
+    agence_id = models.PositiveIntegerField()
+    resource = models.CharField(max_length=30)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("agence_id", "resource")
+
+    def __str__(self):
+        return f"{self.agence_id}:{self.resource} v{self.version}"
+
+# =========================
+# Jobs d'import (arrière-plan)
+# =========================
+
+class ImportJob(models.Model):
+    """
+    Import Excel/CSV exécuté hors requête HTTP (voir apps/services/import_jobs.py).
+    Le front soumet le fichier, reçoit l'id du job puis interroge l'avancement.
+    """
+    KIND_DOSSIERS = "dossiers"
+    KIND_FICHES = "fiches"
+    KIND_VEHICULES = "vehicules"
+    KIND_CHAUFFEURS = "chauffeurs"
+
+    KIND_CHOICES = [
+        (KIND_DOSSIERS, "Dossiers"),
+        (KIND_FICHES, "Fiches mouvement"),
+        (KIND_VEHICULES, "Véhicules"),
+        (KIND_CHAUFFEURS, "Chauffeurs"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En attente"),
+        (STATUS_RUNNING, "En cours"),
+        (STATUS_DONE, "Terminé"),
+        (STATUS_FAILED, "Échec"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+
+    agence = models.ForeignKey(AgenceVoyage, on_delete=models.CASCADE, related_name="import_jobs")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="import_jobs",
+    )
+
+    # fichier conservé le temps du traitement (supprimé à la fin)
+    fichier = models.FileField(upload_to="imports/%Y/%m/", blank=True, null=True)
+    nom_fichier = models.CharField(max_length=255, blank=True, default="")
+    # champs du formulaire d'origine (mapping, mode, ...)
+    params = models.JSONField(default=dict, blank=True)
+
+    # compteurs mis à jour après chaque paquet de lignes
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    ignored_count = models.PositiveIntegerField(default=0)
+    errors_count = models.PositiveIntegerField(default=0)
+
+    erreurs = models.JSONField(default=list, blank=True)
+    report = models.JSONField(default=dict, blank=True)   # réponse complète de l'importeur
+    error_message = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # rafraîchi pendant l'exécution : un job "running" sans battement récent a perdu son process
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["agence", "created_at"]),
+            models.Index(fields=["agence", "status"]),
+        ]
+
+    def __str__(self):
+        return f"ImportJob#{self.pk} {self.kind} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
 
 # =========================
 # Fiche Mouvement
@@ -974,7 +1231,7 @@ class Vehicule(models.Model):
 
         if lat is None or lng is None:
             try:
-                from b2b.services.geocoding import geocode_address
+                from apps.services.geocoding import geocode_address
                 lat, lng = geocode_address(adresse)
             except Exception:
                 lat, lng = None, None
@@ -1177,41 +1434,35 @@ class Chauffeur(models.Model):
         """
         Renvoie (vehicule_disponible_le_plus_proche, distance_km)
         basé sur :
-          - localisation actuelle du chauffeur (géocodée)
-          - coordonnées last_lat / last_lng des véhicules dispo
+          - localisation actuelle du chauffeur : hôtel connu (coordonnées en base),
+            sinon géocodage (cache apps.services.geocache)
+          - coordonnées last_lat / last_lng des véhicules dispo (NumPy, apps.services.nearest)
         """
         loc = self.get_current_location()
         if not loc or not self.agence:
             return None, None
 
-        try:
-            from b2b.services.geocoding import geocode_address
-            lat_c, lng_c = geocode_address(loc)
-        except Exception:
-            lat_c, lng_c = None, None
+        hotel = Hotel.objects.filter(nom__iexact=loc.strip(), lat__isnull=False, lng__isnull=False).first()
+        if hotel:
+            lat_c, lng_c = hotel.lat, hotel.lng
+        else:
+            try:
+                from apps.services.geocoding import geocode_address
+                lat_c, lng_c = geocode_address(loc)
+            except Exception:
+                lat_c, lng_c = None, None
 
         if lat_c is None or lng_c is None:
             return None, None
 
-        from b2b.models import Vehicule  # import local pour éviter cycles
-        vehicles = Vehicule.objects.filter(statut="dispo", agence=self.agence)
-
-        best = None
-        best_distance = None
-
-        for v in vehicles:
-            if v.last_lat is None or v.last_lng is None:
-                continue
-
-            dist = Vehicule._distance_km(lat_c, lng_c, v.last_lat, v.last_lng)
-            if dist is None:
-                continue
-
-            if best_distance is None or dist < best_distance:
-                best = v
-                best_distance = dist
+        from apps.services.nearest import nearest_vehicles
 
-        return best, best_distance
+        Vehicule = self._meta.apps.get_model("apps", "Vehicule")
+        vehicles = Vehicule.objects.filter(statut="dispo", agence=self.agence)
+        best = nearest_vehicles(vehicles, (lat_c, lng_c), k=1)
+        if not best:
+            return None, None
+        return best[0]
 
 
 # =========================
@@ -1499,6 +1750,20 @@ class Mission(models.Model):
 
     is_converted_from_fiche = models.BooleanField(default=False)
 
+    # Fenêtre effective / statut / lieux : copie dénormalisée des affectations
+    # (MissionRessource), tenue à jour par apps.services.mission_window
+    STATUT_PLANNED = "PLANNED"
+    STATUT_CANCELLED = "CANCELLED"
+    STATUT_CHOICES = (
+        (STATUT_PLANNED, "Planifiée"),
+        (STATUT_CANCELLED, "Annulée"),
+    )
+    date_heure_debut = models.DateTimeField(null=True, blank=True)
+    date_heure_fin = models.DateTimeField(null=True, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, null=True, blank=True)
+    lieu_depart = models.CharField(max_length=255, blank=True, null=True)
+    lieu_arrivee = models.CharField(max_length=255, blank=True, null=True)
+
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         null=True,
@@ -1509,7 +1774,11 @@ class Mission(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
-    
+        indexes = [
+            models.Index(fields=["agence", "date_heure_debut"]),
+            models.Index(fields=["vehicule", "date_heure_fin"]),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.reference:
             day = self.date or timezone.localdate()
@@ -1609,28 +1878,33 @@ class MissionRessource(models.Model):
         if errors:
             raise ValidationError(errors)
 
-        overlap = Q(date_heure_debut__lt=self.date_heure_fin) & Q(date_heure_fin__gt=self.date_heure_debut)
+        # chevauchements : requête SQL (ressources verrouillées par save())
+        from apps.services import availability
 
-        if self.vehicule_id:
-            qs = MissionRessource.objects.filter(vehicule_id=self.vehicule_id, is_deleted=False).filter(overlap)
-            if self.pk:
-                qs = qs.exclude(pk=self.pk)
-            if qs.exclude(mission_id=self.mission_id).exists():
-                errors["vehicule"] = "Véhicule déjà occupé sur ce créneau."
-
-        if self.chauffeur_id:
-            qs = MissionRessource.objects.filter(chauffeur_id=self.chauffeur_id, is_deleted=False).filter(overlap)
-            if self.pk:
-                qs = qs.exclude(pk=self.pk)
-            if qs.exclude(mission_id=self.mission_id).exists():
-                errors["chauffeur"] = "Chauffeur déjà occupé sur ce créneau."
+        for kind, res_id, message in (
+            (availability.VEHICULE, self.vehicule_id, "Véhicule déjà occupé sur ce créneau."),
+            (availability.CHAUFFEUR, self.chauffeur_id, "Chauffeur déjà occupé sur ce créneau."),
+        ):
+            if not res_id:
+                continue
+            if availability.conflicts(
+                kind, res_id, self.date_heure_debut, self.date_heure_fin,
+                exclude_id=self.pk, exclude_mission_id=self.mission_id,
+            ):
+                errors[kind] = message
 
         if errors:
             raise ValidationError(errors)
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        res = super().save(*args, **kwargs)
+        from apps.services.availability import lock_resources
+
+        with transaction.atomic():
+            # verrou des ressources AVANT la vérification : deux écritures concurrentes
+            # sur le même véhicule / chauffeur se sérialisent
+            lock_resources([self.vehicule_id], [self.chauffeur_id])
+            self.full_clean()
+            res = super().save(*args, **kwargs)
         return res
 
     def soft_delete(self):
@@ -1726,25 +2000,119 @@ def update_vehicle_position_on_mission_save(sender, instance: MissionRessource,
     vehicule.update_position(adresse)
 
 
+@receiver(post_save, sender=MissionRessource)
+@receiver(post_delete, sender=MissionRessource)
+def sync_availability_index(sender, instance: MissionRessource, **kwargs):
+    """Affectation enregistrée / soft-delete / supprimée => index de disponibilité à jour."""
+    from apps.services.availability import Affectation, record_change
+
+    deleted = kwargs.get("signal") is post_delete
+    record_change(instance.pk, None if deleted else Affectation.from_instance(instance))
+
+
+@receiver(post_save, sender=MissionRessource)
+@receiver(post_delete, sender=MissionRessource)
+def sync_mission_window_on_affectation_change(sender, instance: MissionRessource, **kwargs):
+    """Affectation modifiée => fenêtre / statut / lieux recopiés sur la mission."""
+    from apps.services.mission_window import sync_mission_windows
+
+    sync_mission_windows([instance.mission_id])
+
+
+@receiver(post_save, sender=Mission)
+@receiver(post_delete, sender=Mission)
+@receiver(post_save, sender=FicheMouvement)
+@receiver(post_delete, sender=FicheMouvement)
+@receiver(post_save, sender=Dossier)
+@receiver(post_delete, sender=Dossier)
+@receiver(post_save, sender=Vehicule)
+@receiver(post_delete, sender=Vehicule)
+@receiver(post_save, sender=Chauffeur)
+@receiver(post_delete, sender=Chauffeur)
+def bump_resource_version(sender, instance, **kwargs):
+    """Objet enregistré / supprimé => version (agence, ressource) incrémentée (ETag des listes)."""
+    from apps.services import versions
+
+    resource = {
+        Mission: versions.MISSION,
+        FicheMouvement: versions.FICHE,
+        Dossier: versions.DOSSIER,
+        Vehicule: versions.VEHICULE,
+        Chauffeur: versions.CHAUFFEUR,
+    }[sender]
+    versions.bump_versions([instance.agence_id], [resource])
+
+
+@receiver(post_save, sender=MissionRessource)
+@receiver(post_delete, sender=MissionRessource)
+def bump_affectation_version(sender, instance: MissionRessource, **kwargs):
+    """
+    Affectation modifiée => agence de la mission + agences des ressources (RENTOÛT).
+    La fenêtre de la mission est recopiée sans signal (bulk_update) : version mission aussi.
+    """
+    from apps.services import versions
+
+    # agences lues sur les objets liés déjà chargés ; les autres en UNE requête
+    agence_ids = set()
+    missing = []
+    for field, model in (("mission", Mission), ("vehicule", Vehicule), ("chauffeur", Chauffeur)):
+        pk = getattr(instance, f"{field}_id")
+        if not pk:
+            continue
+        related = instance._state.fields_cache.get(field)
+        if related is not None:
+            agence_ids.add(related.agence_id)
+        else:
+            missing.append(model.objects.filter(pk=pk).order_by().values_list("agence_id", flat=True))
+    if missing:
+        agence_ids.update(missing[0].union(*missing[1:], all=True))
+    versions.bump_versions(agence_ids, [versions.AFFECTATION, versions.MISSION])
+
+
+@receiver(post_save, sender=VehiculeTarifZone)
+@receiver(post_delete, sender=VehiculeTarifZone)
+def bump_tarif_version(sender, instance: VehiculeTarifZone, **kwargs):
+    """Tarif modifié => cache des tarifs / RENTOÛT invalidé."""
+    from apps.services import versions
+
+    versions.bump_versions([instance.agence_id], [versions.TARIF])
+
+
+@receiver(post_save, sender=Zone)
+@receiver(post_delete, sender=Zone)
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+@receiver(post_save, sender=TravelTime)
+@receiver(post_delete, sender=TravelTime)
+def bump_global_version(sender, instance, **kwargs):
+    """Zones / hôtels / temps de trajet : pas d'agence => compteur global."""
+    from apps.services import versions
+
+    resource = {Zone: versions.ZONE, Hotel: versions.HOTEL}.get(sender, versions.TRAVEL_TIME)
+    versions.bump_versions([versions.GLOBAL], [resource])
+
+
+@receiver(post_save, sender=Zone)
+@receiver(post_delete, sender=Zone)
+def invalidate_zone_index_on_change(sender, instance: Zone, **kwargs):
+    """Zone créée / modifiée / supprimée => l'index spatial sera reconstruit."""
+    from apps.services.zone_index import invalidate_zone_index
+
+    invalidate_zone_index()
+
+
 @receiver(post_save, sender=Hotel)
 def enrich_hotel_address_on_create(sender, instance: Hotel, created: bool, **kwargs):
     """
-    Dès qu'un Hotel est créé (ou sauvé) sans adresse, on tente un enrichissement.
-    Fail-safe: aucune exception ne remonte.
+    Nouvel hôtel à géocoder => on réveille le worker d'enrichissement APRÈS commit.
+    Aucun appel réseau ici (les imports ne doivent jamais attendre HTTP).
+    Les nouvelles tentatives (échecs) passent par `manage.py enrich_hotels`.
     """
-    try:
-        if instance.adresse:
-            return
-        city = None
-        postal = None
-        if instance.zone_id:
-            city = instance.zone.nom
-            postal = instance.zone.code_postal or None
-        addr = lookup_hotel_address(instance.nom, city, postal, country=None)
-        if addr:
-            Hotel.objects.filter(pk=instance.pk).update(adresse=addr)
-    except Exception:
-        pass
+    if not created or instance.geo_status != Hotel.GEO_PENDING:
+        return
+    from apps.services.hotel_enrichment import kick_hotel_enrichment
+
+    transaction.on_commit(kick_hotel_enrichment)
 
 
 
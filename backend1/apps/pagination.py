@@ -0,0 +1,186 @@
+# backend1/apps/pagination.py
+# -*- coding: utf-8 -*-
+"""
+Pagination par curseur "keyset" : la page suivante est filtrée par
+WHERE (col1, col2, ..., id) > (valeurs de la dernière ligne), jamais par OFFSET.
+Une page profonde coûte donc autant que la première.
+
+  ?cursor=<opaque>   curseur renvoyé dans "next_cursor" (et dans "next")
+  ?page_size=N       taille de page (plafonnée par KEYSET_MAX_PAGE_SIZE)
+  ?count=1           ajoute "count" (COUNT(*) seulement sur demande)
+
+Réponse : {"next": url|null, "next_cursor": str|null, "results": [...], ("count": n)}
+
+"next" est une URL relative (chemin + query) : derrière le proxy TLS, une URL
+absolue reconstruite côté Django sortirait en http://.
+
+L'ordre est celui du queryset (order_by de la vue ou Meta.ordering), complété
+par la clé primaire si besoin ; les NULL sont placés explicitement (premiers en
+ASC, derniers en DESC) pour que le filtre keyset corresponde à l'ordre SQL.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _parse_ordering(queryset: QuerySet, ordering=None) -> List[Tuple[str, bool]]:
+    """-> [(champ, desc), ...] terminé par la clé primaire."""
+    raw = list(ordering or queryset.query.order_by or queryset.model._meta.ordering or [])
+    pk_name = queryset.model._meta.pk.name
+    out: List[Tuple[str, bool]] = []
+    for item in raw:
+        if not isinstance(item, str):
+            raise TypeError("KeysetPagination : ordering par nom de champ uniquement.")
+        desc = item.startswith("-")
+        name = item.lstrip("-")
+        if name == "pk":
+            name = pk_name
+        if "__" in name:
+            raise TypeError(f"KeysetPagination : champ relationnel non supporté ({item}).")
+        out.append((name, desc))
+    if pk_name not in {name for name, _ in out}:
+        out.append((pk_name, False))
+    return out
+
+
+def _after_q(name: str, desc: bool, value: Any) -> Q:
+    """Lignes strictement après `value` sur ce champ (NULL premiers en ASC, derniers en DESC)."""
+    if value is None:
+        return Q(**{f"{name}__isnull": False}) if not desc else Q(pk__in=[])
+    if desc:
+        return Q(**{f"{name}__lt": value}) | Q(**{f"{name}__isnull": True})
+    return Q(**{f"{name}__gt": value})
+
+
+def _equal_q(name: str, value: Any) -> Q:
+    return Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+
+
+def keyset_q(keys: List[Tuple[str, bool]], values: List[Any]) -> Q:
+    """(k1, k2, ..., kn) > (v1, v2, ..., vn) dans l'ordre lexicographique de `keys`."""
+    q = Q(pk__in=[])
+    prefix = Q()
+    for (name, desc), value in zip(keys, values):
+        q |= prefix & _after_q(name, desc, value)
+        prefix &= _equal_q(name, value)
+    return q
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+
+    # ordre imposé (sinon celui du queryset)
+    ordering: Optional[Tuple[str, ...]] = None
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size = getattr(settings, "KEYSET_PAGE_SIZE", 100)
+        self.max_page_size = getattr(settings, "KEYSET_MAX_PAGE_SIZE", 500)
+
+    # -------------------------
+    # Curseur opaque
+    # -------------------------
+    def encode_cursor(self, values: List[Any]) -> str:
+        payload = {"k": [f"{'-' if d else ''}{n}" for n, d in self.keys], "v": [self._dump(v) for v in values]}
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, request) -> Optional[List[Any]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            payload = json.loads(raw.decode("utf-8"))
+            if payload["k"] != [f"{'-' if d else ''}{n}" for n, d in self.keys]:
+                raise ValueError("ordre différent")
+            return [self._load(name, v) for (name, _), v in zip(self.keys, payload["v"], strict=True)]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError, FieldDoesNotExist):
+            raise NotFound("Curseur invalide.")
+
+    @staticmethod
+    def _dump(value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+    def _load(self, name: str, value: Any) -> Any:
+        if value is None:
+            return None
+        return self.model._meta.get_field(name).to_python(value)
+
+    # -------------------------
+    # API BasePagination
+    # -------------------------
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param) or self.page_size)
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.keys = _parse_ordering(queryset, self.ordering)
+        self.count = None
+        if str(request.query_params.get(self.count_query_param, "")).lower() in ("1", "true", "yes"):
+            self.count = queryset.count()
+
+        ordered = queryset.order_by(*[
+            F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_first=True)
+            for name, desc in self.keys
+        ])
+        values = self.decode_cursor(request)
+        if values is not None:
+            ordered = ordered.filter(keyset_q(self.keys, values))
+
+        page_size = self.get_page_size(request)
+        rows = list(ordered[: page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_cursor(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor([getattr(last, name) for name, _ in self.keys])
+
+    def get_next_link(self) -> Optional[str]:
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.get_full_path(), self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        out = OrderedDict([("next", self.get_next_link()), ("next_cursor", self.get_next_cursor())])
+        if self.count is not None:
+            out["count"] = self.count
+        out["results"] = data
+        return Response(out)
+
+    def get_paginated_response_schema(self, schema):
+        props = {
+            "next": {"type": "string", "nullable": True, "format": "uri-reference"},
+            "next_cursor": {"type": "string", "nullable": True},
+            "count": {"type": "integer"},
+            "results": schema,
+        }
+        return {"type": "object", "required": ["results"], "properties": props}
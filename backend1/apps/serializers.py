@@ -18,14 +18,15 @@ from apps.models import (
     ExcursionTemplate,
     FicheMouvement,
     Hotel,
+    ImportJob,
     LanguageMapping,
     Mission,
-    MissionRessource,
     OrdreMission,
     Profile,
     Vehicule,
     Zone,
 )
+from apps.services.polygons import normalize_points
 
 from django.contrib.auth.password_validation import validate_password
 
@@ -234,7 +235,14 @@ class VehiculeSerializer(serializers.ModelSerializer):
         z = getattr(m, "zone", None)
         return str(z).strip() if z else None
 
+    def _fleet_state(self, obj: Vehicule):
+        # état précalculé en lot par apps.services.fleet_state (liste)
+        return (self.context.get("fleet_state") or {}).get(obj.pk)
+
     def get_last_mission_zone(self, obj: Vehicule):
+        state = self._fleet_state(obj)
+        if state is not None:
+            return self._zone_label(state["last_mission"])
         now = timezone.now()
         qs = Mission.objects.filter(vehicule=obj).order_by("-date", "-horaires")
         for m in qs[:50]:
@@ -244,6 +252,9 @@ class VehiculeSerializer(serializers.ModelSerializer):
         return None
 
     def get_next_mission_zone(self, obj: Vehicule):
+        state = self._fleet_state(obj)
+        if state is not None:
+            return self._zone_label(state["next_mission"])
         now = timezone.now()
         qs = Mission.objects.filter(vehicule=obj).order_by("date", "horaires")
         for m in qs[:50]:
@@ -415,17 +426,6 @@ class MissionSerializer(serializers.ModelSerializer):
             "remarque",
         ]
 
-    def _main_ressource(self, obj: Mission) -> Optional[MissionRessource]:
-        try:
-            return (
-                MissionRessource.objects
-                .filter(mission=obj, is_deleted=False)
-                .order_by("-date_heure_fin", "-id")
-                .first()
-            )
-        except Exception:
-            return None
-
     def _combine_date_time(self, d, t):
         if not d:
             return None
@@ -435,18 +435,18 @@ class MissionSerializer(serializers.ModelSerializer):
             return timezone.make_aware(dt_naive, timezone.get_current_timezone())
         return dt_naive
 
-    def get_kind(self, obj: Mission):
-        mk = getattr(obj, "main_kind", None)
-        if mk:
-            return "arrivee" if str(mk).upper().startswith(("A", "L")) else "depart"
+    def _fiches(self, obj: Mission):
+        # préchargées par MissionViewSet (Prefetch -> fiches_actives), sinon requête
+        fiches = getattr(obj, "fiches_actives", None)
+        if fiches is None:
+            fiches = list(obj.fiches.filter(is_deleted=False))
+        return fiches
 
-        try:
-            f0 = obj.fiches.filter(is_deleted=False).first()
-            if f0:
-                t = (getattr(f0, "type", "") or "").upper().strip()
-                return "arrivee" if t.startswith(("A", "L")) else "depart"
-        except Exception:
-            pass
+    def get_kind(self, obj: Mission):
+        fiches = self._fiches(obj)
+        if fiches:
+            t = (getattr(fiches[0], "type", "") or "").upper().strip()
+            return "arrivee" if t.startswith(("A", "L")) else "depart"
         return None
 
     def get_vehicule(self, obj: Mission):
@@ -458,35 +458,26 @@ class MissionSerializer(serializers.ModelSerializer):
         return str(c) if c else None
 
     def get_pax_total(self, obj: Mission):
-        total = 0
-        try:
-            for f in obj.fiches.filter(is_deleted=False).all():
-                total += int(getattr(f, "pax", 0) or 0)
-        except Exception:
-            pass
-        return total
+        annotated = getattr(obj, "fiches_pax", None)
+        if annotated is not None:
+            return int(annotated)
+        return sum(int(getattr(f, "pax", 0) or 0) for f in self._fiches(obj))
 
     def get_date_heure_debut(self, obj: Mission):
-        mr = self._main_ressource(obj)
-        if mr and mr.date_heure_debut:
-            return mr.date_heure_debut
+        # fenêtre dénormalisée (apps.services.mission_window) : plus de requête par ligne
+        if obj.date_heure_debut:
+            return obj.date_heure_debut
         return self._combine_date_time(getattr(obj, "date", None), getattr(obj, "horaires", None))
 
     def get_date_heure_fin(self, obj: Mission):
-        mr = self._main_ressource(obj)
-        if mr and mr.date_heure_fin:
-            return mr.date_heure_fin
+        if obj.date_heure_fin:
+            return obj.date_heure_fin
         start = self.get_date_heure_debut(obj)
         return (start + timezone.timedelta(hours=3)) if start else None
 
     def get_passage(self, obj: Mission):
         out = []
-        try:
-            fiches = obj.fiches.filter(is_deleted=False).all()
-        except Exception:
-            fiches = []
-
-        for f in fiches:
+        for f in self._fiches(obj):
             hs = getattr(f, "hotel_schedule", None) or []
             if not isinstance(hs, list):
                 continue
@@ -634,9 +625,51 @@ class DossierSerializer(serializers.ModelSerializer):
 # ============================================================
 
 class ZoneSerializer(serializers.ModelSerializer):
+    # sommets du polygone [{lat, lng}] ; stockés encodés dans Zone.polygon
+    points = serializers.ListField(child=serializers.JSONField(), write_only=True, required=False, allow_null=True)
+
     class Meta:
         model = Zone
         fields = "__all__"
+        read_only_fields = ["polygon"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        verts = instance.polygon_vertices()
+        data["points"] = [{"lat": float(la), "lng": float(lo)} for la, lo in verts] if verts is not None else None
+        return data
+
+    def validate_points(self, value):
+        if not value:
+            return None
+        try:
+            pts = normalize_points(value)
+        except (TypeError, ValueError, KeyError, IndexError):
+            raise serializers.ValidationError("Sommets invalides (attendu: [{lat, lng}, ...]).")
+        if len(pts) < 3:
+            raise serializers.ValidationError("Un polygone doit avoir au moins 3 sommets.")
+        return pts
+
+    def _apply_points(self, instance, points):
+        if points:
+            instance.set_polygon(points)
+        elif instance.type != "polygon":
+            instance.polygon = None
+
+    def create(self, validated_data):
+        points = validated_data.pop("points", None)
+        instance = Zone(**validated_data)
+        self._apply_points(instance, points)
+        instance.save()
+        return instance
+
+    def update(self, instance, validated_data):
+        points = validated_data.pop("points", None)
+        for k, v in validated_data.items():
+            setattr(instance, k, v)
+        self._apply_points(instance, points)
+        instance.save()
+        return instance
 
 
 class ExcursionStepSerializer(serializers.ModelSerializer):
@@ -732,3 +765,32 @@ class ExcursionEventSerializer(serializers.ModelSerializer):
         if vehicle_source == "RENTOUT" and not veh_rent:
             raise serializers.ValidationError({"vehicule_rentout": "Merci de sélectionner un véhicule Rentout."})
         return attrs
+
+
+# ============================================================
+# ImportJob
+# ============================================================
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    is_finished = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "is_finished",
+            "agence",
+            "nom_fichier",
+            "processed_rows",
+            "created_count",
+            "updated_count",
+            "ignored_count",
+            "errors_count",
+            "error_message",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
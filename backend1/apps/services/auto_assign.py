@@ -0,0 +1,330 @@
+# backend1/apps/services/auto_assign.py
+# -*- coding: utf-8 -*-
+"""
+Affectation automatique véhicule / chauffeur des fiches d'une journée.
+
+Entrée : les courses à couvrir (Job : fenêtre [start, end), pax, points de
+prise en charge / dépose) + véhicules et chauffeurs "dispo" de l'agence.
+
+  1) glouton : courses par début croissant ; chacune va au véhicule faisable
+     (capacité >= pax, libre dans l'index de disponibilité, enchaînable après
+     sa course précédente du plan : fin + trajet à vide + battement <= début)
+     de coût minimal = km à vide + OPEN_VEHICLE_KM si le véhicule n'est pas
+     encore utilisé ;
+  2) recherche locale :
+       - dissolution de tournées (toutes les courses de la plus petite
+         tournée réinsérées ailleurs -> un véhicule de moins),
+       - déplacement de courses qui réduisent les km à vide,
+       - tournée entière confiée à un véhicule inutilisé plus proche ;
+  3) chauffeurs : un seul chauffeur pour toute la tournée si possible, sinon
+     course par course ; à défaut, affectation véhicule seul.
+
+Distances : haversine (apps.services.nearest) en UNE matrice NumPy ; point
+inconnu => UNKNOWN_KM. Durée d'un trajet à vide : temps de la matrice zone ->
+zone (apps.services.travel_times) quand il est connu, sinon
+km / DEADHEAD_SPEED_KMH.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apps.models import Chauffeur, Vehicule
+from apps.services import availability, travel_times
+from apps.services.nearest import haversine_km
+from apps.services.routing import place_points
+
+
+OPEN_VEHICLE_KM = 200.0      # pénalité d'un véhicule de plus (en km à vide équivalents)
+UNKNOWN_KM = 30.0            # trajet à vide quand un des deux points n'est pas géolocalisé
+DEADHEAD_SPEED_KMH = 50.0
+TURNAROUND = timedelta(minutes=15)
+MAX_PASSES = 5
+EPS = 1e-6
+
+Point = Optional[Tuple[float, float]]
+
+
+@dataclass
+class Job:
+    """Une course à couvrir (une fiche) ; key = id de la fiche."""
+    key: int
+    pax: int
+    start: datetime
+    end: datetime
+    start_label: Optional[str] = None
+    end_label: Optional[str] = None
+    start_point: Point = None
+    end_point: Point = None
+
+
+@dataclass
+class Route:
+    vehicule: Vehicule
+    jobs: List[Job] = field(default_factory=list)
+    empty_km: float = 0.0
+
+
+@dataclass
+class Plan:
+    routes: List[Route]
+    chauffeurs: Dict[int, Optional[Chauffeur]]   # job.key -> chauffeur (None : véhicule seul)
+    unassigned: Dict[int, str]                   # job.key -> raison
+    empty_km: float = 0.0
+
+    @property
+    def vehicles_used(self) -> int:
+        return len(self.routes)
+
+
+def resolve_points(jobs: Sequence[Job]) -> None:
+    """Complète start_point / end_point depuis les libellés : hôtel (nom) puis zone (nom)."""
+    points = place_points(
+        lbl for j in jobs for lbl, pt in ((j.start_label, j.start_point), (j.end_label, j.end_point)) if pt is None
+    )
+    for j in jobs:
+        if j.start_point is None:
+            j.start_point = points.get((j.start_label or "").strip().lower())
+        if j.end_point is None:
+            j.end_point = points.get((j.end_label or "").strip().lower())
+
+
+class AssignmentProblem:
+    """Construit puis améliore un plan ; ne touche pas à la base (hors lectures d'index)."""
+
+    def __init__(self, agence_id: int, jobs: Sequence[Job], vehicules: Sequence[Vehicule], chauffeurs: Sequence[Chauffeur]):
+        self.agence_id = agence_id
+        self.jobs = sorted(jobs, key=lambda j: (j.start, -j.pax, j.key))
+        self.vehicules = list(vehicules)
+        self.chauffeurs = list(chauffeurs)
+
+        # points : [origines véhicules] + [départs courses] + [arrivées courses]
+        nv, nj = len(self.vehicules), len(self.jobs)
+        self._v_idx = {v.pk: i for i, v in enumerate(self.vehicules)}
+        self._start_idx = {j.key: nv + i for i, j in enumerate(self.jobs)}
+        self._end_idx = {j.key: nv + nj + i for i, j in enumerate(self.jobs)}
+        pts: List[Point] = [
+            (v.last_lat, v.last_lng) if v.last_lat is not None and v.last_lng is not None else None
+            for v in self.vehicules
+        ]
+        pts += [j.start_point for j in self.jobs] + [j.end_point for j in self.jobs]
+        lats = np.array([p[0] if p else np.nan for p in pts], dtype=float)
+        lngs = np.array([p[1] if p else np.nan for p in pts], dtype=float)
+        self._km = np.nan_to_num(haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :]), nan=UNKNOWN_KM)
+
+        # zones des libellés : temps de trajet à vide pris dans la matrice si connu
+        zones = travel_times.zones_for_labels(
+            lbl for j in self.jobs for lbl in (j.start_label, j.end_label) if lbl
+        )
+        self._start_zone = {j.key: zones.get((j.start_label or "").strip().lower()) for j in self.jobs}
+        self._end_zone = {j.key: zones.get((j.end_label or "").strip().lower()) for j in self.jobs}
+        self._travel = travel_times.get_matrix()
+
+        self._free: Dict[Tuple[str, int, int], bool] = {}
+
+    # ---------- briques ----------
+    def _gap_km(self, vehicule: Vehicule, prev: Optional[Job], job: Job) -> float:
+        a = self._end_idx[prev.key] if prev is not None else self._v_idx[vehicule.pk]
+        return float(self._km[a, self._start_idx[job.key]])
+
+    def _chains(self, vehicule: Vehicule, prev: Optional[Job], job: Job) -> bool:
+        if prev is None:
+            return True
+        a, b = self._end_zone[prev.key], self._start_zone[job.key]
+        minutes = self._travel.get(a, b) if a != b else None   # même zone : la distance suffit
+        if minutes is not None:
+            travel = timedelta(minutes=minutes)
+        else:
+            travel = timedelta(hours=self._gap_km(vehicule, prev, job) / DEADHEAD_SPEED_KMH)
+        return prev.end + travel + TURNAROUND <= job.start
+
+    def _is_free(self, kind: str, res_id: int, job: Job) -> bool:
+        key = (kind, res_id, job.key)
+        if key not in self._free:
+            self._free[key] = availability.is_free(kind, self.agence_id, res_id, job.start, job.end)
+        return self._free[key]
+
+    def _fits(self, vehicule: Vehicule, job: Job) -> bool:
+        if vehicule.capacite < job.pax:
+            return False
+        return self._is_free(availability.VEHICULE, vehicule.pk, job)
+
+    def _best_insertion(self, vehicule: Vehicule, jobs: List[Job], job: Job) -> Optional[Tuple[float, int]]:
+        """(surcoût km, position) de la meilleure insertion faisable, ou None."""
+        if not self._fits(vehicule, job):
+            return None
+        best = None
+        for pos in range(len(jobs) + 1):
+            prev = jobs[pos - 1] if pos else None
+            nxt = jobs[pos] if pos < len(jobs) else None
+            if prev is not None and prev.start > job.start:
+                break
+            if nxt is not None and nxt.start < job.start:
+                continue
+            if not self._chains(vehicule, prev, job) or (nxt is not None and not self._chains(vehicule, job, nxt)):
+                continue
+            cost = self._gap_km(vehicule, prev, job)
+            if nxt is not None:
+                cost += self._gap_km(vehicule, job, nxt) - self._gap_km(vehicule, prev, nxt)
+            if best is None or cost < best[0]:
+                best = (cost, pos)
+        return best
+
+    def _route_km(self, vehicule: Vehicule, jobs: List[Job]) -> float:
+        return sum(self._gap_km(vehicule, jobs[i - 1] if i else None, j) for i, j in enumerate(jobs))
+
+    def _route_ok(self, vehicule: Vehicule, jobs: List[Job]) -> bool:
+        return all(
+            self._fits(vehicule, j) and self._chains(vehicule, jobs[i - 1] if i else None, j)
+            for i, j in enumerate(jobs)
+        )
+
+    # ---------- 1) glouton ----------
+    def _greedy(self) -> Tuple[Dict[int, List[Job]], Dict[int, str]]:
+        routes: Dict[int, List[Job]] = {v.pk: [] for v in self.vehicules}
+        unassigned: Dict[int, str] = {}
+        for job in self.jobs:
+            best = None
+            for v in self.vehicules:
+                ins = self._best_insertion(v, routes[v.pk], job)
+                if ins is None:
+                    continue
+                cost = ins[0] + (0.0 if routes[v.pk] else OPEN_VEHICLE_KM)
+                cost += 0.01 * (v.capacite - job.pax)  # départage : le plus petit véhicule suffisant
+                if best is None or cost < best[0]:
+                    best = (cost, v.pk, ins[1])
+            if best is None:
+                big_enough = any(v.capacite >= job.pax for v in self.vehicules)
+                unassigned[job.key] = (
+                    "Aucun véhicule libre sur ce créneau." if big_enough else "Aucun véhicule de capacité suffisante."
+                )
+                continue
+            routes[best[1]].insert(best[2], job)
+        return routes, unassigned
+
+    # ---------- 2) recherche locale ----------
+    def _dissolve_routes(self, routes: Dict[int, List[Job]]) -> bool:
+        by_id = {v.pk: v for v in self.vehicules}
+        used = sorted((vid for vid in routes if routes[vid]), key=lambda vid: (len(routes[vid]), vid))
+        for vid in used:
+            trial = {k: list(js) for k, js in routes.items() if js and k != vid}
+            ok = True
+            for job in routes[vid]:
+                best = None
+                for k, js in trial.items():
+                    ins = self._best_insertion(by_id[k], js, job)
+                    if ins is not None and (best is None or ins[0] < best[0]):
+                        best = (ins[0], k, ins[1])
+                if best is None:
+                    ok = False
+                    break
+                trial[best[1]].insert(best[2], job)
+            if ok:
+                routes[vid] = []
+                routes.update(trial)
+                return True
+        return False
+
+    def _relocate_jobs(self, routes: Dict[int, List[Job]]) -> bool:
+        by_id = {v.pk: v for v in self.vehicules}
+        improved = False
+        for vid in list(routes):
+            i = 0
+            while i < len(routes[vid]):
+                js = routes[vid]
+                job, v = js[i], by_id[vid]
+                prev = js[i - 1] if i else None
+                nxt = js[i + 1] if i + 1 < len(js) else None
+                gain = self._gap_km(v, prev, job)
+                if nxt is not None:
+                    gain += self._gap_km(v, job, nxt) - self._gap_km(v, prev, nxt)
+                best = None
+                for k, other in routes.items():
+                    if k == vid or not other:
+                        continue
+                    ins = self._best_insertion(by_id[k], other, job)
+                    if ins is not None and ins[0] < gain - EPS and (best is None or ins[0] < best[0]):
+                        best = (ins[0], k, ins[1])
+                if best is None:
+                    i += 1
+                    continue
+                del js[i]
+                routes[best[1]].insert(best[2], job)
+                improved = True
+        return improved
+
+    def _swap_vehicles(self, routes: Dict[int, List[Job]]) -> bool:
+        improved = False
+        for vid in [k for k, js in routes.items() if js]:
+            current = self._route_km(self._by_id(vid), routes[vid])
+            for v in self.vehicules:
+                if routes[v.pk] or not self._route_ok(v, routes[vid]):
+                    continue
+                km = self._route_km(v, routes[vid])
+                if km < current - EPS:
+                    routes[v.pk], routes[vid] = routes[vid], []
+                    improved = True
+                    break
+        return improved
+
+    def _by_id(self, vid: int) -> Vehicule:
+        return self.vehicules[self._v_idx[vid]]
+
+    # ---------- 3) chauffeurs ----------
+    def _assign_drivers(self, routes: List[Route]) -> Dict[int, Optional[Chauffeur]]:
+        out: Dict[int, Optional[Chauffeur]] = {}
+        booked: Dict[int, List[Job]] = {c.pk: [] for c in self.chauffeurs}
+
+        def ok(c: Chauffeur, jobs: List[Job]) -> bool:
+            return all(
+                self._is_free(availability.CHAUFFEUR, c.pk, j)
+                and all(not (b.start < j.end and b.end > j.start) for b in booked[c.pk])
+                for j in jobs
+            )
+
+        for route in sorted(routes, key=lambda r: (r.jobs[0].start, r.vehicule.pk)):
+            whole = next((c for c in self.chauffeurs if not booked[c.pk] and ok(c, route.jobs)), None)
+            if whole is not None:
+                booked[whole.pk].extend(route.jobs)
+                out.update({j.key: whole for j in route.jobs})
+                continue
+            for j in route.jobs:
+                c = next((c for c in self.chauffeurs if ok(c, [j])), None)
+                if c is not None:
+                    booked[c.pk].append(j)
+                out[j.key] = c
+        return out
+
+    # ---------- plan ----------
+    def solve(self) -> Plan:
+        routes, unassigned = self._greedy()
+        for _ in range(MAX_PASSES):
+            changed = self._dissolve_routes(routes)
+            changed = self._relocate_jobs(routes) or changed
+            changed = self._swap_vehicles(routes) or changed
+            if not changed:
+                break
+
+        final = [
+            Route(vehicule=self._by_id(vid), jobs=js, empty_km=round(self._route_km(self._by_id(vid), js), 1))
+            for vid, js in routes.items()
+            if js
+        ]
+        final.sort(key=lambda r: (r.jobs[0].start, r.vehicule.pk))
+        return Plan(
+            routes=final,
+            chauffeurs=self._assign_drivers(final),
+            unassigned=unassigned,
+            empty_km=round(sum(r.empty_km for r in final), 1),
+        )
+
+
+def plan_assignments(agence_id: int, jobs: Sequence[Job]) -> Plan:
+    """Flotte et chauffeurs "dispo" de l'agence -> plan d'affectation des courses."""
+    resolve_points(jobs)
+    vehicules = Vehicule.objects.filter(agence_id=agence_id, statut="dispo").order_by("id")
+    chauffeurs = Chauffeur.objects.filter(agence_id=agence_id, statut="dispo").order_by("id")
+    return AssignmentProblem(agence_id, jobs, vehicules, chauffeurs).solve()
@@ -0,0 +1,492 @@
+# backend1/apps/services/availability.py
+# -*- coding: utf-8 -*-
+"""
+Moteur de disponibilité des ressources (véhicules / chauffeurs).
+
+Écritures : la base fait foi. Les ressources sont verrouillées (SELECT ... FOR
+UPDATE, véhicules puis chauffeurs, pk croissant) puis les chevauchements sont
+cherchés en SQL dans la même transaction :
+  - lock_resources()     : verrou ligne des ressources
+  - conflicts()          : affectations en conflit (MissionRessource.clean)
+  - batch_conflicts()    : conflits d'un lot (base + intra-lot)
+
+Lectures (calendrier, listes de ressources libres, planification) : index
+d'intervalles en mémoire, PAR AGENCE (agence propriétaire de la ressource),
+construit depuis les MissionRessource non supprimées des
+AVAILABILITY_HISTORY_DAYS derniers jours (créneaux plus anciens : requête SQL) :
+  - par ressource : intervalles triés par début + "fin max" cumulée ;
+    chevauchement de [a, b) = bisect sur les débuts (< b) puis remontée tant
+    que la fin max cumulée > a  -> O(log n + résultats) ;
+  - busy_resource_ids()  : ressources occupées sur [a, b)
+  - first_free_slot()    : 1er créneau libre >= t d'une durée donnée
+  - is_free()
+
+Mise à jour incrémentale : signaux post_save / post_delete de MissionRessource
+(models.py) et notify_affectations_changed() pour les .update() en masse.
+Dans une transaction, les changements restent dans un calque propre au thread
+(visibles par ses propres lectures) et ne rejoignent l'index partagé qu'au
+commit ; un rollback les abandonne.
+
+Autres process : l'index est daté par le compteur AFFECTATION de l'agence
+(ResourceVersion, en base), relu au plus toutes les AVAILABILITY_RECHECK_SECONDS
+secondes ; reconstruction aussi après AVAILABILITY_INDEX_TTL secondes.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+VEHICULE = "vehicule"
+CHAUFFEUR = "chauffeur"
+KINDS = (VEHICULE, CHAUFFEUR)
+
+
+def _ts(dt: datetime) -> float:
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt.timestamp()
+
+
+def _dt(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.get_current_timezone())
+
+
+@dataclass(frozen=True)
+class Affectation:
+    """Vue minimale d'une MissionRessource pour l'index."""
+    id: int
+    mission_id: int
+    start: float
+    end: float
+    vehicule_id: Optional[int] = None
+    vehicule_agence_id: Optional[int] = None
+    chauffeur_id: Optional[int] = None
+    chauffeur_agence_id: Optional[int] = None
+    is_deleted: bool = False
+
+    def resource(self, kind: str) -> Tuple[Optional[int], Optional[int]]:
+        if kind == VEHICULE:
+            return self.vehicule_id, self.vehicule_agence_id
+        return self.chauffeur_id, self.chauffeur_agence_id
+
+    @classmethod
+    def from_instance(cls, mr) -> "Affectation":
+        return cls(
+            id=mr.pk,
+            mission_id=mr.mission_id,
+            start=_ts(mr.date_heure_debut),
+            end=_ts(mr.date_heure_fin),
+            vehicule_id=mr.vehicule_id,
+            vehicule_agence_id=mr.vehicule.agence_id if mr.vehicule_id else None,
+            chauffeur_id=mr.chauffeur_id,
+            chauffeur_agence_id=mr.chauffeur.agence_id if mr.chauffeur_id else None,
+            is_deleted=bool(mr.is_deleted),
+        )
+
+
+# =========================
+# Intervalles d'une ressource
+# =========================
+class _Track:
+    """(start, end, id, mission_id) triés par début ; max_end[i] = max(end[0..i])."""
+
+    __slots__ = ("items", "max_end")
+
+    def __init__(self):
+        self.items: List[Tuple[float, float, int, int]] = []
+        self.max_end: List[float] = []
+
+    def _reindex(self, i: int) -> None:
+        del self.max_end[i:]
+        m = self.max_end[-1] if self.max_end else float("-inf")
+        for it in self.items[i:]:
+            m = max(m, it[1])
+            self.max_end.append(m)
+
+    def add(self, item: Tuple[float, float, int, int]) -> None:
+        i = bisect.bisect_left(self.items, item)
+        self.items.insert(i, item)
+        self._reindex(i)
+
+    def remove(self, mr_id: int, start: float) -> None:
+        i = bisect.bisect_left(self.items, (start,))
+        while i < len(self.items) and self.items[i][0] == start:
+            if self.items[i][2] == mr_id:
+                self.items.pop(i)
+                self._reindex(i)
+                return
+            i += 1
+
+    def overlapping(self, a: float, b: float):
+        """Intervalles avec start < b et end > a (du plus tardif au plus ancien)."""
+        j = bisect.bisect_left(self.items, (b,)) - 1
+        while j >= 0 and self.max_end[j] > a:
+            if self.items[j][1] > a:
+                yield self.items[j]
+            j -= 1
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class AgencyIndex:
+    def __init__(self, agence_id: int, affectations: Iterable[Affectation], generation=None, horizon=float("-inf")):
+        self.agence_id = agence_id
+        self.generation = generation
+        self.horizon = horizon  # créneaux finissant avant : absents de l'index
+        self.built_at = self.checked_at = time.monotonic()
+        self.tracks: Dict[str, Dict[int, _Track]] = {k: {} for k in KINDS}
+        self.where: Dict[Tuple[str, int], Tuple[int, float]] = {}  # (kind, mr_id) -> (res_id, start)
+        for aff in affectations:
+            self.put(aff)
+
+    def put(self, aff: Affectation) -> None:
+        for kind in KINDS:
+            res_id, agence_id = aff.resource(kind)
+            if res_id is None or agence_id != self.agence_id or aff.is_deleted:
+                continue
+            self.tracks[kind].setdefault(res_id, _Track()).add((aff.start, aff.end, aff.id, aff.mission_id))
+            self.where[(kind, aff.id)] = (res_id, aff.start)
+
+    def drop(self, mr_id: int) -> bool:
+        found = False
+        for kind in KINDS:
+            loc = self.where.pop((kind, mr_id), None)
+            if loc:
+                track = self.tracks[kind].get(loc[0])
+                if track is not None:
+                    track.remove(mr_id, loc[1])
+                found = True
+        return found
+
+
+# =========================
+# Index courant (par process)
+# =========================
+_lock = threading.RLock()
+_indexes: Dict[int, AgencyIndex] = {}
+_local = threading.local()
+
+
+def _generation(agence_id: int) -> str:
+    """Compteur AFFECTATION de l'agence : partagé entre process (base)."""
+    from apps.services import versions
+
+    return versions.current_version([versions.AFFECTATION], agence_id)
+
+
+def _horizon() -> float:
+    days = float(getattr(settings, "AVAILABILITY_HISTORY_DAYS", 7))
+    return _ts(timezone.now() - timedelta(days=days))
+
+
+def _build(agence_id: int, generation: str) -> AgencyIndex:
+    from apps.models import MissionRessource
+
+    horizon = _horizon()
+    base = MissionRessource.objects.filter(is_deleted=False, date_heure_fin__gt=_dt(horizon)).order_by()
+    out: Dict[int, dict] = {}
+    for kind in KINDS:
+        rows = base.filter(**{f"{kind}__agence_id": agence_id}).values_list(
+            "id", "mission_id", "date_heure_debut", "date_heure_fin", f"{kind}_id"
+        )
+        for mr_id, mission_id, debut, fin, res_id in rows:
+            d = out.setdefault(mr_id, {"id": mr_id, "mission_id": mission_id, "start": _ts(debut), "end": _ts(fin)})
+            d[f"{kind}_id"] = res_id
+            d[f"{kind}_agence_id"] = agence_id
+    return AgencyIndex(agence_id, [Affectation(**d) for d in out.values()], generation=generation, horizon=horizon)
+
+
+def get_agency_index(agence_id: int) -> AgencyIndex:
+    """
+    Index de l'agence (lectures). Dans une transaction, un index à
+    (re)construire reste PRIVÉ au thread jusqu'à la fin de la transaction (il
+    peut voir des lignes non committées) ; l'index partagé ne contient que des
+    données committées.
+    """
+    ttl = float(getattr(settings, "AVAILABILITY_INDEX_TTL", 300))
+    recheck = float(getattr(settings, "AVAILABILITY_RECHECK_SECONDS", 5))
+    in_tx = connection.in_atomic_block
+    private = _tx_state()[1].get(agence_id) if in_tx else None
+    now = time.monotonic()
+    with _lock:
+        idx = private or _indexes.get(agence_id)
+        if idx is not None and (now - idx.built_at) <= ttl and (now - idx.checked_at) <= recheck:
+            return idx
+    gen = _generation(agence_id)
+    with _lock:
+        idx = private or _indexes.get(agence_id)
+        if idx is not None and idx.generation == gen and (now - idx.built_at) <= ttl:
+            idx.checked_at = now
+            return idx
+        if not in_tx:
+            idx = _build(agence_id, gen)
+            _indexes[agence_id] = idx
+            return idx
+    idx = _build(agence_id, gen)
+    _ensure_flush_registered()
+    _tx_state()[1][agence_id] = idx
+    return idx
+
+
+def _apply(changes: Dict[int, Optional[Affectation]]) -> None:
+    """
+    Applique des changements COMMITTÉS à l'index partagé (None = supprimée).
+    Les autres process les verront via le compteur AFFECTATION (versions).
+    """
+    with _lock:
+        for mr_id, aff in changes.items():
+            for idx in _indexes.values():
+                idx.drop(mr_id)
+            if aff is None or aff.is_deleted:
+                continue
+            for kind in KINDS:
+                _, agence_id = aff.resource(kind)
+                idx = _indexes.get(agence_id) if agence_id is not None else None
+                if idx is not None and aff.end > idx.horizon:
+                    idx.drop(mr_id)
+                    idx.put(aff)
+
+
+# =========================
+# Calque transactionnel (par thread)
+# =========================
+def _flush_registered() -> bool:
+    return connection.in_atomic_block and any(cb[1] is _flush_pending for cb in connection.run_on_commit)
+
+
+def _ensure_flush_registered() -> None:
+    if not _flush_registered():
+        transaction.on_commit(_flush_pending)
+
+
+def _tx_state() -> Tuple[Dict[int, Optional[Affectation]], Dict[int, AgencyIndex]]:
+    """(changements en attente, index privés) de la transaction courante du thread."""
+    if not hasattr(_local, "pending"):
+        _local.pending, _local.indexes = {}, {}
+    if (_local.pending or _local.indexes) and not _flush_registered():
+        # transaction (ou savepoint) annulée : le callback de commit a été abandonné
+        _local.pending.clear()
+        _local.indexes.clear()
+    return _local.pending, _local.indexes
+
+
+def _pending() -> Dict[int, Optional[Affectation]]:
+    return _tx_state()[0]
+
+
+def _flush_pending() -> None:
+    # appelé APRÈS le commit : lecture directe (le callback n'est plus enregistré)
+    changes = dict(getattr(_local, "pending", {}))
+    if hasattr(_local, "pending"):
+        _local.pending.clear()
+        _local.indexes.clear()
+    if changes:
+        _apply(changes)
+
+
+def record_change(mr_id: int, aff: Optional[Affectation]) -> None:
+    """Signal MissionRessource : index partagé tout de suite (autocommit) ou au commit."""
+    if not connection.in_atomic_block:
+        _apply({mr_id: aff})
+        return
+    _ensure_flush_registered()
+    _pending()[mr_id] = aff
+
+
+def notify_affectations_changed(mr_ids: Sequence[int]) -> None:
+    """Après un .update() en masse sur MissionRessource (pas de signal)."""
+    from apps.models import MissionRessource
+
+    ids = list(mr_ids)
+    if not ids:
+        return
+    found = {
+        mr.pk: Affectation.from_instance(mr)
+        for mr in MissionRessource.objects.filter(pk__in=ids).select_related("vehicule", "chauffeur")
+    }
+    for mr_id in ids:
+        record_change(mr_id, found.get(mr_id))
+
+
+# =========================
+# Écritures : la base fait foi
+# =========================
+def lock_resources(vehicule_ids: Iterable[Optional[int]] = (), chauffeur_ids: Iterable[Optional[int]] = ()) -> None:
+    """
+    Verrou ligne (SELECT ... FOR UPDATE) des ressources, à prendre AVANT de
+    chercher les chevauchements. Ordre stable pour tous les chemins d'écriture
+    (véhicules puis chauffeurs, pk croissant) : pas d'interblocage.
+    """
+    from apps.models import Chauffeur, Vehicule
+
+    for model, ids in ((Vehicule, vehicule_ids), (Chauffeur, chauffeur_ids)):
+        ids = sorted({int(i) for i in ids if i})
+        if ids:
+            list(model.objects.select_for_update().filter(pk__in=ids).order_by("pk").values_list("pk", flat=True))
+
+
+def _db_affectations(kind: str, resource_ids: Optional[Iterable[int]], start: datetime, end: datetime):
+    """Affectations non supprimées qui chevauchent [start, end) (toutes ressources du type si None)."""
+    from apps.models import MissionRessource
+
+    qs = MissionRessource.objects.filter(
+        is_deleted=False, date_heure_debut__lt=end, date_heure_fin__gt=start, **{f"{kind}__isnull": False}
+    ).order_by()
+    if resource_ids is not None:
+        qs = qs.filter(**{f"{kind}_id__in": set(resource_ids)})
+    return qs
+
+
+def conflicts(
+    kind: str,
+    resource_id: int,
+    start: datetime,
+    end: datetime,
+    *,
+    exclude_id: Optional[int] = None,
+    exclude_mission_id: Optional[int] = None,
+) -> List[int]:
+    """Ids des MissionRessource de la ressource qui chevauchent [start, end) (requête SQL)."""
+    qs = _db_affectations(kind, [resource_id], start, end)
+    if exclude_id is not None:
+        qs = qs.exclude(pk=exclude_id)
+    if exclude_mission_id is not None:
+        qs = qs.exclude(mission_id=exclude_mission_id)
+    return list(qs.values_list("id", flat=True))
+
+
+def batch_conflicts(
+    kind: str,
+    items: Sequence[Tuple[int, datetime, datetime]],
+    *,
+    exclude_mission_ids: Iterable[int] = (),
+) -> Dict[int, List[Tuple[str, int]]]:
+    """
+    items : [(resource_id, start, end), ...]
+    -> {position: [("affectation", mr_id) | ("batch", autre_position), ...]} (positions en conflit)
+    UNE requête SQL (ressources du lot sur l'enveloppe des créneaux).
+    """
+    out: Dict[int, List[Tuple[str, int]]] = {}
+    if not items:
+        return out
+
+    existing: Dict[int, List[Tuple[float, float, int]]] = {}
+    rows = _db_affectations(
+        kind, {res_id for res_id, _, _ in items}, min(i[1] for i in items), max(i[2] for i in items)
+    ).exclude(mission_id__in=set(exclude_mission_ids)).values_list("id", f"{kind}_id", "date_heure_debut", "date_heure_fin")
+    for mr_id, res_id, debut, fin in rows:
+        existing.setdefault(res_id, []).append((_ts(debut), _ts(fin), mr_id))
+
+    by_res: Dict[int, List[Tuple[float, float, int]]] = {}
+    for pos, (res_id, start, end) in enumerate(items):
+        a, b = _ts(start), _ts(end)
+        by_res.setdefault(res_id, []).append((a, b, pos))
+        for s, e, mr_id in existing.get(res_id, ()):
+            if s < b and e > a:
+                out.setdefault(pos, []).append(("affectation", mr_id))
+
+    # intra-lot : balayage par ressource
+    for ivs in by_res.values():
+        ivs.sort()
+        active: List[Tuple[float, int]] = []  # (end, pos)
+        for a, b, pos in ivs:
+            active = [(e, p) for e, p in active if e > a]
+            for _, p in active:
+                out.setdefault(pos, []).append(("batch", p))
+                out.setdefault(p, []).append(("batch", pos))
+            active.append((b, pos))
+    return out
+
+
+# =========================
+# Lectures : index en mémoire
+# =========================
+def _iter_overlaps(kind: str, agence_id: int, res_id: int, a: float, b: float):
+    """(start, end, id, mission_id) en conflit, calque du thread inclus."""
+    idx = get_agency_index(agence_id)
+    if a < idx.horizon:
+        # avant l'historique chargé : base (voit aussi la transaction en cours)
+        rows = _db_affectations(kind, [res_id], _dt(a), _dt(b)).filter(
+            **{f"{kind}__agence_id": agence_id}
+        ).values_list("date_heure_debut", "date_heure_fin", "id", "mission_id")
+        for debut, fin, mr_id, mission_id in rows:
+            yield (_ts(debut), _ts(fin), mr_id, mission_id)
+        return
+    pend = _pending()
+    with _lock:  # les commits d'autres threads modifient les listes en place
+        track = idx.tracks[kind].get(res_id)
+        base = list(track.overlapping(a, b)) if track is not None else []
+    for item in base:
+        if item[2] not in pend:
+            yield item
+    for mr_id, aff in pend.items():
+        if aff is None or aff.is_deleted or aff.resource(kind) != (res_id, agence_id):
+            continue
+        if aff.start < b and aff.end > a:
+            yield (aff.start, aff.end, aff.id, aff.mission_id)
+
+
+def is_free(kind: str, agence_id: int, resource_id: int, start: datetime, end: datetime) -> bool:
+    return next(_iter_overlaps(kind, agence_id, resource_id, _ts(start), _ts(end)), None) is None
+
+
+def busy_resource_ids(kind: str, agence_ids: Iterable[int], start: datetime, end: datetime) -> Set[int]:
+    """Ressources (des agences données) occupées sur [start, end)."""
+    a, b = _ts(start), _ts(end)
+    busy: Set[int] = set()
+    for agence_id in set(agence_ids):
+        if agence_id is None:
+            continue
+        idx = get_agency_index(agence_id)
+        if a < idx.horizon:
+            busy |= set(
+                _db_affectations(kind, None, start, end).filter(**{f"{kind}__agence_id": agence_id})
+                .values_list(f"{kind}_id", flat=True)
+            )
+            continue
+        with _lock:
+            res_ids = set(idx.tracks[kind])
+        res_ids |= {
+            aff.resource(kind)[0] for aff in _pending().values()
+            if aff is not None and aff.resource(kind)[1] == agence_id
+        }
+        for res_id in res_ids:
+            if res_id is not None and next(_iter_overlaps(kind, agence_id, res_id, a, b), None) is not None:
+                busy.add(res_id)
+    return busy
+
+
+def first_free_slot(
+    kind: str,
+    agence_id: int,
+    resource_id: int,
+    after: datetime,
+    duration: timedelta,
+) -> datetime:
+    """Début du 1er créneau libre >= `after` d'une durée `duration`."""
+    cursor = _ts(after)
+    d = duration.total_seconds()
+    while True:
+        ends = [item[1] for item in _iter_overlaps(kind, agence_id, resource_id, cursor, cursor + d)]
+        if not ends:
+            return _dt(cursor)
+        cursor = max(ends)
+
+
+def reset_availability_index() -> None:
+    """Index partagés et calque du thread vidés (reconstruits à la prochaine lecture)."""
+    with _lock:
+        _indexes.clear()
+    if hasattr(_local, "pending"):
+        _local.pending.clear()
+        _local.indexes.clear()
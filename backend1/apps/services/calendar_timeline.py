@@ -0,0 +1,121 @@
+# backend1/apps/services/calendar_timeline.py
+# -*- coding: utf-8 -*-
+"""
+Timeline calendrier des ressources d'une agence (véhicules + chauffeurs),
+construite sur MissionRessource en un nombre CONSTANT de requêtes :
+
+  1) toutes les affectations qui coupent la fenêtre [start, end) ;
+  2) la dernière affectation terminée avant `start` de chaque ressource
+     (ROW_NUMBER() par véhicule / par chauffeur, UNION ALL) ;
+
+puis busy / busy_reason / location calculés en mémoire.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from django.db.models import F, IntegerField, Q, Value
+
+from apps.models import Chauffeur, MissionRessource, Vehicule
+from apps.services.fleet_state import first_per_group
+
+
+KINDS = ("vehicule", "chauffeur")
+
+
+def _busy_reason(mr: Optional[MissionRessource]) -> Optional[Dict[str, Any]]:
+    if mr is None:
+        return None
+    m = mr.mission
+    return {
+        "mission_id": m.id,
+        "reference": getattr(m, "reference", ""),
+        "start": mr.date_heure_debut,
+        "end": mr.date_heure_fin,
+        "lieu_depart": mr.lieu_depart,
+        "lieu_arrivee": mr.lieu_arrivee,
+        "statut": getattr(m, "statut", None),
+    }
+
+
+def _location(last: Optional[tuple], adresse: Optional[str]) -> Optional[str]:
+    # last = (lieu_depart, lieu_arrivee)
+    if last is None:
+        return adresse
+    return last[1] or last[0] or adresse
+
+
+def load_timeline(agence_id: int, start: datetime, end: datetime) -> Dict[str, Dict[int, Any]]:
+    """
+    -> {
+        "in_window": {"vehicule": {id: [MissionRessource, ...]}, "chauffeur": {...}},
+        "last_before": {"vehicule": {id: (lieu_depart, lieu_arrivee)}, "chauffeur": {...}},
+    }
+    """
+    owned = Q(vehicule__agence_id=agence_id) | Q(chauffeur__agence_id=agence_id)
+    base = MissionRessource.objects.filter(is_deleted=False).filter(owned)
+
+    in_window: Dict[str, Dict[int, List[MissionRessource]]] = {k: {} for k in KINDS}
+    rows = (
+        base.filter(date_heure_debut__lt=end, date_heure_fin__gt=start)
+        .select_related("mission")
+        .order_by("date_heure_debut", "id")
+    )
+    for mr in rows:
+        for kind in KINDS:
+            res_id = getattr(mr, f"{kind}_id")
+            if res_id:
+                in_window[kind].setdefault(res_id, []).append(mr)
+
+    before = base.filter(date_heure_fin__lte=start)
+    fields = ("vehicule_id", "chauffeur_id", "lieu_depart", "lieu_arrivee")
+    last_v = first_per_group(
+        before.filter(vehicule__agence_id=agence_id), "vehicule_id", F("date_heure_fin").desc(), F("id").desc()
+    ).order_by().annotate(_kind=Value(0, output_field=IntegerField())).values_list(*fields, "_kind")
+    last_c = first_per_group(
+        before.filter(chauffeur__agence_id=agence_id), "chauffeur_id", F("date_heure_fin").desc(), F("id").desc()
+    ).order_by().annotate(_kind=Value(1, output_field=IntegerField())).values_list(*fields, "_kind")
+
+    last_before: Dict[str, Dict[int, tuple]] = {k: {} for k in KINDS}
+    for vehicule_id, chauffeur_id, lieu_depart, lieu_arrivee, kind in last_v.union(last_c, all=True):
+        if kind == 0:
+            last_before["vehicule"][vehicule_id] = (lieu_depart, lieu_arrivee)
+        else:
+            last_before["chauffeur"][chauffeur_id] = (lieu_depart, lieu_arrivee)
+
+    return {"in_window": in_window, "last_before": last_before}
+
+
+def resource_timeline(agence_id: int, start: datetime, end: datetime) -> Dict[str, List[Dict[str, Any]]]:
+    """Réponse de CalendarResourcesAPIView : véhicules + chauffeurs avec busy / busy_reason / location."""
+    tl = load_timeline(agence_id, start, end)
+    in_window, last_before = tl["in_window"], tl["last_before"]
+
+    v_out = []
+    for v in Vehicule.objects.filter(agence_id=agence_id).order_by("immatriculation"):
+        reason = _busy_reason((in_window["vehicule"].get(v.id) or [None])[0])
+        v_out.append({
+            "id": v.id,
+            "label": str(v),
+            "type": getattr(v, "type", None),
+            "capacite": getattr(v, "capacite", None),
+            "busy": bool(reason),
+            "busy_reason": reason,
+            "location": _location(last_before["vehicule"].get(v.id), getattr(v, "adresse", None)),
+            "last_lat": getattr(v, "last_lat", None),
+            "last_lng": getattr(v, "last_lng", None),
+        })
+
+    c_out = []
+    for c in Chauffeur.objects.filter(agence_id=agence_id).order_by("nom", "prenom"):
+        reason = _busy_reason((in_window["chauffeur"].get(c.id) or [None])[0])
+        c_out.append({
+            "id": c.id,
+            "label": str(c),
+            "busy": bool(reason),
+            "busy_reason": reason,
+            "location": _location(last_before["chauffeur"].get(c.id), getattr(c, "adresse", None)),
+        })
+
+    return {"vehicules": v_out, "chauffeurs": c_out}
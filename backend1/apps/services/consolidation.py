@@ -0,0 +1,175 @@
+# backend1/apps/services/consolidation.py
+# -*- coding: utf-8 -*-
+"""
+Regroupement automatique des dossiers libres en fiches (jours de charter).
+
+  1) clusters : (date, type de mouvement, n° de vol, aéroport, zone de l'hôtel),
+     découpés en fenêtres de TIME_WINDOW_MIN minutes sur l'horaire ;
+  2) bin packing par cluster, bacs = plus grand véhicule "dispo" de l'agence :
+     Best-Fit Decreasing sur des blocs "hôtel" (les dossiers d'un même hôtel
+     restent ensemble tant qu'ils tiennent dans un véhicule, sinon blocs
+     dossier par dossier), puis chaque fiche ramenée au plus petit véhicule
+     suffisant ;
+  3) un dossier plus grand que le plus grand véhicule forme sa propre fiche
+     (oversize=True).
+
+Aucune écriture ici : la vue crée les fiches et relie les dossiers.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from apps.models import Dossier, Vehicule
+
+
+DEPART_TYPES = ("D", "S")
+TIME_WINDOW_MIN = 60
+DEFAULT_CAPACITY = 50
+
+
+@dataclass
+class ProposedFiche:
+    type: str
+    date: object
+    numero_vol: str
+    aeroport: str
+    zone_id: Optional[int]
+    capacite: int
+    dossiers: List[Dossier] = field(default_factory=list)
+    oversize: bool = False
+
+    @property
+    def pax(self) -> int:
+        return sum(d.pax or 0 for d in self.dossiers)
+
+    @property
+    def horaires(self) -> Optional[time]:
+        hs = [d.horaires for d in self.dossiers if d.horaires]
+        return min(hs) if hs else None
+
+
+def _norm(s: Optional[str]) -> str:
+    return re.sub(r"\s+", "", (s or "")).upper()
+
+
+def _hotel_label(d: Dossier) -> str:
+    return (d.hotel or (d.hotel_fk.nom if d.hotel_fk_id else "") or "—").strip()
+
+
+def _zone_id(d: Dossier) -> Optional[int]:
+    if d.zone_fk_id:
+        return d.zone_fk_id
+    return d.hotel_fk.zone_id if d.hotel_fk_id else None
+
+
+def _cluster_key(d: Dossier) -> Tuple:
+    type_mvt = (d.type_mouvement or "A").strip().upper()
+    aeroport = d.destination if type_mvt in DEPART_TYPES else d.provenance
+    return (d.date, type_mvt, _norm(d.numero_vol), _norm(aeroport), _zone_id(d))
+
+
+def _minutes(t: Optional[time]) -> Optional[int]:
+    return t.hour * 60 + t.minute if t else None
+
+
+def clusters(dossiers: Sequence[Dossier]) -> List[Tuple[Tuple, List[Dossier]]]:
+    """[(clé, dossiers)] ; une clé = vol / type / aéroport / zone + fenêtre horaire."""
+    groups: Dict[Tuple, List[Dossier]] = {}
+    for d in dossiers:
+        groups.setdefault(_cluster_key(d), []).append(d)
+
+    out = []
+    for key in sorted(groups, key=lambda k: tuple("" if v is None else str(v) for v in k)):
+        rows = sorted(groups[key], key=lambda d: (d.horaires is None, d.horaires or time.min, d.id))
+        window: List[Dossier] = []
+        start = None
+        for d in rows:
+            m = _minutes(d.horaires)
+            # nouvelle fenêtre : horaire au-delà de la fenêtre courante, ou 1ers dossiers sans horaire
+            if window and start is not None and (m is None or m - start > TIME_WINDOW_MIN):
+                out.append((key, window))
+                window = []
+            if not window:
+                start = m
+            window.append(d)
+        if window:
+            out.append((key, window))
+    return out
+
+
+def _blocks(dossiers: List[Dossier], max_cap: int) -> List[List[Dossier]]:
+    """Blocs indivisibles : un hôtel entier s'il tient, sinon ses dossiers un par un."""
+    by_hotel: Dict[str, List[Dossier]] = {}
+    for d in dossiers:
+        by_hotel.setdefault(_hotel_label(d).lower(), []).append(d)
+    blocks = []
+    for rows in by_hotel.values():
+        if sum(d.pax or 0 for d in rows) <= max_cap:
+            blocks.append(rows)
+        else:
+            blocks.extend([d] for d in rows)
+    return blocks
+
+
+def pack(dossiers: List[Dossier], capacities: Sequence[int]) -> List[Tuple[List[Dossier], int, bool]]:
+    """
+    Best-Fit Decreasing -> [(dossiers, capacité du véhicule retenu, oversize)].
+    capacities : capacités disponibles (au moins une).
+    """
+    caps = sorted(set(capacities))
+    max_cap = caps[-1]
+    blocks = sorted(
+        _blocks(dossiers, max_cap),
+        key=lambda b: (-sum(d.pax or 0 for d in b), min(d.id for d in b)),
+    )
+
+    bins: List[Tuple[int, List[Dossier]]] = []  # (charge, dossiers)
+    out = []
+    for block in blocks:
+        load = sum(d.pax or 0 for d in block)
+        if load > max_cap:
+            out.append((block, max_cap, True))
+            continue
+        best = None
+        for i, (used, _) in enumerate(bins):
+            rest = max_cap - used - load
+            if rest >= 0 and (best is None or rest < best[0]):
+                best = (rest, i)
+        if best is None:
+            bins.append((load, list(block)))
+        else:
+            used, rows = bins[best[1]]
+            bins[best[1]] = (used + load, rows + block)
+
+    for used, rows in bins:
+        out.append((rows, caps[bisect.bisect_left(caps, used)], False))
+    return out
+
+
+def fleet_capacities(agence_id: int) -> List[int]:
+    caps = list(
+        Vehicule.objects.filter(agence_id=agence_id, statut="dispo")
+        .order_by().values_list("capacite", flat=True).distinct()
+    )
+    return [c for c in caps if c] or [DEFAULT_CAPACITY]
+
+
+def consolidate(dossiers: Sequence[Dossier], capacities: Sequence[int]) -> List[ProposedFiche]:
+    """Dossiers (hotel_fk chargé) -> fiches proposées, triées par date / horaire / vol."""
+    out = []
+    for key, rows in clusters(dossiers):
+        date_val, type_mvt, vol, aeroport, zone_id = key
+        for bin_rows, cap, oversize in pack(rows, capacities):
+            out.append(ProposedFiche(
+                type=type_mvt, date=date_val, numero_vol=vol, aeroport=aeroport, zone_id=zone_id,
+                capacite=cap, dossiers=sorted(bin_rows, key=lambda d: (_hotel_label(d).lower(), d.id)),
+                oversize=oversize,
+            ))
+    out.sort(key=lambda p: (
+        p.date or datetime.min.date(), p.horaires or time.min, p.numero_vol, p.type, min(d.id for d in p.dossiers)
+    ))
+    return out
@@ -0,0 +1,281 @@
+# backend1/apps/services/dossiers_upsert.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.core.exceptions import MultipleObjectsReturned
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+DEFAULT_BATCH_SIZE = 500
+
+
+# =========================
+# Structures
+# =========================
+@dataclass
+class UpsertRow:
+    """
+    Une ligne du fichier prête à écrire :
+      - line   : n° de ligne Excel (pour le rapport)
+      - ref    : référence brute (pour le rapport)
+      - lookup : clé anti-écrasement (mêmes champs que update_or_create)
+      - data   : valeurs à écrire (defaults)
+    """
+    line: int
+    ref: str
+    lookup: Dict[str, Any]
+    data: Dict[str, Any]
+
+
+@dataclass
+class UpsertResult:
+    created: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    erreurs: List[Dict[str, Any]] = field(default_factory=list)
+
+
+# =========================
+# Helpers
+# =========================
+def _norm_value(v: Any) -> Any:
+    """
+    Comparaison "comme la base" : MySQL compare les chaînes sans casse
+    et sans espaces de fin (collation *_ci).
+    """
+    if isinstance(v, str):
+        return v.rstrip().lower()
+    if hasattr(v, "pk"):
+        return v.pk
+    return v
+
+
+def _attname(model, name: str) -> str:
+    """agence -> agence_id (évite de charger l'objet lié à chaque comparaison)."""
+    try:
+        return model._meta.get_field(name).attname
+    except Exception:
+        return name
+
+
+def _matches(obj, lookup: Dict[str, Any]) -> bool:
+    for k, v in lookup.items():
+        current = getattr(obj, _attname(type(obj), k), None)
+        if _norm_value(current) != _norm_value(v):
+            return False
+    return True
+
+
+def _row_label(row: UpsertRow, obj) -> str:
+    return row.ref or (str(obj.pk) if obj.pk else (getattr(obj, "reference", None) or ""))
+
+
+def _ensure_reference(obj, seq: int) -> None:
+    """
+    bulk_create ne passe pas par save() : on reproduit Dossier.save(), suffixé
+    par le rang dans le paquet (même microseconde pour tout le paquet).
+    """
+    if hasattr(obj, "reference") and not obj.reference:
+        obj.reference = f"DOS-{obj.agence_id or 'X'}-{timezone.now().strftime('%Y%m%d%H%M%S%f')}-{seq}"
+
+
+def _reload_pks(Dossier, agence, entries, known_pks: set) -> None:
+    """
+    MySQL : bulk_create ne renvoie pas les clés. On les relit par clé naturelle
+    (lookup + référence) ; à clé égale, ordre d'insertion = ordre des pk.
+    """
+    missing = [e for e in entries if e["obj"].pk is None]
+    if not missing:
+        return
+    refs = {e["obj"].reference for e in missing}
+    candidates = list(
+        Dossier.objects.filter(agence=agence, reference__in=refs).exclude(pk__in=known_pks).order_by("pk")
+    )
+    for e in missing:
+        obj, lookup = e["obj"], e["lines"][0][0].lookup
+        for i, cand in enumerate(candidates):
+            if cand.reference == obj.reference and _matches(cand, lookup):
+                obj.pk = cand.pk
+                obj._state.adding = False
+                obj._state.db = cand._state.db
+                known_pks.add(cand.pk)
+                del candidates[i]
+                break
+
+
+# =========================
+# Upsert en masse
+# =========================
+def bulk_upsert_dossiers(
+    Dossier,
+    rows: Iterable[UpsertRow],
+    *,
+    agence,
+    date_field: str = "date",
+    bucket_fields: Tuple[str, ...] = ("date", "type_mouvement"),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> UpsertResult:
+    """
+    Équivalent de `Dossier.objects.update_or_create(defaults=row.data, **row.lookup)`
+    pour chaque ligne, mais :
+      1) une seule requête pour charger les dossiers existants de l'agence
+         sur la plage de dates du fichier ;
+      2) résolution des clés en mémoire (les lignes suivantes voient les
+         dossiers créés par les lignes précédentes, comme en séquentiel) ;
+      3) écritures par paquets (bulk_create / bulk_update).
+
+    Si un paquet échoue, il est rejoué ligne par ligne (savepoint par objet)
+    pour produire une erreur par ligne fautive sans perdre les autres.
+    """
+    rows = list(rows)
+    result = UpsertResult()
+    if not rows:
+        return result
+
+    # ---------- 1) préchargement ----------
+    dates = [r.lookup.get(date_field) for r in rows if r.lookup.get(date_field)]
+    existing: List[Any] = []
+    if dates:
+        existing = list(
+            Dossier.objects.filter(agence=agence).filter(
+                **{f"{date_field}__range": (min(dates), max(dates))}
+            )
+        )
+
+    def _bucket_key(values: Dict[str, Any]) -> Tuple:
+        return tuple(_norm_value(values.get(f)) for f in bucket_fields)
+
+    index: Dict[Tuple, List[Any]] = {}
+    for obj in existing:
+        key = _bucket_key({f: getattr(obj, _attname(Dossier, f), None) for f in bucket_fields})
+        index.setdefault(key, []).append(obj)
+
+    # ---------- 2) résolution en mémoire ----------
+    # obj_id(python) -> {"obj", "is_new", "lines": [(row, was_created)]}
+    touched: Dict[int, Dict[str, Any]] = {}
+    update_fields: set = set()
+
+    for row in rows:
+        candidates = index.get(_bucket_key(row.lookup), [])
+        found = [o for o in candidates if _matches(o, row.lookup)]
+
+        if len(found) > 1:
+            result.erreurs.append({
+                "ligne": row.line,
+                "raison": (
+                    f"MultipleObjectsReturned: {len(found)} dossiers correspondent "
+                    f"à la clé {', '.join(sorted(row.lookup.keys()))}"
+                ),
+            })
+            continue
+
+        if found:
+            obj = found[0]
+            was_created = False
+        else:
+            obj = Dossier(**row.lookup)
+            index.setdefault(_bucket_key(row.lookup), []).append(obj)
+            was_created = True
+
+        for k, v in row.data.items():
+            setattr(obj, k, v)
+            if not was_created:
+                update_fields.add(k)
+
+        entry = touched.setdefault(id(obj), {"obj": obj, "is_new": obj.pk is None, "lines": []})
+        entry["lines"].append((row, was_created))
+
+    to_create = [e for e in touched.values() if e["is_new"]]
+    to_update = [e for e in touched.values() if not e["is_new"]]
+
+    concrete = {f.name for f in Dossier._meta.concrete_fields if not f.primary_key}
+    fields = sorted(f for f in update_fields if f in concrete)
+
+    # ---------- 3) écritures par paquets ----------
+    def _report_ok(entry):
+        obj = entry["obj"]
+        for row, was_created in entry["lines"]:
+            (result.created if was_created else result.updated).append(_row_label(row, obj))
+
+    def _report_error(entry, exc: Exception):
+        for row, _ in entry["lines"]:
+            result.erreurs.append({"ligne": row.line, "raison": f"{type(exc).__name__}: {exc}"})
+
+    def _write_one_by_one(entries, creating: bool):
+        for entry in entries:
+            obj = entry["obj"]
+            try:
+                with transaction.atomic():
+                    if creating:
+                        obj.save(force_insert=True)
+                    else:
+                        obj.save(update_fields=fields or None)
+                _report_ok(entry)
+            except Exception as exc:
+                if creating:
+                    obj.pk = None
+                _report_error(entry, exc)
+
+    known_pks = {o.pk for o in existing}
+    returns_pks = connections[Dossier.objects.db].features.can_return_rows_from_bulk_insert
+    for start in range(0, len(to_create), batch_size):
+        chunk = to_create[start:start + batch_size]
+        objs = [e["obj"] for e in chunk]
+        for seq, o in enumerate(objs):
+            _ensure_reference(o, seq)
+        try:
+            with transaction.atomic():
+                Dossier.objects.bulk_create(objs, batch_size=batch_size)
+                if not returns_pks:
+                    _reload_pks(Dossier, agence, chunk, known_pks)
+        except Exception:
+            for o in objs:
+                o.pk = None
+                o._state.adding = True
+            _write_one_by_one(chunk, creating=True)
+        else:
+            for e in chunk:
+                _report_ok(e)
+
+    if fields:
+        for start in range(0, len(to_update), batch_size):
+            chunk = to_update[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    Dossier.objects.bulk_update([e["obj"] for e in chunk], fields, batch_size=batch_size)
+            except Exception:
+                _write_one_by_one(chunk, creating=False)
+            else:
+                for e in chunk:
+                    _report_ok(e)
+    else:
+        for e in to_update:
+            _report_ok(e)
+
+    # bulk_* : pas de signal => version "dossier" de l'agence (ETag des listes)
+    if result.created or result.updated:
+        from apps.services.versions import DOSSIER, bump_versions
+
+        bump_versions([getattr(agence, "pk", agence)], [DOSSIER])
+
+    # rapport dans l'ordre du fichier (comme en séquentiel)
+    result.erreurs.sort(key=lambda x: x["ligne"])
+    return result
+
+
+def upsert_dossiers_row_by_row(Dossier, rows: Iterable[UpsertRow]) -> UpsertResult:
+    """Mode historique : un update_or_create par ligne (savepoint par ligne)."""
+    result = UpsertResult()
+    for row in rows:
+        try:
+            with transaction.atomic():
+                obj, was_created = Dossier.objects.update_or_create(defaults=row.data, **row.lookup)
+            (result.created if was_created else result.updated).append(row.ref or str(obj.pk))
+        except MultipleObjectsReturned as exc:
+            result.erreurs.append({"ligne": row.line, "raison": f"MultipleObjectsReturned: {exc}"})
+        except Exception as exc:
+            result.erreurs.append({"ligne": row.line, "raison": f"{type(exc).__name__}: {exc}"})
+    return result
@@ -0,0 +1,159 @@
+# backend1/apps/services/fleet_state.py
+# -*- coding: utf-8 -*-
+"""
+État de la flotte en un nombre CONSTANT de requêtes.
+
+Pour un ensemble de véhicules et une heure de référence :
+  - dernière affectation terminée avant ref_time -> location / available_from
+  - prochaine affectation à partir de ref_time  -> available_until
+  - dernier chauffeur connu (dernière affectation avec chauffeur)
+  - dernière / prochaine mission (Mission.vehicule) par rapport à "now"
+
+Chaque élément = UNE requête "premier de chaque groupe" (ROW_NUMBER() OVER
+(PARTITION BY vehicule ORDER BY ...) = 1), quel que soit le nombre de véhicules.
+Mêmes règles que Vehicule.get_real_state / VehiculeSerializer.get_*_mission_zone.
+
+drivers_state() / vehicles_windows() : "real_state" seul, en UNE requête
+(dernière affectation avant + prochaine après ref_time, UNION ALL).
+"""
+from __future__ import annotations
+
+from datetime import time as dtime
+from typing import Any, Dict, Iterable
+
+from django.db.models import F, Q, QuerySet, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from apps.models import Mission, MissionRessource
+
+
+def first_per_group(qs: QuerySet, partition: str, *order_by) -> QuerySet:
+    """1ère ligne de chaque groupe `partition` selon `order_by` (fonction fenêtre)."""
+    return qs.annotate(
+        _rank=Window(RowNumber(), partition_by=[F(partition)], order_by=list(order_by))
+    ).filter(_rank=1)
+
+
+def _by_vehicule(qs: QuerySet) -> Dict[int, Any]:
+    return {obj.vehicule_id: obj for obj in qs}
+
+
+def _mission_time_q(now, past: bool) -> Q:
+    """Mission (date + horaires, 00:00 si vide) <= now (past) ou >= now."""
+    local = timezone.localtime(now)
+    today, t = local.date(), local.time()
+    if past:
+        return Q(date__lt=today) | Q(date=today, horaires__lte=t) | Q(date=today, horaires__isnull=True)
+    q = Q(date__gt=today) | Q(date=today, horaires__gte=t)
+    if t == dtime(0, 0):
+        q |= Q(date=today, horaires__isnull=True)
+    return q
+
+
+def fleet_state(vehicules: Iterable, ref_time=None, now=None) -> Dict[int, Dict[str, Any]]:
+    """
+    vehicules : instances Vehicule (ou queryset)
+    -> {vehicule_id: {location, available_from, available_until,
+                      last_driver, last_mission, next_mission}}
+    """
+    vehicules = list(vehicules)
+    now = now or timezone.now()
+    ref_time = ref_time or now
+    ids = [v.pk for v in vehicules]
+    if not ids:
+        return {}
+
+    aff = MissionRessource.objects.filter(is_deleted=False, vehicule_id__in=ids)
+
+    last_aff = _by_vehicule(first_per_group(
+        aff.filter(date_heure_fin__lte=ref_time), "vehicule_id", F("date_heure_fin").desc(), F("id").desc()
+    ))
+    next_aff = _by_vehicule(first_per_group(
+        aff.filter(date_heure_debut__gte=ref_time), "vehicule_id", F("date_heure_debut").asc(), F("id").asc()
+    ))
+    last_driver_aff = _by_vehicule(first_per_group(
+        aff.filter(chauffeur__isnull=False).select_related("chauffeur"),
+        "vehicule_id", F("date_heure_fin").desc(), F("id").desc(),
+    ))
+
+    missions = Mission.objects.filter(vehicule_id__in=ids)
+    last_mission = _by_vehicule(first_per_group(
+        missions.filter(_mission_time_q(now, past=True)),
+        "vehicule_id", F("date").desc(), F("horaires").desc(nulls_last=True), F("id").desc(),
+    ))
+    next_mission = _by_vehicule(first_per_group(
+        missions.filter(_mission_time_q(now, past=False)),
+        "vehicule_id", F("date").asc(), F("horaires").asc(nulls_first=True), F("id").asc(),
+    ))
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for v in vehicules:
+        last = last_aff.get(v.pk)
+        nxt = next_aff.get(v.pk)
+        drv = last_driver_aff.get(v.pk)
+        out[v.pk] = {
+            "location": (last.lieu_arrivee or last.lieu_depart or v.adresse) if last else v.adresse,
+            "available_from": last.date_heure_fin if last else ref_time,
+            "available_until": nxt.date_heure_debut if nxt else None,
+            "last_driver": drv.chauffeur if drv else None,
+            "last_mission": last_mission.get(v.pk),
+            "next_mission": next_mission.get(v.pk),
+        }
+    return out
+
+
+def _windows(fk: str, objects: Iterable, ref_time) -> Dict[int, Dict[str, Any]]:
+    """
+    real_state (location / available_from / available_until) par ressource, en UNE
+    requête : dernière affectation avant + prochaine après ref_time (UNION ALL).
+    fk : "chauffeur_id" ou "vehicule_id"
+    """
+    objects = list(objects)
+    ids = [o.pk for o in objects]
+    if not ids:
+        return {}
+
+    aff = MissionRessource.objects.filter(is_deleted=False, **{f"{fk}__in": ids})
+    fields = ("id", fk, "date_heure_debut", "date_heure_fin", "lieu_depart", "lieu_arrivee")
+    before = first_per_group(
+        aff.filter(date_heure_fin__lte=ref_time), fk, F("date_heure_fin").desc(), F("id").desc()
+    ).order_by().values_list(*fields)
+    after = first_per_group(
+        aff.filter(date_heure_debut__gte=ref_time), fk, F("date_heure_debut").asc(), F("id").asc()
+    ).order_by().values_list(*fields)
+
+    # une seule requête ; regroupement en mémoire (fin <= ref_time => "avant")
+    last: Dict[int, tuple] = {}
+    nxt: Dict[int, tuple] = {}
+    for row in before.union(after, all=True):
+        _, res_id, debut, fin, _, _ = row
+        (last if fin <= ref_time else nxt)[res_id] = row
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for o in objects:
+        adresse = getattr(o, "adresse", None)
+        la = last.get(o.pk)
+        nx = nxt.get(o.pk)
+        out[o.pk] = {
+            "location": (la[5] or la[4] or adresse) if la else adresse,
+            "available_from": la[3] if la else ref_time,
+            "available_until": nx[2] if nx else None,
+        }
+    return out
+
+
+def drivers_state(chauffeurs: Iterable, ref_time=None) -> Dict[int, Dict[str, Any]]:
+    """
+    chauffeurs : instances Chauffeur (ou queryset)
+    -> {chauffeur_id: {location, available_from, available_until}}
+    """
+    return _windows("chauffeur_id", chauffeurs, ref_time or timezone.now())
+
+
+def vehicles_windows(vehicules: Iterable, ref_time=None) -> Dict[int, Dict[str, Any]]:
+    """
+    Version allégée de fleet_state() (fenêtre seule, UNE requête)
+    -> {vehicule_id: {location, available_from, available_until}}
+    """
+    return _windows("vehicule_id", vehicules, ref_time or timezone.now())
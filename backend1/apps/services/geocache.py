@@ -0,0 +1,215 @@
+# backend1/apps/services/geocache.py
+# -*- coding: utf-8 -*-
+"""
+Cache de géocodage partagé par tous les géocodeurs (Google, Nominatim).
+
+Deux niveaux :
+  1) LRU en mémoire (par process, thread-safe) ;
+  2) table GeocodeCache (partagée entre process / redémarrages), avec TTL.
+
+Clés :
+  - forward : requête normalisée (casse, accents, espaces, ponctuation)
+  - reverse : coordonnées arrondies (`precision` décimales)
+
+"Aucun résultat" est aussi mis en cache (TTL plus court). Les erreurs
+réseau / quota (exceptions levées par `fetch`) ne sont PAS mises en cache.
+
+Les taux de hit sont visibles via geocache_stats() (process courant) et la
+colonne `hits` de GeocodeCache (cumul en base).
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+POSITIVE_TTL = timedelta(days=int(getattr(settings, "GEOCODE_CACHE_TTL_DAYS", 90)))
+NEGATIVE_TTL = timedelta(days=int(getattr(settings, "GEOCODE_CACHE_NEGATIVE_TTL_DAYS", 7)))
+LRU_SIZE = int(getattr(settings, "GEOCODE_CACHE_LRU_SIZE", 2048))
+REVERSE_PRECISION = 4  # ~11 m
+
+_MISSING = object()
+
+
+# =========================
+# Clés
+# =========================
+def normalize_query(query: str) -> str:
+    s = (query or "").strip().lower()
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = re.sub(r"[^a-z0-9]+", " ", s)
+    return " ".join(s.split())
+
+
+def round_coords(lat: float, lng: float, precision: int = REVERSE_PRECISION) -> Tuple[float, float]:
+    return round(float(lat), precision), round(float(lng), precision)
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# =========================
+# LRU + stats (process)
+# =========================
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, str, str], Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, k):
+        with self._lock:
+            item = self._data.get(k)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at <= timezone.now():
+                del self._data[k]
+                return _MISSING
+            self._data.move_to_end(k)
+            return value
+
+    def set(self, k, value, expires_at) -> None:
+        with self._lock:
+            self._data[k] = (value, expires_at)
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_lru = _LRU(LRU_SIZE)
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"lru_hits": 0, "db_hits": 0, "negative_hits": 0, "misses": 0, "errors": 0}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def geocache_stats() -> Dict[str, Any]:
+    """Compteurs du process courant + taux de hit."""
+    with _stats_lock:
+        out: Dict[str, Any] = dict(_stats)
+    lookups = out["lru_hits"] + out["db_hits"] + out["misses"]
+    out["lookups"] = lookups
+    out["hit_rate"] = round((out["lru_hits"] + out["db_hits"]) / lookups, 4) if lookups else None
+    out["lru_size"] = len(_lru)
+    out["lru_maxsize"] = _lru.maxsize
+    return out
+
+
+def reset_geocache(memory_only: bool = True) -> None:
+    """Vide le LRU (et les stats) ; la table aussi si memory_only=False."""
+    _lru.clear()
+    with _stats_lock:
+        for k in _stats:
+            _stats[k] = 0
+    if not memory_only:
+        apps.get_model("apps", "GeocodeCache").objects.all().delete()
+
+
+# =========================
+# Lookup
+# =========================
+def cached_lookup(
+    provider: str,
+    kind: str,
+    raw_key: str,
+    fetch: Callable[[], Optional[Dict[str, Any]]],
+    *,
+    query: str = "",
+) -> Optional[Dict[str, Any]]:
+    """
+    Renvoie le résultat en cache pour (provider, kind, raw_key), sinon appelle
+    `fetch()` (-> dict JSON-sérialisable, ou None si aucun résultat) et le stocke.
+    """
+    GeocodeCache = apps.get_model("apps", "GeocodeCache")
+    key = _hash(raw_key)
+    lk = (provider, kind, key)
+
+    value = _lru.get(lk)
+    if value is not _MISSING:
+        _count("lru_hits")
+        if value is None:
+            _count("negative_hits")
+        return value
+
+    now = timezone.now()
+    row = (
+        GeocodeCache.objects.filter(provider=provider, kind=kind, key=key, expires_at__gt=now)
+        .only("pk", "result", "expires_at")
+        .first()
+    )
+    if row is not None:
+        _count("db_hits")
+        if row.result is None:
+            _count("negative_hits")
+        GeocodeCache.objects.filter(pk=row.pk).update(hits=F("hits") + 1)
+        _lru.set(lk, row.result, row.expires_at)
+        return row.result
+
+    _count("misses")
+    try:
+        result = fetch()
+    except Exception:
+        _count("errors")
+        raise
+
+    expires_at = now + (POSITIVE_TTL if result is not None else NEGATIVE_TTL)
+    try:
+        with transaction.atomic():
+            GeocodeCache.objects.update_or_create(
+                provider=provider,
+                kind=kind,
+                key=key,
+                defaults={"query": (query or raw_key)[:500], "result": result, "expires_at": expires_at},
+            )
+    except IntegrityError:
+        pass  # écrit en parallèle par un autre worker
+    _lru.set(lk, result, expires_at)
+    return result
+
+
+def cached_forward(provider: str, query: str, fetch, *, variant: str = "") -> Optional[Dict[str, Any]]:
+    """Adresse -> résultat ; `variant` distingue les paramètres (langue, pays...)."""
+    raw_key = f"{variant}|{normalize_query(query)}"
+    return cached_lookup(provider, "forward", raw_key, fetch, query=query)
+
+
+def cached_reverse(
+    provider: str,
+    lat: float,
+    lng: float,
+    fetch: Callable[[float, float], Optional[Dict[str, Any]]],
+    *,
+    precision: int = REVERSE_PRECISION,
+    variant: str = "",
+) -> Optional[Dict[str, Any]]:
+    """
+    Coordonnées -> résultat ; le géocodeur est appelé avec les coordonnées
+    ARRONDIES (le résultat en cache correspond exactement à la clé).
+    """
+    rlat, rlng = round_coords(lat, lng, precision)
+    raw_key = f"{variant}|{rlat:.{precision}f},{rlng:.{precision}f}"
+    return cached_lookup(provider, "reverse", raw_key, lambda: fetch(rlat, rlng), query=raw_key)
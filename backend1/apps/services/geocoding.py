@@ -1,20 +1,48 @@
 # b2b/services/geocoding.py
 import os
 import json
+import threading
+import time
 import urllib.parse
 import urllib.request
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+
+from apps.services.geocache import cached_forward
 
 DEFAULT_TIMEOUT = float(os.getenv("GEO_TIMEOUT", "4.0"))
 DEFAULT_USER_AGENT = os.getenv("GEO_USER_AGENT", "b2b-mouha/1.0 (+contact@example.com)")
 DEFAULT_COUNTRY = os.getenv("GEO_DEFAULT_COUNTRY", "Tunisia").strip()  # ex: "Tunisia" ou "France"
 DEFAULT_LANG = os.getenv("GEO_LANG", "fr").strip() or "fr"      # <- langue cible (fr par défaut)
+# politique d'usage Nominatim : 1 requête / seconde au plus (sinon IP bloquée)
+NOMINATIM_MIN_INTERVAL = float(os.getenv("GEO_NOMINATIM_MIN_INTERVAL", "1.0"))
+
+
+class _RateLimiter:
+    """Espacement minimal entre deux appels, partagé par tous les threads du process."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        # réserve le prochain créneau sous verrou, attend hors verrou
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next_at)
+            self._next_at = at + self.min_interval
+        if at > now:
+            time.sleep(at - now)
+
+
+_nominatim_limiter = _RateLimiter(NOMINATIM_MIN_INTERVAL)
 
 
-def _fetch_json(url: str) -> Optional[dict]:
+def _fetch_json(url: str, strict: bool = False) -> Optional[dict]:
     """
     Appel HTTP simple avec User-Agent et Accept-Language pour orienter la langue
     de la réponse Nominatim.
+    strict=True : les erreurs réseau remontent (pour ne pas les mettre en cache).
     """
     try:
         req = urllib.request.Request(
@@ -27,6 +55,44 @@ def _fetch_json(url: str) -> Optional[dict]:
         with urllib.request.urlopen(req, timeout=DEFAULT_TIMEOUT) as f:
             return json.loads(f.read().decode("utf-8"))
     except Exception:
+        if strict:
+            raise
+        return None
+
+
+def _nominatim_search(query: str, strict: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    1er résultat Nominatim pour `query` (via le cache de géocodage).
+    strict=True : les erreurs réseau remontent au lieu de donner None.
+    """
+    def fetch():
+        qs = urllib.parse.urlencode(
+            {
+                "q": query,
+                "format": "json",
+                "limit": 1,
+                "addressdetails": 1,
+                "accept-language": DEFAULT_LANG,  # <- forcer la langue côté API
+            }
+        )
+        url = f"https://nominatim.openstreetmap.org/search?{qs}"
+        _nominatim_limiter.wait()  # seulement si le cache n'a pas répondu
+        data = _fetch_json(url, strict=True)
+        if not data or not isinstance(data, list):
+            return None
+        item = data[0]
+        return {
+            "display_name": item.get("display_name"),
+            "address": item.get("address") or {},
+            "lat": item.get("lat"),
+            "lon": item.get("lon"),
+        }
+
+    try:
+        return cached_forward("nominatim", query, fetch, variant=DEFAULT_LANG)
+    except Exception:
+        if strict:
+            raise
         return None
 
 
@@ -84,6 +150,7 @@ def lookup_hotel_address(
     - Utilise l'en-tête HTTP 'Accept-Language' et le paramètre 'accept-language=fr'
     - Essaie d'abord 'display_name', sinon reconstruit depuis 'address'
     - Fail-safe : retourne None si pas de résultat
+    - Résultat mis en cache (GeocodeCache + LRU)
     """
     if not hotel_name or not hotel_name.strip():
         return None
@@ -91,22 +158,10 @@ def lookup_hotel_address(
     country = country or DEFAULT_COUNTRY or None
     query = _mk_query(hotel_name.strip(), (city or "").strip() or None, (postal or "").strip() or None, country)
 
-    qs = urllib.parse.urlencode(
-        {
-            "q": query,
-            "format": "json",
-            "limit": 1,
-            "addressdetails": 1,
-            "accept-language": DEFAULT_LANG,  # <- forcer la langue côté API
-        }
-    )
-    url = f"https://nominatim.openstreetmap.org/search?{qs}"
-
-    data = _fetch_json(url)
-    if not data or not isinstance(data, list) or not data:
+    item = _nominatim_search(query)
+    if not item:
         return None
 
-    item = data[0]
     # 1) Essayer le display_name (déjà localisé)
     disp = (item.get("display_name") or "").strip()
     if disp:
@@ -116,3 +171,27 @@ def lookup_hotel_address(
     addr = item.get("address") or {}
     formatted = _format_from_addressdetails(addr)
     return formatted
+
+
+def geocode_address(
+    adresse: str,
+    country: Optional[str] = None,
+    strict: bool = False,
+) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Adresse libre -> (lat, lng) via Nominatim (même cache que lookup_hotel_address).
+    Fail-safe : (None, None) si pas de résultat (strict=True : erreurs réseau levées).
+    """
+    adresse = (adresse or "").strip()
+    if not adresse:
+        return None, None
+
+    country = country or DEFAULT_COUNTRY or None
+    query = _mk_query(adresse, None, None, country)
+    item = _nominatim_search(query, strict=strict)
+    if not item:
+        return None, None
+    try:
+        return float(item["lat"]), float(item["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None, None
@@ -0,0 +1,210 @@
+# backend1/apps/services/hotel_enrichment.py
+# -*- coding: utf-8 -*-
+"""
+Enrichissement différé des hôtels (géocodage + zone).
+
+Les imports créent les hôtels "pending" sans aucun appel réseau ; ce worker
+les traite ensuite par lots :
+  1) appels HTTP (géocodage, adresse) en parallèle, plafonnés à
+     `concurrency` (1 par défaut sans clé Google), HORS transaction ; les
+     appels Nominatim restent espacés d'au moins 1 s (apps.services.geocoding) ;
+  2) écriture courte par hôtel : lat/lng, adresse, zone (point dans polygone),
+     puis report de la zone sur les dossiers de l'hôtel (Dossier.zone_fk).
+
+Déclenchement :
+  - automatiquement après commit quand un hôtel "pending" est enregistré
+    (thread de fond, un seul par process) — HOTEL_ENRICH_AUTOSTART ;
+  - ou périodiquement : `python manage.py enrich_hotels`.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from apps.models import Dossier, Hotel
+from apps.services.geocoding import lookup_hotel_address
+from apps.services.hotels import find_zone_for_point, geocode_hotel
+from apps.services.versions import DOSSIER, bump_all
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+# =========================
+# 1) Réseau (hors transaction)
+# =========================
+def _lookup(hotel: Hotel) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"coords": None, "adresse": None, "error": None}
+    try:
+        if hotel.lat is None or hotel.lng is None:
+            out["coords"] = geocode_hotel(hotel)
+        if not hotel.adresse:
+            city = hotel.zone.nom if hotel.zone_id else (hotel.geo_hint or None)
+            postal = (hotel.zone.code_postal or None) if hotel.zone_id else None
+            out["adresse"] = lookup_hotel_address(hotel.nom, city, postal, country=None)
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        connection.close()  # connexion du thread du pool (cache géocodage)
+    return out
+
+
+# =========================
+# 2) Écriture (transaction courte)
+# =========================
+def _apply(hotel_id: int, res: Dict[str, Any]) -> Dict[str, Any]:
+    with transaction.atomic():
+        hotel = Hotel.objects.select_for_update().filter(pk=hotel_id).first()
+        if hotel is None:
+            return {"status": None, "dossiers": 0}
+
+        hotel.geo_attempts += 1
+        hotel.geo_checked_at = timezone.now()
+        fields = ["geo_status", "geo_attempts", "geo_checked_at"]
+
+        if res["error"]:
+            logger.warning("Hotel#%s (%s): géocodage en échec: %s", hotel.pk, hotel.nom, res["error"])
+            hotel.geo_status = Hotel.GEO_FAILED if hotel.geo_attempts >= MAX_ATTEMPTS else Hotel.GEO_PENDING
+        else:
+            if res["coords"] and (hotel.lat is None or hotel.lng is None):
+                lat, lng, formatted_address, place_id = res["coords"]
+                hotel.lat, hotel.lng = lat, lng
+                fields += ["lat", "lng"]
+                if formatted_address:
+                    hotel.formatted_address = formatted_address
+                    fields.append("formatted_address")
+                if place_id:
+                    hotel.place_id = place_id
+                    fields.append("place_id")
+
+            if res["adresse"] and not hotel.adresse:
+                hotel.adresse = res["adresse"]
+                fields.append("adresse")
+
+            if hotel.lat is not None and hotel.lng is not None:
+                if hotel.zone_id is None:
+                    z = find_zone_for_point(hotel.lat, hotel.lng)
+                    if z:
+                        hotel.zone = z
+                        fields.append("zone")
+                hotel.geo_status = Hotel.GEO_DONE
+            else:
+                hotel.geo_status = Hotel.GEO_NOT_FOUND
+
+        hotel.save(update_fields=fields)
+
+        n_dossiers = 0
+        if hotel.zone_id:
+            n_dossiers = Dossier.objects.filter(hotel_fk_id=hotel.pk, zone_fk__isnull=True).update(
+                zone_fk_id=hotel.zone_id
+            )
+            if n_dossiers:
+                bump_all([DOSSIER])
+
+    return {"status": hotel.geo_status, "dossiers": n_dossiers}
+
+
+# =========================
+# Worker par lots
+# =========================
+def enrich_pending_hotels(
+    *,
+    limit: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    retry_failed: bool = False,
+) -> Dict[str, int]:
+    """Traite les hôtels "pending" (et "failed" si retry_failed) ; renvoie les compteurs."""
+    default_concurrency = 4 if _setting("GOOGLE_MAPS_API_KEY", "") else 1
+    concurrency = max(1, int(concurrency or _setting("HOTEL_ENRICH_CONCURRENCY", default_concurrency)))
+    batch_size = max(1, int(batch_size or _setting("HOTEL_ENRICH_BATCH_SIZE", 100)))
+
+    if retry_failed:
+        Hotel.objects.filter(geo_status=Hotel.GEO_FAILED).update(geo_status=Hotel.GEO_PENDING, geo_attempts=0)
+
+    stats = {"processed": 0, "done": 0, "not_found": 0, "failed": 0, "retry": 0, "dossiers_updated": 0}
+    seen: set = set()  # un hôtel en erreur n'est retenté qu'au passage suivant
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="hotel-geo") as pool:
+        while limit is None or stats["processed"] < limit:
+            n = batch_size if limit is None else min(batch_size, limit - stats["processed"])
+            hotels = list(
+                Hotel.objects.filter(geo_status=Hotel.GEO_PENDING)
+                .exclude(pk__in=seen)
+                .select_related("zone")
+                .order_by("id")[:n]
+            )
+            if not hotels:
+                break
+            seen.update(h.pk for h in hotels)
+
+            for hotel, res in zip(hotels, pool.map(_lookup, hotels)):
+                out = _apply(hotel.pk, res)
+                stats["processed"] += 1
+                stats["dossiers_updated"] += out["dossiers"]
+                key = {
+                    Hotel.GEO_DONE: "done",
+                    Hotel.GEO_NOT_FOUND: "not_found",
+                    Hotel.GEO_FAILED: "failed",
+                    Hotel.GEO_PENDING: "retry",
+                }.get(out["status"])
+                if key:
+                    stats[key] += 1
+
+    return stats
+
+
+# =========================
+# Déclenchement en arrière-plan
+# =========================
+_kick_lock = threading.Lock()
+_running = False
+_again = False
+
+
+def kick_hotel_enrichment() -> None:
+    """Lance le worker dans un thread de fond (un seul par process ; idempotent)."""
+    global _running, _again
+    if not _setting("HOTEL_ENRICH_AUTOSTART", True):
+        return
+    with _kick_lock:
+        if _running:
+            _again = True  # un nouvel hôtel est arrivé pendant le passage en cours
+            return
+        _running = True
+    threading.Thread(target=_background_run, name="hotel-enrichment", daemon=True).start()
+
+
+def _background_run() -> None:
+    global _running, _again
+    try:
+        while True:
+            with _kick_lock:
+                _again = False
+            close_old_connections()
+            try:
+                stats = enrich_pending_hotels()
+                if stats["processed"]:
+                    logger.info("Enrichissement hôtels: %s", stats)
+            except Exception:
+                logger.exception("Enrichissement hôtels: erreur")
+            with _kick_lock:
+                if not _again:
+                    _running = False
+                    return
+    finally:
+        with _kick_lock:
+            _running = False
+        connection.close()
@@ -2,95 +2,221 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from typing import Dict, Optional, Sequence, Tuple
+
 import requests
 from django.conf import settings
 from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+
+from apps.models import Dossier, Hotel
+from apps.services.geocache import cached_forward
+from apps.services.geocoding import geocode_address
+from apps.services.versions import DOSSIER, bump_all
+from apps.services.zone_index import get_zone_index, zones_for_points
+
 
-from apps.models import Hotel, Zone
+class _GeocodeUnavailable(Exception):
+    pass
 
 
 def _google_geocode(query: str, language: str = "fr"):
     """
-    Google Geocoding API:
+    Google Geocoding API (via le cache de géocodage) :
     retourne (lat, lng, formatted_address, place_id) ou None
     """
+    try:
+        return _google_geocode_strict(query, language)
+    except _GeocodeUnavailable:
+        return None
+
+
+def _google_geocode_strict(query: str, language: str = "fr"):
+    """Comme _google_geocode, mais quota / clé refusée lèvent _GeocodeUnavailable."""
     api_key = getattr(settings, "GOOGLE_MAPS_API_KEY", None)
     if not api_key:
         raise RuntimeError("GOOGLE_MAPS_API_KEY n'est pas configurée.")
 
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {"address": query, "key": api_key, "language": language}
-
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()
-
-    results = data.get("results") or []
-    if not results:
+    def fetch():
+        url = "https://maps.googleapis.com/maps/api/geocode/json"
+        params = {"address": query, "key": api_key, "language": language}
+
+        r = requests.get(url, params=params, timeout=10)
+        r.raise_for_status()
+        data = r.json()
+
+        status = data.get("status") or "OK"
+        if status not in ("OK", "ZERO_RESULTS"):
+            # quota / clé refusée : pas de cache négatif
+            raise _GeocodeUnavailable(status)
+
+        results = data.get("results") or []
+        if not results:
+            return None
+
+        top = results[0]
+        loc = (top.get("geometry") or {}).get("location") or {}
+        lat = loc.get("lat")
+        lng = loc.get("lng")
+        if lat is None or lng is None:
+            return None
+
+        return {
+            "lat": float(lat),
+            "lng": float(lng),
+            "formatted_address": top.get("formatted_address"),
+            "place_id": top.get("place_id"),
+        }
+
+    res = cached_forward("google", query, fetch, variant=language)
+    if not res:
         return None
-
-    top = results[0]
-    loc = (top.get("geometry") or {}).get("location") or {}
-    lat = loc.get("lat")
-    lng = loc.get("lng")
-    if lat is None or lng is None:
-        return None
-
-    return float(lat), float(lng), top.get("formatted_address"), top.get("place_id")
+    return res["lat"], res["lng"], res.get("formatted_address"), res.get("place_id")
 
 
 def find_zone_for_point(lat: float, lng: float):
     """
     Retourne une zone qui contient le point (lat, lng).
-    (Pour l'instant : 1ère zone matchée)
+    (1ère zone matchée par id, via l'index spatial en mémoire)
     """
     if lat is None or lng is None:
         return None
+    return get_zone_index().find(lat, lng)
+
 
-    for z in Zone.objects.all().order_by("id"):
-        try:
-            if z.contains_point(lat, lng):
-                return z
-        except Exception:
+def assign_hotel_zones(queryset=None, batch_size: int = 2000) -> Dict[str, int]:
+    """
+    Affectation en masse : zone des hôtels géocodés sans zone (ex: après le
+    tracé de nouvelles zones), puis report sur Dossier.zone_fk.
+    """
+    qs = queryset if queryset is not None else Hotel.objects.all()
+    qs = qs.filter(zone__isnull=True, zone_manuelle=False, lat__isnull=False, lng__isnull=False).order_by("id")
+
+    hotels_updated = 0
+    dossiers_updated = 0
+    last_id = 0
+    while True:
+        batch = list(qs.filter(id__gt=last_id).only("id", "lat", "lng")[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        zone_ids = zones_for_points([(h.lat, h.lng) for h in batch])
+        changed = []
+        for h, zid in zip(batch, zone_ids):
+            if zid is not None:
+                h.zone_id = zid
+                changed.append(h)
+        if not changed:
             continue
-    return None
+
+        with transaction.atomic():
+            Hotel.objects.bulk_update(changed, ["zone"], batch_size=500)
+            dossiers_updated += Dossier.objects.filter(
+                hotel_fk_id__in=[h.id for h in changed], zone_fk__isnull=True
+            ).update(zone_fk_id=Subquery(Hotel.objects.filter(pk=OuterRef("hotel_fk_id")).values("zone_id")[:1]))
+        hotels_updated += len(changed)
+
+    if dossiers_updated:
+        bump_all([DOSSIER])
+    return {"hotels_updated": hotels_updated, "dossiers_updated": dossiers_updated}
+
+
+def reassign_all_hotel_zones(
+    batch_size: int = 2000,
+    extents: Optional[Sequence[Tuple[float, float, float, float]]] = None,
+    zone_ids: Sequence[int] = (),
+) -> Dict[str, int]:
+    """
+    Recalcule la zone des hôtels géocodés (après création / modification /
+    suppression d'une zone) : une passe vectorisée par lot, écriture des seuls
+    changements. Les dossiers dont la zone venait de l'hôtel (zone_fk vide ou
+    égale à l'ancienne zone de l'hôtel) suivent. Hôtels à zone manuelle exclus.
+
+    extents : emprises (south, north, west, east) touchées -> seuls les hôtels
+    qui y sont (ou rattachés à `zone_ids`) sont revus ; None = tous.
+    """
+    qs = Hotel.objects.filter(lat__isnull=False, lng__isnull=False, zone_manuelle=False).order_by("id")
+    if extents is not None:
+        cond = Q(zone_id__in=list(zone_ids)) if zone_ids else Q(pk__in=[])
+        for south, north, west, east in extents:
+            cond |= Q(lat__gte=south, lat__lte=north, lng__gte=west, lng__lte=east)
+        qs = qs.filter(cond)
+
+    hotels_checked = 0
+    hotels_updated = 0
+    dossiers_updated = 0
+    last_id = 0
+    while True:
+        batch = list(qs.filter(id__gt=last_id).only("id", "lat", "lng", "zone_id")[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        hotels_checked += len(batch)
+
+        zone_ids = zones_for_points([(h.lat, h.lng) for h in batch])
+        by_zone: Dict[Optional[int], list] = {}
+        for h, zid in zip(batch, zone_ids):
+            if zid != h.zone_id:
+                by_zone.setdefault(zid, []).append(h.id)
+        if not by_zone:
+            continue
+
+        changed_ids = [hid for ids in by_zone.values() for hid in ids]
+        with_dossiers = set(
+            Dossier.objects.filter(hotel_fk_id__in=changed_ids).values_list("hotel_fk_id", flat=True).distinct()
+        )
+        with transaction.atomic():
+            # un UPDATE par zone cible ; dossiers d'abord (comparaison à l'ancienne zone de l'hôtel)
+            for zid, hotel_ids in by_zone.items():
+                d_ids = [hid for hid in hotel_ids if hid in with_dossiers]
+                if d_ids:
+                    dossiers_updated += Dossier.objects.filter(hotel_fk_id__in=d_ids).filter(
+                        Q(zone_fk__isnull=True) | Q(zone_fk_id=F("hotel_fk__zone_id"))
+                    ).exclude(zone_fk_id=zid).update(zone_fk_id=zid)
+                Hotel.objects.filter(pk__in=hotel_ids).update(zone_id=zid)
+        hotels_updated += len(changed_ids)
+
+    if dossiers_updated:
+        bump_all([DOSSIER])
+    return {"hotels_checked": hotels_checked, "hotels_updated": hotels_updated, "dossiers_updated": dossiers_updated}
 
 
-@transaction.atomic
 def get_or_create_hotel_and_assign_zone(hotel_name: str, hint_text: str = None) -> Hotel | None:
     """
-    - récupère l’hôtel depuis la DB
-    - si lat/lng absents => geocoding Google
-    - puis assigne zone si possible
+    - récupère (ou crée) l’hôtel en base, SANS appel réseau
+    - un hôtel pas encore géocodé reste "pending" : le worker d'enrichissement
+      (apps/services/hotel_enrichment.py) calcule lat/lng + zone plus tard et
+      complète les dossiers (zone_fk) à ce moment-là
+    - `hint_text` (ville, cp) est conservé pour le géocodage
     """
     name = (hotel_name or "").strip()
     if not name:
         return None
 
+    hint = (hint_text or "").strip()[:255]
+
     hotel = Hotel.objects.filter(nom__iexact=name).first()
     if not hotel:
-        hotel = Hotel.objects.create(nom=name)
-
-    # si déjà enrichi et zone déjà trouvée => ok
-    if hotel.lat is not None and hotel.lng is not None and hotel.zone_id is not None:
-        return hotel
-
-    # si coords manquent => appel Google
-    if hotel.lat is None or hotel.lng is None:
-        query = f"{name}, {hint_text}" if hint_text else name
-        res = _google_geocode(query)
-        if res:
-            lat, lng, formatted_address, place_id = res
-            hotel.lat = lat
-            hotel.lng = lng
-            hotel.formatted_address = formatted_address
-            hotel.place_id = place_id
-
-    # si coords ok et zone absente => calcule zone
-    if hotel.lat is not None and hotel.lng is not None and hotel.zone_id is None:
-        z = find_zone_for_point(hotel.lat, hotel.lng)
-        if z:
-            hotel.zone = z
-
-    hotel.save()
+        hotel = Hotel.objects.create(nom=name, geo_hint=hint)
+    elif hint and not hotel.geo_hint and hotel.geo_status == Hotel.GEO_PENDING:
+        Hotel.objects.filter(pk=hotel.pk).update(geo_hint=hint)
+        hotel.geo_hint = hint
+
     return hotel
+
+
+def geocode_hotel(hotel: Hotel) -> Optional[Tuple[float, float, Optional[str], Optional[str]]]:
+    """
+    (lat, lng, formatted_address, place_id) ou None — appels réseau (cachés),
+    à n'utiliser qu'en dehors de toute transaction (worker d'enrichissement).
+    Google si une clé est configurée, sinon Nominatim.
+    """
+    query = f"{hotel.nom}, {hotel.geo_hint}" if hotel.geo_hint else hotel.nom
+    if getattr(settings, "GOOGLE_MAPS_API_KEY", None):
+        return _google_geocode_strict(query)
+
+    lat, lng = geocode_address(query, strict=True)
+    if lat is None or lng is None:
+        return None
+    return lat, lng, None, None
@@ -0,0 +1,267 @@
+# backend1/apps/services/import_columns.py
+# -*- coding: utf-8 -*-
+"""
+Normalisation colonne par colonne des fichiers importés (Excel/CSV).
+
+Au lieu d'appeler _smart_date/_smart_time/_to_int... cellule par cellule dans
+un df.iterrows(), on convertit chaque colonne en une passe :
+  - chemins rapides vectorisés (regex pandas) pour les formats courants
+    (séries Excel, JJ/MM/AAAA, AAAA-MM-JJ, 16h50, 16:50:00, ...)
+  - pour le reste, la fonction "cellule" historique n'est appelée qu'une
+    fois par VALEUR DISTINCTE (un manifeste a quelques dizaines de dates
+    distinctes pour des milliers de lignes).
+
+Toutes les fonctions prennent une pd.Series et renvoient une pd.Series
+alignée (même index) de valeurs Python déjà typées.
+"""
+from __future__ import annotations
+
+import warnings
+from datetime import date, datetime, time
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+NULL_TOKENS = ("nan", "none", "null", "-", "nat", "<na>")
+EXCEL_ORIGIN = "1899-12-30"
+
+_NUM_RE = r"^\d+(?:\.\d*)?$"
+_DMY_RE = r"^(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})$"
+_YMD_RE = r"^(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})$"
+# "16h50", "16H", "16:50", "16:50:30", "2022-04-25 16:50:00", "1899-12-30T16:50"
+_TIME_RE = r"^(?:.*[ T])?(\d{1,2})\s*[:hH]\s*(\d{1,2})?(?:\s*:\s*(\d{1,2}))?(?:\.\d+)?$"
+
+
+# =========================
+# Helpers
+# =========================
+def empty_column(index) -> pd.Series:
+    """Colonne absente du mapping : que des None."""
+    return pd.Series([None] * len(index), index=index, dtype=object)
+
+
+def _as_object(s: pd.Series) -> pd.Series:
+    """Series object avec None pour les manquants (indépendant du dtype pandas)."""
+    s = s.astype(object)
+    return s.where(s.notna(), None)
+
+
+def map_unique(s: pd.Series, fn: Callable[[Any], Any]) -> pd.Series:
+    """Applique `fn` une seule fois par valeur distincte (valeurs hashables)."""
+    s = _as_object(s)
+    if s.empty:
+        return s
+    try:
+        uniques = pd.unique(s.to_numpy())
+        table = {u: fn(u) for u in uniques}
+        return s.map(lambda v: table[v]).astype(object)
+    except TypeError:
+        # valeurs non hashables -> cellule par cellule
+        return s.map(fn).astype(object)
+
+
+def str_column(s: pd.Series) -> pd.Series:
+    """Équivalent vectorisé de _to_str : strip + jetons vides -> ""."""
+    s = _as_object(s)
+    out = s.map(lambda v: "" if v is None else v).astype(str).str.strip()
+    return out.mask(out.str.lower().isin(NULL_TOKENS), "").astype(object)
+
+
+def _native_mask(s: pd.Series, types) -> pd.Series:
+    return s.map(lambda v: isinstance(v, types)).astype(bool)
+
+
+# =========================
+# Dates
+# =========================
+def date_column(
+    s: pd.Series,
+    *,
+    serial_min: float = 30000,
+    serial_max: float = 60000,
+    fallback: Optional[Callable[[Any], Optional[date]]] = None,
+) -> pd.Series:
+    """
+    Convertit une colonne en `datetime.date` (ou None).
+      - datetime/date natifs (cellules Excel typées)
+      - nombres Excel (séries depuis 1899-12-30) dans [serial_min, serial_max]
+      - "25/04/2022", "25-04-2022", "25.04.2022" (jour en premier)
+      - "2022-04-25", "2022/04/25" (+ heure éventuelle, ignorée)
+    Les valeurs restantes passent par `fallback` (une fois par valeur distincte).
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.date.astype(object).where(s.notna(), None)
+
+    s = _as_object(s)
+    out = pd.Series([None] * len(s), index=s.index, dtype=object)
+    if s.empty:
+        return out
+
+    # 1) natifs
+    native = _native_mask(s, (datetime, date))
+    if native.any():
+        out[native] = s[native].map(lambda v: v.date() if isinstance(v, datetime) else v)
+
+    # 2) texte
+    txt = str_column(s[~native])
+    # coupe l'heure ("2022-04-25 00:00:00", "2022-04-25T00:00")
+    txt = txt.str.split(" ", n=1).str[0].str.split("T", n=1).str[0].str.strip()
+    todo = txt[txt != ""]
+
+    # 2a) séries Excel
+    is_num = todo.str.match(_NUM_RE)
+    if is_num.any():
+        nums = pd.to_numeric(todo[is_num], errors="coerce")
+        ok = nums.between(serial_min, serial_max)
+        if ok.any():
+            days = pd.to_datetime(nums[ok], unit="D", origin=EXCEL_ORIGIN, errors="coerce")
+            out[days.index] = days.dt.date.astype(object).where(days.notna(), None)
+
+    # 2b) JJ/MM/AAAA puis AAAA-MM-JJ
+    for pattern, order in ((_DMY_RE, (2, 1, 0)), (_YMD_RE, (0, 1, 2))):
+        parts = todo.str.extract(pattern)
+        hit = parts[0].notna()
+        if not hit.any():
+            continue
+        p = parts[hit].astype(int)
+        ymd = pd.DataFrame({"year": p[order[0]], "month": p[order[1]], "day": p[order[2]]})
+        parsed = pd.to_datetime(ymd, errors="coerce")
+        good = parsed.notna()
+        out[parsed[good].index] = parsed[good].dt.date.astype(object)
+
+    # 3) le reste : une conversion par valeur distincte
+    rest_idx = todo.index[out[todo.index].isna()]
+    if len(rest_idx):
+        fn = fallback or parse_date_value
+        out[rest_idx] = map_unique(s[rest_idx], fn)
+    return out
+
+
+def parse_date_value(v: Any) -> Optional[date]:
+    """Conversion d'UNE valeur (chemin lent, jour en premier)."""
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    s = str(v).strip()
+    if not s or s.lower() in NULL_TOKENS:
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            d = pd.to_datetime(s, dayfirst=True, errors="coerce")
+        if pd.notna(d):
+            return d.date()
+    except Exception:
+        pass
+    return None
+
+
+# =========================
+# Heures
+# =========================
+def time_column(
+    s: pd.Series,
+    *,
+    fallback: Optional[Callable[[Any], Optional[time]]] = None,
+) -> pd.Series:
+    """
+    Convertit une colonne en `datetime.time` (ou None).
+      - time/datetime natifs
+      - fractions de jour Excel (0 <= x < 1)
+      - "16:50", "16:50:30", "16h50", "16H", "2022-04-25 16:50:00"
+    Les valeurs restantes passent par `fallback` (une fois par valeur distincte).
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.time.astype(object).where(s.notna(), None)
+
+    s = _as_object(s)
+    out = pd.Series([None] * len(s), index=s.index, dtype=object)
+    if s.empty:
+        return out
+
+    native = _native_mask(s, (time, datetime))
+    if native.any():
+        out[native] = s[native].map(
+            lambda v: v.time().replace(microsecond=0) if isinstance(v, datetime) else v
+        )
+
+    todo = str_column(s[~native])
+    todo = todo[todo != ""]
+
+    # fractions Excel
+    is_num = todo.str.match(_NUM_RE)
+    if is_num.any():
+        nums = pd.to_numeric(todo[is_num], errors="coerce")
+        frac = nums[(nums >= 0) & (nums < 1)]
+        if not frac.empty:
+            minutes = np.round(frac.to_numpy(dtype=float) * 24 * 60).astype(int)
+            out[frac.index] = [
+                time(int(m // 60), int(m % 60)) if m < 24 * 60 else None for m in minutes
+            ]
+
+    parts = todo.str.extract(_TIME_RE)
+    hit = parts[0].notna()
+    if hit.any():
+        p = parts[hit].fillna("0").astype(int)
+        valid = (p[0] < 24) & (p[1] < 60) & (p[2] < 60)
+        p = p[valid]
+        out[p.index] = [time(h, m, sec) for h, m, sec in zip(p[0], p[1], p[2])]
+
+    rest_idx = todo.index[out[todo.index].isna()]
+    if len(rest_idx):
+        fn = fallback or parse_time_value
+        out[rest_idx] = map_unique(s[rest_idx], fn)
+    return out
+
+
+def parse_time_value(v: Any) -> Optional[time]:
+    """Conversion d'UNE valeur (chemin lent)."""
+    if v is None:
+        return None
+    if isinstance(v, time):
+        return v
+    if isinstance(v, datetime):
+        return v.time().replace(microsecond=0)
+    s = str(v).strip()
+    if not s or s.lower() in NULL_TOKENS:
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            dt = pd.to_datetime(s, errors="coerce")
+        if pd.isna(dt):
+            return None
+        return dt.time().replace(microsecond=0)
+    except Exception:
+        return None
+
+
+# =========================
+# Entiers / types
+# =========================
+def int_column(s: pd.Series, default: int = 0) -> pd.Series:
+    """
+    Équivalent vectorisé de _to_int : 1er nombre trouvé ("2 adultes", "3,0"),
+    arrondi, sinon `default`.
+    """
+    txt = str_column(s).astype(str).str.replace("\u00A0", " ", regex=False).str.replace(",", ".", regex=False)
+    num = pd.to_numeric(txt.str.extract(r"([-+]?\d*\.?\d+)", expand=False), errors="coerce")
+    return pd.Series(
+        np.where(num.notna(), np.round(num.fillna(0).to_numpy(dtype=float)), default).astype(int),
+        index=s.index,
+    ).astype(object)
+
+
+def type_column(s: pd.Series) -> pd.Series:
+    """
+    Équivalent vectorisé de _normalize_type :
+      "A" pour Arrivées (A, L) / "D" pour Départs (D, S) / "" sinon.
+    """
+    up = str_column(s).astype(str).str.upper()
+    c = up.str.extract(r"([ADLS])", expand=False).fillna(up.str[:1])
+    return c.map({"A": "A", "L": "A", "D": "D", "S": "D"}).fillna("").astype(object)
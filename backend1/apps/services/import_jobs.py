@@ -0,0 +1,262 @@
+# backend1/apps/services/import_jobs.py
+# -*- coding: utf-8 -*-
+"""
+Imports en arrière-plan (sans broker externe).
+
+  - submit_import_job() enregistre le fichier + un ImportJob "pending" et
+    rend la main immédiatement ;
+  - un ThreadPoolExecutor local exécute la logique d'import existante
+    (méthode `run_import` des vues d'import) ;
+  - les compteurs du job sont mis à jour après chaque paquet de lignes,
+    le rapport final (réponse de l'importeur) est stocké sur le job ;
+  - le fichier est supprimé à la fin du job, quelle qu'en soit l'issue.
+
+Ordonnancement : la file est la table ImportJob. Un job passe "pending" ->
+"running" sous verrou de la ligne de l'agence (SELECT ... FOR UPDATE), et
+seulement si l'agence n'a aucun job "running" : les jobs d'une même agence
+passent l'un après l'autre, tous process confondus (deux imports simultanés
+d'une agence se marcheraient dessus en upsert) ; ceux d'agences différentes
+tournent en parallèle. Le worker qui termine un job prend le suivant de
+l'agence dans la même transaction.
+
+Reprise : un job "running" dont le battement (heartbeat_at, rafraîchi pendant
+l'exécution) date de plus de IMPORT_JOB_STALE_SECONDS a perdu son process ->
+"failed" (l'import a pu être partiel : à relancer) et fichier supprimé ; les
+jobs "pending" sont relancés. recover_import_jobs() tourne une fois par
+process au premier appel de l'API des imports, et via
+`python manage.py recover_import_jobs` (démarrage / cron).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.models import AgenceVoyage, ImportJob
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB_WORKERS = int(getattr(settings, "IMPORT_JOB_WORKERS", 4))
+
+# kind -> vue exposant run_import(fichier, data, *, progress=None) -> Response
+IMPORTERS = {
+    ImportJob.KIND_DOSSIERS: "apps.views.dossiers_import.ImporterDossierAPIView",
+    ImportJob.KIND_FICHES: "apps.views.Fiches_import.ImporterFicheMouvementAPIView",
+    ImportJob.KIND_VEHICULES: "apps.views.importers.ImporterVehiculesAPIView",
+    ImportJob.KIND_CHAUFFEURS: "apps.views.importers.ImporterChauffeursAPIView",
+}
+
+INTERRUPTED_MESSAGE = "Import interrompu (arrêt du serveur) : il a pu être appliqué partiellement, relancez le fichier."
+
+
+def _stale_seconds() -> float:
+    return float(getattr(settings, "IMPORT_JOB_STALE_SECONDS", 900))
+
+
+# =========================
+# File d'attente (table ImportJob)
+# =========================
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_recovered = False
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, IMPORT_JOB_WORKERS),
+                thread_name_prefix="import-job",
+            )
+        return _executor
+
+
+def _dispatch(agence_id: int) -> None:
+    """Réveille un worker pour l'agence ; il repart aussitôt si un job de l'agence tourne déjà."""
+    _get_executor().submit(_worker, agence_id)
+
+
+def _claim_next(agence_id: int, finished: Optional[Tuple[int, Dict[str, Any]]] = None) -> Optional[int]:
+    """
+    Sous verrou de l'agence : enregistre le job terminé (id, champs) puis passe
+    le plus ancien job "pending" en "running" si aucun autre ne tourne -> son id.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        list(AgenceVoyage.objects.select_for_update().filter(pk=agence_id).values_list("pk", flat=True))
+        if finished is not None:
+            ImportJob.objects.filter(pk=finished[0]).update(**finished[1])
+        jobs = ImportJob.objects.filter(agence_id=agence_id)
+        if jobs.filter(status=ImportJob.STATUS_RUNNING).exists():
+            return None
+        job_id = (
+            jobs.filter(status=ImportJob.STATUS_PENDING).order_by("created_at", "id")
+            .values_list("id", flat=True).first()
+        )
+        if job_id is None:
+            return None
+        jobs.filter(pk=job_id, status=ImportJob.STATUS_PENDING).update(
+            status=ImportJob.STATUS_RUNNING, started_at=now, heartbeat_at=now,
+        )
+        return job_id
+
+
+def process_agency_jobs(agence_id: int) -> int:
+    """Traite les jobs "pending" de l'agence l'un après l'autre (worker ; direct en test) -> nombre traité."""
+    done = 0
+    job_id = _claim_next(agence_id)
+    while job_id is not None:
+        fields = _execute(job_id)
+        done += 1
+        job_id = _claim_next(agence_id, finished=(job_id, fields))
+    return done
+
+
+def _worker(agence_id: int) -> None:
+    close_old_connections()
+    try:
+        process_agency_jobs(agence_id)
+    except Exception:
+        logger.exception("Imports agence %s: erreur inattendue du worker", agence_id)
+    finally:
+        connection.close()  # connexion propre au thread worker
+
+
+def _heartbeat(job_id: int, stop: threading.Event, every: float) -> None:
+    try:
+        while not stop.wait(every):
+            ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+    except Exception:
+        logger.warning("ImportJob#%s: battement non enregistré", job_id, exc_info=True)
+    finally:
+        connection.close()
+
+
+def _delete_file(job: ImportJob) -> None:
+    if not job.fichier:
+        return
+    try:
+        job.fichier.delete(save=False)
+    except Exception:
+        logger.warning("ImportJob#%s: fichier non supprimé", job.pk, exc_info=True)
+
+
+def recover_import_jobs() -> Dict[str, int]:
+    """
+    Jobs "running" sans battement depuis IMPORT_JOB_STALE_SECONDS -> "failed"
+    (fichier supprimé) ; agences ayant des jobs "pending" -> worker relancé.
+    """
+    cutoff = timezone.now() - timedelta(seconds=_stale_seconds())
+    stale = list(
+        ImportJob.objects.filter(status=ImportJob.STATUS_RUNNING)
+        .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff))
+    )
+    for job in stale:
+        _delete_file(job)
+        ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_RUNNING).update(
+            status=ImportJob.STATUS_FAILED,
+            error_message=INTERRUPTED_MESSAGE,
+            finished_at=timezone.now(),
+            fichier="",
+        )
+        logger.warning("ImportJob#%s: interrompu, marqué en échec", job.pk)
+
+    agences = set(ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).values_list("agence_id", flat=True))
+    for agence_id in agences:
+        transaction.on_commit(lambda a=agence_id: _dispatch(a))
+    return {"failed": len(stale), "agences": len(agences)}
+
+
+def ensure_recovered() -> None:
+    """recover_import_jobs() une fois par process (premier appel de l'API des imports)."""
+    global _recovered
+    with _lock:
+        if _recovered:
+            return
+        _recovered = True
+    try:
+        recover_import_jobs()
+    except Exception:
+        logger.exception("Reprise des imports: erreur")
+
+
+# =========================
+# API
+# =========================
+def submit_import_job(*, kind: str, upload, agence, user=None, params: Optional[Dict[str, Any]] = None) -> ImportJob:
+    """Crée le job (fichier copié dans MEDIA_ROOT/imports/) et le planifie après commit."""
+    if kind not in IMPORTERS:
+        raise ValueError(f"Type d'import inconnu : {kind}")
+
+    job = ImportJob(
+        kind=kind,
+        agence=agence,
+        created_by=user if getattr(user, "is_authenticated", False) else None,
+        nom_fichier=(getattr(upload, "name", "") or "")[:255],
+        params=params or {},
+    )
+    job.fichier.save(os.path.basename(job.nom_fichier) or "import", upload, save=False)
+    job.save()
+
+    transaction.on_commit(lambda: _dispatch(job.agence_id))
+    return job
+
+
+def _execute(job_id: int) -> Dict[str, Any]:
+    """Exécute un job déjà "running" -> champs finaux (statut, rapport, ...). Fichier supprimé dans tous les cas."""
+    job = ImportJob.objects.get(pk=job_id)
+
+    def progress(rows: int, created: int, updated: int, ignored: int, errors: int) -> None:
+        ImportJob.objects.filter(pk=job_id).update(
+            processed_rows=rows,
+            created_count=created,
+            updated_count=updated,
+            ignored_count=ignored,
+            errors_count=errors,
+            heartbeat_at=timezone.now(),
+        )
+
+    stop = threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(job_id, stop, max(1.0, _stale_seconds() / 3)),
+        name=f"import-job-{job_id}-heartbeat", daemon=True,
+    ).start()
+
+    fields: Dict[str, Any] = {}
+    try:
+        view = import_string(IMPORTERS[job.kind])()
+        data = dict(job.params or {})
+        data["agence"] = job.agence_id
+        with job.fichier.open("rb") as fh:
+            response = view.run_import(fh, data, progress=progress)
+
+        report = response.data if isinstance(response.data, dict) else {"data": response.data}
+        fields["report"] = report
+        fields["erreurs"] = report.get("erreurs") or report.get("errors") or []
+        if response.status_code >= 400:
+            fields["status"] = ImportJob.STATUS_FAILED
+            fields["error_message"] = str(report.get("error") or report.get("detail") or report)
+        else:
+            fields["status"] = ImportJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("ImportJob#%s: échec", job_id)
+        fields["status"] = ImportJob.STATUS_FAILED
+        fields["error_message"] = f"{type(e).__name__}: {e}"
+    finally:
+        stop.set()
+        _delete_file(job)
+
+    fields["finished_at"] = timezone.now()
+    fields["fichier"] = ""
+    return fields
@@ -0,0 +1,81 @@
+# backend1/apps/services/mission_window.py
+# -*- coding: utf-8 -*-
+"""
+Copie dénormalisée, sur Mission, de la fenêtre effective des affectations :
+  - date_heure_debut / date_heure_fin : min début / max fin des affectations actives
+  - lieu_depart : celui de la 1ère affectation, lieu_arrivee : celui de la dernière
+  - statut : PLANNED (au moins une affectation active), CANCELLED (affectations
+    toutes soft-delete), vide (jamais affectée)
+
+Tenue à jour par les signaux MissionRessource (models.py) et explicitement
+après les .update() en masse ; `manage.py backfill_mission_windows` pour l'existant.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from apps.models import Mission, MissionRessource
+
+
+FIELDS = ["date_heure_debut", "date_heure_fin", "statut", "lieu_depart", "lieu_arrivee"]
+
+
+def compute_window(affectations: List[MissionRessource]) -> Dict[str, object]:
+    active = [a for a in affectations if not a.is_deleted]
+    if not active:
+        return {
+            "date_heure_debut": None,
+            "date_heure_fin": None,
+            "statut": Mission.STATUT_CANCELLED if affectations else None,
+            "lieu_depart": None,
+            "lieu_arrivee": None,
+        }
+    first = min(active, key=lambda a: (a.date_heure_debut, a.id))
+    last = max(active, key=lambda a: (a.date_heure_fin, a.id))
+    return {
+        "date_heure_debut": first.date_heure_debut,
+        "date_heure_fin": last.date_heure_fin,
+        "statut": Mission.STATUT_PLANNED,
+        "lieu_depart": first.lieu_depart,
+        "lieu_arrivee": last.lieu_arrivee,
+    }
+
+
+def sync_mission_windows(mission_ids: Iterable[int]) -> int:
+    """Recalcule les missions données ; n'écrit que celles qui changent. -> nb mises à jour."""
+    ids = {i for i in mission_ids if i}
+    if not ids:
+        return 0
+
+    by_mission: Dict[int, List[MissionRessource]] = {i: [] for i in ids}
+    rows = MissionRessource.objects.filter(mission_id__in=ids).only(
+        "id", "mission_id", "date_heure_debut", "date_heure_fin", "lieu_depart", "lieu_arrivee", "is_deleted"
+    )
+    for mr in rows:
+        by_mission[mr.mission_id].append(mr)
+
+    changed = []
+    for m in Mission.objects.filter(pk__in=ids).only("id", *FIELDS):
+        values = compute_window(by_mission[m.pk])
+        if any(getattr(m, k) != v for k, v in values.items()):
+            for k, v in values.items():
+                setattr(m, k, v)
+            changed.append(m)
+
+    if changed:
+        Mission.objects.bulk_update(changed, FIELDS, batch_size=500)
+    return len(changed)
+
+
+def backfill_mission_windows(batch_size: int = 1000) -> int:
+    """Toutes les missions, par lots d'id croissants."""
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Mission.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return updated
+        last_id = ids[-1]
+        updated += sync_mission_windows(ids)
@@ -0,0 +1,104 @@
+# backend1/apps/services/nearest.py
+# -*- coding: utf-8 -*-
+"""
+K plus proches véhicules d'un point (lat/lng, centre de zone ou hôtel).
+
+Distances haversine calculées en UNE passe NumPy sur les last_lat / last_lng de
+tous les candidats (filtrés en SQL : statut "dispo", coordonnées connues,
+capacité, type), puis top-k par argpartition ; les véhicules occupés sur
+[debut, fin) sont exclus via l'index de disponibilité (apps.services.availability).
+Sans créneau complet, la disponibilité est vérifiée à l'instant donné (debut,
+fin ou maintenant).
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.models import Hotel, Vehicule, Zone
+from apps.services import availability
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    """Distance (km) de (lat, lng) à chaque point ; NaN si coordonnées manquantes."""
+    p_lat = np.radians(np.asarray(lats, dtype=float))
+    p_lng = np.radians(np.asarray(lngs, dtype=float))
+    o_lat, o_lng = np.radians(lat), np.radians(lng)
+    with np.errstate(invalid="ignore"):
+        a = np.sin((p_lat - o_lat) / 2) ** 2 + np.cos(o_lat) * np.cos(p_lat) * np.sin((p_lng - o_lng) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def resolve_origin(
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    zone_id: Optional[int] = None,
+    hotel_id: Optional[int] = None,
+) -> Optional[Tuple[float, float]]:
+    """Point de départ : lat/lng explicites, sinon centre de la zone, sinon hôtel (géocodé)."""
+    if lat is not None and lng is not None:
+        return float(lat), float(lng)
+    if zone_id:
+        z = Zone.objects.filter(pk=zone_id).values_list("center_lat", "center_lng").first()
+        if z and None not in z:
+            return z
+    if hotel_id:
+        h = Hotel.objects.filter(pk=hotel_id).values_list("lat", "lng").first()
+        if h and None not in h:
+            return h
+    return None
+
+
+def nearest_vehicles(
+    vehicules: QuerySet,
+    origin: Tuple[float, float],
+    *,
+    k: int = 5,
+    pax: Optional[int] = None,
+    type_code: Optional[str] = None,
+    debut=None,
+    fin=None,
+    max_km: Optional[float] = None,
+) -> List[Tuple[Vehicule, float]]:
+    """-> [(vehicule, distance_km), ...] triés par distance croissante (au plus k)."""
+    qs = vehicules.filter(statut="dispo", last_lat__isnull=False, last_lng__isnull=False)
+    if pax:
+        qs = qs.filter(capacite__gte=pax)
+    if type_code:
+        qs = qs.filter(type__iexact=type_code)
+
+    if not (debut and fin):
+        at = debut or fin or timezone.now()
+        debut, fin = at, at + timedelta(minutes=1)
+
+    rows = list(qs.order_by().values_list("id", "agence_id", "last_lat", "last_lng"))
+    if rows:
+        busy = availability.busy_resource_ids(availability.VEHICULE, {r[1] for r in rows}, debut, fin)
+        rows = [r for r in rows if r[0] not in busy]
+    if not rows or k <= 0:
+        return []
+
+    arr = np.array([(r[2], r[3]) for r in rows], dtype=float)
+    ids = np.array([r[0] for r in rows])
+    dist = haversine_km(origin[0], origin[1], arr[:, 0], arr[:, 1])
+    if max_km is not None:
+        keep = dist <= max_km
+        ids, dist = ids[keep], dist[keep]
+    if not len(ids):
+        return []
+
+    if len(ids) > k:
+        top = np.argpartition(dist, k - 1)[:k]
+        ids, dist = ids[top], dist[top]
+    order = np.lexsort((ids, dist))  # distance puis id (stable)
+    ids, dist = ids[order], dist[order]
+
+    by_id = Vehicule.objects.select_related("agence").in_bulk([int(i) for i in ids])
+    return [(by_id[int(i)], float(d)) for i, d in zip(ids, dist) if int(i) in by_id]
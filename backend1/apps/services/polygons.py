@@ -0,0 +1,125 @@
+# backend1/apps/services/polygons.py
+# -*- coding: utf-8 -*-
+"""
+Polygones de zones :
+  - stockage compact des sommets : "encoded polyline" Google (précision 1e-5°,
+    ~1 m ; quelques octets par sommet), champ Zone.polygon ;
+  - point-dans-polygone vectorisé (ray casting NumPy) avec préfiltre bbox.
+
+Les sommets sont des (lat, lng) ; le polygone est fermé implicitement.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+PRECISION = 1e5
+
+
+# =========================
+# Encodage
+# =========================
+def _encode_value(v: int) -> str:
+    v = ~(v << 1) if v < 0 else (v << 1)
+    out = []
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1F)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+    return "".join(out)
+
+
+def encode_polyline(points: Iterable[Tuple[float, float]]) -> str:
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        ilat = int(round(float(lat) * PRECISION))
+        ilng = int(round(float(lng) * PRECISION))
+        out.append(_encode_value(ilat - prev_lat))
+        out.append(_encode_value(ilng - prev_lng))
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(out)
+
+
+def decode_polyline(encoded: str) -> np.ndarray:
+    """-> tableau (n, 2) de (lat, lng)."""
+    coords = []
+    index = lat = lng = 0
+    length = len(encoded or "")
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else (result >> 1))
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append((lat / PRECISION, lng / PRECISION))
+    return np.asarray(coords, dtype=float).reshape(-1, 2)
+
+
+def normalize_points(points: Sequence[Any]) -> list:
+    """[{lat, lng}] | [[lat, lng]] -> [(lat, lng)] (dernier sommet = premier => retiré)."""
+    out = []
+    for p in points or []:
+        if isinstance(p, dict):
+            lat, lng = p.get("lat"), p.get("lng", p.get("lon"))
+        else:
+            lat, lng = p[0], p[1]
+        out.append((float(lat), float(lng)))
+    if len(out) > 1 and out[0] == out[-1]:
+        out.pop()
+    return out
+
+
+# =========================
+# Point dans polygone
+# =========================
+def polygon_bbox(vertices: np.ndarray) -> Tuple[float, float, float, float]:
+    """(south, north, west, east)"""
+    return (
+        float(vertices[:, 0].min()),
+        float(vertices[:, 0].max()),
+        float(vertices[:, 1].min()),
+        float(vertices[:, 1].max()),
+    )
+
+
+def points_in_polygon(lats, lngs, vertices: np.ndarray, bbox: Optional[Tuple[float, float, float, float]] = None) -> np.ndarray:
+    """
+    Masque booléen : point i dans le polygone (ray casting, règle pair-impair).
+    Boucle sur les arêtes, vectorisé sur les points ; seuls les points dans la
+    bbox du polygone sont testés.
+    """
+    y = np.asarray(lats, dtype=float).ravel()
+    x = np.asarray(lngs, dtype=float).ravel()
+    inside = np.zeros(y.shape, dtype=bool)
+    if len(vertices) < 3 or not len(y):
+        return inside
+
+    s, n, w, e = bbox or polygon_bbox(vertices)
+    cand = np.nonzero((y >= s) & (y <= n) & (x >= w) & (x <= e))[0]
+    if not len(cand):
+        return inside
+
+    py, px = y[cand], x[cand]
+    res = np.zeros(len(cand), dtype=bool)
+    vy, vx = vertices[:, 0], vertices[:, 1]
+    j = len(vertices) - 1
+    for i in range(len(vertices)):
+        yi, xi, yj, xj = vy[i], vx[i], vy[j], vx[j]
+        crosses = (yi > py) != (yj > py)
+        if crosses.any():
+            x_cross = (xj - xi) * (py[crosses] - yi) / (yj - yi) + xi
+            res[crosses] ^= px[crosses] < x_cross
+        j = i
+    inside[cand] = res
+    return inside
@@ -0,0 +1,151 @@
+# backend1/apps/services/rentout_search.py
+# -*- coding: utf-8 -*-
+"""
+Recherche RENTOÛT (véhicules partagés par les autres agences) en un nombre
+CONSTANT de requêtes, quel que soit le nombre d'agences / de véhicules :
+
+  1) candidats : louer_autres_agences + dispo + capacité (SQL)
+  2) grille tarifaire de l'aéroport chargée une fois -> TariffMatrix
+       (vehicule)          -> tarif le moins cher propre au véhicule
+       (agence, type)      -> sinon, tarif le moins cher de l'agence pour ce type
+  3) fenêtres de disponibilité de tous les candidats tarifés (fleet_state.vehicles_windows)
+  4) filtrage + clé de tri (distance, tarif, dispo) en une passe, un seul tri
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.models import Vehicule, VehiculeTarifZone, Zone
+from apps.services.fleet_state import vehicles_windows
+
+
+FAR_KM = 9999.0
+
+
+@dataclass(frozen=True)
+class Tarif:
+    prix: float
+    devise: str
+
+
+class TariffMatrix:
+    """Tarifs d'un aéroport : (vehicule) puis (agence, type) -> tarif minimal."""
+
+    def __init__(self, aeroport: str):
+        self.by_vehicule: Dict[int, Tuple] = {}
+        self.by_agence_type: Dict[Tuple[int, str], Tuple] = {}
+        rows = VehiculeTarifZone.objects.filter(aeroport=aeroport).values_list(
+            "id", "agence_id", "vehicule_id", "type_code", "prix", "devise"
+        )
+        for pk, agence_id, vehicule_id, type_code, prix, devise in rows:
+            item = (prix, pk, devise)  # ordre : prix puis id
+            if vehicule_id:
+                self._keep_min(self.by_vehicule, vehicule_id, item)
+            if type_code:
+                self._keep_min(self.by_agence_type, (agence_id, type_code.lower()), item)
+
+    @staticmethod
+    def _keep_min(d: Dict, key, item: Tuple) -> None:
+        cur = d.get(key)
+        if cur is None or item[:2] < cur[:2]:
+            d[key] = item
+
+    def price_for(self, vehicule: Vehicule) -> Optional[Tarif]:
+        item = self.by_vehicule.get(vehicule.pk)
+        if item is None and vehicule.type:
+            item = self.by_agence_type.get((vehicule.agence_id, vehicule.type.lower()))
+        if item is None:
+            return None
+        return Tarif(prix=float(item[0]), devise=item[2])
+
+
+def _distance_km(zone_name: str, zone_obj: Optional[Zone], vehicule: Vehicule, position: Optional[str]):
+    if not zone_name:
+        return None
+    adr_txt = (position or vehicule.adresse or "").lower()
+    # déjà dans la zone (texte) -> 0 km
+    if zone_name.lower() in adr_txt:
+        return 0.0
+    # zone + coordonnées -> distance réelle
+    if (
+        zone_obj
+        and vehicule.last_lat is not None
+        and vehicule.last_lng is not None
+        and zone_obj.center_lat is not None
+        and zone_obj.center_lng is not None
+    ):
+        return Vehicule._distance_km(vehicule.last_lat, vehicule.last_lng, zone_obj.center_lat, zone_obj.center_lng)
+    return FAR_KM
+
+
+def search_rentout(
+    *,
+    aeroport: str,
+    zone_name: str = "",
+    hotel_client: str = "",
+    pax: int = 0,
+    heure: Optional[datetime] = None,
+    exclude_agence_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Véhicules RENTOÛT proposables, triés distance -> tarif -> dispo."""
+    qs = Vehicule.objects.filter(louer_autres_agences=True, statut="dispo").select_related("agence")
+    if exclude_agence_id:
+        qs = qs.exclude(agence_id=exclude_agence_id)
+    if pax:
+        qs = qs.filter(Q(capacite__isnull=True) | Q(capacite__gte=pax))
+
+    matrix = TariffMatrix(aeroport)
+    priced = [(v, t) for v in qs for t in (matrix.price_for(v),) if t is not None]
+    if not priced:
+        return []
+
+    windows = vehicles_windows([v for v, _ in priced], ref_time=heure)
+    zone_obj = Zone.objects.filter(nom__iexact=zone_name).first() if zone_name else None
+
+    now = timezone.now()
+    ranked = []
+    for v, tarif in priced:
+        state = windows[v.pk]
+        dispo_de = state["available_from"]
+        dispo_jusqua = state["available_until"]
+        position = state["location"] or v.adresse
+
+        # fenêtre incohérente / heure demandée hors fenêtre
+        if dispo_jusqua and dispo_de and dispo_de >= dispo_jusqua:
+            continue
+        if heure and ((dispo_de and heure < dispo_de) or (dispo_jusqua and heure > dispo_jusqua)):
+            continue
+
+        distance_km = _distance_km(zone_name, zone_obj, v, position)
+        key = (
+            distance_km if distance_km is not None else 999999.0,
+            tarif.prix,
+            dispo_de or now,
+            dispo_jusqua or (now + timedelta(days=30)),
+        )
+        ranked.append((key, {
+            "id": v.id,
+            "marque": v.marque,
+            "modele": v.modele,
+            "type": v.type,
+            "capacite": v.capacite,
+            "annee": v.annee_mise_en_circulation,
+            "position_actuelle": position,
+            "adresse": position,
+            "hotel_client": hotel_client,
+            "zone_client": zone_name,
+            "agence": v.agence.legal_name if v.agence_id else None,
+            "tarif": tarif.prix,
+            "devise": tarif.devise,
+            "dispo_de": dispo_de,
+            "dispo_jusqua": dispo_jusqua,
+            "distance_km": distance_km,
+        }))
+
+    ranked.sort(key=lambda x: x[0])
+    return [row for _, row in ranked]
@@ -0,0 +1,95 @@
+# backend1/apps/services/response_cache.py
+# -*- coding: utf-8 -*-
+"""
+Cache de réponses des endpoints de lecture coûteux (framework cache Django,
+locmem / fichier par défaut : aucun service externe).
+
+Clé = endpoint + agence + paramètres normalisés + empreinte des compteurs de
+version (apps.services.versions) dont dépend l'endpoint. Les signaux qui
+incrémentent ces compteurs invalident donc précisément les entrées concernées,
+y compris d'un process à l'autre (les compteurs sont en base) ; les anciennes
+entrées expirent seules (RESPONSE_CACHE_TTL).
+
+Compteurs hit / miss par endpoint (process courant) : response_cache_stats().
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.response import Response
+
+from apps.services.versions import current_version
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(endpoint: str, name: str) -> None:
+    with _stats_lock:
+        row = _stats.setdefault(endpoint, {"hits": 0, "misses": 0})
+        row[name] += 1
+
+
+def response_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """{endpoint: {hits, misses, hit_rate}} pour le process courant."""
+    with _stats_lock:
+        out = {k: dict(v) for k, v in _stats.items()}
+    for row in out.values():
+        total = row["hits"] + row["misses"]
+        row["hit_rate"] = round(row["hits"] / total, 4) if total else None
+    return out
+
+
+def reset_response_cache_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _normalized_params(request) -> str:
+    items = sorted((k, sorted(v)) for k, v in request.query_params.lists())
+    return "&".join(f"{k}={','.join(v)}" for k, v in items)
+
+
+def cached_response(
+    request,
+    endpoint: str,
+    build: Callable[[], Any],
+    *,
+    agence_id: Optional[int] = None,
+    depends: Sequence[str] = (),
+    global_depends: Sequence[str] = (),
+    time_bucket: bool = False,
+) -> Response:
+    """
+    build()        : calcule les données de la réponse (appelé sur miss seulement)
+    depends        : ressources de l'agence `agence_id`
+    global_depends : ressources toutes agences confondues (zones, hôtels, RENTOÛT...)
+    time_bucket    : réponse dépendant de "maintenant" => renouvelée toutes les
+                     ETAG_TIME_BUCKET_SECONDS
+    """
+    parts = [endpoint, str(agence_id), _normalized_params(request)]
+    if depends:
+        parts.append(current_version(depends, agence_id))
+    if global_depends:
+        parts.append(current_version(global_depends))
+    if time_bucket:
+        bucket = max(1, int(getattr(settings, "ETAG_TIME_BUCKET_SECONDS", 60)))
+        parts.append(str(int(timezone.now().timestamp()) // bucket))
+    key = "resp:" + hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+
+    cache = caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+    data = cache.get(key)
+    if data is not None:
+        _count(endpoint, "hits")
+        return Response(data, headers={"X-Cache": "HIT"})
+
+    _count(endpoint, "misses")
+    data = build()
+    cache.set(key, data, getattr(settings, "RESPONSE_CACHE_TTL", 300))
+    return Response(data, headers={"X-Cache": "MISS"})
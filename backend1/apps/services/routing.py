@@ -0,0 +1,142 @@
+# backend1/apps/services/routing.py
+# -*- coding: utf-8 -*-
+"""
+Ordre de ramassage des hôtels d'un départ (hotel_schedule) : chemin ouvert
+qui se termine à l'aéroport.
+
+  - points : Hotel.lat/lng (puis Zone.center_* pour l'aéroport), UNE requête ;
+  - construction plus proche voisin en partant de l'aéroport (ordre inversé :
+    le dernier ramassage est le plus proche de l'aéroport), puis 2-opt ;
+  - durée d'un tronçon = STOP_MIN d'arrêt + temps de la matrice zone -> zone
+    (apps.services.travel_times) si les deux zones diffèrent et que le temps
+    est connu, sinon distance / ROUTE_SPEED_KMH ; tronçon sans temps ni
+    points => None (l'appelant garde sa constante).
+
+Les hôtels non géolocalisés passent en tête, dans l'ordre reçu.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db.models import Q
+
+from apps.models import Hotel, Zone
+from apps.services import travel_times
+from apps.services.nearest import haversine_km
+
+
+ROUTE_SPEED_KMH = 40.0
+STOP_MIN = 5
+
+
+def place_points(labels: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+    """{libellé en minuscules: (lat, lng)} : hôtel (nom) prioritaire sur zone (nom)."""
+    keys = {(lbl or "").strip().lower() for lbl in labels if (lbl or "").strip()}
+    if not keys:
+        return {}
+    cond = Q()
+    for key in keys:
+        cond |= Q(nom__iexact=key)
+    points: Dict[str, Tuple[float, float]] = {}
+    for model, lat, lng in ((Zone, "center_lat", "center_lng"), (Hotel, "lat", "lng")):
+        rows = model.objects.filter(cond, **{f"{lat}__isnull": False, f"{lng}__isnull": False}).values_list("nom", lat, lng)
+        for nom, a, b in rows:
+            points[nom.lower()] = (a, b)
+    return points
+
+
+@dataclass
+class PickupRoute:
+    order: List[int]                    # indices (dans la liste reçue) par ordre de ramassage
+    leg_minutes: List[Optional[int]]    # par position : vers l'arrêt suivant / l'aéroport
+    km: float
+
+
+def _two_opt(path: List[int], dist: np.ndarray, end: Optional[int]) -> List[int]:
+    """2-opt sur chemin ouvert (début libre, fin fixée à `end` si donnée)."""
+    def d(a, b):
+        return 0.0 if a is None or b is None else dist[a, b]
+
+    n = len(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                a = path[i - 1] if i else None
+                nxt = path[j + 1] if j + 1 < n else end
+                if d(a, path[j]) + d(path[i], nxt) < d(a, path[i]) + d(path[j], nxt) - 1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+    return path
+
+
+def sequence_pickups(hotels: Sequence[str], airport: Optional[str] = None, *, optimize: bool = True) -> PickupRoute:
+    """
+    hotels  : libellés dans l'ordre reçu
+    airport : libellé de l'aéroport (provenance / destination de la fiche)
+    optimize=False : ordre reçu conservé, seules les durées sont estimées.
+    """
+    points = place_points(list(hotels) + [airport or ""])
+    pts = [points.get((h or "").strip().lower()) for h in hotels]
+    air = points.get((airport or "").strip().lower())
+
+    known = [i for i, p in enumerate(pts) if p is not None]
+    unknown = [i for i, p in enumerate(pts) if p is None]
+    order = list(range(len(hotels)))
+
+    # matrice : hôtels géolocalisés + aéroport (dernier indice)
+    coords = [pts[i] for i in known] + ([air] if air else [])
+    if coords:
+        arr = np.array(coords, dtype=float)
+        dist = haversine_km(arr[:, :1], arr[:, 1:], arr[:, 0][None, :], arr[:, 1][None, :])
+    else:
+        dist = np.zeros((0, 0))
+    end = len(known) if air else None
+
+    if optimize and len(known) > 1:
+        local = list(range(len(known)))
+        if end is not None:
+            # plus proche voisin depuis l'aéroport, puis inversé
+            path, cur = [], end
+            while local:
+                nxt = min(local, key=lambda k: (dist[cur, k], k))
+                local.remove(nxt)
+                path.append(nxt)
+                cur = nxt
+            path.reverse()
+        else:
+            path, cur = [0], 0
+            local.remove(0)
+            while local:
+                nxt = min(local, key=lambda k: (dist[cur, k], k))
+                local.remove(nxt)
+                path.append(nxt)
+                cur = nxt
+        path = _two_opt(path, dist, end)
+        order = unknown + [known[k] for k in path]
+
+    zones = travel_times.zones_for_labels(list(hotels) + [airport or ""])
+    zone_of = [zones.get((h or "").strip().lower()) for h in hotels] + [zones.get((airport or "").strip().lower())]
+    matrix = travel_times.get_matrix()
+
+    pos = {i: k for k, i in enumerate(known)}
+    legs: List[Optional[int]] = []
+    km = 0.0
+    for n, i in enumerate(order):
+        j = order[n + 1] if n + 1 < len(order) else len(hotels)   # len(hotels) : l'aéroport
+        a = pos.get(i)
+        b = pos.get(j) if j < len(hotels) else end
+        if a is not None and b is not None:
+            km += float(dist[a, b])
+        minutes = matrix.get(zone_of[i], zone_of[j]) if zone_of[i] != zone_of[j] else None
+        if minutes is not None:
+            legs.append(STOP_MIN + minutes)
+        elif a is not None and b is not None:
+            legs.append(STOP_MIN + math.ceil(float(dist[a, b]) / ROUTE_SPEED_KMH * 60))
+        else:
+            legs.append(None)
+    return PickupRoute(order=order, leg_minutes=legs, km=round(km, 1))
@@ -0,0 +1,250 @@
+# backend1/apps/services/travel_times.py
+# -*- coding: utf-8 -*-
+"""
+Matrice des temps de trajet (minutes) entre zones ; les aéroports sont des
+zones (Zone.nom = libellé de l'aéroport, ex: "DJE").
+
+  - source : table TravelTime, calculée hors ligne
+      manage.py estimate_travel_times  (haversine entre centres × DETOUR_FACTOR)
+      manage.py import_travel_times    (temps mesurés, jamais écrasés)
+  - en mémoire : tableau NumPy float32 n×n (NaN = inconnu) + {zone_id: indice},
+    une lecture = un accès indexé, aucune requête ;
+  - rechargée quand les compteurs TRAVEL_TIME / ZONE (GLOBAL) changent,
+    vérifiés au plus toutes les TRAVEL_TIME_RECHECK_SECONDS secondes.
+
+Libellés (hôtel / zone / aéroport) -> zone : zones_for_labels(), UNE requête
+par modèle ; un hôtel prend la zone de son Hotel.zone.
+"""
+from __future__ import annotations
+
+import csv
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.models import Hotel, TravelTime, Zone
+from apps.services import versions
+from apps.services.nearest import haversine_km
+
+
+TRAVEL_TIME_SPEED_KMH = 50.0
+DETOUR_FACTOR = 1.3          # route réelle ~30 % plus longue que la distance à vol d'oiseau
+MAX_MINUTES = 32767          # PositiveSmallIntegerField
+
+
+class TravelTimeMatrix:
+    def __init__(self, rows: Iterable[Tuple[int, int, int]]):
+        rows = list(rows)
+        ids = sorted({a for a, _, _ in rows} | {b for _, b, _ in rows})
+        self.index: Dict[int, int] = {zid: i for i, zid in enumerate(ids)}
+        n = len(ids)
+        self.minutes = np.full((n, n), np.nan, dtype=np.float32)
+        if rows:
+            arr = np.array(rows, dtype=np.int64)
+            ia = np.array([self.index[a] for a in arr[:, 0]])
+            ib = np.array([self.index[b] for b in arr[:, 1]])
+            self.minutes[ia, ib] = arr[:, 2]
+        np.fill_diagonal(self.minutes, 0.0)
+
+    def get(self, origin_id: Optional[int], destination_id: Optional[int]) -> Optional[int]:
+        if origin_id is None or destination_id is None:
+            return None
+        if origin_id == destination_id:
+            return 0
+        a, b = self.index.get(origin_id), self.index.get(destination_id)
+        if a is None or b is None:
+            return None
+        v = self.minutes[a, b]
+        return None if np.isnan(v) else int(v)
+
+
+# =========================
+# Matrice courante (par process)
+# =========================
+_lock = threading.Lock()
+_matrix: Optional[TravelTimeMatrix] = None
+_version = None
+_checked_at = 0.0
+
+
+def get_matrix() -> TravelTimeMatrix:
+    global _matrix, _version, _checked_at
+    recheck = float(getattr(settings, "TRAVEL_TIME_RECHECK_SECONDS", 60))
+    with _lock:
+        if _matrix is not None and (time.monotonic() - _checked_at) <= recheck:
+            return _matrix
+        version = versions.current_version([versions.TRAVEL_TIME, versions.ZONE], versions.GLOBAL)
+        if _matrix is None or version != _version:
+            _matrix = TravelTimeMatrix(TravelTime.objects.values_list("origin_id", "destination_id", "minutes"))
+            _version = version
+        _checked_at = time.monotonic()
+        return _matrix
+
+
+def invalidate_matrix() -> None:
+    """Rechargement forcé à la prochaine lecture (écritures de ce process)."""
+    global _matrix
+    with _lock:
+        _matrix = None
+
+
+def zone_minutes(origin_id: Optional[int], destination_id: Optional[int]) -> Optional[int]:
+    return get_matrix().get(origin_id, destination_id)
+
+
+def zones_for_labels(labels: Iterable[str]) -> Dict[str, int]:
+    """{libellé en minuscules: zone_id} : hôtel (sa zone) prioritaire sur zone (nom)."""
+    keys = {(lbl or "").strip().lower() for lbl in labels if (lbl or "").strip()}
+    if not keys:
+        return {}
+    cond = Q()
+    for key in keys:
+        cond |= Q(nom__iexact=key)
+    out: Dict[str, int] = {}
+    for nom, zid in Zone.objects.filter(cond).values_list("nom", "id"):
+        out[nom.lower()] = zid
+    for nom, zid in Hotel.objects.filter(cond, zone__isnull=False).values_list("nom", "zone_id"):
+        out[nom.lower()] = zid
+    return out
+
+
+def place_minutes(origin: Optional[str], destination: Optional[str]) -> Optional[int]:
+    """Minutes entre deux libellés (hôtel / zone / aéroport), None si inconnu."""
+    zones = zones_for_labels([origin or "", destination or ""])
+    return zone_minutes(
+        zones.get((origin or "").strip().lower()), zones.get((destination or "").strip().lower())
+    )
+
+
+def minutes_from(origin: Optional[str], destinations: Sequence[str]) -> List[Optional[int]]:
+    """Minutes de `origin` vers chaque destination (une seule résolution des libellés)."""
+    zones = zones_for_labels([origin or "", *destinations])
+    matrix = get_matrix()
+    a = zones.get((origin or "").strip().lower())
+    return [matrix.get(a, zones.get((d or "").strip().lower())) for d in destinations]
+
+
+# =========================
+# Calcul hors ligne
+# =========================
+@transaction.atomic
+def estimate_travel_times(speed_kmh: float = TRAVEL_TIME_SPEED_KMH) -> int:
+    """
+    Estimations pour toutes les paires de zones géolocalisées (centre) ;
+    les lignes "measured" sont conservées. -> nombre de lignes écrites.
+
+    Écriture en masse (upsert + suppression SQL des estimations devenues sans
+    objet) ; incréments de version regroupés au commit : UN seul par exécution.
+    """
+    zones = list(
+        Zone.objects.filter(center_lat__isnull=False, center_lng__isnull=False)
+        .order_by("id").values_list("id", "center_lat", "center_lng")
+    )
+    measured = set(
+        TravelTime.objects.filter(source=TravelTime.SOURCE_MEASURED).values_list("origin_id", "destination_id")
+    )
+
+    objs: List[TravelTime] = []
+    if len(zones) > 1:
+        ids = [z[0] for z in zones]
+        lats = np.array([z[1] for z in zones], dtype=float)
+        lngs = np.array([z[2] for z in zones], dtype=float)
+        km = haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+        minutes = np.ceil(km * DETOUR_FACTOR / speed_kmh * 60).clip(1, MAX_MINUTES)
+        now = timezone.now()
+        objs = [
+            TravelTime(
+                origin_id=ids[i], destination_id=ids[j], minutes=int(minutes[i, j]),
+                source=TravelTime.SOURCE_ESTIMATE, updated_at=now,
+            )
+            for i in range(len(ids)) for j in range(len(ids))
+            if i != j and (ids[i], ids[j]) not in measured
+        ]
+
+    # estimations devenues sans objet : une extrémité n'est plus géolocalisée
+    # (les paires "measured" n'ont jamais d'estimation : clé unique)
+    geolocated = [z[0] for z in zones]
+    TravelTime.objects.filter(source=TravelTime.SOURCE_ESTIMATE).exclude(
+        origin_id__in=geolocated, destination_id__in=geolocated
+    ).delete()
+    TravelTime.objects.bulk_create(
+        objs, batch_size=1000, update_conflicts=True,
+        unique_fields=["origin", "destination"], update_fields=["minutes", "source", "updated_at"],
+    )
+
+    versions.bump_versions([versions.GLOBAL], [versions.TRAVEL_TIME])
+    transaction.on_commit(invalidate_matrix)
+    return len(objs)
+
+
+def _zone_lookup(value: str, by_name: Dict[str, int], ids: set) -> Optional[int]:
+    value = (value or "").strip()
+    if value.isdigit() and int(value) in ids:
+        return int(value)
+    return by_name.get(value.lower())
+
+
+@transaction.atomic
+def import_travel_times(lines: Iterable[str]) -> Tuple[int, List[str]]:
+    """
+    CSV "origine;destination;minutes" (zones par nom ou id, en-tête optionnel)
+    -> temps mesurés. Retourne (lignes écrites, erreurs par ligne).
+    """
+    zones = list(Zone.objects.values_list("id", "nom"))
+    ids = {zid for zid, _ in zones}
+    by_name = {nom.strip().lower(): zid for zid, nom in zones if nom}
+
+    rows: Dict[Tuple[int, int], int] = {}
+    errors: List[str] = []
+    for n, rec in enumerate(csv.reader(lines, delimiter=";"), start=1):
+        if not rec or not any(c.strip() for c in rec):
+            continue
+        if n == 1 and rec[0].strip().lower() in ("origine", "origin"):
+            continue
+        if len(rec) < 3:
+            errors.append(f"Ligne {n}: 3 colonnes attendues (origine;destination;minutes).")
+            continue
+        a = _zone_lookup(rec[0], by_name, ids)
+        b = _zone_lookup(rec[1], by_name, ids)
+        if a is None or b is None:
+            errors.append(f"Ligne {n}: zone inconnue '{rec[0] if a is None else rec[1]}'.")
+            continue
+        try:
+            minutes = float(rec[2].strip().replace(",", "."))
+        except ValueError:
+            errors.append(f"Ligne {n}: minutes invalides '{rec[2]}'.")
+            continue
+        if not (0 <= minutes <= MAX_MINUTES) or a == b:
+            errors.append(f"Ligne {n}: valeur hors bornes.")
+            continue
+        rows[(a, b)] = int(math.ceil(minutes))
+
+    if rows:
+        existing = {
+            (o, d): pk for pk, o, d in TravelTime.objects.filter(
+                origin_id__in={a for a, _ in rows}, destination_id__in={b for _, b in rows}
+            ).values_list("id", "origin_id", "destination_id")
+        }
+        now = timezone.now()
+        to_update, to_create = [], []
+        for (a, b), minutes in rows.items():
+            obj = TravelTime(
+                origin_id=a, destination_id=b, minutes=minutes, source=TravelTime.SOURCE_MEASURED, updated_at=now
+            )
+            if (a, b) in existing:
+                obj.pk = existing[(a, b)]
+                to_update.append(obj)
+            else:
+                to_create.append(obj)
+        TravelTime.objects.bulk_update(to_update, ["minutes", "source", "updated_at"], batch_size=1000)
+        TravelTime.objects.bulk_create(to_create, batch_size=1000)
+        versions.bump_versions([versions.GLOBAL], [versions.TRAVEL_TIME])
+        transaction.on_commit(invalidate_matrix)
+    return len(rows), errors
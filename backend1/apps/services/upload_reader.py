@@ -0,0 +1,304 @@
+# backend1/apps/services/upload_reader.py
+# -*- coding: utf-8 -*-
+"""
+Lecture en flux (mémoire bornée) des fichiers importés : XLSX / XLS / CSV.
+
+Les importeurs ne chargent plus tout le fichier : ils itèrent sur des
+paquets de `chunk_rows` lignes (DataFrames) qu'ils traitent et valident
+l'un après l'autre.
+  - XLSX : openpyxl en mode read_only (lecture ligne à ligne dans le zip)
+  - CSV  : moteur C de pandas (chunksize) + détection d'encodage incrémentale
+           (décodage par blocs, sans jamais décoder tout le fichier en str)
+  - XLS  : format OLE non "streamable" -> pd.read_excel puis découpage
+
+L'index des paquets est continu (0..n-1 sur tout le fichier) : la ligne
+Excel d'une donnée reste `index + 2` comme avant.
+"""
+from __future__ import annotations
+
+import codecs
+import os
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+DEFAULT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+ENCODING_BLOCK_SIZE = 1 << 20  # 1 Mo
+
+
+# =========================
+# Détection format / encodage
+# =========================
+def _raw(upload):
+    """Fichier sous-jacent (UploadedFile Django -> BytesIO / fichier temporaire)."""
+    return getattr(upload, "file", None) or upload
+
+
+def _peek(upload, n: int) -> bytes:
+    pos = upload.tell()
+    head = upload.read(n)
+    upload.seek(pos)
+    return head or b""
+
+
+def is_xlsx(upload) -> bool:
+    return _peek(upload, 4)[:2] == b"PK"  # ZIP
+
+
+def is_xls(upload) -> bool:
+    return _peek(upload, 8).startswith(b"\xD0\xCF\x11\xE0")  # OLE2
+
+
+def upload_kind(upload) -> str:
+    """'xlsx' | 'xls' | 'csv' (signature binaire d'abord, extension ensuite)."""
+    upload.seek(0)
+    if is_xlsx(upload):
+        return "xlsx"
+    if is_xls(upload):
+        return "xls"
+    name = (getattr(upload, "name", "") or "").lower()
+    ext = os.path.splitext(name)[1]
+    if ext == ".xlsx":
+        return "xlsx"
+    if ext == ".xls":
+        return "xls"
+    return "csv"
+
+
+def detect_encoding(upload, block_size: int = ENCODING_BLOCK_SIZE) -> str:
+    """
+    Même ordre de préférence qu'avant (utf-8-sig, utf-8, cp1252, latin1),
+    mais validé par blocs avec un décodeur incrémental : mémoire constante
+    quelle que soit la taille du fichier.
+    """
+    upload.seek(0)
+    if upload.read(3) == codecs.BOM_UTF8:
+        upload.seek(0)
+        return "utf-8-sig"
+
+    for enc in ("utf-8", "cp1252"):
+        upload.seek(0)
+        decoder = codecs.getincrementaldecoder(enc)()
+        try:
+            while True:
+                block = upload.read(block_size)
+                if not block:
+                    decoder.decode(b"", final=True)
+                    upload.seek(0)
+                    return enc
+                decoder.decode(block)
+        except UnicodeDecodeError:
+            continue
+
+    upload.seek(0)
+    return "latin1"
+
+
+def sniff_sep(sample: str) -> str:
+    head = "\n".join(sample.splitlines()[:20])
+    candidates = [";", ",", "\t"]
+    counts = {c: head.count(c) for c in candidates}
+    best = max(candidates, key=lambda c: (counts[c], 1 if c == ";" else 0))
+    return best if counts[best] > 0 else ","
+
+
+# =========================
+# Helpers lignes
+# =========================
+def cell_text(v: Any):
+    """Valeur openpyxl -> texte (équivalent de read_excel(dtype=str))."""
+    if v is None:
+        return np.nan
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    if isinstance(v, datetime):
+        return str(pd.Timestamp(v))
+    return str(v)
+
+
+def _dedupe_headers(values: Sequence[Any]) -> List[str]:
+    """Comme pandas : en-tête vide -> 'Unnamed: i', doublons -> 'x.1', 'x.2'."""
+    out: List[str] = []
+    seen: dict = {}
+    for i, v in enumerate(values):
+        name = "" if v is None else (v if isinstance(v, str) else str(v))
+        if not name.strip():
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        out.append(name)
+    return out
+
+
+def _fit(row: Sequence[Any], width: int) -> List[Any]:
+    row = list(row[:width])
+    if len(row) < width:
+        row.extend([None] * (width - len(row)))
+    return row
+
+
+def _is_empty_row(row: Sequence[Any]) -> bool:
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in row)
+
+
+# =========================
+# Lecteurs
+# =========================
+def iter_xlsx_rows(upload, sheet: int | str = 0) -> Iterator[tuple]:
+    """Lignes brutes d'une feuille XLSX (openpyxl read_only, valeurs calculées)."""
+    upload.seek(0)
+    wb = load_workbook(_raw(upload), read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if isinstance(sheet, str) else wb.worksheets[sheet]
+        pending_empty: List[tuple] = []
+        for row in ws.iter_rows(values_only=True):
+            # on retient les lignes vides : émises seulement si une ligne
+            # non vide suit (les feuilles read_only traînent souvent des
+            # milliers de lignes vides en fin de plage)
+            if _is_empty_row(row):
+                pending_empty.append(row)
+                continue
+            for e in pending_empty:
+                yield e
+            pending_empty = []
+            yield row
+    finally:
+        wb.close()
+
+
+def xlsx_sheet_names(upload) -> List[str]:
+    upload.seek(0)
+    wb = load_workbook(_raw(upload), read_only=True, data_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def _rows_to_chunks(
+    rows: Iterator[Sequence[Any]],
+    *,
+    chunk_rows: int,
+    as_text: bool,
+    header: bool,
+) -> Iterator[pd.DataFrame]:
+    columns: Optional[List[Any]] = None
+    width = 0
+    if header:
+        first = next(rows, None)
+        if first is None:
+            return
+        columns = _dedupe_headers(first)
+        width = len(columns)
+
+    offset = 0
+    buf: List[List[Any]] = []
+
+    def _flush():
+        nonlocal offset, buf
+        cols = columns if columns is not None else list(range(width))
+        data = [_fit(r, width) for r in buf]
+        if as_text:
+            data = [[cell_text(v) for v in r] for r in data]
+        df = pd.DataFrame(data, columns=cols, index=pd.RangeIndex(offset, offset + len(buf)), dtype=object)
+        offset += len(buf)
+        buf = []
+        return df
+
+    for row in rows:
+        if columns is None:
+            width = max(width, len(row))
+        buf.append(list(row))
+        if len(buf) >= chunk_rows:
+            yield _flush()
+    if buf:
+        yield _flush()
+
+
+def iter_csv_chunks(
+    upload,
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    as_text: bool = True,
+    header: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """CSV par paquets (moteur C), encodage + séparateur détectés sans tout charger."""
+    enc = detect_encoding(upload)
+    upload.seek(0)
+    sample = upload.read(64 * 1024).decode(enc, errors="replace")
+    sep = sniff_sep(sample)
+    upload.seek(0)
+
+    reader = pd.read_csv(
+        _raw(upload),
+        sep=sep,
+        encoding=enc,
+        dtype=str if as_text else None,
+        header=0 if header else None,
+        keep_default_na=True,
+        chunksize=chunk_rows,
+        engine="c",
+    )
+    try:
+        for chunk in reader:
+            yield chunk
+    finally:
+        try:
+            reader.close()
+        except ValueError:
+            pass  # générateur abandonné après fermeture du fichier source
+
+
+def iter_upload_chunks(
+    upload,
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    as_text: bool = True,
+    header: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """
+    Point d'entrée unique des importeurs.
+      - as_text=True  : valeurs en texte (équivalent dtype=str)
+      - as_text=False : valeurs natives (datetime, nombres...)
+      - header=False  : pas de ligne d'en-tête (colonnes 0..n-1)
+    """
+    if upload is None:
+        raise ValueError("Aucun fichier fourni.")
+
+    kind = upload_kind(upload)
+
+    if kind == "xlsx":
+        yield from _rows_to_chunks(
+            iter_xlsx_rows(upload), chunk_rows=chunk_rows, as_text=as_text, header=header
+        )
+        return
+
+    if kind == "xls":
+        # nécessite xlrd ; OLE2 ne se lit pas en flux
+        upload.seek(0)
+        df = pd.read_excel(
+            upload,
+            dtype=str if as_text else None,
+            header=0 if header else None,
+            keep_default_na=True,
+        )
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    yield from iter_csv_chunks(upload, chunk_rows=chunk_rows, as_text=as_text, header=header)
+
+
+def read_upload(upload, *, as_text: bool = True, header: bool = True) -> pd.DataFrame:
+    """Compat : tout le fichier en un DataFrame (petits référentiels uniquement)."""
+    chunks = list(iter_upload_chunks(upload, as_text=as_text, header=header))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, axis=0)
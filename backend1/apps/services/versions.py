@@ -0,0 +1,104 @@
+# backend1/apps/services/versions.py
+# -*- coding: utf-8 -*-
+"""
+Compteurs de version par (agence, type de ressource) : ResourceVersion.
+
+Incrémentés par les signaux save / delete (models.py) et explicitement après
+les .update() / bulk_* (pas de signal). Les listes exposent un ETag dérivé de
+ces compteurs (apps.views.helpers.VersionedListMixin) et répondent 304 à
+If-None-Match sans toucher aux querysets lourds.
+
+Dans une transaction, les incréments sont regroupés (un par couple agence /
+ressource) et appliqués en transaction.on_commit : une seule écriture par
+transaction sur ces lignes très sollicitées, rien au rollback. Hors
+transaction (autocommit), l'incrément est immédiat.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+
+from apps.models import AgenceVoyage, ResourceVersion
+
+
+MISSION = "mission"
+FICHE = "fiche"
+DOSSIER = "dossier"
+VEHICULE = "vehicule"
+CHAUFFEUR = "chauffeur"
+AFFECTATION = "affectation"
+TARIF = "tarif"
+# ressources sans agence (zones, hôtels, temps de trajet) : compteur sur GLOBAL
+ZONE = "zone"
+HOTEL = "hotel"
+TRAVEL_TIME = "travel_time"
+RESOURCES = (MISSION, FICHE, DOSSIER, VEHICULE, CHAUFFEUR, AFFECTATION, TARIF, ZONE, HOTEL, TRAVEL_TIME)
+
+GLOBAL = 0
+
+
+_local = threading.local()
+
+
+def _bump_now(ids: Set[int], resources: Iterable[str]) -> None:
+    for resource in resources:
+        rows = ResourceVersion.objects.filter(agence_id__in=ids, resource=resource)
+        if rows.update(version=F("version") + 1) == len(ids):
+            continue
+        missing = ids - set(rows.values_list("agence_id", flat=True))
+        for agence_id in missing:
+            obj, created = ResourceVersion.objects.get_or_create(
+                agence_id=agence_id, resource=resource, defaults={"version": 1}
+            )
+            if not created:
+                ResourceVersion.objects.filter(pk=obj.pk).update(version=F("version") + 1)
+
+
+def _flush_pending() -> None:
+    """Callback de commit : le premier applique tout, les suivants ne trouvent plus rien."""
+    pending, _local.pending = getattr(_local, "pending", {}), {}
+    by_ids: Dict[frozenset, list] = {}
+    for resource, ids in pending.items():
+        by_ids.setdefault(frozenset(ids), []).append(resource)
+    for ids, resources in by_ids.items():
+        _bump_now(set(ids), resources)
+
+
+def bump_versions(agence_ids: Iterable[Optional[int]], resources: Sequence[str]) -> None:
+    """+1 sur chaque (agence, ressource) ; lignes créées à la volée. Au commit si transaction."""
+    ids = {int(a) for a in agence_ids if a is not None}
+    if not ids or not resources:
+        return
+    if not connection.in_atomic_block:
+        _bump_now(ids, resources)
+        return
+    # après un rollback, les incréments restés en attente partent avec le commit
+    # suivant du thread : au pire une version de trop, jamais une de moins
+    if not hasattr(_local, "pending"):
+        _local.pending = {}
+    for resource in resources:
+        _local.pending.setdefault(resource, set()).update(ids)
+    transaction.on_commit(_flush_pending)
+
+
+def bump_all(resources: Sequence[str]) -> None:
+    """
+    Changement transverse (ex: zones des hôtels -> dossiers de toutes les agences) :
+    toutes les agences, lignes manquantes créées (sinon empreinte inchangée).
+    """
+    bump_versions(AgenceVoyage.objects.values_list("id", flat=True), resources)
+
+
+def current_version(resources: Sequence[str], agence_id: Optional[int] = None) -> str:
+    """
+    Empreinte des compteurs : une requête agrégée.
+    agence_id None => toutes les agences (superadmin sans filtre).
+    """
+    qs = ResourceVersion.objects.filter(resource__in=resources)
+    if agence_id is not None:
+        qs = qs.filter(agence_id=agence_id)
+    agg = qs.aggregate(total=Sum("version"), n=Count("id"))
+    return f"{agg['n'] or 0}.{agg['total'] or 0}"
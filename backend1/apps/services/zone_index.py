@@ -0,0 +1,238 @@
+# backend1/apps/services/zone_index.py
+# -*- coding: utf-8 -*-
+"""
+Index spatial en mémoire des zones (point -> zone).
+
+  - grille régulière (GRID_DEG degrés) : chaque cellule liste les zones dont
+    l'emprise (bbox du rectangle / bbox du cercle) la recouvre ;
+  - une recherche ne teste que les zones candidates de la cellule du point
+    (Zone.contains_point, même règle qu'avant), par id croissant : même
+    résultat que l'ancienne boucle sur Zone.objects.order_by("id") ;
+  - zones_for_points() : affectation en masse, haversine vectorisée NumPy ;
+    les zones polygone (sommets enregistrés) : ray casting vectorisé,
+    préfiltré par leur bbox (apps.services.polygons).
+
+Invalidation : signaux post_save / post_delete de Zone (models.py) qui
+incrémentent une génération dans le cache Django ; l'index est aussi
+reconstruit après ZONE_INDEX_TTL secondes (autres process sans cache partagé).
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.services.polygons import points_in_polygon, polygon_bbox
+
+
+GRID_DEG = 0.05                                # ~5,5 km en latitude
+MAX_CELLS_PER_ZONE = 10_000                    # au-delà : zone "large", testée partout
+EARTH_RADIUS_M = 6371000.0
+M_PER_DEG = EARTH_RADIUS_M * math.pi / 180.0   # ~111 195 m (cohérent avec la haversine)
+EXTENT_MARGIN = 1.01                           # emprise élargie : jamais de faux négatif
+GENERATION_KEY = "zone_index:generation"
+
+_T_CIRCLE, _T_RECT, _T_OTHER = 0, 1, 2
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return int(math.floor(lat / GRID_DEG)), int(math.floor(lng / GRID_DEG))
+
+
+def _f(v) -> float:
+    return float(v) if v is not None else np.nan
+
+
+class ZoneIndex:
+    def __init__(self, zones: Sequence):
+        self.zones = sorted(zones, key=lambda z: z.pk)
+        n = len(self.zones)
+
+        self.types = np.empty(n, dtype=np.int8)
+        self.c_lat = np.full(n, np.nan)
+        self.c_lng = np.full(n, np.nan)
+        self.radius = np.full(n, np.nan)
+        self.north = np.full(n, np.nan)
+        self.south = np.full(n, np.nan)
+        self.east = np.full(n, np.nan)
+        self.west = np.full(n, np.nan)
+
+        # zones polygone avec sommets : i -> (sommets, bbox)
+        self.polys: Dict[int, Tuple[np.ndarray, Tuple[float, float, float, float]]] = {}
+
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        self.large: List[int] = []
+
+        for i, z in enumerate(self.zones):
+            t = (z.type or "").strip().lower()
+            self.types[i] = _T_CIRCLE if t == "circle" else _T_RECT if t == "rectangle" else _T_OTHER
+            self.c_lat[i], self.c_lng[i], self.radius[i] = _f(z.center_lat), _f(z.center_lng), _f(z.radius_m)
+            self.north[i], self.south[i] = _f(z.north), _f(z.south)
+            self.east[i], self.west[i] = _f(z.east), _f(z.west)
+            if t == "polygon":
+                verts = z.polygon_vertices()
+                if verts is not None:
+                    self.polys[i] = (verts, polygon_bbox(verts))
+            for ext in self._extents(i):
+                self._insert(i, ext)
+
+    # ---------- construction ----------
+    def _has_circle(self, i: int) -> bool:
+        return not (np.isnan(self.c_lat[i]) or np.isnan(self.c_lng[i]) or np.isnan(self.radius[i]))
+
+    def _has_bbox(self, i: int) -> bool:
+        return not any(np.isnan(a[i]) for a in (self.north, self.south, self.east, self.west))
+
+    def _extents(self, i: int) -> List[Tuple[float, float, float, float]]:
+        """Emprises (south, north, west, east) pouvant contenir un point de la zone."""
+        if i in self.polys:
+            return [self.polys[i][1]]
+        out = []
+        t = self.types[i]
+        if t in (_T_RECT, _T_OTHER) and self._has_bbox(i):
+            out.append((self.south[i], self.north[i], self.west[i], self.east[i]))
+        if t in (_T_CIRCLE, _T_OTHER) and self._has_circle(i):
+            dlat = EXTENT_MARGIN * self.radius[i] / M_PER_DEG
+            # largeur max du cercle en longitude : côté pôle de l'emprise
+            coslat = max(math.cos(math.radians(min(89.9, abs(self.c_lat[i]) + dlat))), 1e-6)
+            dlng = EXTENT_MARGIN * self.radius[i] / (M_PER_DEG * coslat)
+            out.append((self.c_lat[i] - dlat, self.c_lat[i] + dlat, self.c_lng[i] - dlng, self.c_lng[i] + dlng))
+        return out
+
+    def _insert(self, i: int, ext: Tuple[float, float, float, float]) -> None:
+        s, n, w, e = ext
+        if s > n or w > e:
+            return
+        i0, j0 = _cell(s, w)
+        i1, j1 = _cell(n, e)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > MAX_CELLS_PER_ZONE:
+            if i not in self.large:
+                self.large.append(i)
+            return
+        for a in range(i0, i1 + 1):
+            for b in range(j0, j1 + 1):
+                bucket = self.grid.setdefault((a, b), [])
+                if not bucket or bucket[-1] != i:
+                    bucket.append(i)
+
+    # ---------- recherche ----------
+    def candidates(self, lat: float, lng: float) -> List[int]:
+        found = self.grid.get(_cell(lat, lng), [])
+        if self.large:
+            found = sorted(set(found) | set(self.large))
+        return found
+
+    def find(self, lat: float, lng: float):
+        """1ère zone (id croissant) contenant le point, ou None."""
+        if lat is None or lng is None:
+            return None
+        lat, lng = float(lat), float(lng)
+        for i in self.candidates(lat, lng):
+            if self.zones[i].contains_point(lat, lng):
+                return self.zones[i]
+        return None
+
+    def find_many(self, lats, lngs, chunk_size: int = 4096) -> List[Optional[int]]:
+        """
+        Id de zone pour chaque point (None si aucune), vectorisé :
+        matrice points x zones par paquets de `chunk_size` points.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        out: List[Optional[int]] = [None] * len(lats)
+        if not len(self.zones) or not len(lats):
+            return out
+
+        ids = np.array([z.pk for z in self.zones])
+        has_circle = ~(np.isnan(self.c_lat) | np.isnan(self.c_lng) | np.isnan(self.radius))
+        has_bbox = ~(np.isnan(self.north) | np.isnan(self.south) | np.isnan(self.east) | np.isnan(self.west))
+        is_poly = np.zeros(len(self.zones), dtype=bool)
+        is_poly[list(self.polys)] = True
+        use_circle = has_circle & (self.types != _T_RECT) & ~is_poly
+        use_bbox = has_bbox & (self.types != _T_CIRCLE) & ~is_poly
+
+        c_lat = np.radians(self.c_lat)[None, :]
+        c_lng = np.radians(self.c_lng)[None, :]
+
+        for start in range(0, len(lats), chunk_size):
+            la = lats[start:start + chunk_size][:, None]
+            lo = lngs[start:start + chunk_size][:, None]
+
+            with np.errstate(invalid="ignore"):
+                # haversine (même formule que Zone._contains_circle)
+                p_lat, p_lng = np.radians(la), np.radians(lo)
+                a = np.sin((p_lat - c_lat) / 2) ** 2 + np.cos(c_lat) * np.cos(p_lat) * np.sin((p_lng - c_lng) / 2) ** 2
+                dist = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+                in_circle = use_circle[None, :] & (dist <= self.radius[None, :])
+
+                in_bbox = use_bbox[None, :] & (
+                    (la >= self.south[None, :]) & (la <= self.north[None, :])
+                    & (lo >= self.west[None, :]) & (lo <= self.east[None, :])
+                )
+
+            hit = in_circle | in_bbox
+            for j, (verts, bbox) in self.polys.items():
+                hit[:, j] = points_in_polygon(la[:, 0], lo[:, 0], verts, bbox)
+            hit &= ~(np.isnan(la) | np.isnan(lo))
+            any_hit = hit.any(axis=1)
+            first = hit.argmax(axis=1)  # zones triées par id => plus petit id
+            for k in np.nonzero(any_hit)[0]:
+                out[start + int(k)] = int(ids[first[k]])
+        return out
+
+
+# =========================
+# Index courant (par process)
+# =========================
+_lock = threading.Lock()
+_index: Optional[ZoneIndex] = None
+_built_at = 0.0
+_built_generation = None
+
+
+def _generation():
+    return cache.get(GENERATION_KEY, 0)
+
+
+def get_zone_index() -> ZoneIndex:
+    global _index, _built_at, _built_generation
+    ttl = float(getattr(settings, "ZONE_INDEX_TTL", 300))
+    gen = _generation()
+    with _lock:
+        if _index is None or gen != _built_generation or (time.monotonic() - _built_at) > ttl:
+            from apps.models import Zone
+
+            _index = ZoneIndex(list(Zone.objects.all()))
+            _built_at = time.monotonic()
+            _built_generation = gen
+        return _index
+
+
+def invalidate_zone_index() -> None:
+    """Appelé par les signaux Zone : l'index sera reconstruit à la prochaine recherche."""
+    global _index
+    with _lock:
+        _index = None
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def zone_extents(zone) -> List[Tuple[float, float, float, float]]:
+    """Emprises (south, north, west, east) d'une zone, mêmes règles que l'index."""
+    return ZoneIndex([zone])._extents(0)
+
+
+def zones_for_points(points: Sequence[Tuple[Optional[float], Optional[float]]]) -> List[Optional[int]]:
+    """[(lat, lng), ...] -> [zone_id | None, ...] en une passe vectorisée."""
+    if not points:
+        return []
+    lats = [np.nan if p[0] is None else p[0] for p in points]
+    lngs = [np.nan if p[1] is None else p[1] for p in points]
+    return get_zone_index().find_many(lats, lngs)
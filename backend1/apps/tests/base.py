@@ -0,0 +1,54 @@
+# backend1/apps/tests/base.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.models import AgenceVoyage, Profile
+from apps.services.availability import reset_availability_index
+from apps.services.travel_times import invalidate_matrix
+from apps.services.zone_index import invalidate_zone_index
+
+
+def make_agency(username: str, legal_name: str):
+    """Utilisateur "adminagence" rattaché à sa propre agence -> (user, agence)."""
+    user = User.objects.create_user(username, f"{username}@example.com")
+    agence = AgenceVoyage.objects.create(legal_name=legal_name, user=user)
+    Profile.objects.update_or_create(user=user, defaults={"agence": agence, "role": "adminagence"})
+    return user, agence
+
+
+class AgencyAPITestCase(TestCase):
+    """
+    Fixtures communes :
+      - self.user / self.agence : compte "adminagence" et son agence ;
+      - self.other_user / self.other_agence : une seconde agence (cloisonnement) ;
+      - self.superadmin.
+    self.client est authentifié avec self.user ; self.login(user) pour changer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_superuser("admin", "admin@example.com")
+        cls.user, cls.agence = make_agency("agent", "Agence Test")
+        cls.other_user, cls.other_agence = make_agency("autre", "Autre Agence")
+
+    def setUp(self):
+        # index en mémoire (par process) : les rollbacks entre tests ne les atteignent pas
+        reset_availability_index()
+        invalidate_matrix()
+        invalidate_zone_index()
+        # pas d'appel réseau (position des véhicules géocodée à chaque affectation)
+        patcher = mock.patch("apps.services.geocoding._nominatim_search", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.login(self.user)
+
+    def login(self, user) -> None:
+        # relu : le profil (rôle, agence) ne doit pas venir d'un cache de fixture
+        self.client.force_authenticate(User.objects.select_related("profile__agence").get(pk=user.pk))
@@ -0,0 +1,127 @@
+# backend1/apps/tests/test_auto_assign.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.models import Chauffeur, FicheMouvement, Hotel, Mission, MissionRessource, Vehicule, Zone
+from apps.tests.base import AgencyAPITestCase
+
+
+class AutoAssignTests(AgencyAPITestCase):
+    """fiches/auto-assign : preview sans écriture, commit en lot, capacité / dispo / enchaînement."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate() + timedelta(days=3)
+        Zone.objects.create(nom="Enfidha", center_lat=36.07, center_lng=10.44)
+        Hotel.objects.create(nom="Hotel A", lat=35.83, lng=10.64)
+        Hotel.objects.create(nom="Hotel B", lat=35.85, lng=10.60)
+
+        def vehicule(immat, cap, lat):
+            return Vehicule.objects.create(
+                agence=cls.agence, type="bus", marque="M", modele="X", immatriculation=immat,
+                capacite=cap, last_lat=lat, last_lng=10.5,
+            )
+        cls.small = vehicule("SMALL", 20, 36.0)
+        cls.big = vehicule("BIG", 50, 36.5)
+        cls.busy = vehicule("BUSY", 50, 36.07)
+        cls.chauffeurs = [
+            Chauffeur.objects.create(agence=cls.agence, nom=f"Nom{i}", prenom="P", cin=f"CIN{i:06d}") for i in range(2)
+        ]
+
+        def fiche(heure, pax, hotel):
+            return FicheMouvement.objects.create(
+                agence=cls.agence, type="A", date=cls.day, horaires=heure, provenance="Enfidha",
+                pax=pax, hotel_schedule=[{"hotel": hotel, "pax": pax}],
+            )
+        cls.f_morning = fiche("09:00", 15, "Hotel A")
+        cls.f_afternoon = fiche("14:00", 12, "Hotel B")
+        cls.f_large = fiche("09:30", 40, "Hotel B")
+        cls.f_too_big = fiche("11:00", 80, "Hotel A")
+
+    def setUp(self):
+        super().setUp()
+        # BUSY occupé toute la journée
+        mission = Mission.objects.create(agence=self.agence, date=self.day, reference="BUSY-1")
+        start = timezone.make_aware(timezone.datetime.combine(self.day, timezone.datetime.min.time()))
+        MissionRessource.objects.create(
+            mission=mission, vehicule=self.busy, date_heure_debut=start, date_heure_fin=start + timedelta(days=1),
+        )
+
+    def _post(self, step):
+        return self.client.post(
+            f"/api/fiches-mouvement/auto-assign/{step}/",
+            {"agence": self.agence.id, "date": self.day.isoformat()}, format="json",
+        )
+
+    def _plan(self, data):
+        return {
+            t["vehicule"]["immatriculation"]: [c["fiche_id"] for c in t["courses"]] for t in data["tournees"]
+        }
+
+    def test_preview_does_not_write(self):
+        response = self._post("preview")
+        self.assertEqual(response.status_code, 200)
+        # l'après-midi enchaîne sur BIG (déposé à Hotel B, plus proche de l'aéroport que Hotel A)
+        self.assertEqual(
+            self._plan(response.data),
+            {"SMALL": [self.f_morning.id], "BIG": [self.f_large.id, self.f_afternoon.id]},
+        )
+        self.assertEqual(
+            [(u["fiche_id"], u["raison"]) for u in response.data["non_affectees"]],
+            [(self.f_too_big.id, "Aucun véhicule de capacité suffisante.")],
+        )
+        self.assertEqual(response.data["summary"]["vehicules"], 2)
+        self.assertEqual(response.data["summary"]["sans_chauffeur"], 0)
+        self.assertFalse(Mission.objects.filter(is_converted_from_fiche=True).exists())
+
+    def test_commit_creates_missions_in_bulk(self):
+        preview = self._plan(self._post("preview").data)
+        response = self._post("commit")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._plan(response.data), preview)
+
+        missions = Mission.objects.filter(is_converted_from_fiche=True)
+        self.assertEqual(missions.count(), 3)
+        for fiche in (self.f_morning, self.f_afternoon, self.f_large):
+            fiche.refresh_from_db()
+            mr = MissionRessource.objects.get(mission=fiche.mission_id)
+            self.assertEqual(fiche.mission.date_heure_debut, mr.date_heure_debut)
+            self.assertIsNotNone(mr.chauffeur_id)
+        self.assertEqual(
+            set(MissionRessource.objects.filter(mission__in=missions).values_list("vehicule__immatriculation", flat=True)),
+            {"SMALL", "BIG"},
+        )
+
+        # plus rien à affecter ; les missions créées occupent désormais la flotte
+        again = self._post("preview").data
+        self.assertEqual(again["tournees"], [])
+        self.assertEqual(again["summary"]["fiches"], 1)
+
+    def test_other_agency_forbidden(self):
+        response = self.client.post(
+            "/api/fiches-mouvement/auto-assign/preview/",
+            {"agence": self.other_agence.id, "date": self.day.isoformat()}, format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_commit_revalidates_against_database(self):
+        self._post("preview")  # index de lecture construit
+        # SMALL pris par un autre process entre-temps (aucun signal : index non prévenu)
+        mission = Mission.objects.create(agence=self.agence, date=self.day, reference="AUTRE-1")
+        start = timezone.make_aware(timezone.datetime.combine(self.day, timezone.datetime.min.time()))
+        MissionRessource.objects.bulk_create([MissionRessource(
+            mission=mission, vehicule=self.small, date_heure_debut=start, date_heure_fin=start + timedelta(days=1),
+        )])
+
+        response = self._post("commit")
+        self.assertEqual(response.status_code, 201)
+        raisons = {u["fiche_id"]: u["raison"] for u in response.data["non_affectees"]}
+        self.assertEqual(raisons[self.f_morning.id], "Véhicule déjà occupé sur ce créneau.")
+        self.assertEqual(
+            MissionRessource.objects.filter(vehicule=self.small, is_deleted=False).count(), 1
+        )
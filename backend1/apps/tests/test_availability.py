@@ -0,0 +1,129 @@
+# backend1/apps/tests/test_availability.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import threading
+import unittest
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.models import AgenceVoyage, Chauffeur, Mission, MissionRessource, Vehicule
+from apps.services import availability, versions
+from apps.tests.base import AgencyAPITestCase
+
+
+class AvailabilityTests(AgencyAPITestCase):
+    """Écritures vérifiées en base ; index en mémoire pour les lectures seulement."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.vehicule = Vehicule.objects.create(
+            agence=cls.agence, type="bus", marque="M", modele="X", immatriculation="V1", capacite=50,
+        )
+        cls.chauffeur = Chauffeur.objects.create(agence=cls.agence, nom="Nom", prenom="P", cin="CIN000001")
+        cls.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def _mission(self, ref):
+        return Mission.objects.create(agence=self.agence, date=self.start.date(), reference=ref)
+
+    def _other_process_insert(self):
+        """Affectation écrite par un autre process : aucun signal, index local non prévenu."""
+        MissionRessource.objects.bulk_create([MissionRessource(
+            mission=self._mission("M-AUTRE"), vehicule=self.vehicule,
+            date_heure_debut=self.start, date_heure_fin=self.start + timedelta(hours=2),
+        )])
+
+    def test_write_check_ignores_stale_index(self):
+        end = self.start + timedelta(hours=1)
+        self.assertTrue(availability.is_free(availability.VEHICULE, self.agence.id, self.vehicule.id, self.start, end))
+        self._other_process_insert()
+
+        mr = MissionRessource(
+            mission=self._mission("M-1"), vehicule=self.vehicule,
+            date_heure_debut=self.start + timedelta(hours=1), date_heure_fin=self.start + timedelta(hours=3),
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            mr.save()
+        self.assertIn("vehicule", ctx.exception.message_dict)
+
+        found = availability.batch_conflicts(availability.VEHICULE, [
+            (self.vehicule.id, self.start + timedelta(hours=1), self.start + timedelta(hours=3)),
+            (self.vehicule.id, self.start + timedelta(hours=4), self.start + timedelta(hours=5)),
+            (self.vehicule.id, self.start + timedelta(hours=4, minutes=30), self.start + timedelta(hours=6)),
+        ])
+        self.assertEqual(found[0][0][0], "affectation")
+        self.assertEqual(found[1], [("batch", 2)])
+        self.assertEqual(found[2], [("batch", 1)])
+
+    @override_settings(AVAILABILITY_RECHECK_SECONDS=0)
+    def test_read_index_follows_shared_version(self):
+        end = self.start + timedelta(hours=1)
+        self.assertTrue(availability.is_free(availability.VEHICULE, self.agence.id, self.vehicule.id, self.start, end))
+        self._other_process_insert()
+        # l'autre process committe : compteur AFFECTATION de l'agence incrémenté en base
+        with self.captureOnCommitCallbacks(execute=True):
+            versions.bump_versions([self.agence.id], [versions.AFFECTATION])
+        self.assertFalse(availability.is_free(availability.VEHICULE, self.agence.id, self.vehicule.id, self.start, end))
+        self.assertEqual(
+            availability.busy_resource_ids(availability.VEHICULE, [self.agence.id], self.start, end), {self.vehicule.id}
+        )
+
+    @override_settings(AVAILABILITY_HISTORY_DAYS=2)
+    def test_history_outside_index_read_from_db(self):
+        old = timezone.now().replace(microsecond=0) - timedelta(days=10)
+        MissionRessource.objects.create(
+            mission=self._mission("M-OLD"), vehicule=self.vehicule,
+            date_heure_debut=old, date_heure_fin=old + timedelta(hours=2),
+        )
+        availability.reset_availability_index()
+        index = availability.get_agency_index(self.agence.id)
+        self.assertEqual(len(index.where), 0)
+        self.assertFalse(availability.is_free(
+            availability.VEHICULE, self.agence.id, self.vehicule.id, old, old + timedelta(hours=1),
+        ))
+        self.assertEqual(
+            availability.busy_resource_ids(availability.VEHICULE, [self.agence.id], old, old + timedelta(hours=1)),
+            {self.vehicule.id},
+        )
+
+
+@unittest.skipUnless(connection.features.has_select_for_update, "SELECT ... FOR UPDATE requis (MySQL / PostgreSQL)")
+class ConcurrentAffectationTests(TransactionTestCase):
+    """Deux écritures simultanées sur le même véhicule : une seule passe."""
+
+    def test_overlapping_saves_serialized(self):
+        agence = AgenceVoyage.objects.create(legal_name="Agence Test")
+        vehicule = Vehicule.objects.create(
+            agence=agence, type="bus", marque="M", modele="X", immatriculation="V1", capacite=50,
+        )
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        missions = [Mission.objects.create(agence=agence, date=start.date(), reference=f"M-{i}") for i in range(2)]
+        barrier = threading.Barrier(2)
+        results = []
+
+        def worker(mission):
+            try:
+                with transaction.atomic():
+                    barrier.wait()
+                    MissionRessource.objects.create(
+                        mission=mission, vehicule=vehicule,
+                        date_heure_debut=start, date_heure_fin=start + timedelta(hours=2),
+                    )
+                results.append("ok")
+            except ValidationError:
+                results.append("conflit")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(m,)) for m in missions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(results), ["conflit", "ok"])
+        self.assertEqual(MissionRessource.objects.filter(vehicule=vehicule, is_deleted=False).count(), 1)
@@ -0,0 +1,87 @@
+# backend1/apps/tests/test_consolidation.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.utils import timezone
+
+from apps.models import Dossier, FicheMouvement, Hotel, Vehicule, Zone
+from apps.tests.base import AgencyAPITestCase
+
+
+class DossiersConsolidationTests(AgencyAPITestCase):
+    """dossiers/to-fiche/auto : clusters vol / zone / horaire, bin packing sur les capacités de la flotte."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate()
+        for immat, cap in (("BUS", 50), ("MINI", 20)):
+            Vehicule.objects.create(agence=cls.agence, type="bus", marque="M", modele="X", immatriculation=immat, capacite=cap)
+        sousse, hammamet = Zone.objects.create(nom="Sousse"), Zone.objects.create(nom="Hammamet")
+        hotels = {
+            "A": Hotel.objects.create(nom="Hotel A", zone=sousse),
+            "B": Hotel.objects.create(nom="Hotel B", zone=sousse),
+            "C": Hotel.objects.create(nom="Hotel C", zone=sousse),
+            "H": Hotel.objects.create(nom="Hotel H", zone=hammamet),
+        }
+
+        def dossier(hotel, pax, vol="TU 100", heure="10:00"):
+            return Dossier.objects.create(
+                agence=cls.agence, type_mouvement="A", date=cls.day, horaires=heure, numero_vol=vol,
+                provenance="Enfidha", hotel=hotels[hotel].nom, hotel_fk=hotels[hotel], pax=pax,
+            )
+        cls.a1, cls.a2 = dossier("A", 20), dossier("A", 10)
+        cls.b = dossier("B", 15)
+        cls.c = dossier("C", 10)
+        cls.h = dossier("H", 8)
+        cls.late = dossier("A", 5, heure="13:00")
+        cls.other_flight = dossier("B", 4, vol="BJ 200")
+        cls.huge = dossier("C", 60, vol="BJ 300")
+
+    def _post(self, step):
+        return self.client.post(
+            f"/api/dossiers/to-fiche/auto/{step}/",
+            {"agence": self.agence.id, "date": self.day.isoformat()}, format="json",
+        )
+
+    def _groups(self, data):
+        return sorted((sorted(f["dossier_ids"]), f["capacite"], f["hors_capacite"]) for f in data["fiches"])
+
+    def test_preview_packing(self):
+        response = self._post("preview")
+        self.assertEqual(response.status_code, 200)
+        expected = sorted([
+            (sorted([self.a1.id, self.a2.id, self.b.id]), 50, False),   # Hotel A entier (30) + B (15)
+            ([self.c.id], 20, False),                                     # reste de la zone, ramené au minibus
+            ([self.h.id], 20, False),                                     # autre zone
+            ([self.late.id], 20, False),                                  # autre fenêtre horaire
+            ([self.other_flight.id], 20, False),                          # autre vol
+            ([self.huge.id], 50, True),                                   # plus grand que la flotte
+        ])
+        self.assertEqual(self._groups(response.data), expected)
+        self.assertFalse(FicheMouvement.objects.exists())
+
+    def test_commit_creates_all_fiches(self):
+        preview = self._groups(self._post("preview").data)
+        response = self._post("commit")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._groups(response.data), preview)
+
+        self.assertEqual(FicheMouvement.objects.count(), 6)
+        self.assertFalse(Dossier.objects.filter(fiche_mouvement__isnull=True).exists())
+        for f in response.data["fiches"]:
+            fiche = FicheMouvement.objects.get(pk=f["fiche_id"])
+            self.assertEqual(fiche.ref, f["ref"])
+            self.assertTrue(fiche.ref.startswith(f"FM-{self.day:%Y%m%d}-"))
+            self.assertEqual(fiche.pax, f["pax"])
+            self.assertEqual(set(fiche.dossiers.values_list("id", flat=True)), set(f["dossier_ids"]))
+
+        self.assertEqual(self._post("preview").data["fiches"], [])
+
+    def test_other_agency_forbidden(self):
+        response = self.client.post(
+            "/api/dossiers/to-fiche/auto/commit/",
+            {"agence": self.other_agence.id, "date": self.day.isoformat()}, format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(FicheMouvement.objects.exists())
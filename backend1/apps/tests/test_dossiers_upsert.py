@@ -0,0 +1,109 @@
+# backend1/apps/tests/test_dossiers_upsert.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import time, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.utils import timezone
+
+from apps.models import Dossier
+from apps.services.dossiers_upsert import UpsertRow, bulk_upsert_dossiers, upsert_dossiers_row_by_row
+from apps.tests.base import AgencyAPITestCase
+
+
+class BulkUpsertDossiersTests(AgencyAPITestCase):
+    """bulk_upsert_dossiers : même rapport que update_or_create ligne à ligne, écritures en lot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate() + timedelta(days=5)
+        cls.existing = Dossier.objects.create(
+            agence=cls.agence, reference="REF-1", date=cls.day, type_mouvement="A",
+            horaires=time(10, 0), numero_vol="TU100", pax=2,
+        )
+
+    def _row(self, line, ref, *, horaires=time(10, 0), vol="TU100", pax=1, **data):
+        lookup = {"agence": self.agence, "date": self.day, "type_mouvement": "A", "horaires": horaires, "numero_vol": vol}
+        if ref:
+            lookup["reference"] = ref
+        return UpsertRow(line=line, ref=ref, lookup=lookup, data={"pax": pax, **data})
+
+    def _rows(self):
+        return [
+            self._row(2, "REF-1", pax=4),                           # dossier existant
+            self._row(3, "", horaires=time(12, 0), pax=3),          # nouveau, sans référence
+            self._row(4, "REF-2", vol="TU200", pax=5),              # nouveau
+            self._row(5, "", horaires=time(12, 0), pax=6),          # même clé que la ligne 3
+        ]
+
+    def _upsert(self, rows):
+        return bulk_upsert_dossiers(Dossier, rows, agence=self.agence)
+
+    def test_same_report_as_row_by_row(self):
+        bulk = self._upsert(self._rows())
+        snapshot = sorted(Dossier.objects.values_list("reference", "horaires", "numero_vol", "pax"))
+        Dossier.objects.exclude(pk=self.existing.pk).delete()
+        Dossier.objects.filter(pk=self.existing.pk).update(pax=2)
+
+        row = upsert_dossiers_row_by_row(Dossier, self._rows())
+        self.assertEqual((len(bulk.created), len(bulk.updated)), (len(row.created), len(row.updated)))
+        self.assertEqual((len(bulk.created), len(bulk.updated)), (2, 2))
+        self.assertEqual(bulk.erreurs, [])
+        # mêmes lignes en base (références générées mises à part)
+        strip = lambda rows: sorted((r[1], r[2], r[3]) for r in rows)  # noqa: E731
+        self.assertEqual(
+            strip(snapshot), strip(Dossier.objects.values_list("reference", "horaires", "numero_vol", "pax"))
+        )
+
+    def test_pks_reread_by_natural_key(self):
+        # MySQL : bulk_create ne renvoie pas les clés
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            result = self._upsert(self._rows())
+
+        new = Dossier.objects.get(horaires=time(12, 0))
+        ref2 = Dossier.objects.get(reference="REF-2")
+        # ligne 3 créée (libellé = pk relu), ligne 5 met à jour ce même dossier
+        self.assertEqual(result.created, [str(new.pk), "REF-2"])
+        self.assertCountEqual(result.updated, ["REF-1", str(new.pk)])
+        self.assertEqual(new.pax, 6)
+        self.assertTrue(new.reference.startswith(f"DOS-{self.agence.id}-"))
+        self.assertEqual(ref2.pax, 5)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.pax, 4)
+        self.assertEqual(Dossier.objects.count(), 3)
+
+    def test_reread_links_each_row_to_its_own_dossier(self):
+        # même référence fichier, clés différentes ; puis sans référence (références générées)
+        rows = [self._row(2, "REF-3", pax=7), self._row(3, "REF-3", vol="TU300", pax=8)]
+        rows += [self._row(4 + i, "", horaires=time(14, i), pax=10 + i) for i in range(3)]
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            result = bulk_upsert_dossiers(Dossier, rows, agence=self.agence, batch_size=2)
+
+        self.assertEqual(result.created[:2], ["REF-3", "REF-3"])
+        self.assertEqual(
+            [Dossier.objects.get(reference="REF-3", numero_vol=v).pax for v in ("TU100", "TU300")], [7, 8]
+        )
+        pax = dict(Dossier.objects.values_list("pk", "pax"))
+        self.assertEqual([pax[int(pk)] for pk in result.created[2:]], [10, 11, 12])
+
+    def test_failing_line_reported_alone(self):
+        rows = self._rows()
+        rows[2].data["pax"] = -1  # CHECK pax >= 0 : le paquet échoue, rejoué ligne à ligne
+        result = self._upsert(rows)
+        self.assertEqual([e["ligne"] for e in result.erreurs], [4])
+        self.assertEqual(len(result.created), 1)
+        self.assertFalse(Dossier.objects.filter(numero_vol="TU200").exists())
+        self.assertEqual(Dossier.objects.get(horaires=time(12, 0)).pax, 6)
+
+    def test_ambiguous_key(self):
+        Dossier.objects.create(
+            agence=self.agence, reference="REF-1", date=self.day, type_mouvement="A",
+            horaires=time(10, 0), numero_vol="TU100",
+        )
+        result = self._upsert([self._row(2, "REF-1", pax=9)])
+        self.assertEqual(len(result.erreurs), 1)
+        self.assertIn("MultipleObjectsReturned", result.erreurs[0]["raison"])
+        self.assertEqual(result.created + result.updated, [])
@@ -0,0 +1,162 @@
+# backend1/apps/tests/test_geocache.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+from urllib.error import URLError
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.models import GeocodeCache
+from apps.services import geocoding
+from apps.services.geocache import (
+    NEGATIVE_TTL,
+    POSITIVE_TTL,
+    _LRU,
+    cached_forward,
+    cached_reverse,
+    geocache_stats,
+    normalize_query,
+    reset_geocache,
+)
+from apps.tests.base import AgencyAPITestCase
+
+
+SOUSSE = {"lat": "35.8256", "lon": "10.6084"}
+
+
+class GeocacheTests(TestCase):
+    """cached_lookup : LRU puis table, TTL, cache négatif, erreurs réseau jamais stockées."""
+
+    def setUp(self):
+        reset_geocache()  # LRU + compteurs du process (la table est annulée par le rollback)
+
+    def test_hit_skips_fetch(self):
+        fetch = mock.Mock(return_value=SOUSSE)
+        self.assertEqual(cached_forward("nominatim", "Hôtel Mouradi,  Sousse", fetch), SOUSSE)
+        # même requête normalisée : LRU
+        self.assertEqual(cached_forward("nominatim", "hotel mouradi sousse", fetch), SOUSSE)
+        # autre process (LRU vide) : table
+        reset_geocache()
+        self.assertEqual(cached_forward("nominatim", "HOTEL MOURADI - SOUSSE", fetch), SOUSSE)
+        self.assertEqual(fetch.call_count, 1)
+
+        row = GeocodeCache.objects.get()
+        self.assertEqual((row.provider, row.kind, row.hits), ("nominatim", "forward", 1))
+        self.assertAlmostEqual(row.expires_at, timezone.now() + POSITIVE_TTL, delta=timedelta(minutes=1))
+        self.assertEqual(geocache_stats()["db_hits"], 1)
+
+        # fournisseur ou variante différents : clés distinctes
+        cached_forward("google", "hotel mouradi sousse", fetch)
+        cached_forward("nominatim", "hotel mouradi sousse", fetch, variant="en")
+        self.assertEqual(fetch.call_count, 3)
+
+    def test_expired_row_fetched_again(self):
+        fetch = mock.Mock(return_value=SOUSSE)
+        cached_forward("nominatim", "Sousse", fetch)
+        GeocodeCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        reset_geocache()
+
+        fetch.return_value = {"lat": "35.83", "lon": "10.61"}
+        self.assertEqual(cached_forward("nominatim", "Sousse", fetch), {"lat": "35.83", "lon": "10.61"})
+        self.assertEqual(fetch.call_count, 2)
+        # même ligne, résultat et échéance renouvelés
+        row = GeocodeCache.objects.get()
+        self.assertEqual(row.result, {"lat": "35.83", "lon": "10.61"})
+        self.assertGreater(row.expires_at, timezone.now())
+
+    def test_negative_result_cached(self):
+        fetch = mock.Mock(return_value=None)
+        self.assertIsNone(cached_forward("nominatim", "Hotel Inconnu", fetch))
+        reset_geocache()
+        self.assertIsNone(cached_forward("nominatim", "Hotel Inconnu", fetch))
+        self.assertEqual(fetch.call_count, 1)
+
+        row = GeocodeCache.objects.get()
+        self.assertIsNone(row.result)
+        self.assertAlmostEqual(row.expires_at, timezone.now() + NEGATIVE_TTL, delta=timedelta(minutes=1))
+        self.assertEqual(geocache_stats()["negative_hits"], 1)
+
+    def test_network_error_not_cached(self):
+        fetch = mock.Mock(side_effect=[URLError("timeout"), SOUSSE])
+        with self.assertRaises(URLError):
+            cached_forward("nominatim", "Sousse", fetch)
+        self.assertFalse(GeocodeCache.objects.exists())
+        self.assertEqual(geocache_stats()["errors"], 1)
+        # l'appel suivant retente le réseau
+        self.assertEqual(cached_forward("nominatim", "Sousse", fetch), SOUSSE)
+        self.assertEqual(fetch.call_count, 2)
+
+    @mock.patch.object(geocoding._nominatim_limiter, "wait")
+    def test_strict_geocoding_errors_not_cached(self, _wait):
+        with mock.patch.object(geocoding, "_fetch_json", side_effect=URLError("timeout")):
+            with self.assertRaises(URLError):
+                geocoding.geocode_address("Hotel Mouradi, Sousse", strict=True)
+            # fail-safe : (None, None), pas mis en cache non plus
+            self.assertEqual(geocoding.geocode_address("Hotel Mouradi, Sousse"), (None, None))
+        self.assertFalse(GeocodeCache.objects.exists())
+
+        # "aucun résultat" (liste vide) : cache négatif, même en strict
+        with mock.patch.object(geocoding, "_fetch_json", return_value=[]) as fetch_json:
+            self.assertEqual(geocoding.geocode_address("Hotel Mouradi, Sousse", strict=True), (None, None))
+            self.assertEqual(geocoding.geocode_address("Hotel Mouradi, Sousse", strict=True), (None, None))
+        self.assertEqual(fetch_json.call_count, 1)
+        self.assertIsNone(GeocodeCache.objects.get().result)
+
+    def test_reverse_precision_merges_nearby_points(self):
+        fetch = mock.Mock(return_value={"address": "Avenue Habib Bourguiba, Tunis"})
+        cached_reverse("google", 36.80651, 10.18152, fetch)
+        cached_reverse("google", 36.80649, 10.18148, fetch)   # ~3 m : même clé
+        # géocodeur appelé avec les coordonnées arrondies
+        fetch.assert_called_once_with(36.8065, 10.1815)
+
+        cached_reverse("google", 36.8070, 10.1815, fetch)     # ~50 m : autre clé
+        cached_reverse("google", 36.80651, 10.18152, fetch, precision=5)
+        self.assertEqual(fetch.call_count, 3)
+        self.assertCountEqual(
+            GeocodeCache.objects.values_list("query", flat=True),
+            ["|36.80651,10.18152", "|36.8065,10.1815", "|36.8070,10.1815"],
+        )
+
+
+class GeocacheHelpersTests(SimpleTestCase):
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Hôtel  Mouradi, SOUSSE-4000 "), "hotel mouradi sousse 4000")
+
+    def test_lru_eviction(self):
+        lru = _LRU(2)
+        expires = timezone.now() + timedelta(days=1)
+        lru.set("a", 1, expires)
+        lru.set("b", 2, expires)
+        lru.get("a")                 # "a" récent : "b" sort en premier
+        lru.set("c", 3, expires)
+        self.assertEqual((lru.get("a"), lru.get("c")), (1, 3))
+        self.assertEqual(len(lru), 2)
+        lru.set("d", 4, timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(lru), 2)
+        self.assertIsNot(lru.get("d"), 4)  # expiré
+
+
+class GeocacheStatsEndpointTests(AgencyAPITestCase):
+    """GET /api/geocode-cache/stats/ : réservé au superadmin."""
+
+    def test_superadmin_only(self):
+        reset_geocache()
+        cached_forward("nominatim", "Sousse", lambda: SOUSSE)
+        cached_forward("nominatim", "Sousse", lambda: SOUSSE)
+        cached_forward("nominatim", "Nulle part", lambda: None)
+
+        self.assertEqual(self.client.get("/api/geocode-cache/stats/").status_code, 403)
+        self.login(self.superadmin)
+        response = self.client.get("/api/geocode-cache/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {k: response.data["process"][k] for k in ("lru_hits", "misses", "lookups", "hit_rate")},
+            {"lru_hits": 1, "misses": 2, "lookups": 3, "hit_rate": 0.3333},
+        )
+        self.assertEqual(
+            response.data["db"],
+            [{"provider": "nominatim", "kind": "forward", "entries": 2, "negatives": 1, "expired": 0, "hits": 0}],
+        )
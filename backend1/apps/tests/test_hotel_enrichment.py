@@ -0,0 +1,107 @@
+# backend1/apps/tests/test_hotel_enrichment.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.models import Dossier, Hotel, Zone
+from apps.services import geocoding
+from apps.services.hotel_enrichment import MAX_ATTEMPTS, enrich_pending_hotels
+from apps.tests.base import AgencyAPITestCase
+
+
+def _result(coords=None, adresse=None, error=None):
+    return {"coords": coords, "adresse": adresse, "error": error}
+
+
+class EnrichPendingHotelsTests(AgencyAPITestCase):
+    """Worker d'enrichissement (_lookup simulé) : statut final, tentatives, zone reportée sur les dossiers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.zone = Zone.objects.create(nom="Sousse", type="rectangle", south=35.7, north=35.9, west=10.5, east=10.7)
+        cls.hotel = Hotel.objects.create(nom="Hotel Sousse", geo_hint="Sousse")
+        cls.dossier = Dossier.objects.create(agence=cls.agence, reference="D-1", hotel_fk=cls.hotel)
+
+    def _enrich(self, result, **kwargs):
+        with mock.patch("apps.services.hotel_enrichment._lookup", return_value=result) as lookup:
+            stats = enrich_pending_hotels(**kwargs)
+        self.hotel.refresh_from_db()
+        return stats, lookup
+
+    def test_done_and_zone_copied_to_dossiers(self):
+        stats, _ = self._enrich(_result(coords=(35.8, 10.6, "Route touristique, Sousse", "pid-1"), adresse="Sousse"))
+        self.assertEqual(stats["processed"], 1)
+        self.assertEqual((stats["done"], stats["dossiers_updated"]), (1, 1))
+        self.assertEqual(self.hotel.geo_status, Hotel.GEO_DONE)
+        self.assertEqual((self.hotel.lat, self.hotel.lng), (35.8, 10.6))
+        self.assertEqual((self.hotel.place_id, self.hotel.adresse), ("pid-1", "Sousse"))
+        self.assertEqual(self.hotel.zone_id, self.zone.id)
+        self.dossier.refresh_from_db()
+        self.assertEqual(self.dossier.zone_fk_id, self.zone.id)
+
+    def test_not_found(self):
+        stats, _ = self._enrich(_result())
+        self.assertEqual(stats["not_found"], 1)
+        self.assertEqual(self.hotel.geo_status, Hotel.GEO_NOT_FOUND)
+        self.assertIsNone(self.hotel.zone_id)
+        self.dossier.refresh_from_db()
+        self.assertIsNone(self.dossier.zone_fk_id)
+
+    def test_failed_after_max_attempts(self):
+        error = _result(error="URLError: timeout")
+        with self.assertLogs("apps.services.hotel_enrichment", "WARNING"):
+            for attempt in range(1, MAX_ATTEMPTS):
+                stats, lookup = self._enrich(error)
+                # un hôtel en erreur n'est retenté qu'au passage suivant
+                self.assertEqual((stats["retry"], lookup.call_count), (1, 1))
+                self.assertEqual((self.hotel.geo_status, self.hotel.geo_attempts), (Hotel.GEO_PENDING, attempt))
+            stats, _ = self._enrich(error)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual((self.hotel.geo_status, self.hotel.geo_attempts), (Hotel.GEO_FAILED, MAX_ATTEMPTS))
+
+        # plus repris sans retry_failed
+        stats, lookup = self._enrich(_result(coords=(35.8, 10.6, None, None)))
+        self.assertEqual((stats["processed"], lookup.call_count), (0, 0))
+
+    def test_retry_failed(self):
+        Hotel.objects.filter(pk=self.hotel.pk).update(geo_status=Hotel.GEO_FAILED, geo_attempts=MAX_ATTEMPTS)
+        stats, _ = self._enrich(_result(coords=(35.8, 10.6, None, None)), retry_failed=True)
+        self.assertEqual(stats["done"], 1)
+        self.assertEqual((self.hotel.geo_status, self.hotel.geo_attempts), (Hotel.GEO_DONE, 1))
+        self.assertEqual(self.hotel.zone_id, self.zone.id)
+
+    def test_limit_and_batches(self):
+        Hotel.objects.bulk_create([Hotel(nom=f"Hotel {i}") for i in range(4)])
+        stats, lookup = self._enrich(_result(), limit=3, batch_size=2)
+        self.assertEqual((stats["processed"], lookup.call_count), (3, 3))
+        self.assertEqual(Hotel.objects.filter(geo_status=Hotel.GEO_PENDING).count(), 2)
+
+
+class NominatimRateLimitTests(SimpleTestCase):
+    """Appels Nominatim espacés d'au moins NOMINATIM_MIN_INTERVAL, tous threads confondus."""
+
+    def test_calls_spaced(self):
+        limiter = geocoding._RateLimiter(1.0)
+        with mock.patch.object(geocoding.time, "monotonic", return_value=100.0), \
+                mock.patch.object(geocoding.time, "sleep") as sleep:
+            for _ in range(3):
+                limiter.wait()
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1.0, 2.0])
+
+    def test_cache_hit_not_limited(self):
+        with mock.patch.object(geocoding, "cached_forward", return_value={"lat": "35.8", "lon": "10.6"}), \
+                mock.patch.object(geocoding._nominatim_limiter, "wait") as wait:
+            self.assertEqual(geocoding.geocode_address("Hotel Sousse, Sousse"), (35.8, 10.6))
+        wait.assert_not_called()
+
+    def test_fetch_waits_for_limiter(self):
+        calls = []
+        with mock.patch.object(geocoding, "cached_forward", side_effect=lambda provider, query, fetch, **kw: fetch()), \
+                mock.patch.object(geocoding._nominatim_limiter, "wait", side_effect=lambda: calls.append("wait")), \
+                mock.patch.object(geocoding, "_fetch_json", side_effect=lambda url, strict: calls.append("fetch") or []):
+            geocoding.lookup_hotel_address("Hotel Sousse", "Sousse", None)
+        self.assertEqual(calls, ["wait", "fetch"])
@@ -0,0 +1,129 @@
+# backend1/apps/tests/test_import_jobs.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+
+from apps.models import ImportJob
+from apps.services import import_jobs
+from apps.tests.base import AgencyAPITestCase
+
+
+class FakeImporter:
+    """Importeur de test : lit le fichier, signale l'avancement ; "boom" -> exception."""
+
+    def run_import(self, fichier, data, *, progress=None):
+        content = fichier.read().decode()
+        if content == "boom":
+            raise RuntimeError("fichier illisible")
+        rows = content.splitlines()
+        if progress:
+            progress(len(rows), len(rows), 0, 0, 0)
+        return Response({"created": len(rows), "erreurs": []}, status=201)
+
+
+FAKE_IMPORTERS = {kind: f"{__name__}.FakeImporter" for kind in import_jobs.IMPORTERS}
+
+
+@mock.patch.dict(import_jobs.IMPORTERS, FAKE_IMPORTERS)
+class ImportJobLifecycleTests(AgencyAPITestCase):
+    """Jobs d'import : file en base par agence, fichier supprimé à la fin, reprise après arrêt."""
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def _submit(self, content="a\nb", agence=None):
+        # hors captureOnCommitCallbacks : aucun worker lancé, le test pilote la file
+        return import_jobs.submit_import_job(
+            kind=ImportJob.KIND_VEHICULES,
+            upload=SimpleUploadedFile("vehicules.csv", content.encode()),
+            agence=agence or self.agence,
+        )
+
+    def _storage_exists(self, name):
+        return ImportJob._meta.get_field("fichier").storage.exists(name)
+
+    def test_job_done_and_file_deleted(self):
+        job = self._submit()
+        path = job.fichier.name
+        self.assertTrue(self._storage_exists(path))
+
+        self.assertEqual(import_jobs.process_agency_jobs(self.agence.id), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual((job.processed_rows, job.created_count), (2, 2))
+        self.assertEqual(job.report["created"], 2)
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertFalse(job.fichier)
+        self.assertFalse(self._storage_exists(path))
+
+    def test_failed_job_file_deleted(self):
+        job = self._submit("boom")
+        path = job.fichier.name
+        with self.assertLogs(import_jobs.logger, "ERROR"):
+            import_jobs.process_agency_jobs(self.agence.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("fichier illisible", job.error_message)
+        self.assertFalse(self._storage_exists(path))
+
+    def test_one_running_job_per_agency(self):
+        first, second = self._submit(), self._submit()
+        other = self._submit(agence=self.other_agence)
+        # job de l'agence déjà pris par un autre process
+        ImportJob.objects.filter(pk=first.pk).update(status=ImportJob.STATUS_RUNNING, heartbeat_at=timezone.now())
+
+        self.assertEqual(import_jobs.process_agency_jobs(self.agence.id), 0)
+        self.assertEqual(ImportJob.objects.get(pk=second.pk).status, ImportJob.STATUS_PENDING)
+        self.assertEqual(import_jobs.process_agency_jobs(self.other_agence.id), 1)
+        self.assertEqual(ImportJob.objects.get(pk=other.pk).status, ImportJob.STATUS_DONE)
+
+        # fin du job en cours : le suivant de l'agence est pris dans la même transaction
+        next_id = import_jobs._claim_next(self.agence.id, finished=(first.pk, {"status": ImportJob.STATUS_DONE}))
+        self.assertEqual(next_id, second.pk)
+        self.assertEqual(ImportJob.objects.get(pk=second.pk).status, ImportJob.STATUS_RUNNING)
+
+    def test_jobs_of_agency_run_in_submission_order(self):
+        jobs = [self._submit(f"ligne{i}") for i in range(3)]
+        with mock.patch.object(import_jobs, "_execute", wraps=import_jobs._execute) as execute:
+            self.assertEqual(import_jobs.process_agency_jobs(self.agence.id), 3)
+        self.assertEqual([c.args[0] for c in execute.call_args_list], [j.pk for j in jobs])
+
+    @override_settings(IMPORT_JOB_STALE_SECONDS=60)
+    def test_recover_stale_running_jobs(self):
+        stale, alive, pending = self._submit(), self._submit(agence=self.other_agence), self._submit()
+        path = stale.fichier.name
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.STATUS_RUNNING, heartbeat_at=timezone.now() - timedelta(minutes=5),
+        )
+        ImportJob.objects.filter(pk=alive.pk).update(status=ImportJob.STATUS_RUNNING, heartbeat_at=timezone.now())
+
+        with mock.patch.object(import_jobs, "_dispatch") as dispatch, self.assertLogs(import_jobs.logger, "WARNING") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                stats = import_jobs.recover_import_jobs()
+        self.assertEqual(stats, {"failed": 1, "agences": 1})
+        self.assertEqual(len(logs.records), 1)
+        dispatch.assert_called_once_with(self.agence.id)
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(stale.error_message, import_jobs.INTERRUPTED_MESSAGE)
+        self.assertFalse(self._storage_exists(path))
+        self.assertEqual(ImportJob.objects.get(pk=alive.pk).status, ImportJob.STATUS_RUNNING)
+
+        # le job en attente de l'agence passe ensuite normalement
+        self.assertEqual(import_jobs.process_agency_jobs(self.agence.id), 1)
+        self.assertEqual(ImportJob.objects.get(pk=pending.pk).status, ImportJob.STATUS_DONE)
@@ -0,0 +1,130 @@
+# backend1/apps/tests/test_import_parsers.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import json
+from datetime import date, time
+from pathlib import Path
+
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+
+from apps.models import Dossier
+from apps.services.import_columns import date_column, int_column, time_column, type_column
+from apps.services.upload_reader import iter_upload_chunks
+from apps.smart_mapper import smart_read_excel
+from apps.tests.base import AgencyAPITestCase
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "imports"
+
+
+def _fixture(name: str) -> io.BytesIO:
+    buf = io.BytesIO((FIXTURES / name).read_bytes())
+    buf.name = name
+    return buf
+
+
+class CsvColumnParsingTests(SimpleTestCase):
+    """manifest_formats.csv : une ligne par variante de date / heure / type / pax (texte)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = next(iter_upload_chunks(_fixture("manifest_formats.csv")))
+
+    def test_dates(self):
+        self.assertEqual(list(date_column(self.df["Date"])), [
+            date(2025, 4, 25),   # JJ/MM/AAAA
+            date(2025, 4, 26),   # AAAA-MM-JJ
+            date(2025, 4, 26),   # série Excel 45773
+            date(2025, 1, 5),    # JJ.MM.AAAA : jour en premier
+            None,                # 31/02 : date impossible
+            date(2025, 4, 25),   # "Apr 25, 2025" : chemin lent
+            None,                # "-"
+        ])
+
+    def test_times(self):
+        self.assertEqual(list(time_column(self.df["Horaires"])), [
+            time(16, 50),        # 16h50
+            time(16, 50, 30),    # 16:50:30
+            time(12, 0),         # fraction de jour Excel
+            time(9, 0),          # 9H
+            None,                # 25:00
+            time(7, 5),          # date + heure
+            None,                # "-"
+        ])
+
+    def test_types_and_pax(self):
+        self.assertEqual(list(type_column(self.df["Type"])), ["A", "D", "A", "D", "", "A", "D"])
+        # "2 adultes", "3,0", vide, "1.6" arrondi, "nan", " 4 ", "-"
+        self.assertEqual(list(int_column(self.df["Pax"])), [2, 3, 0, 2, 0, 4, 0])
+
+
+class XlsxSmartReadTests(SimpleTestCase):
+    """manifest_formats.xlsx : cellules typées, bandeau, deux blocs d'entêtes, deux feuilles."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = smart_read_excel(_fixture("manifest_formats.xlsx"))
+
+    def test_blocks_and_sheets_concatenated(self):
+        self.assertEqual(list(self.df.columns), ["Date", "Horaires", "L/S", "Pax", "Hotel"])
+        # les lignes de données ne sont pas prises pour des entêtes
+        self.assertEqual(list(self.df["Hotel"]), ["Radisson", "Mouradi", "Iberostar", "Movenpick", "Royal"])
+
+    def test_typed_cells(self):
+        self.assertEqual(list(date_column(self.df["Date"])), [
+            date(2025, 4, 25),   # datetime Excel
+            date(2025, 4, 26),   # série numérique
+            date(2025, 4, 27),   # datetime avec heure
+            date(2025, 4, 28),   # texte JJ/MM/AAAA (2e bloc)
+            date(2025, 4, 29),   # 2e feuille
+        ])
+        self.assertEqual(list(time_column(self.df["Horaires"])), [
+            time(16, 50),        # time Excel
+            time(18, 0),         # 0.75
+            time(7, 5),          # heure d'un datetime
+            time(23, 59),        # 23h59
+            None,                # 0.9999 arrondi à 24:00
+        ])
+        self.assertEqual(list(type_column(self.df["L/S"])), ["A", "A", "A", "D", "D"])
+        self.assertEqual(list(int_column(self.df["Pax"])), [2, 3, 2, 1, 0])
+
+    def test_datetime_series_dtype(self):
+        s = pd.Series(pd.to_datetime(["2025-04-25 16:50", None]))
+        self.assertEqual(list(date_column(s)), [date(2025, 4, 25), None])
+        self.assertEqual(list(time_column(s)), [time(16, 50), None])
+
+
+class DossierImportFixtureTests(AgencyAPITestCase):
+    """POST /api/importer-dossier/ avec le fichier de référence : dossiers typés, lignes sans date ignorées."""
+
+    MAPPING = {
+        "reference": "Ref", "date": "Date", "horaires": "Horaires",
+        "type_mouvement": "Type", "pax": "Pax", "hotel": "Hotel",
+    }
+
+    def test_import_csv(self):
+        upload = SimpleUploadedFile("manifest_formats.csv", (FIXTURES / "manifest_formats.csv").read_bytes())
+        response = self.client.post(
+            "/api/importer-dossier/",
+            {"file": upload, "agence": self.agence.id, "mapping": json.dumps(self.MAPPING)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["dossiers_crees"], ["D1", "D2", "D3", "D4", "D6"])
+        self.assertEqual([r["ligne"] for r in response.data["lignes_ignorees"]], [6, 8])
+        self.assertEqual(response.data["erreurs"], [])
+        self.assertEqual(
+            list(Dossier.objects.order_by("reference").values_list("reference", "date", "horaires", "type_mouvement", "pax")),
+            [
+                ("D1", date(2025, 4, 25), time(16, 50), "A", 2),
+                ("D2", date(2025, 4, 26), time(16, 50, 30), "D", 3),
+                ("D3", date(2025, 4, 26), time(12, 0), "A", 0),
+                ("D4", date(2025, 1, 5), time(9, 0), "D", 2),
+                ("D6", date(2025, 4, 25), time(7, 5), "A", 4),
+            ],
+        )
@@ -0,0 +1,323 @@
+# backend1/apps/tests/test_lists.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.models import Chauffeur, Dossier, FicheMouvement, Mission, MissionRessource, Vehicule
+from apps.tests.base import AgencyAPITestCase
+
+
+class ChauffeurListQueryCountTests(AgencyAPITestCase):
+    """ChauffeurViewSet.list : real_state calculé en lot, nb de requêtes constant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.now = timezone.now()
+
+    def _make_drivers(self, n):
+        start = Chauffeur.objects.count()
+        chauffeurs = Chauffeur.objects.bulk_create([
+            Chauffeur(agence=self.agence, nom=f"Nom{start + i}", prenom="P", cin=f"CIN{start + i:06d}")
+            for i in range(n)
+        ])
+        missions = Mission.objects.bulk_create([
+            Mission(agence=self.agence, date=self.now.date(), reference=f"T-{start + i}-{k}")
+            for i in range(n) for k in range(2)
+        ])
+        affectations = []
+        for i, c in enumerate(chauffeurs):
+            before = self.now - timedelta(hours=5)
+            after = self.now + timedelta(hours=3)
+            affectations += [
+                MissionRessource(
+                    mission=missions[2 * i], chauffeur=c, lieu_arrivee=f"Hotel {i}",
+                    date_heure_debut=before, date_heure_fin=before + timedelta(hours=2),
+                ),
+                MissionRessource(
+                    mission=missions[2 * i + 1], chauffeur=c,
+                    date_heure_debut=after, date_heure_fin=after + timedelta(hours=2),
+                ),
+            ]
+        MissionRessource.objects.bulk_create(affectations)
+        return chauffeurs
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/chauffeurs/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_real_state(self):
+        c = self._make_drivers(1)[0]
+        response, _ = self._list()
+        row = next(r for r in response.data if r["id"] == c.id)
+        self.assertEqual(row["real_state"]["location"], "Hotel 0")
+        self.assertEqual(row["real_state"]["available_from"], self.now - timedelta(hours=3))
+        self.assertEqual(row["real_state"]["available_until"], self.now + timedelta(hours=3))
+
+    def test_query_count_constant(self):
+        self._make_drivers(10)
+        response, queries_10 = self._list()
+        self.assertEqual(len(response.data), 10)
+
+        self._make_drivers(990)
+        response, queries_1000 = self._list()
+        self.assertEqual(len(response.data), 1000)
+
+        self.assertEqual(queries_10, queries_1000)
+
+    def test_other_agency_hidden(self):
+        Chauffeur.objects.create(agence=self.other_agence, nom="Autre", prenom="P", cin="CIN999999")
+        mine = self._make_drivers(1)[0]
+        response, _ = self._list()
+        self.assertEqual([r["id"] for r in response.data], [mine.id])
+
+
+
+class VehiculeListQueryCountTests(AgencyAPITestCase):
+    """VehiculeViewSet.list : état réel de la flotte (fleet_state) en lot, nb de requêtes constant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.now = timezone.now()
+
+    def _make_vehicles(self, n):
+        start = Vehicule.objects.count()
+        vehicules = Vehicule.objects.bulk_create([
+            Vehicule(
+                agence=self.agence, type="bus", marque="M", modele="X", capacite=50,
+                immatriculation=f"{start + i:05d}TU", adresse="Dépôt",
+            )
+            for i in range(n)
+        ])
+        chauffeurs = Chauffeur.objects.bulk_create([
+            Chauffeur(agence=self.agence, nom=f"Veh{start + i}", prenom="P", cin=f"VCIN{start + i:06d}")
+            for i in range(n)
+        ])
+        missions = Mission.objects.bulk_create([
+            Mission(agence=self.agence, date=self.now.date(), reference=f"V-{start + i}-{k}", vehicule=v)
+            for i, v in enumerate(vehicules) for k in range(2)
+        ])
+        before = self.now - timedelta(hours=5)
+        after = self.now + timedelta(hours=3)
+        affectations = []
+        for i, (v, c) in enumerate(zip(vehicules, chauffeurs)):
+            affectations += [
+                MissionRessource(
+                    mission=missions[2 * i], vehicule=v, chauffeur=c, lieu_arrivee=f"Hotel {i}",
+                    date_heure_debut=before, date_heure_fin=before + timedelta(hours=2),
+                ),
+                MissionRessource(
+                    mission=missions[2 * i + 1], vehicule=v, lieu_depart="Aéroport",
+                    date_heure_debut=after, date_heure_fin=after + timedelta(hours=2),
+                ),
+            ]
+        MissionRessource.objects.bulk_create(affectations)
+        return vehicules, chauffeurs
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/vehicules/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_real_state(self):
+        (v,), (c,) = self._make_vehicles(1)
+        idle = Vehicule.objects.create(
+            agence=self.agence, type="bus", marque="M", modele="X", capacite=50, immatriculation="ZZZ", adresse="Parc",
+        )
+        response, _ = self._list()
+        rows = {r["id"]: r for r in response.data}
+        row = rows[v.id]
+        self.assertEqual(row["real_state"]["location"], "Hotel 0")
+        self.assertEqual(row["real_state"]["available_from"], self.now - timedelta(hours=3))
+        self.assertEqual(row["real_state"]["available_until"], self.now + timedelta(hours=3))
+        self.assertEqual(row["adresse_actuelle"], "Hotel 0")
+        self.assertEqual(row["last_driver"], {"id": c.id, "nom": c.nom, "prenom": "P"})
+        self.assertEqual(row["last_driver_name"], f"P {c.nom}")
+        self.assertEqual(row["last_mission_end"], self.now + timedelta(hours=5))
+        self.assertEqual(row["next_mission_start"], self.now + timedelta(hours=3))
+        self.assertEqual(row["next_mission_address"], "Aéroport")
+
+        # sans affectation : adresse du parc, libre dès maintenant
+        self.assertEqual(rows[idle.id]["real_state"]["location"], "Parc")
+        self.assertIsNone(rows[idle.id]["real_state"]["available_until"])
+        self.assertIsNone(rows[idle.id]["last_driver"])
+
+    def test_query_count_constant(self):
+        self._make_vehicles(1)
+        response, queries_1 = self._list()
+        self.assertEqual(len(response.data), 1)
+
+        self._make_vehicles(99)
+        response, queries_100 = self._list()
+        self.assertEqual(len(response.data), 100)
+        self.assertTrue(all(r["last_driver"] for r in response.data))
+
+        self.assertEqual(queries_1, queries_100)
+
+    def test_other_agency_hidden(self):
+        Vehicule.objects.create(
+            agence=self.other_agence, type="bus", marque="M", modele="X", capacite=50, immatriculation="AUTRE",
+        )
+        (mine,), _ = self._make_vehicles(1)
+        response, _ = self._list()
+        self.assertEqual([r["id"] for r in response.data], [mine.id])
+        # ?agence= d'une autre agence ignoré pour un admin agence
+        response = self.client.get("/api/vehicules/", {"agence": self.other_agence.id})
+        self.assertEqual([r["id"] for r in response.data], [mine.id])
+
+
+class MissionListQueryCountTests(AgencyAPITestCase):
+    """MissionViewSet.list : fiches préchargées + pax annoté, nb de requêtes constant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.vehicule = Vehicule.objects.create(
+            agence=cls.agence, type="bus", marque="M", modele="X", immatriculation="123TU4567", capacite=50
+        )
+        cls.chauffeur = Chauffeur.objects.create(agence=cls.agence, nom="Nom", prenom="P", cin="CIN000001")
+        cls.today = timezone.localdate()
+
+    def _make_missions(self, n):
+        start = Mission.objects.count()
+        missions = Mission.objects.bulk_create([
+            Mission(
+                agence=self.agence, date=self.today, reference=f"M-{start + i}",
+                vehicule=self.vehicule, chauffeur=self.chauffeur,
+            )
+            for i in range(n)
+        ])
+        FicheMouvement.objects.bulk_create([
+            FicheMouvement(
+                agence=self.agence, mission=m, type="A", date=self.today, pax=pax,
+                ref=f"F-{m.id}-{k}", is_deleted=(k == 2),
+                hotel_schedule=[{"hotel": f"Hotel {k}", "heure_pickup": "10:00", "pax": pax}],
+            )
+            for m in missions for k, pax in enumerate((3, 4, 100))
+        ])
+        return missions
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/missions/", {"page_size": 500})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_serialized_values(self):
+        m = self._make_missions(1)[0]
+        response, _ = self._list()
+        row = next(r for r in response.data["results"] if r["id"] == m.id)
+        self.assertEqual(row["pax_total"], 7)
+        self.assertEqual(row["kind"], "arrivee")
+        self.assertEqual(row["vehicule"], str(self.vehicule))
+        self.assertEqual(row["chauffeur"], str(self.chauffeur))
+        self.assertEqual({p["hotel"] for p in row["passage"]}, {"Hotel 0", "Hotel 1"})
+
+    def test_query_count_constant(self):
+        self._make_missions(10)
+        response, queries_10 = self._list()
+        self.assertEqual(len(response.data["results"]), 10)
+
+        self._make_missions(190)
+        response, queries_200 = self._list()
+        self.assertEqual(len(response.data["results"]), 200)
+
+        self.assertEqual(queries_10, queries_200)
+
+    def test_other_agency_hidden(self):
+        mine = self._make_missions(1)[0]
+        Mission.objects.create(agence=self.other_agence, date=self.today, reference="AUTRE-1")
+        response, _ = self._list()
+        self.assertEqual([r["id"] for r in response.data["results"]], [mine.id])
+        self.assertEqual(self.client.get("/api/missions/", {"agence": self.other_agence.id}).status_code, 403)
+
+
+
+class DossiersToFicheKeysetPaginationTests(AgencyAPITestCase):
+    """DossiersToFicheAPIView.get : pages keyset (date, hotel, titulaire, id), NULL compris."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.localdate()
+        Dossier.objects.bulk_create([
+            Dossier(
+                agence=cls.agence, reference=f"D-{i}", type_mouvement="A",
+                date=None if i % 7 == 0 else today + timedelta(days=i % 3),
+                hotel=None if i % 5 == 0 else f"Hotel {i % 4}",
+                titulaire=None if i % 2 else "Titulaire",
+            )
+            for i in range(53)
+        ])
+
+    def test_walk_all_pages(self):
+        url = f"/api/dossiers/to-fiche/?agence={self.agence.id}&page_size=10&count=1"
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if pages == 0:
+                self.assertEqual(response.data["count"], 53)
+            else:
+                self.assertNotIn("count", response.data)
+            seen += [r["id"] for r in response.data["results"]]
+            url, pages = response.data["next"], pages + 1
+            if url:
+                # relative : pas de schéma http:// reconstruit derrière le proxy
+                self.assertTrue(url.startswith("/api/dossiers/to-fiche/?"))
+                self.assertIn(f"cursor={response.data['next_cursor']}", url)
+            else:
+                self.assertIsNone(response.data["next_cursor"])
+
+        expected = Dossier.objects.order_by(
+            F("date").asc(nulls_first=True),
+            F("hotel").asc(nulls_first=True),
+            F("titulaire").asc(nulls_first=True),
+            "id",
+        ).values_list("id", flat=True)
+        self.assertEqual(pages, 6)
+        self.assertEqual(seen, list(expected))
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/dossiers/to-fiche/", {"agence": self.agence.id, "cursor": "nope"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_agency_forbidden(self):
+        response = self.client.get("/api/dossiers/to-fiche/", {"agence": self.other_agence.id})
+        self.assertEqual(response.status_code, 403)
+
+
+class FicheMouvementScopeTests(AgencyAPITestCase):
+    """Fiches : un admin agence ne voit / ne modifie que celles de son agence."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.localdate()
+        cls.mine = FicheMouvement.objects.create(agence=cls.agence, type="A", date=today, horaires="10:00")
+        cls.theirs = FicheMouvement.objects.create(agence=cls.other_agence, type="A", date=today, horaires="10:00")
+
+    def test_list_and_detail_scoped(self):
+        response = self.client.get("/api/fiches-mouvement/")
+        self.assertEqual([r["id"] for r in response.data["results"]], [self.mine.id])
+        self.assertEqual(self.client.get(f"/api/fiches-mouvement/{self.theirs.id}/").status_code, 404)
+        response = self.client.post(
+            f"/api/fiches-mouvement/{self.theirs.id}/hotel-schedule/",
+            {"hotel_schedule": [{"hotel": "Hotel A", "pax": 2}]}, format="json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_superadmin_sees_all(self):
+        self.login(self.superadmin)
+        response = self.client.get("/api/fiches-mouvement/")
+        self.assertEqual({r["id"] for r in response.data["results"]}, {self.mine.id, self.theirs.id})
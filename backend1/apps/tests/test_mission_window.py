@@ -0,0 +1,276 @@
+# backend1/apps/tests/test_mission_window.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.models import Chauffeur, Mission, MissionRessource, Vehicule
+from apps.services.calendar_timeline import resource_timeline
+from apps.services.mission_window import backfill_mission_windows, sync_mission_windows
+from apps.tests.base import AgencyAPITestCase
+
+
+class MissionWindowTests(AgencyAPITestCase):
+    """Fenêtre / statut / lieux recopiés des affectations sur Mission."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate() + timedelta(days=2)
+        cls.t0 = timezone.make_aware(datetime.combine(cls.day, time(8, 0)))
+        cls.vehicules = [
+            Vehicule.objects.create(
+                agence=cls.agence, type="bus", marque="M", modele="X", immatriculation=f"V-{i}", capacite=50,
+            )
+            for i in range(2)
+        ]
+
+    def _mission(self, reference, agence=None):
+        return Mission.objects.create(agence=agence or self.agence, date=self.day, reference=reference)
+
+    def _affecter(self, mission, vehicule, start_h, end_h, depart="Hotel A", arrivee="Aéroport"):
+        return MissionRessource.objects.create(
+            mission=mission, vehicule=vehicule,
+            date_heure_debut=self.t0 + timedelta(hours=start_h), date_heure_fin=self.t0 + timedelta(hours=end_h),
+            lieu_depart=depart, lieu_arrivee=arrivee,
+        )
+
+    def test_window_follows_affectations(self):
+        mission = self._mission("W-1")
+        first = self._affecter(mission, self.vehicules[0], 0, 2, depart="Hotel A", arrivee="Hotel B")
+        self._affecter(mission, self.vehicules[1], 1, 4, depart="Hotel C", arrivee="Aéroport")
+
+        mission.refresh_from_db()
+        self.assertEqual((mission.date_heure_debut, mission.date_heure_fin), (self.t0, self.t0 + timedelta(hours=4)))
+        self.assertEqual((mission.lieu_depart, mission.lieu_arrivee), ("Hotel A", "Aéroport"))
+        self.assertEqual(mission.statut, Mission.STATUT_PLANNED)
+
+        # soft-delete de la première : la fenêtre se resserre sur la seconde
+        first.is_deleted = True
+        first.save()
+        mission.refresh_from_db()
+        self.assertEqual(mission.date_heure_debut, self.t0 + timedelta(hours=1))
+        self.assertEqual(mission.lieu_depart, "Hotel C")
+
+    def test_all_deleted_is_cancelled(self):
+        mission = self._mission("W-2")
+        mr = self._affecter(mission, self.vehicules[0], 0, 2)
+        mr.is_deleted = True
+        mr.save()
+        mission.refresh_from_db()
+        self.assertEqual(mission.statut, Mission.STATUT_CANCELLED)
+        self.assertIsNone(mission.date_heure_debut)
+        self.assertIsNone(mission.date_heure_fin)
+
+        # jamais affectée : pas de statut
+        self.assertIsNone(self._mission("W-3").statut)
+
+    def test_sync_after_bulk_update(self):
+        mission = self._mission("W-4")
+        self._affecter(mission, self.vehicules[0], 0, 2)
+        # .update() en masse : aucun signal, la mission n'est pas encore à jour
+        MissionRessource.objects.filter(mission=mission).update(date_heure_fin=self.t0 + timedelta(hours=5))
+        mission.refresh_from_db()
+        self.assertEqual(mission.date_heure_fin, self.t0 + timedelta(hours=2))
+
+        self.assertEqual(sync_mission_windows([mission.id, None]), 1)
+        mission.refresh_from_db()
+        self.assertEqual(mission.date_heure_fin, self.t0 + timedelta(hours=5))
+        # rien ne change : rien n'est écrit
+        self.assertEqual(sync_mission_windows([mission.id]), 0)
+        self.assertEqual(sync_mission_windows([]), 0)
+
+    def test_backfill_in_batches(self):
+        missions = [self._mission(f"B-{i}") for i in range(3)]
+        for i, mission in enumerate(missions):
+            self._affecter(mission, self.vehicules[i % 2], 3 * i, 3 * i + 2)
+        Mission.objects.update(date_heure_debut=None, date_heure_fin=None, statut=None, lieu_depart=None)
+
+        self.assertEqual(backfill_mission_windows(batch_size=2), 3)
+        for i, mission in enumerate(missions):
+            mission.refresh_from_db()
+            self.assertEqual(mission.date_heure_debut, self.t0 + timedelta(hours=3 * i))
+            self.assertEqual(mission.statut, Mission.STATUT_PLANNED)
+
+        out = StringIO()
+        call_command("backfill_mission_windows", "--batch-size", "1", stdout=out)
+        self.assertIn("Missions mises à jour: 0", out.getvalue())
+
+
+class CalendarMissionsTests(AgencyAPITestCase):
+    """GET /api/calendar/missions : missions de l'agence qui chevauchent [from, to)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate() + timedelta(days=2)
+        cls.t0 = timezone.make_aware(datetime.combine(cls.day, time(8, 0)))
+        cls.vehicule = Vehicule.objects.create(
+            agence=cls.agence, type="bus", marque="M", modele="X", immatriculation="CAL-1", capacite=50,
+        )
+        cls.other_vehicule = Vehicule.objects.create(
+            agence=cls.other_agence, type="bus", marque="M", modele="X", immatriculation="CAL-2", capacite=50,
+        )
+
+        def mission(reference, vehicule, start_h, end_h, agence=None):
+            m = Mission.objects.create(agence=agence or cls.agence, date=cls.day, reference=reference)
+            mr = MissionRessource.objects.create(
+                mission=m, vehicule=vehicule,
+                date_heure_debut=cls.t0 + timedelta(hours=start_h), date_heure_fin=cls.t0 + timedelta(hours=end_h),
+            )
+            return m, mr
+
+        cls.late, _ = mission("LATE", cls.vehicule, 5, 7)
+        cls.early, _ = mission("EARLY", cls.vehicule, 0, 2)
+        cls.outside, _ = mission("OUTSIDE", cls.vehicule, 10, 12)
+        cls.cancelled, mr = mission("CANCELLED", cls.vehicule, 3, 4)
+        mr.is_deleted = True
+        mr.save()
+        mission("OTHER", cls.other_vehicule, 0, 2, agence=cls.other_agence)
+
+    def _get(self, start, end):
+        return self.client.get("/api/calendar/missions", {"from": start.isoformat(), "to": end.isoformat()})
+
+    def test_range_scan(self):
+        response = self._get(self.t0 + timedelta(hours=1), self.t0 + timedelta(hours=6))
+        self.assertEqual(response.status_code, 200)
+        # chevauchement strict, annulées exclues, autre agence exclue, trié par début
+        self.assertEqual([m["reference"] for m in response.data], ["EARLY", "LATE"])
+        self.assertEqual(response.data[0]["start"], self.t0)
+        self.assertEqual(response.data[0]["statut"], Mission.STATUT_PLANNED)
+
+        # bornes : une mission qui finit à `from` ne chevauche pas
+        response = self._get(self.t0 + timedelta(hours=2), self.t0 + timedelta(hours=5))
+        self.assertEqual(response.data, [])
+
+    def test_invalid_range(self):
+        response = self.client.get("/api/calendar/missions", {"from": "hier", "to": self.t0.isoformat()})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_without_agency(self):
+        self.login(self.superadmin)
+        response = self._get(self.t0, self.t0 + timedelta(hours=6))
+        self.assertEqual(response.status_code, 403)
+
+
+class CalendarResourcesTests(AgencyAPITestCase):
+    """GET /api/calendar/resources : busy / busy_reason / location par ressource, nb de requêtes constant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate() + timedelta(days=2)
+        cls.t0 = timezone.make_aware(datetime.combine(cls.day, time(8, 0)))
+        # fenêtre demandée : [t0 + 2h, t0 + 6h)
+        cls.start, cls.end = cls.t0 + timedelta(hours=2), cls.t0 + timedelta(hours=6)
+
+    def _vehicule(self, immatriculation, agence=None, **fields):
+        return Vehicule.objects.create(
+            agence=agence or self.agence, type="bus", marque="M", modele="X",
+            immatriculation=immatriculation, capacite=50, **fields,
+        )
+
+    def _chauffeur(self, nom, **fields):
+        return Chauffeur.objects.create(agence=self.agence, nom=nom, prenom="P", cin=f"CIN-{nom}", **fields)
+
+    def _busy(self, reference, start_h, end_h, **fields):
+        mission = Mission.objects.create(agence=self.agence, date=self.day, reference=reference)
+        fields = {"lieu_depart": "Aéroport", "lieu_arrivee": f"Hotel {reference}", **fields}
+        return MissionRessource.objects.create(
+            mission=mission,
+            date_heure_debut=self.t0 + timedelta(hours=start_h), date_heure_fin=self.t0 + timedelta(hours=end_h),
+            **fields,
+        )
+
+    def _get(self):
+        return self.client.get("/api/calendar/resources", {"from": self.start.isoformat(), "to": self.end.isoformat()})
+
+    def test_busy_intervals_on_window_edges(self):
+        v_start = self._vehicule("CAL-A")                     # coupe le début de la fenêtre
+        v_end = self._vehicule("CAL-B")                       # coupe la fin de la fenêtre
+        v_before = self._vehicule("CAL-C", adresse="Dépôt")   # finit pile au début : libre
+        v_idle = self._vehicule("CAL-D", adresse="Dépôt")
+        self._vehicule("CAL-X", agence=self.other_agence)
+        c_around = self._chauffeur("Alpha")                   # couvre toute la fenêtre
+        c_after = self._chauffeur("Beta", adresse="Sousse")   # commence pile à la fin : libre
+
+        self._busy("PREV", -3, -1, vehicule=v_start)
+        start_mr = self._busy("S", 1, 3, vehicule=v_start)
+        self._busy("E1", 5, 8, vehicule=v_end)
+        self._busy("E2", 3, 4, vehicule=v_end)
+        self._busy("B", 0, 2, vehicule=v_before)
+        deleted = self._busy("DEL", 3, 4, vehicule=v_idle, lieu_depart="", lieu_arrivee="")
+        deleted.is_deleted = True
+        deleted.save()
+        self._busy("AROUND", 0, 10, chauffeur=c_around)
+        self._busy("AFTER", 6, 7, chauffeur=c_after)
+
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        vehicules = {v["label"].split("(")[1].rstrip(")"): v for v in response.data["vehicules"]}
+        self.assertEqual(sorted(vehicules), ["CAL-A", "CAL-B", "CAL-C", "CAL-D"])
+
+        self.assertTrue(vehicules["CAL-A"]["busy"])
+        self.assertEqual(vehicules["CAL-A"]["busy_reason"], {
+            "mission_id": start_mr.mission_id, "reference": "S",
+            "start": self.t0 + timedelta(hours=1), "end": self.t0 + timedelta(hours=3),
+            "lieu_depart": "Aéroport", "lieu_arrivee": "Hotel S", "statut": Mission.STATUT_PLANNED,
+        })
+        # position : arrivée de la dernière affectation terminée avant la fenêtre
+        self.assertEqual(vehicules["CAL-A"]["location"], "Hotel PREV")
+        self.assertEqual(vehicules["CAL-A"]["capacite"], 50)
+        # 1ère affectation de la fenêtre par début
+        self.assertEqual(vehicules["CAL-B"]["busy_reason"]["reference"], "E2")
+        self.assertEqual(
+            (vehicules["CAL-C"]["busy"], vehicules["CAL-C"]["busy_reason"], vehicules["CAL-C"]["location"]),
+            (False, None, "Hotel B"),
+        )
+        self.assertEqual((vehicules["CAL-D"]["busy"], vehicules["CAL-D"]["location"]), (False, "Dépôt"))
+
+        chauffeurs = {c["id"]: c for c in response.data["chauffeurs"]}
+        self.assertEqual(list(chauffeurs), [c_around.id, c_after.id])
+        self.assertEqual(chauffeurs[c_around.id]["busy_reason"]["reference"], "AROUND")
+        self.assertEqual(chauffeurs[c_around.id]["label"], "P Alpha")
+        self.assertEqual(
+            (chauffeurs[c_after.id]["busy"], chauffeurs[c_after.id]["location"]), (False, "Sousse")
+        )
+
+    def _make_resources(self, n):
+        start = Vehicule.objects.count()
+        for i in range(start, start + n):
+            vehicule = self._vehicule(f"CAL-{i}")
+            chauffeur = self._chauffeur(f"N{i}")
+            self._busy(f"P{i}", -3, -1, vehicule=vehicule, chauffeur=chauffeur)
+            self._busy(f"W{i}", 1, 3, vehicule=vehicule, chauffeur=chauffeur)
+            self._busy(f"X{i}", 5, 8, vehicule=vehicule)
+
+    def test_query_count_constant(self):
+        # affectations de la fenêtre, dernières avant (UNION ALL), véhicules, chauffeurs
+        self._make_resources(1)
+        with self.assertNumQueries(4):
+            tl = resource_timeline(self.agence.id, self.start, self.end)
+        self.assertEqual((len(tl["vehicules"]), len(tl["chauffeurs"])), (1, 1))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._get().status_code, 200)
+        queries_1 = len(ctx.captured_queries)
+
+        self._make_resources(24)
+        with self.assertNumQueries(4):
+            tl = resource_timeline(self.agence.id, self.start, self.end)
+        self.assertEqual((len(tl["vehicules"]), len(tl["chauffeurs"])), (25, 25))
+        self.assertTrue(all(v["busy"] and v["location"].startswith("Hotel P") for v in tl["vehicules"]))
+        with self.assertNumQueries(queries_1):
+            response = self._get()
+        self.assertEqual(len(response.data["vehicules"]), 25)
+
+    def test_invalid_range_and_no_agency(self):
+        response = self.client.get("/api/calendar/resources", {"from": "hier", "to": self.end.isoformat()})
+        self.assertEqual(response.status_code, 400)
+        self.login(self.superadmin)
+        self.assertEqual(self._get().status_code, 403)
@@ -0,0 +1,80 @@
+# backend1/apps/tests/test_nearest.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.models import Chauffeur, Hotel, Mission, MissionRessource, Vehicule
+from apps.tests.base import AgencyAPITestCase
+
+
+class NearestVehiclesTests(AgencyAPITestCase):
+    """GET /api/vehicules/nearest/ : top-k par distance, filtres capacité / type / créneau."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Sousse ~ (35.83, 10.64) ; véhicules de plus en plus loin vers le nord
+        cls.vehicules = Vehicule.objects.bulk_create([
+            Vehicule(
+                agence=cls.agence, type=t, marque="M", modele="X", immatriculation=f"V{i}",
+                capacite=cap, last_lat=35.83 + 0.1 * i, last_lng=10.64,
+            )
+            for i, (t, cap) in enumerate([("bus", 50), ("minibus", 20), ("bus", 50), ("bus", 30)])
+        ])
+        Vehicule.objects.create(agence=cls.agence, type="bus", marque="M", modele="X", immatriculation="NOGPS", capacite=50)
+        cls.hotel = Hotel.objects.create(nom="Hotel Sousse", lat=35.83, lng=10.64)
+
+    def _ids(self, **params):
+        response = self.client.get("/api/vehicules/nearest/", params)
+        self.assertEqual(response.status_code, 200)
+        return [r["immatriculation"] for r in response.data["results"]]
+
+    def test_ranking_and_filters(self):
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, k=3), ["V0", "V1", "V2"])
+        self.assertEqual(self._ids(lat=36.13, lng=10.64, k=2), ["V3", "V2"])
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, pax=40), ["V0", "V2"])
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, type="minibus"), ["V1"])
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, max_km=15), ["V0", "V1"])
+
+    def test_busy_vehicle_excluded(self):
+        chauffeur = Chauffeur.objects.create(agence=self.agence, nom="Nom", prenom="P", cin="CIN000001")
+        mission = Mission.objects.create(agence=self.agence, date=timezone.localdate(), reference="M-1")
+        start = timezone.now().replace(microsecond=0)
+        MissionRessource.objects.create(
+            mission=mission, vehicule=self.vehicules[0], chauffeur=chauffeur,
+            date_heure_debut=start, date_heure_fin=start + timedelta(hours=2),
+        )
+        debut = timezone.localtime(start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M")
+        fin = timezone.localtime(start + timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M")
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, k=2, debut=debut, fin=fin), ["V1", "V2"])
+
+    def test_origin_required(self):
+        response = self.client.get("/api/vehicules/nearest/")
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_agency_vehicles_ignored(self):
+        Vehicule.objects.create(
+            agence=self.other_agence, type="bus", marque="M", modele="X", immatriculation="AUTRE",
+            capacite=50, last_lat=35.83, last_lng=10.64,
+        )
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, k=1), ["V0"])
+
+    def test_non_dispo_vehicle_ignored(self):
+        Vehicule.objects.create(
+            agence=self.agence, type="bus", marque="M", modele="X", immatriculation="OCCUPE",
+            capacite=50, statut="occupe", last_lat=35.83, last_lng=10.64,
+        )
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, k=2), ["V0", "V1"])
+
+    def test_busy_now_excluded_without_window(self):
+        chauffeur = Chauffeur.objects.create(agence=self.agence, nom="Nom", prenom="P", cin="CIN000002")
+        mission = Mission.objects.create(agence=self.agence, date=timezone.localdate(), reference="M-2")
+        now = timezone.now()
+        MissionRessource.objects.create(
+            mission=mission, vehicule=self.vehicules[0], chauffeur=chauffeur,
+            date_heure_debut=now - timedelta(hours=1), date_heure_fin=now + timedelta(hours=1),
+        )
+        self.assertEqual(self._ids(hotel_id=self.hotel.id, k=1), ["V1"])
@@ -0,0 +1,37 @@
+# backend1/apps/tests/test_references.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.tests.base import AgencyAPITestCase
+
+
+class DailyReferenceBlockTests(AgencyAPITestCase):
+    """reserve_daily_references : bloc contigu en une mise à jour, même format, limite 9999 tout ou rien."""
+
+    def test_block_follows_single_references(self):
+        from datetime import date
+        from apps.models import generate_daily_reference, reserve_daily_references
+
+        day = date(2026, 5, 4)
+        self.assertEqual(generate_daily_reference("fm", day), "FM-20260504-0001")
+        with CaptureQueriesContext(connection) as ctx:
+            refs = reserve_daily_references("FM", day, 3)
+        self.assertEqual(refs, ["FM-20260504-0002", "FM-20260504-0003", "FM-20260504-0004"])
+        self.assertEqual(sum(1 for q in ctx.captured_queries if q["sql"].startswith("UPDATE")), 1)
+        self.assertEqual(generate_daily_reference("FM", day), "FM-20260504-0005")
+        self.assertEqual(reserve_daily_references("M", day, 2), ["M-20260504-0001", "M-20260504-0002"])
+
+    def test_limit_is_all_or_nothing(self):
+        from datetime import date
+        from django.core.exceptions import ValidationError
+        from apps.models import ReferenceSequence, reserve_daily_references
+
+        day = date(2026, 5, 4)
+        ReferenceSequence.objects.create(prefix="M", day=day, last_number=9990)
+        with self.assertRaises(ValidationError):
+            reserve_daily_references("M", day, 10)
+        self.assertEqual(ReferenceSequence.objects.get(prefix="M", day=day).last_number, 9990)
+        self.assertEqual(reserve_daily_references("M", day, 9)[-1], "M-20260504-9999")
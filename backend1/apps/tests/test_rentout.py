@@ -0,0 +1,80 @@
+# backend1/apps/tests/test_rentout.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.models import AgenceVoyage, Vehicule, VehiculeTarifZone, Zone
+from apps.tests.base import AgencyAPITestCase
+
+
+class RentoutSearchTests(AgencyAPITestCase):
+    """Recherche RENTOÛT : tarifs en mémoire + fenêtres en lot, nb de requêtes constant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.zone = Zone.objects.create(nom="Sousse")
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def _share_fleets(self, n_agencies, prix=100):
+        start = AgenceVoyage.objects.count()
+        agences = []
+        for i in range(n_agencies):
+            user = User.objects.create_user(f"u{start + i}")
+            agence = AgenceVoyage.objects.create(legal_name=f"Agence {start + i}", user=user)
+            agences.append(agence)
+            bus, minibus = Vehicule.objects.bulk_create([
+                Vehicule(
+                    agence=agence, type=t, marque="M", modele="X", immatriculation=f"{start + i}-{t}",
+                    capacite=cap, louer_autres_agences=True,
+                )
+                for t, cap in (("bus", 50), ("minibus", 20))
+            ])
+            VehiculeTarifZone.objects.bulk_create([
+                VehiculeTarifZone(agence=agence, aeroport="NBE", zone=self.zone, type_code="BUS", prix=prix + i),
+                VehiculeTarifZone(agence=agence, aeroport="NBE", zone=self.zone, vehicule=minibus, prix=prix - 50),
+            ])
+        return agences
+
+    def _search(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/rentout/available-vehicles/", {"aeroport": "NBE", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_tariffs_and_ranking(self):
+        first, _ = self._share_fleets(2)
+        rows, _ = self._search(pax=30)
+        self.assertEqual([(r["type"], r["tarif"]) for r in rows], [("bus", 100.0), ("bus", 101.0)])
+        self.assertEqual(rows[0]["agence"], first.legal_name)
+
+        rows, _ = self._search()
+        self.assertEqual([r["tarif"] for r in rows], [50.0, 50.0, 100.0, 101.0])
+
+    def test_query_count_constant(self):
+        self._share_fleets(3)
+        rows, queries_3 = self._search()
+        self.assertEqual(len(rows), 6)
+
+        cache.clear()
+        self._share_fleets(27)
+        rows, queries_30 = self._search()
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(queries_3, queries_30)
+
+    def test_own_fleet_not_offered(self):
+        self._share_fleets(1)
+        Vehicule.objects.create(
+            agence=self.agence, type="bus", marque="M", modele="X", immatriculation="MINE",
+            capacite=50, louer_autres_agences=True,
+        )
+        VehiculeTarifZone.objects.create(agence=self.agence, aeroport="NBE", zone=self.zone, type_code="BUS", prix=1)
+        rows, _ = self._search()
+        self.assertNotIn(self.agence.legal_name, {r["agence"] for r in rows})
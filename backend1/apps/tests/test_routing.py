@@ -0,0 +1,61 @@
+# backend1/apps/tests/test_routing.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.utils import timezone
+
+from apps.models import FicheMouvement, Hotel, Zone
+from apps.tests.base import AgencyAPITestCase
+
+
+class PickupRoutingTests(AgencyAPITestCase):
+    """Départs : ordre de ramassage géographique (NN + 2-opt) terminé à l'aéroport, heures estimées."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Zone.objects.create(nom="Enfidha", center_lat=36.00, center_lng=10.40)
+        # alignés vers le sud : H1 le plus proche de l'aéroport, H3 le plus loin
+        for i in (1, 2, 3):
+            Hotel.objects.create(nom=f"H{i}", lat=36.00 - 0.1 * i, lng=10.40)
+
+    def setUp(self):
+        super().setUp()
+        self.fiche = FicheMouvement.objects.create(
+            agence=self.agence, type="D", date=timezone.localdate(), horaires="12:00", destination="Enfidha", pax=30,
+        )
+
+    def _schedule(self, rows):
+        response = self.client.post(
+            f"/api/fiches-mouvement/{self.fiche.id}/hotel-schedule/", {"hotel_schedule": rows}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.fiche.refresh_from_db()
+        return [(it["hotel"], it["heure_pickup"]) for it in self.fiche.hotel_schedule]
+
+    def test_order_and_times_from_geography(self):
+        schedule = self._schedule([{"hotel": h, "pax": 10} for h in ("H2", "H1", "H3")])
+        # aéroport 10:00 ; ~11 km par tronçon => 5 min d'arrêt + 17 min de route
+        self.assertEqual(schedule, [("H3", "08:54"), ("H2", "09:16"), ("H1", "09:38")])
+
+    def test_agent_times_are_kept(self):
+        schedule = self._schedule([
+            {"hotel": "H2", "pax": 10},
+            {"hotel": "H1", "pax": 10, "override_time": "09:30"},
+        ])
+        self.assertEqual(schedule, [("H2", "09:08"), ("H1", "09:30")])
+
+    def test_two_opt_on_many_hotels(self):
+        import random
+        from apps.services.routing import sequence_pickups
+
+        rnd = random.Random(7)
+        Hotel.objects.bulk_create([
+            Hotel(nom=f"R{i}", lat=35.7 + rnd.random() * 0.4, lng=10.3 + rnd.random() * 0.4) for i in range(18)
+        ])
+        names = [f"R{i}" for i in range(18)] + ["Inconnu"]
+        route = sequence_pickups(names, "Enfidha")
+        self.assertEqual(sorted(route.order), list(range(19)))
+        self.assertEqual(route.order[0], 18)          # non géolocalisé en tête
+        self.assertIsNone(route.leg_minutes[0])
+        self.assertLess(route.km, sequence_pickups(names, "Enfidha", optimize=False).km)
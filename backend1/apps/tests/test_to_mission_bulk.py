@@ -0,0 +1,117 @@
+# backend1/apps/tests/test_to_mission_bulk.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.models import Chauffeur, Dossier, FicheMouvement, Mission, MissionRessource, Vehicule
+from apps.tests.base import AgencyAPITestCase
+
+
+class ToMissionBulkTests(AgencyAPITestCase):
+    """fiches/to-mission/bulk : plusieurs groupes, une vérification de dispo, erreurs par groupe."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.day = timezone.localdate() + timedelta(days=2)
+        cls.vehicules = [
+            Vehicule.objects.create(
+                agence=cls.agence, type="bus", marque="M", modele="X", immatriculation=f"V{i}", capacite=50,
+            ) for i in range(2)
+        ]
+        cls.chauffeur = Chauffeur.objects.create(agence=cls.agence, nom="Nom", prenom="P", cin="CIN000001")
+        cls.fiches = [
+            FicheMouvement.objects.create(
+                agence=cls.agence, type="A", date=cls.day, horaires=heure, provenance="DJE", pax=10,
+                hotel_schedule=[{"hotel": "Hotel A", "pax": 10}],
+            ) for heure in ("09:00", "09:30", "15:00")
+        ]
+
+    def _post(self, groups):
+        return self.client.post("/api/fiches-mouvement/to-mission/bulk/", {"groups": groups}, format="json")
+
+    def test_groups_created_and_errors_reported(self):
+        v0, v1 = self.vehicules
+        f0, f1, f2 = self.fiches
+        response = self._post([
+            {"fiche_ids": [f0.id], "vehicule_id": v0.id, "chauffeur_ids": [self.chauffeur.id]},
+            {"fiche_ids": [f1.id], "vehicule_id": v0.id},           # même véhicule, créneau chevauchant : les 2 refusés
+            {"fiche_ids": [f2.id], "vehicule_id": v0.id},           # l'après-midi : libre
+            {"fiche_ids": [f2.id], "vehicule_id": v1.id},           # fiche déjà dans un autre groupe
+            {"fiche_ids": [999999], "vehicule_id": v1.id},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["summary"], {"groupes": 5, "missions": 1, "erreurs": 4})
+        by_index = {r["index"]: r for r in response.data["resultats"]}
+        for i in (0, 1):
+            self.assertEqual(by_index[i]["erreur"], "Véhicule sur des créneaux qui se chevauchent dans le lot.")
+        self.assertIn("déjà présente", by_index[3]["erreur"])
+        self.assertIn("introuvable", by_index[4]["erreur"])
+
+        f2.refresh_from_db()
+        self.assertEqual(f2.mission_id, by_index[2]["mission_id"])
+        mr = MissionRessource.objects.get(mission=f2.mission_id)
+        self.assertEqual(mr.vehicule_id, v0.id)
+        self.assertEqual(f2.mission.date_heure_debut, mr.date_heure_debut)
+
+        # lot suivant : V0 désormais occupé l'après-midi, fiche déjà convertie rejetée
+        again = self._post([
+            {"fiche_ids": [f0.id], "vehicule_id": v0.id, "chauffeur_ids": [self.chauffeur.id]},
+            {"fiche_ids": [f1.id], "vehicule_id": v1.id},
+            {"fiche_ids": [f2.id], "vehicule_id": v1.id},
+        ])
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again.data["summary"], {"groupes": 3, "missions": 2, "erreurs": 1})
+        self.assertIn("déjà rattachée", again.data["resultats"][2]["erreur"])
+        f0.refresh_from_db()
+        self.assertEqual(MissionRessource.objects.get(mission=f0.mission_id).chauffeur_id, self.chauffeur.id)
+
+    def test_other_agency_fiches_forbidden(self):
+        theirs = FicheMouvement.objects.create(
+            agence=self.other_agence, type="A", date=self.day, horaires="09:00", provenance="DJE", pax=5,
+            hotel_schedule=[{"hotel": "Hotel A", "pax": 5}],
+        )
+        response = self._post([{"fiche_ids": [theirs.id], "vehicule_id": self.vehicules[0].id}])
+        self.assertEqual(response.status_code, 403)
+        theirs.refresh_from_db()
+        self.assertIsNone(theirs.mission_id)
+
+    def _without_schedule(self, heure):
+        """Fiche sans hotel_schedule : généré depuis ses dossiers pendant la conversion."""
+        fiche = FicheMouvement.objects.create(agence=self.agence, type="A", date=self.day, horaires=heure, provenance="DJE", pax=4)
+        Dossier.objects.create(agence=self.agence, reference=f"D-{heure}", hotel="Hotel B", pax=4, fiche_mouvement=fiche)
+        return fiche
+
+    def test_rejected_groups_leave_fiches_unchanged(self):
+        v0, v1 = self.vehicules
+        f0, f1 = self._without_schedule("09:00"), self._without_schedule("09:30")
+        # deux groupes sur le même véhicule, créneaux chevauchants : tout est refusé
+        response = self._post([
+            {"fiche_ids": [f0.id], "vehicule_id": v0.id},
+            {"fiche_ids": [f1.id], "vehicule_id": v0.id},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["summary"], {"groupes": 2, "missions": 0, "erreurs": 2})
+        for f in (f0, f1):
+            f.refresh_from_db()
+            self.assertEqual((f.hotel_schedule, f.mission_id), ([], None))
+        self.assertFalse(Mission.objects.exists())
+
+        # lot mixte : le groupe refusé ne garde pas non plus le schedule généré
+        f2 = self._without_schedule("15:00")
+        response = self._post([
+            {"fiche_ids": [f0.id], "vehicule_id": v0.id},
+            {"fiche_ids": [f1.id], "vehicule_id": v0.id},
+            {"fiche_ids": [f2.id], "vehicule_id": v1.id},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["summary"], {"groupes": 3, "missions": 1, "erreurs": 2})
+        for f in (f0, f1):
+            f.refresh_from_db()
+            self.assertEqual((f.hotel_schedule, f.mission_id), ([], None))
+        f2.refresh_from_db()
+        self.assertEqual([row["hotel"] for row in f2.hotel_schedule], ["Hotel B"])
+        self.assertIsNotNone(f2.mission_id)
@@ -0,0 +1,98 @@
+# backend1/apps/tests/test_travel_times.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.utils import timezone
+
+from apps.models import FicheMouvement, Hotel, Zone
+from apps.tests.base import AgencyAPITestCase
+
+
+class TravelTimeMatrixTests(AgencyAPITestCase):
+    """Temps de trajet zone -> zone : estimations hors ligne, temps mesurés, horaires d'arrivée."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.airport = Zone.objects.create(nom="DJE", center_lat=33.875, center_lng=10.775)
+        cls.zarzis = Zone.objects.create(nom="Zarzis", center_lat=33.50, center_lng=11.11)
+        cls.midoun = Zone.objects.create(nom="Midoun", center_lat=33.81, center_lng=10.99)
+        Hotel.objects.create(nom="Hotel Zarzis", zone=cls.zarzis)
+        Hotel.objects.create(nom="Hotel Midoun", zone=cls.midoun)
+
+    def test_estimate_then_measured_times(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from apps.services import travel_times
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("estimate_travel_times", stdout=StringIO())
+        estimated = travel_times.place_minutes("DJE", "Hotel Zarzis")
+        self.assertGreater(estimated, 60)
+        self.assertLess(travel_times.place_minutes("DJE", "Hotel Midoun"), estimated)
+        self.assertIsNone(travel_times.place_minutes("DJE", "Inconnu"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            written, errors = travel_times.import_travel_times([
+                "origine;destination;minutes", "DJE;Zarzis;55", f"{self.zarzis.id};DJE;50", "DJE;Nulle part;10",
+            ])
+        self.assertEqual(written, 2)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(travel_times.place_minutes("DJE", "Hotel Zarzis"), 55)
+
+        # une nouvelle estimation ne remplace pas les temps mesurés
+        with self.captureOnCommitCallbacks(execute=True):
+            travel_times.estimate_travel_times()
+        self.assertEqual(travel_times.place_minutes("DJE", "Hotel Zarzis"), 55)
+        self.assertEqual(travel_times.place_minutes("Hotel Zarzis", "DJE"), 50)
+
+    def test_arrival_depot_times_per_hotel(self):
+        from apps.services import travel_times
+
+        with self.captureOnCommitCallbacks(execute=True):
+            travel_times.import_travel_times(["DJE;Zarzis;55", "DJE;Midoun;25"])
+        fiche = FicheMouvement.objects.create(
+            agence=self.agence, type="A", date=timezone.localdate(), horaires="10:00", provenance="DJE", pax=30,
+        )
+        rows = [{"hotel": h, "pax": 10} for h in ("Hotel Zarzis", "Hotel Midoun", "Inconnu")]
+        response = self.client.post(f"/api/fiches-mouvement/{fiche.id}/hotel-schedule/", {"hotel_schedule": rows}, format="json")
+        self.assertEqual(response.status_code, 200)
+        fiche.refresh_from_db()
+        # aéroport 11:00 (+60 min d'attente) ; hôtel inconnu => 120 min par défaut
+        self.assertEqual(
+            [(it["hotel"], it["heure_depot"]) for it in fiche.hotel_schedule],
+            [("Hotel Zarzis", "11:55"), ("Hotel Midoun", "11:25"), ("Inconnu", "13:00")],
+        )
+
+    def test_estimate_bumps_global_version_once(self):
+        from apps.models import ResourceVersion, TravelTime
+        from apps.services import travel_times, versions
+
+        def version():
+            row = ResourceVersion.objects.filter(agence_id=versions.GLOBAL, resource=versions.TRAVEL_TIME).first()
+            return row.version if row else 0
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(travel_times.estimate_travel_times(), 6)
+        before = version()
+        # zone sans centre : ses estimations disparaissent, les autres sont mises à jour en place
+        Zone.objects.filter(pk=self.midoun.pk).update(center_lat=None)
+        ids = set(TravelTime.objects.values_list("id", flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(travel_times.estimate_travel_times(), 2)
+        self.assertEqual(version(), before + 1)
+        self.assertEqual(TravelTime.objects.count(), 2)
+        self.assertLessEqual(set(TravelTime.objects.values_list("id", flat=True)), ids)
+
+        # plus aucune zone géolocalisée : toutes les estimations partent, les temps mesurés restent
+        TravelTime.objects.filter(origin=self.airport, destination=self.zarzis).update(
+            source=TravelTime.SOURCE_MEASURED
+        )
+        Zone.objects.update(center_lat=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(travel_times.estimate_travel_times(), 0)
+        self.assertEqual(
+            list(TravelTime.objects.values_list("origin_id", "destination_id", "source")),
+            [(self.airport.id, self.zarzis.id, TravelTime.SOURCE_MEASURED)],
+        )
@@ -0,0 +1,193 @@
+# backend1/apps/tests/test_upload_reader.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import codecs
+import io
+import json
+from datetime import datetime
+from functools import partial
+from unittest import mock
+from zipfile import BadZipFile
+
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from openpyxl import Workbook
+
+from apps.models import Chauffeur, Dossier
+from apps.services import upload_reader
+from apps.services.upload_reader import detect_encoding, iter_upload_chunks, read_upload, sniff_sep, upload_kind
+from apps.tests.base import AgencyAPITestCase
+from apps.views.importers import ImporterChauffeursAPIView
+
+
+def _upload(data: bytes, name: str = "fichier.csv") -> io.BytesIO:
+    buf = io.BytesIO(data)
+    buf.name = name
+    return buf
+
+
+def _xlsx(rows) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in rows:
+        ws.append(row)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+class LargeFileTests(SimpleTestCase):
+    """Gros fichiers : paquets de taille bornée, index continu (ligne Excel = index + 2)."""
+
+    def test_csv_chunks(self):
+        n = 25_003
+        data = "ref;pax\n" + "".join(f"R{i};{i % 9}\n" for i in range(n))
+        chunks = list(iter_upload_chunks(_upload(data.encode("utf-8")), chunk_rows=5000))
+        self.assertEqual([len(c) for c in chunks], [5000] * 5 + [3])
+        self.assertEqual(chunks[3].index[0], 15_000)
+        self.assertEqual(chunks[-1].iloc[-1].tolist(), [f"R{n - 1}", str((n - 1) % 9)])
+        self.assertEqual(list(pd.concat(chunks).index), list(range(n)))
+
+    def test_xlsx_chunks(self):
+        n = 12_001
+        rows = [["ref", "date", "pax"]] + [[f"R{i}", datetime(2025, 4, 25), float(i % 7)] for i in range(n)]
+        # traîne de lignes vides (plage Excel étendue) : ignorée
+        rows += [[None, None, None]] * 50
+        chunks = list(iter_upload_chunks(_upload(_xlsx(rows), "gros.xlsx"), chunk_rows=5000))
+        self.assertEqual([len(c) for c in chunks], [5000, 5000, 2001])
+        self.assertEqual(chunks[2].index[-1], n - 1)
+        # texte comme read_excel(dtype=str) : flottants entiers sans ".0"
+        self.assertEqual(chunks[0].iloc[1].tolist(), ["R1", "2025-04-25 00:00:00", "1"])
+
+    def test_xlsx_native_values_and_inner_blank_rows(self):
+        rows = [["ref", "pax"], ["R1", 2], [None, None], ["R2", 3.5]]
+        df = read_upload(_upload(_xlsx(rows), "petit.xlsx"), as_text=False)
+        # ligne vide intérieure conservée (numérotation des lignes intacte)
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df.iloc[2].tolist(), ["R2", 3.5])
+
+    def test_xlsx_duplicate_and_empty_headers(self):
+        rows = [["ref", None, "ref", "pax"], ["R1", "x", "R1b", 1]]
+        df = read_upload(_upload(_xlsx(rows), "entetes.xlsx"))
+        self.assertEqual(list(df.columns), ["ref", "Unnamed: 1", "ref.1", "pax"])
+
+
+class MalformedFileTests(SimpleTestCase):
+    """Fichiers invalides : erreur explicite, jamais de lecture silencieusement tronquée."""
+
+    def test_kind_from_signature_not_extension(self):
+        self.assertEqual(upload_kind(_upload(_xlsx([["a"]]), "export.csv")), "xlsx")
+        self.assertEqual(upload_kind(_upload(b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1", "export.csv")), "xls")
+        self.assertEqual(upload_kind(_upload(b"a;b\n", "export.xlsx")), "xlsx")
+        self.assertEqual(upload_kind(_upload(b"a;b\n", "export.txt")), "csv")
+
+    def test_truncated_xlsx(self):
+        with self.assertRaises(BadZipFile):
+            list(iter_upload_chunks(_upload(_xlsx([["a"], [1]])[:200], "coupe.xlsx")))
+
+    def test_empty_csv(self):
+        with self.assertRaises(pd.errors.EmptyDataError):
+            list(iter_upload_chunks(_upload(b"")))
+
+    def test_ragged_row_stops_after_good_chunks(self):
+        data = b"a;b\n" + b"1;2\n" * 10 + b"3;4;5;6\n" + b"7;8\n"
+        chunks = iter_upload_chunks(_upload(data), chunk_rows=4)
+        self.assertEqual([len(next(chunks)), len(next(chunks))], [4, 4])
+        with self.assertRaises(pd.errors.ParserError):
+            next(chunks)
+
+    def test_unterminated_quote(self):
+        with self.assertRaises(pd.errors.ParserError):
+            list(iter_upload_chunks(_upload(b'a;b\n1;"2\n3;4\n')))
+
+    def test_no_file(self):
+        with self.assertRaises(ValueError):
+            list(iter_upload_chunks(None))
+
+
+class EncodingTests(SimpleTestCase):
+    """Détection d'encodage : utf-8-sig > utf-8 > cp1252 > latin1, par blocs."""
+
+    def test_detection_order(self):
+        text = "nom;ville\nBéja;Médenine\n"
+        self.assertEqual(detect_encoding(_upload(codecs.BOM_UTF8 + text.encode("utf-8"))), "utf-8-sig")
+        self.assertEqual(detect_encoding(_upload(text.encode("utf-8"))), "utf-8")
+        self.assertEqual(detect_encoding(_upload(text.encode("cp1252"))), "cp1252")
+        # 0x81 : indéfini en cp1252
+        self.assertEqual(detect_encoding(_upload(b"nom\n\x81\n")), "latin1")
+
+    def test_invalid_byte_after_first_block(self):
+        data = ("nom;pax\n" + "Sousse;1\n" * 2000).encode("utf-8") + "Gabès;2\n".encode("cp1252")
+        self.assertEqual(detect_encoding(_upload(data), block_size=64), "cp1252")
+
+    def test_utf8_split_across_blocks(self):
+        # "é" (2 octets) à cheval sur deux blocs : décodeur incrémental
+        data = b"x" * 63 + "é\n".encode("utf-8")
+        self.assertEqual(detect_encoding(_upload(data), block_size=64), "utf-8")
+
+    def test_decoded_values(self):
+        for enc in ("utf-8-sig", "cp1252", "latin1"):
+            with self.subTest(enc=enc):
+                df = read_upload(_upload("nom;ville\nBéja;Médenine\n".encode(enc)))
+                self.assertEqual(df.iloc[0].tolist(), ["Béja", "Médenine"])
+                self.assertEqual(list(df.columns), ["nom", "ville"])
+
+    def test_separator(self):
+        self.assertEqual(sniff_sep("a;b;c\n1;2;3"), ";")
+        self.assertEqual(sniff_sep("a,b,c\n1,2,3"), ",")
+        self.assertEqual(sniff_sep("a\tb\n1\t2"), "\t")
+        self.assertEqual(sniff_sep("a\n1"), ",")
+        # égalité : le point-virgule l'emporte (décimales "1,5")
+        self.assertEqual(sniff_sep("a;b,c"), ";")
+
+
+class ImportReadErrorTests(AgencyAPITestCase):
+    """Importeur dossiers : fichier illisible -> 400 ; ligne cassée -> paquets précédents gardés."""
+
+    MAPPING = json.dumps({"reference": "Ref", "date": "Date", "type_mouvement": "Type"})
+
+    def _post(self, data: bytes, name: str = "dossiers.csv"):
+        return self.client.post(
+            "/api/importer-dossier/",
+            {"file": SimpleUploadedFile(name, data), "agence": self.agence.id, "mapping": self.MAPPING},
+            format="multipart",
+        )
+
+    def test_unreadable_file(self):
+        response = self._post(b"PK\x03\x04pas un zip", "dossiers.xlsx")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Fichier illisible", response.data["error"])
+
+    def test_broken_line_keeps_previous_chunks(self):
+        good = "".join(f"R{i};25/04/2025;A\n" for i in range(5))
+        data = ("Ref;Date;Type\n" + good + "R9;25/04/2025;A;x;y\nR10;25/04/2025;A\n").encode("utf-8")
+        small_chunks = partial(upload_reader.iter_upload_chunks, chunk_rows=2)
+        with mock.patch("apps.views.dossiers_import.iter_upload_chunks", small_chunks):
+            response = self._post(data)
+        self.assertEqual(response.status_code, 200)
+        # paquets [R0, R1] et [R2, R3] écrits ; le suivant (lignes 6-7, colonnes en trop) ne se lit pas
+        self.assertEqual(response.data["dossiers_crees"], ["R0", "R1", "R2", "R3"])
+        self.assertEqual(len(response.data["erreurs"]), 1)
+        self.assertEqual(response.data["erreurs"][0]["ligne"], 6)
+        self.assertIn("Lecture interrompue", response.data["erreurs"][0]["raison"])
+        self.assertEqual(Dossier.objects.filter(agence=self.agence).count(), 4)
+
+    def test_broken_line_in_driver_import(self):
+        data = ("NOM;PRENOM;CIN\n" + "".join(f"Nom{i};P;CIN{i}\n" for i in range(3)) + ";P;X\nNom9;P;C9\nA;B;C;D;E\n").encode()
+        small_chunks = partial(upload_reader.iter_upload_chunks, chunk_rows=2)
+        progress = mock.Mock()
+        with mock.patch("apps.views.importers.iter_upload_chunks", small_chunks):
+            response = ImporterChauffeursAPIView().run_import(
+                _upload(data, "chauffeurs.csv"), {"agence": self.agence.id}, progress=progress,
+            )
+        self.assertEqual(response.status_code, 200)
+        # [Nom0, Nom1] et [Nom2, ligne sans nom] écrits ; le paquet suivant (ligne 7 en trop) ne se lit pas
+        self.assertEqual(response.data["chauffeurs_crees"], ["Nom0 P", "Nom1 P", "Nom2 P"])
+        ignored = response.data["lignes_ignorees"]
+        self.assertEqual([r["ligne"] for r in ignored], [5, None])
+        self.assertIn("Lecture interrompue", ignored[1]["raison"])
+        self.assertEqual(response.data["resume"]["erreurs"], 1)
+        self.assertEqual(progress.call_args_list[-1], mock.call(4, 3, 0, 1, 1))
+        self.assertEqual(Chauffeur.objects.filter(agence=self.agence).count(), 3)
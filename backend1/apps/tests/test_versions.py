@@ -0,0 +1,180 @@
+# backend1/apps/tests/test_versions.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.models import (
+    Chauffeur,
+    Mission,
+    MissionRessource,
+    ResourceVersion,
+    Vehicule,
+    VehiculeTarifZone,
+    Zone,
+    bump_affectation_version,
+)
+from apps.services import versions
+from apps.services.response_cache import reset_response_cache_stats, response_cache_stats
+from apps.tests.base import AgencyAPITestCase
+
+
+class ListETagTests(AgencyAPITestCase):
+    """ETag des listes : 304 tant que les compteurs de version de l'agence ne bougent pas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.mission = Mission.objects.create(agence=cls.agence, date=timezone.localdate(), reference="M-1")
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"/api/missions/?agence={self.agence.id}"
+
+    def test_not_modified_until_change(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.mission.remarque = "modifiée"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mission.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_affectation_bumps_mission_list(self):
+        start = timezone.now()
+        chauffeur = Chauffeur.objects.create(agence=self.agence, nom="Nom", prenom="P", cin="CIN000001")
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            MissionRessource.objects.create(
+                mission=self.mission, chauffeur=chauffeur,
+                date_heure_debut=start, date_heure_fin=start + timedelta(hours=1),
+            )
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class BumpVersionsTests(AgencyAPITestCase):
+    """Incréments regroupés au commit ; bump_all crée les lignes manquantes."""
+
+    def _version(self, agence_id, resource=versions.MISSION):
+        return ResourceVersion.objects.filter(agence_id=agence_id, resource=resource).values_list("version", flat=True).first()
+
+    def test_one_bump_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                Mission.objects.create(agence=self.agence, date=timezone.localdate(), reference=f"M-{i}")
+            self.assertIsNone(self._version(self.agence.id))
+        self.assertEqual(self._version(self.agence.id), 1)
+
+    def test_rollback_does_not_bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Mission.objects.create(agence=self.agence, date=timezone.localdate(), reference="M-X")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertIsNone(self._version(self.agence.id))
+
+    def test_bump_all_creates_missing_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            versions.bump_versions([self.agence.id], [versions.DOSSIER])
+        before = versions.current_version([versions.DOSSIER], self.other_agence.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            versions.bump_all([versions.DOSSIER])
+        self.assertEqual(self._version(self.agence.id, versions.DOSSIER), 2)
+        self.assertEqual(self._version(self.other_agence.id, versions.DOSSIER), 1)
+        self.assertNotEqual(versions.current_version([versions.DOSSIER], self.other_agence.id), before)
+
+
+class ResponseCacheTests(AgencyAPITestCase):
+    """Cache de réponses : HIT tant que les compteurs de version ne bougent pas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+    def setUp(self):
+        cache.clear()
+        reset_response_cache_stats()
+        super().setUp()
+
+    def test_zones_invalidated_by_signal(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Zone.objects.create(nom="Sousse")
+        self.assertEqual(self.client.get("/api/zones/")["X-Cache"], "MISS")
+        response = self.client.get("/api/zones/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual([z["nom"] for z in response.data], ["Sousse"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Zone.objects.create(nom="Tunis")
+        response = self.client.get("/api/zones/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual([z["nom"] for z in response.data], ["Sousse", "Tunis"])
+        self.assertEqual(response_cache_stats()["zones"]["hits"], 1)
+
+    def test_tarifs_scoped_by_agency(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            zone = Zone.objects.create(nom="Sousse")
+        url = "/api/fournisseur/vehicule-tarifs/?aeroport=NBE"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            VehiculeTarifZone.objects.create(agence=self.other_agence, aeroport="NBE", zone=zone, type_code="BUS", prix=10)
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            VehiculeTarifZone.objects.create(agence=self.agence, aeroport="NBE", zone=zone, type_code="BUS", prix=20)
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["rows"], [{"zone_id": zone.id, "zone_name": "Sousse", "bus": 20.0}])
+
+    def test_stats_superadmin_only(self):
+        for url in ("/api/response-cache/stats/", "/api/geocode-cache/stats/"):
+            self.login(self.user)
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.login(self.superadmin)
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class AffectationVersionTests(AgencyAPITestCase):
+    """bump_affectation_version : agences lues sur les objets déjà chargés, sinon en une requête."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.mission = Mission.objects.create(agence=cls.agence, date=timezone.localdate(), reference="M-1")
+        # véhicule loué à une autre agence (RENTOÛT)
+        cls.vehicule = Vehicule.objects.create(
+            agence=cls.other_agence, type="bus", marque="M", modele="X", immatriculation="RENT-1", capacite=50,
+        )
+        cls.chauffeur = Chauffeur.objects.create(agence=cls.agence, nom="Nom", prenom="P", cin="CIN000001")
+
+    def _bump(self, instance, queries):
+        with mock.patch("apps.services.versions.bump_versions") as bump, self.assertNumQueries(queries):
+            bump_affectation_version(MissionRessource, instance)
+        self.assertEqual(set(bump.call_args.args[0]), {self.agence.id, self.other_agence.id})
+
+    def test_related_objects_already_loaded(self):
+        self._bump(MissionRessource(mission=self.mission, vehicule=self.vehicule, chauffeur=self.chauffeur), 0)
+
+    def test_ids_only(self):
+        mr = MissionRessource(mission_id=self.mission.id, vehicule_id=self.vehicule.id, chauffeur_id=self.chauffeur.id)
+        self._bump(mr, 1)
+        mr = MissionRessource(mission=self.mission, vehicule_id=self.vehicule.id)
+        self._bump(mr, 1)
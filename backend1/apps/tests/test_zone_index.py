@@ -0,0 +1,187 @@
+# backend1/apps/tests/test_zone_index.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.models import Dossier, Hotel, Zone
+from apps.services import zone_index
+from apps.services.hotels import assign_hotel_zones, find_zone_for_point
+from apps.services.polygons import (
+    decode_polyline,
+    encode_polyline,
+    normalize_points,
+    points_in_polygon,
+    polygon_bbox,
+)
+from apps.services.zone_index import GRID_DEG, ZoneIndex, zones_for_points
+from apps.tests.base import AgencyAPITestCase
+
+
+SQUARE = np.array([(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (1.0, 0.0)])
+
+
+class PolygonTests(SimpleTestCase):
+    """Encodage des sommets et point-dans-polygone (pair-impair, bords semi-ouverts)."""
+
+    def test_polyline_round_trip(self):
+        points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        # exemple de référence de l'algorithme Google
+        self.assertEqual(encode_polyline(points), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        np.testing.assert_allclose(decode_polyline(encode_polyline(points)), points)
+        self.assertEqual(decode_polyline("").shape, (0, 2))
+
+    def test_normalize_points(self):
+        closed = [{"lat": 1, "lng": 2}, {"lat": 3, "lon": 4}, [5, 6], {"lat": 1, "lng": 2}]
+        self.assertEqual(normalize_points(closed), [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0)])
+
+    def test_concave_polygon(self):
+        # "L" : le coin nord-est est hors du polygone mais dans sa bbox
+        ell = np.array([(0, 0), (0, 2), (1, 2), (1, 1), (2, 1), (2, 0)], dtype=float)
+        inside = points_in_polygon([0.5, 1.5, 1.5, 0.5, 3.0], [1.5, 0.5, 1.5, 0.5, 0.5], ell)
+        self.assertEqual(inside.tolist(), [True, True, False, True, False])
+        self.assertEqual(polygon_bbox(ell), (0.0, 2.0, 0.0, 2.0))
+
+    def test_boundary_is_half_open(self):
+        # bords sud / ouest dedans, nord / est dehors : un point d'une arête
+        # commune à deux polygones voisins n'appartient qu'à l'un des deux
+        east = SQUARE + [0.0, 1.0]
+        lats, lngs = [0.0, 1.0, 0.5, 0.5, 0.0, 1.0], [0.5, 0.5, 0.0, 1.0, 0.0, 1.0]
+        self.assertEqual(points_in_polygon(lats, lngs, SQUARE).tolist(), [True, False, True, False, True, False])
+        on_shared_edge = ([0.25, 0.5, 0.75], [1.0, 1.0, 1.0])
+        a = points_in_polygon(*on_shared_edge, SQUARE)
+        b = points_in_polygon(*on_shared_edge, east)
+        self.assertTrue(np.all(a ^ b))
+
+    def test_degenerate_inputs(self):
+        self.assertFalse(points_in_polygon([0.5], [0.5], SQUARE[:2]).any())
+        self.assertEqual(points_in_polygon([], [], SQUARE).tolist(), [])
+        self.assertEqual(points_in_polygon([np.nan, 0.5], [0.5, np.nan], SQUARE).tolist(), [False, False])
+
+
+def _zone(pk, nom, **fields):
+    return Zone(pk=pk, nom=nom, **fields)
+
+
+def _polygon_zone(pk, nom, points):
+    zone = Zone(pk=pk, nom=nom)
+    zone.set_polygon(points)
+    return zone
+
+
+class ZoneIndexLookupTests(SimpleTestCase):
+    """ZoneIndex.find (par point) et find_many (vectorisé) : même zone pour chaque point."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.zones = [
+            # rectangle aligné sur la grille : ses bords tombent sur des bords de cellule
+            _zone(1, "Sousse", type="rectangle", south=35.70, north=35.90, west=10.50, east=10.70),
+            # cercle qui chevauche Sousse (id plus grand : perd les points communs)
+            _zone(2, "Port El Kantaoui", type="circle", center_lat=35.89, center_lng=10.59, radius_m=5000),
+            _polygon_zone(3, "Monastir", [(35.70, 10.75), (35.80, 10.75), (35.80, 10.85)]),
+            # polygone voisin : arête commune (35.70,10.75)-(35.80,10.85) avec Monastir
+            _polygon_zone(4, "Skanes", [(35.70, 10.75), (35.80, 10.85), (35.70, 10.85)]),
+            # zone "polygon" ancienne (sans sommets) : repli sur la bbox
+            _zone(5, "Mahdia", type="polygon", south=35.40, north=35.55, west=10.95, east=11.10),
+            # type inconnu : bbox OU cercle
+            _zone(6, "Kairouan", type="", south=35.60, north=35.70, west=10.00, east=10.10,
+                  center_lat=35.50, center_lng=10.05, radius_m=3000),
+            # très grande zone (hors grille) : testée partout, en dernier par id
+            _zone(7, "Tunisie", type="rectangle", south=30.0, north=37.6, west=7.5, east=11.7),
+            # zone incomplète : jamais trouvée
+            _zone(8, "Vide", type="circle", center_lat=35.8),
+        ]
+        cls.index = ZoneIndex(cls.zones)
+
+    def _check(self, lat, lng, expected):
+        zone = self.index.find(lat, lng)
+        self.assertEqual(zone.pk if zone else None, expected, (lat, lng))
+        self.assertEqual(self.index.find_many([lat], [lng]), [expected], (lat, lng))
+
+    def test_rectangle_edges_inclusive(self):
+        for lat, lng in ((35.70, 10.60), (35.85, 10.50), (35.70, 10.50), (35.75, 10.70)):
+            self._check(lat, lng, 1)
+        # juste dehors (et hors du cercle) : la grande zone
+        self._check(35.69999, 10.60, 7)
+
+    def test_overlap_smallest_id_wins(self):
+        self._check(35.89, 10.59, 1)     # centre du cercle, dans Sousse
+        self._check(35.92, 10.59, 2)     # cercle seul (au nord de Sousse)
+        self._check(35.9349, 10.59, 2)   # ~4,99 km du centre
+        self._check(35.9351, 10.59, 7)   # ~5,01 km : hors du cercle
+
+    def test_adjacent_polygons(self):
+        self._check(35.78, 10.77, 3)
+        self._check(35.72, 10.83, 4)
+        # arête commune : un seul des deux, le même par les deux chemins
+        zone = self.index.find(35.75, 10.80)
+        self.assertIn(zone.pk, (3, 4))
+        self.assertEqual(self.index.find_many([35.75], [10.80]), [zone.pk])
+
+    def test_fallbacks(self):
+        self._check(35.50, 11.00, 5)     # polygone sans sommets : bbox
+        self._check(35.65, 10.05, 6)     # type inconnu : bbox
+        self._check(35.50, 10.05, 6)     # type inconnu : cercle
+        self._check(29.0, 10.0, None)
+
+    def test_missing_coordinates(self):
+        self.assertIsNone(self.index.find(None, 10.6))
+        self.assertIsNone(self.index.find(35.8, None))
+        self.assertEqual(self.index.find_many([np.nan, 35.8], [10.6, np.nan]), [None, None])
+        self.assertEqual(ZoneIndex([]).find_many([35.8], [10.6]), [None])
+
+    def test_vectorized_matches_scalar(self):
+        rng = np.random.default_rng(7)
+        lats = rng.uniform(35.3, 36.0, 3000)
+        lngs = rng.uniform(9.9, 11.2, 3000)
+        # points exactement sur des bords de cellule de la grille
+        lats[:50] = np.round(lats[:50] / GRID_DEG) * GRID_DEG
+        lngs[50:100] = np.round(lngs[50:100] / GRID_DEG) * GRID_DEG
+        scalar = [z.pk if z else None for z in (self.index.find(a, b) for a, b in zip(lats, lngs))]
+        self.assertEqual(self.index.find_many(lats, lngs, chunk_size=512), scalar)
+        self.assertEqual(set(scalar), {1, 2, 3, 4, 5, 6, 7})
+
+
+class HotelZoneAssignmentTests(AgencyAPITestCase):
+    """Index courant (base) : hôtels sans coordonnées ignorés, index reconstruit après écriture."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.sousse = Zone.objects.create(nom="Sousse", type="rectangle", south=35.7, north=35.9, west=10.5, east=10.7)
+        cls.large = Zone.objects.create(nom="Sahel", type="rectangle", south=35.0, north=36.0, west=10.0, east=11.0)
+        cls.hotel = Hotel.objects.create(nom="Hotel Sousse", lat=35.8, lng=10.6)
+        cls.no_coords = Hotel.objects.create(nom="Hotel Inconnu")
+        cls.half = Hotel.objects.create(nom="Hotel Moitié", lat=35.8)
+        cls.dossier = Dossier.objects.create(agence=cls.agence, reference="D-1", hotel_fk=cls.no_coords)
+
+    def test_assign_skips_hotels_without_coordinates(self):
+        stats = assign_hotel_zones()
+        self.assertEqual(stats["hotels_updated"], 1)
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.zone_id, self.sousse.id)
+        self.assertEqual(
+            list(Hotel.objects.filter(pk__in=[self.no_coords.pk, self.half.pk]).values_list("zone_id", flat=True)),
+            [None, None],
+        )
+        self.dossier.refresh_from_db()
+        self.assertIsNone(self.dossier.zone_fk_id)
+
+    def test_points_without_coordinates(self):
+        self.assertEqual(
+            zones_for_points([(35.8, 10.6), (None, 10.6), (35.8, None), (None, None)]),
+            [self.sousse.id, None, None, None],
+        )
+        self.assertEqual(zones_for_points([]), [])
+        self.assertIsNone(find_zone_for_point(None, None))
+
+    def test_index_rebuilt_after_zone_delete(self):
+        self.assertEqual(find_zone_for_point(35.8, 10.6).id, self.sousse.id)
+        index = zone_index.get_zone_index()
+        self.sousse.delete()
+        self.assertIsNot(zone_index.get_zone_index(), index)
+        # zone recouvrante suivante
+        self.assertEqual(find_zone_for_point(35.8, 10.6).id, self.large.id)
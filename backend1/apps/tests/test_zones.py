@@ -0,0 +1,81 @@
+# backend1/apps/tests/test_zones.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from apps.models import Hotel, Zone
+from apps.tests.base import AgencyAPITestCase
+
+
+class ZoneWriteTests(AgencyAPITestCase):
+    """Zones globales : écriture superadmin, recalcul limité à l'emprise, zones manuelles figées."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.far_zone = Zone.objects.create(
+            nom="Tunis", type="rectangle", north=36.9, south=36.7, east=10.3, west=10.1,
+        )
+        # dans la future zone "Sousse"
+        cls.inside = Hotel.objects.create(nom="Hotel Sousse", lat=35.83, lng=10.63)
+        cls.manual = Hotel.objects.create(nom="Hotel Manuel", lat=35.84, lng=10.62, zone=cls.far_zone, zone_manuelle=True)
+        # loin de "Sousse", zone périmée : un recalcul global la viderait
+        cls.outside = Hotel.objects.create(nom="Hotel Djerba", lat=33.8, lng=10.9, zone=cls.far_zone)
+
+    def _sousse(self, **extra):
+        return {"nom": "Sousse", "type": "rectangle", "north": 35.9, "south": 35.7, "east": 10.7, "west": 10.5, **extra}
+
+    def test_writes_superadmin_only(self):
+        self.assertEqual(self.client.get("/api/zones/").status_code, 200)
+        self.assertEqual(self.client.post("/api/zones/", self._sousse(), format="json").status_code, 403)
+        self.assertEqual(
+            self.client.patch(f"/api/zones/{self.far_zone.id}/", {"nom": "X"}, format="json").status_code, 403
+        )
+        self.assertEqual(self.client.delete(f"/api/zones/{self.far_zone.id}/").status_code, 403)
+        self.assertEqual(self.client.post("/api/zones/reassign-hotels/").status_code, 403)
+        self.assertTrue(Zone.objects.filter(pk=self.far_zone.pk, nom="Tunis").exists())
+
+    def test_create_reassigns_hotels_in_extent_only(self):
+        self.login(self.superadmin)
+        response = self.client.post("/api/zones/", self._sousse(), format="json")
+        self.assertEqual(response.status_code, 201)
+        sousse = Zone.objects.get(pk=response.data["id"])
+
+        self.inside.refresh_from_db()
+        self.manual.refresh_from_db()
+        self.outside.refresh_from_db()
+        self.assertEqual(self.inside.zone_id, sousse.id)
+        self.assertEqual(self.manual.zone_id, self.far_zone.id)
+        self.assertEqual(self.outside.zone_id, self.far_zone.id)
+
+    def test_update_and_delete_cover_old_extent(self):
+        self.login(self.superadmin)
+        sousse = Zone.objects.create(**self._sousse())
+        Hotel.objects.filter(pk=self.inside.pk).update(zone=sousse)
+
+        # zone déplacée : l'hôtel qui en sort perd sa zone
+        response = self.client.patch(
+            f"/api/zones/{sousse.id}/", {"north": 35.6, "south": 35.4}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.inside.refresh_from_db()
+        self.assertIsNone(self.inside.zone_id)
+
+        Hotel.objects.filter(pk=self.inside.pk).update(lat=35.5)
+        self.client.post("/api/zones/reassign-hotels/")
+        self.inside.refresh_from_db()
+        self.assertEqual(self.inside.zone_id, sousse.id)
+
+        self.assertEqual(self.client.delete(f"/api/zones/{sousse.id}/").status_code, 204)
+        self.inside.refresh_from_db()
+        self.assertIsNone(self.inside.zone_id)
+        self.manual.refresh_from_db()
+        self.assertEqual(self.manual.zone_id, self.far_zone.id)
+
+    def test_full_reassign_skips_manual_zones(self):
+        self.login(self.superadmin)
+        response = self.client.post("/api/zones/reassign-hotels/")
+        self.assertEqual(response.status_code, 200)
+        self.manual.refresh_from_db()
+        self.outside.refresh_from_db()
+        self.assertEqual(self.manual.zone_id, self.far_zone.id)
+        self.assertIsNone(self.outside.zone_id)
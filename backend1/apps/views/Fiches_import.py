@@ -2,12 +2,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import io
 import json
 import re
+from itertools import chain
 import unicodedata
 from datetime import date, time
-from typing import Any, Dict, Optional, Set, Tuple
+from typing import Any, Dict, Optional, Set
 
 import pandas as pd
 from django.apps import apps
@@ -18,6 +18,15 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.services.upload_reader import iter_upload_chunks
+from apps.services.import_columns import (
+    date_column,
+    empty_column,
+    str_column,
+    time_column,
+    type_column,
+)
+
 # =============================================================================
 # Utils: strings / dates / times
 # =============================================================================
@@ -46,16 +55,6 @@ def _smart_date(v: Any) -> Optional[date]:
     except Exception:
         return None
 
-def _normalize_type(v: Any) -> str:
-    s = _to_str(v).upper()
-    m = re.search(r"[ADLS]", s)
-    c = (m.group(0) if m else s[:1]) or ""
-    if c in {"A", "L"}:
-        return "A"
-    if c in {"D", "S"}:
-        return "D"
-    return ""
-
 def _norm_key(s: str) -> str:
     s = (s or "").strip().lower()
     s = unicodedata.normalize("NFKD", s)
@@ -85,51 +84,6 @@ def _sanitize_defaults(model_cls, defaults: Dict[str, Any]) -> Dict[str, Any]:
     allowed = _allowed_fields(model_cls)
     return {k: v for k, v in defaults.items() if k in allowed}
 
-# =============================================================================
-# File detection: excel signatures (avoid UTF-8 decode on binaries)
-# =============================================================================
-
-def _peek(upload, n: int) -> bytes:
-    pos = upload.tell()
-    head = upload.read(n)
-    upload.seek(pos)
-    return head or b""
-
-def is_xlsx(upload) -> bool:
-    head = _peek(upload, 4)
-    return head[:2] == b"PK"
-
-def is_xls(upload) -> bool:
-    head = _peek(upload, 8)
-    return head.startswith(b"\xD0\xCF\x11\xE0")
-
-# =============================================================================
-# CSV reading: robust decoding + delimiter sniffing
-# =============================================================================
-
-def _decode_bytes(data: bytes) -> Tuple[str, str]:
-    for enc in ("utf-8-sig", "utf-8", "cp1252", "latin1"):
-        try:
-            return data.decode(enc), enc
-        except UnicodeDecodeError:
-            continue
-    return data.decode("latin1", errors="replace"), "latin1(replace)"
-
-def _sniff_sep(sample: str) -> str:
-    head = "\n".join(sample.splitlines()[:20])
-    candidates = [";", ",", "\t"]
-    counts = {c: head.count(c) for c in candidates}
-    best = max(candidates, key=lambda c: (counts[c], 1 if c == ";" else 0))
-    return best if counts[best] > 0 else ","
-
-def read_csv_df(upload) -> pd.DataFrame:
-    upload.seek(0)
-    raw = upload.read()
-    text, _enc = _decode_bytes(raw)
-    sep = _sniff_sep(text[:4096])
-    sio = io.StringIO(text)
-    return pd.read_csv(sio, sep=sep, dtype=str, keep_default_na=True, engine="python")
-
 # =============================================================================
 # Importer FicheMouvement
 # =============================================================================
@@ -194,19 +148,21 @@ class ImporterFicheMouvementAPIView(APIView):
         return out
 
     def _resolve_models(self):
-        AgenceVoyage = apps.get_model("b2b", "AgenceVoyage")
-        Fiche = apps.get_model("b2b", "FicheMouvement")
-        Hotel = apps.get_model("b2b", "Hotel")
-        Zone = apps.get_model("b2b", "Zone")
+        AgenceVoyage = apps.get_model("apps", "AgenceVoyage")
+        Fiche = apps.get_model("apps", "FicheMouvement")
+        Hotel = apps.get_model("apps", "Hotel")
+        Zone = apps.get_model("apps", "Zone")
         if not (AgenceVoyage and Fiche):
             raise LookupError("Modèles AgenceVoyage/FicheMouvement introuvables.")
         return AgenceVoyage, Fiche, Hotel, Zone
 
-    @transaction.atomic
     def post(self, request):
-        fichier = request.FILES.get("file")
-        agence_id = request.data.get("agence")
-        mapping_raw = request.data.get("mapping")
+        return self.run_import(request.FILES.get("file"), request.data)
+
+    def run_import(self, fichier, data, *, progress=None):
+        """Logique d'import (aussi appelée par les jobs d'arrière-plan, cf. ImportJob)."""
+        agence_id = data.get("agence")
+        mapping_raw = data.get("mapping")
 
         if not fichier:
             return Response({"error": "Aucun fichier envoyé."}, status=400)
@@ -227,18 +183,14 @@ class ImporterFicheMouvementAPIView(APIView):
 
         agence = get_object_or_404(AgenceVoyage, id=agence_id)
 
-        # Load file into DataFrame robustly
+        # Lecture en flux : paquets de lignes traités/validés un par un
         try:
-            name = str(getattr(fichier, "name", "")).lower()
-            if name.endswith(".csv") or (not is_xlsx(fichier) and not is_xls(fichier) and name.endswith((".txt", ".dat"))):
-                df = read_csv_df(fichier)
-            else:
-                fichier.seek(0)
-                df = pd.read_excel(fichier, dtype=str, keep_default_na=True)
+            chunks = iter_upload_chunks(fichier, as_text=True)
+            first = next(chunks, None)
         except Exception as e:
             return Response({"error": f"Fichier illisible ({e})."}, status=400)
 
-        if df is None or df.empty:
+        if first is None or first.empty:
             return Response({"error": "Fichier vide."}, status=400)
 
         fiche_fields = {f.name for f in Fiche._meta.get_fields()}
@@ -248,134 +200,178 @@ class ImporterFicheMouvementAPIView(APIView):
         _hotel_cache: Dict[str, Any] = {}
         _zone_cache: Dict[str, Any] = {}
 
-        def cell(row, key):
-            col = mapping.get(key)
-            if not col:
-                return None
-            if col in row.index:
-                return row.get(col)
-            for c in row.index:
-                if str(c).strip() == str(col).strip():
-                    return row.get(c)
-            return None
-
-        def _safe_int(x):
-            s = _to_str(x)
-            return int(s) if s.isdigit() else 0
-
-        for i, row in df.iterrows():
-            try:
-                t = _normalize_type(cell(row, "type_mouvement"))
-                if not t:
-                    ignored.append({"ligne": i + 2, "raison": "type A/D manquant"})
-                    continue
-
-                d = _smart_date(cell(row, "date"))
-                if not d:
-                    ignored.append({"ligne": i + 2, "raison": "date invalide"})
-                    continue
-
-                hv = _smart_time(cell(row, "horaires"))
-                prov = _to_str(cell(row, "provenance"))
-                dest = _to_str(cell(row, "destination"))
-                vol = _to_str(cell(row, "num_vol"))
-                to = _to_str(cell(row, "client_to"))
-                tit = _to_str(cell(row, "titulaire"))
-                hotel_txt = _to_str(cell(row, "hotel"))
-                ref = _to_str(cell(row, "ref"))
-                ville = _to_str(cell(row, "ville"))
-                cp = _to_str(cell(row, "code_postal"))
-                obs = _to_str(cell(row, "observation"))
-
-                # Si on a ref dans le modèle -> on accepte même si hotel vide (sinon impossible)
-                if has_ref_field:
-                    if not ref:
-                        ignored.append({"ligne": i + 2, "raison": "REF manquante"})
+        def process_chunk(df):
+            # =========================
+            # NORMALISATION PAR COLONNE
+            # =========================
+            def col(key):
+                c = mapping.get(key)
+                if not c:
+                    return empty_column(df.index)
+                if c in df.columns:
+                    return df[c]
+                for cc in df.columns:
+                    if str(cc).strip() == str(c).strip():
+                        return df[cc]
+                return empty_column(df.index)
+
+            def _digits(x: pd.Series) -> pd.Series:
+                t = str_column(x)
+                return t.where(t.str.isdigit(), "0").astype(int)
+
+            ad_col = _digits(col("adulte"))
+            ch_col = _digits(col("enfants"))
+            bb_col = _digits(col("bb_gratuit"))
+            bb_col = bb_col.where(bb_col != 0, _digits(col("bebe")))
+            pax_raw = str_column(col("pax"))
+            pax_col = pax_raw.where(pax_raw.str.isdigit(), None)
+            pax_col = pax_col.astype(object).where(pax_col.notna(), ad_col + ch_col + bb_col).astype(int)
+
+            frame = pd.DataFrame(
+                {
+                    "t": type_column(col("type_mouvement")),
+                    "d": date_column(col("date"), fallback=_smart_date),
+                    "hv": time_column(col("horaires"), fallback=_smart_time),
+                    "prov": str_column(col("provenance")),
+                    "dest": str_column(col("destination")),
+                    "vol": str_column(col("num_vol")),
+                    "to": str_column(col("client_to")),
+                    "tit": str_column(col("titulaire")),
+                    "hotel_txt": str_column(col("hotel")),
+                    "ref": str_column(col("ref")),
+                    "ville": str_column(col("ville")),
+                    "cp": str_column(col("code_postal")),
+                    "obs": str_column(col("observation")),
+                    "zone_txt": str_column(col("zone")),
+                    "ad": ad_col.astype(object),
+                    "ch": ch_col.astype(object),
+                    "bb": bb_col.astype(object),
+                    "pax": pax_col.astype(object),
+                },
+                index=df.index,
+            )
+
+            for i, r in zip(frame.index, frame.to_dict("records")):
+                try:
+                    t = r["t"]
+                    if not t:
+                        ignored.append({"ligne": i + 2, "raison": "type A/D manquant"})
                         continue
-                else:
-                    # fallback historique: sans ref, on exige hotel pour éviter collisions
-                    if not hotel_txt:
-                        ignored.append({"ligne": i + 2, "raison": "hotel manquant (pas de champ ref côté modèle)"})
+
+                    d = r["d"]
+                    if not d:
+                        ignored.append({"ligne": i + 2, "raison": "date invalide"})
                         continue
 
-                ad = _safe_int(cell(row, "adulte"))
-                ch = _safe_int(cell(row, "enfants"))
-                bb = _safe_int(cell(row, "bb_gratuit")) or _safe_int(cell(row, "bebe"))
-                pax_raw = _to_str(cell(row, "pax"))
-                pax = int(pax_raw) if pax_raw.isdigit() else (ad + ch + bb)
-
-                hotel_obj = None
-                if hotel_txt and Hotel:
-                    k = hotel_txt.lower()
-                    hotel_obj = (
-                        _hotel_cache.get(k)
-                        or Hotel.objects.filter(nom__iexact=hotel_txt).first()
-                        or Hotel.objects.create(nom=hotel_txt)
-                    )
-                    _hotel_cache[k] = hotel_obj
-
-                zone_txt = _to_str(cell(row, "zone"))
-                zone_obj = None
-                if zone_txt and Zone:
-                    kz = zone_txt.lower()
-                    zone_obj = (
-                        _zone_cache.get(kz)
-                        or Zone.objects.filter(nom__iexact=zone_txt).first()
-                        or Zone.objects.create(nom=zone_txt)
-                    )
-                    _zone_cache[kz] = zone_obj
-
-                defaults = {
-                    "agence": agence,
-                    "type": t,
-                    "date": d,
-                    "horaires": hv,
-                    "numero_vol": vol or "",
-                    "client_to": to or "",
-                    "titulaire": tit or "",
-                    "hotel": hotel_obj if _is_fk(Fiche, "hotel") else (hotel_txt or ""),
-                    "ville": ville or "",
-                    "code_postal": cp or "",
-                    "observation": obs or "",
-                    "adulte": ad,
-                    "enfants": ch,
-                    "bebe": bb,
-                    "pax": pax,
-                }
-
-                if has_ref_field:
-                    defaults["ref"] = ref
-
-                if _is_fk(Fiche, "zone_fk") and zone_obj:
-                    defaults["zone_fk"] = zone_obj
-                elif "zone" in fiche_fields:
-                    defaults["zone"] = zone_txt or ""
-
-                if t == "D":
-                    defaults["provenance"] = prov or dest or ""
-                else:
-                    defaults["destination"] = dest or prov or ""
-
-                defaults = _sanitize_defaults(Fiche, defaults)
-
-                # ✅ LOOKUP FIX: si champ ref existe -> (agence, ref) => 1 ligne = 1 fiche
-                if has_ref_field:
-                    lookup = {"agence": agence, "ref": ref}
-                else:
-                    # fallback ancien (moins fiable)
-                    lookup = {
+                    hv = r["hv"]
+                    prov, dest, vol, to = r["prov"], r["dest"], r["vol"], r["to"]
+                    tit, hotel_txt, ref = r["tit"], r["hotel_txt"], r["ref"]
+                    ville, cp, obs = r["ville"], r["cp"], r["obs"]
+
+                    # Si on a ref dans le modèle -> on accepte même si hotel vide (sinon impossible)
+                    if has_ref_field:
+                        if not ref:
+                            ignored.append({"ligne": i + 2, "raison": "REF manquante"})
+                            continue
+                    else:
+                        # fallback historique: sans ref, on exige hotel pour éviter collisions
+                        if not hotel_txt:
+                            ignored.append({"ligne": i + 2, "raison": "hotel manquant (pas de champ ref côté modèle)"})
+                            continue
+
+                    ad, ch, bb, pax = r["ad"], r["ch"], r["bb"], r["pax"]
+
+                    hotel_obj = None
+                    if hotel_txt and Hotel:
+                        k = hotel_txt.lower()
+                        hotel_obj = (
+                            _hotel_cache.get(k)
+                            or Hotel.objects.filter(nom__iexact=hotel_txt).first()
+                            or Hotel.objects.create(nom=hotel_txt)
+                        )
+                        _hotel_cache[k] = hotel_obj
+
+                    zone_txt = r["zone_txt"]
+                    zone_obj = None
+                    if zone_txt and Zone:
+                        kz = zone_txt.lower()
+                        zone_obj = (
+                            _zone_cache.get(kz)
+                            or Zone.objects.filter(nom__iexact=zone_txt).first()
+                            or Zone.objects.create(nom=zone_txt)
+                        )
+                        _zone_cache[kz] = zone_obj
+
+                    defaults = {
                         "agence": agence,
                         "type": t,
                         "date": d,
+                        "horaires": hv,
                         "numero_vol": vol or "",
+                        "client_to": to or "",
+                        "titulaire": tit or "",
                         "hotel": hotel_obj if _is_fk(Fiche, "hotel") else (hotel_txt or ""),
+                        "ville": ville or "",
+                        "code_postal": cp or "",
+                        "observation": obs or "",
+                        "adulte": ad,
+                        "enfants": ch,
+                        "bebe": bb,
+                        "pax": pax,
                     }
 
-                obj, was_created = Fiche.objects.update_or_create(defaults=defaults, **lookup)
-                (created if was_created else updated).append(getattr(obj, "ref", f"{obj.date} {obj.type}"))
-
-            except Exception as e:
-                erreurs.append({"ligne": i + 2, "raison": f"{type(e).__name__}: {e}"})
+                    if has_ref_field:
+                        defaults["ref"] = ref
+
+                    if _is_fk(Fiche, "zone_fk") and zone_obj:
+                        defaults["zone_fk"] = zone_obj
+                    elif "zone" in fiche_fields:
+                        defaults["zone"] = zone_txt or ""
+
+                    if t == "D":
+                        defaults["provenance"] = prov or dest or ""
+                    else:
+                        defaults["destination"] = dest or prov or ""
+
+                    defaults = _sanitize_defaults(Fiche, defaults)
+
+                    # ✅ LOOKUP FIX: si champ ref existe -> (agence, ref) => 1 ligne = 1 fiche
+                    if has_ref_field:
+                        lookup = {"agence": agence, "ref": ref}
+                    else:
+                        # fallback ancien (moins fiable)
+                        lookup = {
+                            "agence": agence,
+                            "type": t,
+                            "date": d,
+                            "numero_vol": vol or "",
+                            "hotel": hotel_obj if _is_fk(Fiche, "hotel") else (hotel_txt or ""),
+                        }
+
+                    obj, was_created = Fiche.objects.update_or_create(defaults=defaults, **lookup)
+                    (created if was_created else updated).append(getattr(obj, "ref", f"{obj.date} {obj.type}"))
+
+                except Exception as e:
+                    erreurs.append({"ligne": i + 2, "raison": f"{type(e).__name__}: {e}"})
+
+        # =========================
+        # BOUCLE PAR PAQUETS (1 transaction par paquet)
+        # =========================
+        next_line = 2
+        try:
+            for df in chain([first], chunks):
+                with transaction.atomic():
+                    process_chunk(df)
+                next_line = int(df.index[-1]) + 3 if len(df) else next_line
+                if progress:
+                    progress(next_line - 2, len(created), len(updated), len(ignored), len(erreurs))
+        except Exception as e:
+            erreurs.append({
+                "ligne": next_line,
+                "raison": f"Lecture interrompue à partir de cette ligne ({type(e).__name__}: {e})",
+            })
+            if progress:
+                progress(next_line - 2, len(created), len(updated), len(ignored), len(erreurs))
 
         return Response(
             {
@@ -2,9 +2,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import io
 import json
-from typing import Any, Dict, Optional, Tuple
+from itertools import chain
+from typing import Any, Dict, Optional
 
 import pandas as pd
 from django.apps import apps
@@ -15,156 +15,27 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.services.dossiers_upsert import (
+    UpsertRow,
+    bulk_upsert_dossiers,
+    upsert_dossiers_row_by_row,
+)
 from apps.services.hotels import get_or_create_hotel_and_assign_zone
-
-
-# ============================================================
-# Helpers fichiers (CSV/XLS/XLSX)
-# ============================================================
-
-def _peek(upload, n: int) -> bytes:
-    pos = upload.tell()
-    head = upload.read(n)
-    upload.seek(pos)
-    return head or b""
-
-
-def is_xlsx(upload) -> bool:
-    head = _peek(upload, 4)
-    return head[:2] == b"PK"  # ZIP
-
-
-def is_xls(upload) -> bool:
-    head = _peek(upload, 8)
-    return head.startswith(b"\xD0\xCF\x11\xE0")  # OLE2
-
-
-def _decode_bytes(data: bytes) -> Tuple[str, str]:
-    for enc in ("utf-8-sig", "utf-8", "cp1252", "latin1"):
-        try:
-            return data.decode(enc), enc
-        except UnicodeDecodeError:
-            continue
-    return data.decode("latin1", errors="replace"), "latin1(replace)"
-
-
-def _sniff_sep(sample: str) -> str:
-    head = "\n".join(sample.splitlines()[:20])
-    candidates = [";", ",", "\t"]
-    counts = {c: head.count(c) for c in candidates}
-    best = max(candidates, key=lambda c: (counts[c], 1 if c == ";" else 0))
-    return best if counts[best] > 0 else ","
-
-
-def read_csv_df(upload) -> pd.DataFrame:
-    upload.seek(0)
-    raw = upload.read()
-    text, _enc = _decode_bytes(raw)
-    sep = _sniff_sep(text[:4096])
-    return pd.read_csv(
-        io.StringIO(text),
-        sep=sep,
-        dtype=str,
-        keep_default_na=True,
-        engine="python",
-    )
+from apps.services.upload_reader import iter_upload_chunks
+from apps.services.import_columns import (
+    date_column,
+    empty_column,
+    int_column,
+    str_column,
+    time_column,
+    type_column,
+)
 
 
 # ============================================================
 # Helpers valeurs / modèles
 # ============================================================
 
-def _to_str(v) -> str:
-    if v is None:
-        return ""
-    s = str(v).strip()
-    return "" if s.lower() in {"nan", "none", "null", "-"} else s
-
-
-def _smart_time(v):
-    """Convertit une valeur Excel/texte en time() ou None."""
-    try:
-        dt = pd.to_datetime(v, errors="coerce")
-        if pd.isna(dt):
-            return None
-        return dt.time()
-    except Exception:
-        return None
-
-
-def _smart_date(v):
-    """
-    Convertit une valeur Excel/texte en date() ou None.
-    Gère:
-      - datetime/date natifs
-      - nombres Excel (séries à partir de 1899-12-30)
-      - chaînes "25/04/2022", "2022-04-25T00:00:00", etc.
-    """
-    import datetime as dt
-
-    if v is None:
-        return None
-
-    if isinstance(v, (dt.datetime, dt.date)):
-        return v.date() if isinstance(v, dt.datetime) else v
-
-    s = str(v).strip()
-    if not s or s.lower() in {"nan", "none", "null", "-"}:
-        return None
-
-    # coupe l'heure
-    for sep in (" ", "T"):
-        if sep in s:
-            s = s.split(sep)[0].strip()
-
-    # nombres Excel
-    try:
-        if s.replace(".", "", 1).isdigit():
-            as_float = float(s)
-            if 30000 <= as_float <= 60000:
-                d = pd.to_datetime(as_float, unit="D", origin="1899-12-30", errors="coerce")
-                if pd.notna(d):
-                    return d.date()
-    except Exception:
-        pass
-
-    try:
-        d = pd.to_datetime(s, dayfirst=True, errors="coerce", infer_datetime_format=True)
-        if pd.notna(d):
-            return d.date()
-    except Exception:
-        pass
-
-    return None
-
-
-def _to_int(v, default=0) -> int:
-    try:
-        import re
-        s = _to_str(v).replace("\u00A0", " ").replace(",", ".")
-        m = re.search(r"[-+]?\d*\.?\d+", s)
-        return int(round(float(m.group(0)))) if m else default
-    except Exception:
-        return default
-
-
-def _normalize_type(v) -> str:
-    """
-    Normalise tout ce qui ressemble à A/D/L/S vers:
-      - "A" pour Arrivées (A,L)
-      - "D" pour Départs (D,S)
-    """
-    s = _to_str(v).upper()
-    import re
-    m = re.search(r"[ADLS]", s)
-    c = (m.group(0) if m else s[:1]) or ""
-    if c in {"A", "L"}:
-        return "A"
-    if c in {"D", "S"}:
-        return "D"
-    return ""
-
-
 def _is_fk(model, fieldname: Optional[str]) -> bool:
     if not fieldname:
         return False
@@ -192,6 +63,7 @@ class ImporterDossierAPIView(APIView):
     POST /api/importer-dossier/
     Form-Data:
       - file, agence, mapping(JSON)
+      - mode (optionnel) : "bulk" (défaut, écritures par paquets) | "row" (update_or_create par ligne)
     """
     parser_classes = [MultiPartParser]
     permission_classes = [IsAuthenticated]
@@ -296,11 +168,19 @@ class ImporterDossierAPIView(APIView):
             "agence": first("agence"),
         }
 
-    @transaction.atomic
     def post(self, request):
-        fichier = request.FILES.get("file")
-        agence_id = request.data.get("agence")
-        mapping_raw = request.data.get("mapping")
+        return self.run_import(request.FILES.get("file"), request.data)
+
+    def run_import(self, fichier, data, *, progress=None):
+        """
+        Logique d'import (aussi appelée par les jobs d'arrière-plan).
+        `progress(lignes, créés, mis_à_jour, ignorés, erreurs)` est appelé après chaque paquet.
+        """
+        agence_id = data.get("agence")
+        mapping_raw = data.get("mapping")
+        write_mode = (data.get("mode") or "bulk").strip().lower()
+        if write_mode not in ("bulk", "row"):
+            write_mode = "bulk"
 
         if not fichier:
             return Response({"error": "Aucun fichier envoyé."}, status=400)
@@ -318,27 +198,21 @@ class ImporterDossierAPIView(APIView):
         AgenceVoyage, Dossier, Hotel, Zone = self._resolve_models()
         agence = get_object_or_404(AgenceVoyage, id=agence_id)
 
-        # lecture fichier
+        # lecture fichier (en flux : paquets de lignes traités/validés un par un)
         try:
-            name = str(getattr(fichier, "name", "")).lower()
-            if name.endswith(".csv") or (
-                not is_xlsx(fichier) and not is_xls(fichier) and name.endswith((".txt", ".dat"))
-            ):
-                df = read_csv_df(fichier)
-            else:
-                fichier.seek(0)
-                df = pd.read_excel(fichier, dtype=str, keep_default_na=True)
+            chunks = iter_upload_chunks(fichier, as_text=True)
+            first = next(chunks, None)
         except Exception as e:
             return Response({"error": f"Fichier illisible ({e})."}, status=400)
 
-        if df is None or df.empty:
+        if first is None or first.empty:
             return Response({"error": "Fichier vide."}, status=400)
 
         # normalisation colonnes
         def norm_col(c):
             return self._norm_key(str(c))
 
-        df.columns = [norm_col(c) for c in df.columns]
+        columns = [norm_col(c) for c in first.columns]
 
         # mapping canonique -> colonne normalisée (telle que df.columns)
         mapping: Dict[str, str] = {}
@@ -351,163 +225,227 @@ class ImporterDossierAPIView(APIView):
         # colonne reference obligatoire si modèle a un champ reference
         if fieldmap["reference"]:
             ref_col = mapping.get("reference")
-            if not ref_col or ref_col not in df.columns:
+            if not ref_col or ref_col not in columns:
                 return Response({"error": "Le mapping doit contenir 'reference'."}, status=400)
 
-        def cell(row, key):
-            col = mapping.get(key)
-            return row.get(col) if (col and col in row.index) else None
-
         created, updated, ignored, erreurs = [], [], [], []
         _hotel_cache: Dict[str, Any] = {}
         _zone_cache: Dict[str, Any] = {}
 
-        for i, row in df.iterrows():
-            try:
-                ref = _to_str(cell(row, "reference"))
-                dt = _smart_date(cell(row, "date"))
-                hv = _smart_time(cell(row, "horaires"))
-                typ = _normalize_type(cell(row, "type_mouvement"))
-                prov = _to_str(cell(row, "provenance"))
-                dest = _to_str(cell(row, "destination"))
-                vol = _to_str(cell(row, "num_vol"))
-                cli = _to_str(cell(row, "client"))
-                hotx = _to_str(cell(row, "hotel"))
-                tit = _to_str(cell(row, "titulaire"))
-                obs = _to_str(cell(row, "observation"))
-                ville = _to_str(cell(row, "ville"))
-                cp = _to_str(cell(row, "code_postal"))
-                zonx = _to_str(cell(row, "zone"))
-
-                ad = _to_int(cell(row, "adulte"))
-                ch = _to_int(cell(row, "enfants"))
-                bb = _to_int(cell(row, "bb_gratuit"))
-                paxr = _to_int(cell(row, "pax"))
-                pax = paxr if paxr > 0 else (ad + ch + bb)
-
-                # sécurité: sans date/type, on ignore
-                if not dt or not typ:
-                    ignored.append({"ligne": i + 2, "raison": "date/type manquants"})
-                    continue
-
-                # ===================================================
-                # Résolution HOTEL + ZONE
-                # - La ZONE doit venir du calcul lat/lng de l'hôtel
-                # - On n'insère PAS de zones depuis le fichier import
-                # ===================================================
-                hotel_val = None
-                zone_val = None
-
-                # 1) hôtel FK => enrichissement + zone auto
-                if fieldmap.get("hotel") and _is_fk(Dossier, fieldmap["hotel"]) and hotx:
-                    hk = hotx.strip().lower()
-
-                    if hk in _hotel_cache:
-                        hotel_val = _hotel_cache[hk]
-                    else:
-                        # Hint pour Google: ville/cp (améliore beaucoup)
-                        hint_parts = []
-                        if ville:
-                            hint_parts.append(ville)
-                        if cp:
-                            hint_parts.append(cp)
-                        # Décommente si tu veux forcer le pays:
-                        # hint_parts.append("Tunisie")
-                        hint = ", ".join([p for p in hint_parts if p]) if hint_parts else None
-
-                        hotel_val = get_or_create_hotel_and_assign_zone(hotx, hint_text=hint)
-                        _hotel_cache[hk] = hotel_val
-
-                    if hotel_val and getattr(hotel_val, "zone_id", None):
-                        zone_val = hotel_val.zone
-
-                # 2) override zone via colonne "zone" (optionnel)
-                # => seulement si une zone existe déjà en base
-                if (
-                    zone_val is None
-                    and fieldmap.get("zone")
-                    and _is_fk(Dossier, fieldmap["zone"])
-                    and zonx
-                ):
-                    zk = zonx.strip().lower()
-                    if zk in _zone_cache:
-                        zone_val = _zone_cache[zk]
-                    else:
-                        zone_val = Zone.objects.filter(nom__iexact=zonx).first()
-                        _zone_cache[zk] = zone_val
-
-                # =========================
-                # data (defaults)
-                # =========================
-                data: Dict[str, Any] = {
-                    (fieldmap.get("agence") or "agence"): agence,
-                    fieldmap.get("date"): dt,
-                    fieldmap.get("horaires"): hv,
-                    fieldmap.get("provenance"): prov,
-                    fieldmap.get("destination"): dest,
-                    fieldmap.get("type_mouvement"): typ,
-                    fieldmap.get("num_vol"): vol,
-                    fieldmap.get("client"): cli,
-                    fieldmap.get("titulaire"): tit,
-                    fieldmap.get("pax"): pax,
-                    fieldmap.get("adulte"): ad,
-                    fieldmap.get("enfants"): ch,
-                    fieldmap.get("bb_gratuit"): bb,
-                    fieldmap.get("ville"): ville,
-                    fieldmap.get("code_postal"): cp,
-                }
-
-                # observation
-                if "observation" in valid_fields:
-                    data["observation"] = obs
-
-                # hotel
-                if fieldmap.get("hotel"):
-                    if _is_fk(Dossier, fieldmap["hotel"]):
-                        if hotel_val:
-                            data[fieldmap["hotel"]] = hotel_val
-                    else:
-                        data[fieldmap["hotel"]] = hotx or None
-
-                # zone
-                if fieldmap.get("zone"):
-                    if _is_fk(Dossier, fieldmap["zone"]):
-                        if zone_val:
-                            data[fieldmap["zone"]] = zone_val
-                    else:
-                        # si champ zone est texte (rare) => on stocke le libellé
-                        data[fieldmap["zone"]] = zonx or None
-
-                # purge champs inexistants + None keys
-                data = {k: v for k, v in data.items() if k and k in valid_fields}
-
-                # =========================
-                # LOOKUP ANTI-ÉCRASEMENT
-                # 1 ligne excel = 1 dossier-mouvement
-                # =========================
-                lookup: Dict[str, Any] = {(fieldmap.get("agence") or "agence"): agence}
-
-                # ref si dispo (utile mais pas suffisant)
-                if fieldmap.get("reference") and ref:
-                    lookup[fieldmap["reference"]] = ref
-
-                # clé mouvement (obligatoire)
-                if fieldmap.get("date") and dt:
-                    lookup[fieldmap["date"]] = dt
-                if fieldmap.get("type_mouvement") and typ:
-                    lookup[fieldmap["type_mouvement"]] = typ
-
-                # renforce l'unicité si présent
-                if fieldmap.get("horaires") and hv:
-                    lookup[fieldmap["horaires"]] = hv
-                if fieldmap.get("num_vol") and vol:
-                    lookup[fieldmap["num_vol"]] = vol
-
-                obj, was_created = Dossier.objects.update_or_create(defaults=data, **lookup)
-                (created if was_created else updated).append(ref or str(obj.pk))
-
-            except Exception as e:
-                erreurs.append({"ligne": i + 2, "raison": f"{type(e).__name__}: {e}"})
+        def process_chunk(df):
+            # =========================
+            # NORMALISATION PAR COLONNE
+            # (une passe vectorisée par colonne, avant toute écriture)
+            # =========================
+            def col(key):
+                c = mapping.get(key)
+                return df[c] if (c and c in df.columns) else empty_column(df.index)
+
+            ad_col = int_column(col("adulte"))
+            ch_col = int_column(col("enfants"))
+            bb_col = int_column(col("bb_gratuit"))
+            pax_col = int_column(col("pax"))
+            sum_col = ad_col.astype(int) + ch_col.astype(int) + bb_col.astype(int)
+
+            frame = pd.DataFrame(
+                {
+                    "ref": str_column(col("reference")),
+                    "dt": date_column(col("date")),
+                    "hv": time_column(col("horaires")),
+                    "typ": type_column(col("type_mouvement")),
+                    "prov": str_column(col("provenance")),
+                    "dest": str_column(col("destination")),
+                    "vol": str_column(col("num_vol")),
+                    "cli": str_column(col("client")),
+                    "hotx": str_column(col("hotel")),
+                    "tit": str_column(col("titulaire")),
+                    "obs": str_column(col("observation")),
+                    "ville": str_column(col("ville")),
+                    "cp": str_column(col("code_postal")),
+                    "zonx": str_column(col("zone")),
+                    "ad": ad_col,
+                    "ch": ch_col,
+                    "bb": bb_col,
+                    "pax": pax_col.where(pax_col.astype(int) > 0, sum_col).astype(object),
+                },
+                index=df.index,
+            )
+
+            pending: list[UpsertRow] = []
+
+            for i, r in zip(frame.index, frame.to_dict("records")):
+                try:
+                    ref, dt, hv, typ = r["ref"], r["dt"], r["hv"], r["typ"]
+                    prov, dest, vol, cli = r["prov"], r["dest"], r["vol"], r["cli"]
+                    hotx, tit, obs = r["hotx"], r["tit"], r["obs"]
+                    ville, cp, zonx = r["ville"], r["cp"], r["zonx"]
+                    ad, ch, bb, pax = r["ad"], r["ch"], r["bb"], r["pax"]
+
+                    # sécurité: sans date/type, on ignore
+                    if not dt or not typ:
+                        ignored.append({"ligne": i + 2, "raison": "date/type manquants"})
+                        continue
+
+                    # ===================================================
+                    # Résolution HOTEL + ZONE
+                    # - La ZONE doit venir du calcul lat/lng de l'hôtel
+                    # - On n'insère PAS de zones depuis le fichier import
+                    # ===================================================
+                    hotel_val = None
+                    zone_val = None
+
+                    # 1) hôtel FK => zone si l'hôtel est déjà géocodé ; sinon il est
+                    #    créé "pending" et le worker d'enrichissement complétera
+                    #    Hotel.zone + Dossier.zone_fk après l'import (aucun appel réseau ici)
+                    if fieldmap.get("hotel") and _is_fk(Dossier, fieldmap["hotel"]) and hotx:
+                        hk = hotx.strip().lower()
+
+                        if hk in _hotel_cache:
+                            hotel_val = _hotel_cache[hk]
+                        else:
+                            # Hint pour Google: ville/cp (améliore beaucoup)
+                            hint_parts = []
+                            if ville:
+                                hint_parts.append(ville)
+                            if cp:
+                                hint_parts.append(cp)
+                            # Décommente si tu veux forcer le pays:
+                            # hint_parts.append("Tunisie")
+                            hint = ", ".join([p for p in hint_parts if p]) if hint_parts else None
+
+                            hotel_val = get_or_create_hotel_and_assign_zone(hotx, hint_text=hint)
+                            _hotel_cache[hk] = hotel_val
+
+                        if hotel_val and getattr(hotel_val, "zone_id", None):
+                            zone_val = hotel_val.zone
+
+                    # 2) override zone via colonne "zone" (optionnel)
+                    # => seulement si une zone existe déjà en base
+                    if (
+                        zone_val is None
+                        and fieldmap.get("zone")
+                        and _is_fk(Dossier, fieldmap["zone"])
+                        and zonx
+                    ):
+                        zk = zonx.strip().lower()
+                        if zk in _zone_cache:
+                            zone_val = _zone_cache[zk]
+                        else:
+                            zone_val = Zone.objects.filter(nom__iexact=zonx).first()
+                            _zone_cache[zk] = zone_val
+
+                    # =========================
+                    # data (defaults)
+                    # =========================
+                    data: Dict[str, Any] = {
+                        (fieldmap.get("agence") or "agence"): agence,
+                        fieldmap.get("date"): dt,
+                        fieldmap.get("horaires"): hv,
+                        fieldmap.get("provenance"): prov,
+                        fieldmap.get("destination"): dest,
+                        fieldmap.get("type_mouvement"): typ,
+                        fieldmap.get("num_vol"): vol,
+                        fieldmap.get("client"): cli,
+                        fieldmap.get("titulaire"): tit,
+                        fieldmap.get("pax"): pax,
+                        fieldmap.get("adulte"): ad,
+                        fieldmap.get("enfants"): ch,
+                        fieldmap.get("bb_gratuit"): bb,
+                        fieldmap.get("ville"): ville,
+                        fieldmap.get("code_postal"): cp,
+                    }
+
+                    # observation
+                    if "observation" in valid_fields:
+                        data["observation"] = obs
+
+                    # hotel
+                    if fieldmap.get("hotel"):
+                        if _is_fk(Dossier, fieldmap["hotel"]):
+                            if hotel_val:
+                                data[fieldmap["hotel"]] = hotel_val
+                        else:
+                            data[fieldmap["hotel"]] = hotx or None
+
+                    # zone
+                    if fieldmap.get("zone"):
+                        if _is_fk(Dossier, fieldmap["zone"]):
+                            if zone_val:
+                                data[fieldmap["zone"]] = zone_val
+                        else:
+                            # si champ zone est texte (rare) => on stocke le libellé
+                            data[fieldmap["zone"]] = zonx or None
+
+                    # purge champs inexistants + None keys
+                    data = {k: v for k, v in data.items() if k and k in valid_fields}
+
+                    # =========================
+                    # LOOKUP ANTI-ÉCRASEMENT
+                    # 1 ligne excel = 1 dossier-mouvement
+                    # =========================
+                    lookup: Dict[str, Any] = {(fieldmap.get("agence") or "agence"): agence}
+
+                    # ref si dispo (utile mais pas suffisant)
+                    if fieldmap.get("reference") and ref:
+                        lookup[fieldmap["reference"]] = ref
+
+                    # clé mouvement (obligatoire)
+                    if fieldmap.get("date") and dt:
+                        lookup[fieldmap["date"]] = dt
+                    if fieldmap.get("type_mouvement") and typ:
+                        lookup[fieldmap["type_mouvement"]] = typ
+
+                    # renforce l'unicité si présent
+                    if fieldmap.get("horaires") and hv:
+                        lookup[fieldmap["horaires"]] = hv
+                    if fieldmap.get("num_vol") and vol:
+                        lookup[fieldmap["num_vol"]] = vol
+
+                    pending.append(UpsertRow(line=i + 2, ref=ref, lookup=lookup, data=data))
+
+                except Exception as e:
+                    erreurs.append({"ligne": i + 2, "raison": f"{type(e).__name__}: {e}"})
+
+            # =========================
+            # ÉCRITURE
+            # =========================
+            if write_mode == "row":
+                result = upsert_dossiers_row_by_row(Dossier, pending)
+            else:
+                result = bulk_upsert_dossiers(
+                    Dossier,
+                    pending,
+                    agence=agence,
+                    date_field=fieldmap.get("date") or "date",
+                    bucket_fields=tuple(
+                        f for f in (fieldmap.get("date"), fieldmap.get("type_mouvement")) if f
+                    ),
+                )
+            created.extend(result.created)
+            updated.extend(result.updated)
+            erreurs.extend(result.erreurs)
+
+        # =========================
+        # BOUCLE PAR PAQUETS (1 transaction par paquet)
+        # =========================
+        next_line = 2
+        try:
+            for df in chain([first], chunks):
+                df.columns = columns
+                with transaction.atomic():
+                    process_chunk(df)
+                next_line = int(df.index[-1]) + 3 if len(df) else next_line
+                if progress:
+                    progress(next_line - 2, len(created), len(updated), len(ignored), len(erreurs))
+        except Exception as e:
+            erreurs.append({
+                "ligne": next_line,
+                "raison": f"Lecture interrompue à partir de cette ligne ({type(e).__name__}: {e})",
+            })
+            if progress:
+                progress(next_line - 2, len(created), len(updated), len(ignored), len(erreurs))
+
+        erreurs.sort(key=lambda x: x["ligne"])
 
         return Response(
             {
@@ -522,6 +460,7 @@ class ImporterDossierAPIView(APIView):
                 "lignes_ignorees": ignored,
                 "erreurs": erreurs,
                 "lookup_mode": "agence+ref+date+type+horaires+vol",
+                "write_mode": write_mode,
             },
             status=200,
         )
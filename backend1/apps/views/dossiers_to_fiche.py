@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from django.db import transaction
 from django.utils import timezone
@@ -12,7 +12,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from apps.models import Dossier, FicheMouvement, AgenceVoyage
+from apps.models import Dossier, FicheMouvement, AgenceVoyage, Zone, reserve_daily_references
+from apps.pagination import KeysetPagination
+from apps.services import consolidation, versions
 from apps.views.helpers import _ensure_same_agence_or_superadmin
 
 
@@ -44,6 +46,76 @@ def _clean_ref(s):
     return (s or "").strip()
 
 
+def _fiche_from_dossiers(agence, dossiers, *, type_mvt=None, date_val=None, numero_vol=None, aeroport=None, remarque=None, user=None):
+    """FicheMouvement (non enregistrée, sans ref) regroupant les dossiers donnés."""
+    # type mouvement
+    if not type_mvt:
+        type_mvt = (dossiers[0].type_mouvement or "A").strip().upper()
+
+    # date
+    date_val = date_val or dossiers[0].date or timezone.now().date()
+
+    # horaires (la plus tôt)
+    horaires_list = [d.horaires for d in dossiers if d.horaires]
+    horaires_val = min(horaires_list) if horaires_list else None
+
+    # aéroport
+    if aeroport:
+        if type_mvt in DEPART_TYPES:
+            provenance_val = None
+            destination_val = aeroport
+        else:
+            provenance_val = aeroport
+            destination_val = None
+    else:
+        provenance_val = dossiers[0].provenance
+        destination_val = dossiers[0].destination
+
+    pax_total = sum(_safe_int(getattr(d, "pax", 0)) for d in dossiers)
+    adulte_total = sum(_safe_int(getattr(d, "adulte", 0)) for d in dossiers)
+    enfants_total = sum(_safe_int(getattr(d, "enfants", 0)) for d in dossiers)
+    bebe_total = sum(_safe_int(getattr(d, "bb_gratuit", getattr(d, "bebe", 0))) for d in dossiers)
+
+    # hotel commun ?
+    hotel_fk_id = dossiers[0].hotel_fk_id
+    same_hotel = hotel_fk_id and all(d.hotel_fk_id == hotel_fk_id for d in dossiers)
+    hotel_obj = dossiers[0].hotel_fk if same_hotel else None
+
+    # multi hôtels -> hotel_schedule
+    hotel_schedule = []
+    if not same_hotel:
+        by_hotel = defaultdict(int)
+        for d in dossiers:
+            label = d.hotel or (d.hotel_fk.nom if d.hotel_fk_id else "—")
+            by_hotel[label] += _safe_int(getattr(d, "pax", 0))
+        hotel_schedule = [{"hotel": h, "pax": p} for h, p in by_hotel.items()]
+
+    return FicheMouvement(
+        agence=agence,
+        type=type_mvt,
+        date=date_val,
+        horaires=horaires_val,
+        provenance=provenance_val,
+        destination=destination_val,
+        numero_vol=numero_vol or dossiers[0].numero_vol,
+        client_to=dossiers[0].client,
+        pax=pax_total,
+        adulte=adulte_total,
+        enfants=enfants_total,
+        bebe=bebe_total,
+        hotel=hotel_obj,
+        hotel_schedule=hotel_schedule,
+
+        # ✅ ce champ-là doit être alimenté MANUELLEMENT par le front
+        remarque=remarque,
+
+        # ❌ on ne remplit PLUS observation automatiquement
+        # observation=... (supprimé)
+
+        created_by=user,
+    )
+
+
 class DossiersToFicheAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -72,8 +144,11 @@ class DossiersToFicheAPIView(APIView):
 
         qs = qs.select_related("hotel_fk", "hotel_fk__zone", "zone_fk")
 
+        paginator = KeysetPagination(ordering=("date", "hotel", "titulaire"))
+        page = paginator.paginate_queryset(qs, request, view=self)
+
         data = []
-        for d in qs.order_by("date", "hotel", "titulaire"):
+        for d in page:
             hotel_label = d.hotel or (d.hotel_fk.nom if getattr(d, "hotel_fk_id", None) else None)
             hotel_lat = getattr(d.hotel_fk, "lat", None) if getattr(d, "hotel_fk_id", None) else None
             hotel_lng = getattr(d.hotel_fk, "lng", None) if getattr(d, "hotel_fk_id", None) else None
@@ -116,7 +191,7 @@ class DossiersToFicheAPIView(APIView):
                 }
             )
 
-        return Response(data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(data)
 
     @transaction.atomic
     def post(self, request, *args, **kwargs):
@@ -159,51 +234,7 @@ class DossiersToFicheAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # type mouvement
-        if kind == "arrivee":
-            type_mvt = "A"
-        elif kind == "depart":
-            type_mvt = "D"
-        else:
-            type_mvt = (dossiers[0].type_mouvement or "A").strip().upper()
-
-        # date
-        date_val = _parse_date(date_str) or dossiers[0].date or timezone.now().date()
-
-        # horaires (la plus tôt)
-        horaires_list = [d.horaires for d in dossiers if d.horaires]
-        horaires_val = min(horaires_list) if horaires_list else None
-
-        # aéroport
-        if aeroport:
-            if type_mvt in DEPART_TYPES:
-                provenance_val = None
-                destination_val = aeroport
-            else:
-                provenance_val = aeroport
-                destination_val = None
-        else:
-            provenance_val = dossiers[0].provenance
-            destination_val = dossiers[0].destination
-
-        pax_total = sum(_safe_int(getattr(d, "pax", 0)) for d in dossiers)
-        adulte_total = sum(_safe_int(getattr(d, "adulte", 0)) for d in dossiers)
-        enfants_total = sum(_safe_int(getattr(d, "enfants", 0)) for d in dossiers)
-        bebe_total = sum(_safe_int(getattr(d, "bb_gratuit", getattr(d, "bebe", 0))) for d in dossiers)
-
-        # hotel commun ?
-        hotel_fk_id = dossiers[0].hotel_fk_id
-        same_hotel = hotel_fk_id and all(d.hotel_fk_id == hotel_fk_id for d in dossiers)
-        hotel_obj = dossiers[0].hotel_fk if same_hotel else None
-
-        # multi hôtels -> hotel_schedule
-        hotel_schedule = []
-        if not same_hotel:
-            by_hotel = defaultdict(int)
-            for d in dossiers:
-                label = d.hotel or (d.hotel_fk.nom if d.hotel_fk_id else "—")
-                by_hotel[label] += _safe_int(getattr(d, "pax", 0))
-            hotel_schedule = [{"hotel": h, "pax": p} for h, p in by_hotel.items()]
+        type_mvt = {"arrivee": "A", "depart": "D"}.get(kind)
 
         dossier_refs = [_clean_ref(getattr(d, "reference", "")) for d in dossiers]
         dossier_refs = [r for r in dossier_refs if r]
@@ -213,33 +244,18 @@ class DossiersToFicheAPIView(APIView):
         else:
             base_ref = f"AG{agence.id}-{len(dossiers)}DOS"
 
-        ref = f"{base_ref}-{timezone.now().strftime('%Y%m%d%H%M%S%f')}"[:50]
-
-        fiche = FicheMouvement.objects.create(
-            ref=ref,
-            agence=agence,
-            type=type_mvt,
-            date=date_val,
-            horaires=horaires_val,
-            provenance=provenance_val,
-            destination=destination_val,
-            numero_vol=numero_vol or dossiers[0].numero_vol,
-            client_to=dossiers[0].client,
-            pax=pax_total,
-            adulte=adulte_total,
-            enfants=enfants_total,
-            bebe=bebe_total,
-            hotel=hotel_obj,
-            hotel_schedule=hotel_schedule,
-
-            # ✅ ce champ-là doit être alimenté MANUELLEMENT par le front
+        fiche = _fiche_from_dossiers(
+            agence,
+            dossiers,
+            type_mvt=type_mvt,
+            date_val=_parse_date(date_str),
+            numero_vol=numero_vol,
+            aeroport=aeroport,
             remarque=remarque_val,
-
-            # ❌ on ne remplit PLUS observation automatiquement
-            # observation=... (supprimé)
-
-            created_by=request.user,
+            user=request.user,
         )
+        fiche.ref = f"{base_ref}-{timezone.now().strftime('%Y%m%d%H%M%S%f')}"[:50]
+        fiche.save()
 
         # ✅ lien dossier -> fiche
         for d in dossiers:
@@ -248,3 +264,112 @@ class DossiersToFicheAPIView(APIView):
             d.save(update_fields=["fiche_mouvement", "is_transformed"])
 
         return Response({"fiche_ids": [fiche.id]}, status=status.HTTP_201_CREATED)
+
+
+class DossiersConsolidationAPIView(APIView):
+    """
+    Regroupement automatique des dossiers libres d'une journée (apps.services.consolidation).
+      POST .../auto/preview/ : fiches proposées
+      POST .../auto/commit/  : crée toutes les fiches et relie tous les dossiers (une transaction)
+    Body : {agence, date, kind?: arrivee|depart}
+    """
+    permission_classes = [IsAuthenticated]
+    commit = False
+
+    def post(self, request, *args, **kwargs):
+        payload = request.data or {}
+        agence_id = _safe_int(payload.get("agence"))
+        date_val = _parse_date(payload.get("date"))
+        kind = (payload.get("kind") or "").strip().lower()
+
+        if not agence_id or not date_val:
+            return Response(
+                {"detail": "Champs 'agence' et 'date' sont obligatoires."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # ✅ sécurité agence
+        _ensure_same_agence_or_superadmin(request, agence_id)
+
+        agence = AgenceVoyage.objects.filter(pk=agence_id).first()
+        if agence is None:
+            return Response({"detail": "Agence inconnue."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            qs = Dossier.objects.filter(agence=agence, date=date_val, fiche_mouvement__isnull=True)
+            if kind == "depart":
+                qs = qs.filter(type_mouvement__in=DEPART_TYPES)
+            elif kind == "arrivee":
+                qs = qs.filter(type_mouvement__in=ARRIVEE_TYPES)
+            qs = qs.select_related("hotel_fk", "zone_fk").order_by("id")
+            if self.commit:
+                qs = qs.select_for_update(of=("self",))
+
+            proposals = consolidation.consolidate(list(qs), consolidation.fleet_capacities(agence.id))
+            fiches = self._create(agence, proposals, request.user) if self.commit and proposals else []
+
+        zones = dict(Zone.objects.filter(id__in={p.zone_id for p in proposals if p.zone_id}).values_list("id", "nom"))
+        data = []
+        for i, p in enumerate(proposals):
+            by_hotel = defaultdict(int)
+            for d in p.dossiers:
+                by_hotel[d.hotel or (d.hotel_fk.nom if d.hotel_fk_id else "—")] += _safe_int(d.pax)
+            data.append({
+                "fiche_id": fiches[i].id if fiches else None,
+                "ref": fiches[i].ref if fiches else None,
+                "type": p.type,
+                "date": p.date.isoformat() if p.date else None,
+                "horaires": p.horaires.isoformat() if p.horaires else None,
+                "numero_vol": p.dossiers[0].numero_vol,
+                "aeroport": p.aeroport or None,
+                "zone_id": p.zone_id,
+                "zone_nom": zones.get(p.zone_id) or "—",
+                "pax": p.pax,
+                "capacite": p.capacite,
+                "hors_capacite": p.oversize,
+                "hotels": [{"hotel": h, "pax": n} for h, n in by_hotel.items()],
+                "dossier_ids": [d.id for d in p.dossiers],
+            })
+
+        return Response(
+            {
+                "dry_run": not self.commit,
+                "summary": {
+                    "dossiers": sum(len(p.dossiers) for p in proposals),
+                    "fiches": len(proposals),
+                    "pax": sum(p.pax for p in proposals),
+                    "hors_capacite": sum(1 for p in proposals if p.oversize),
+                },
+                "fiches": data,
+            },
+            status=status.HTTP_201_CREATED if fiches else status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def _create(agence, proposals, user):
+        """Insertions groupées (pas de save() ni de signaux : ref et versions tenues ici)."""
+        fiches = [
+            _fiche_from_dossiers(agence, p.dossiers, type_mvt=p.type, date_val=p.date, user=user) for p in proposals
+        ]
+        # références : un bloc réservé par jour (une seule mise à jour du compteur)
+        days = Counter(f.date for f in fiches)
+        refs = {day: iter(reserve_daily_references("FM", day, n)) for day, n in days.items()}
+        for fiche in fiches:
+            fiche.ref = next(refs[fiche.date])
+        FicheMouvement.objects.bulk_create(fiches)
+        if fiches[0].pk is None:
+            # MySQL : bulk_create ne renvoie pas les pk -> relecture par ref
+            ids = dict(FicheMouvement.objects.filter(ref__in=[f.ref for f in fiches]).values_list("ref", "id"))
+            for f in fiches:
+                f.pk = ids[f.ref]
+                f._state.adding = False
+
+        dossiers = []
+        for p, fiche in zip(proposals, fiches):
+            for d in p.dossiers:
+                d.fiche_mouvement = fiche
+                d.is_transformed = True
+                dossiers.append(d)
+        Dossier.objects.bulk_update(dossiers, ["fiche_mouvement", "is_transformed"], batch_size=500)
+        versions.bump_versions([agence.id], [versions.FICHE, versions.DOSSIER])
+        return fiches
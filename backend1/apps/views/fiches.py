@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import re
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Any, Dict, List
 
@@ -11,7 +12,7 @@ from django.db import transaction
 from django.db.models import Q, Count, Sum
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_date, parse_datetime
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -19,7 +20,7 @@ from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework import viewsets, status
 
-from apps.views.helpers import _ensure_same_agence_or_superadmin
+from apps.views.helpers import VersionedListMixin, _ensure_same_agence_or_superadmin, _user_agence, _user_role
 
 from apps.models import (
     Dossier,
@@ -28,7 +29,13 @@ from apps.models import (
     Vehicule,
     Chauffeur,
     MissionRessource,
+    reserve_daily_references,
 )
+from apps.pagination import KeysetPagination
+from apps.services import auto_assign, availability, travel_times, versions
+from apps.services.mission_window import sync_mission_windows
+from apps.services.response_cache import cached_response
+from apps.services.routing import sequence_pickups
 from apps.serializers import FicheMouvementSerializer, MissionSerializer
 
 
@@ -117,7 +124,8 @@ def _hhmm_to_dt_near(hhmm: str, ref_dt: datetime) -> datetime:
 def _group_hotels_from_dossiers(fiche: FicheMouvement) -> List[Dict[str, Any]]:
     """
     Fallback si le front n’envoie rien : on agrège pax par hôtel.
-    ⚠️ On ne trie PAS pour ne pas casser un éventuel ordre métier.
+    ⚠️ On ne trie PAS pour ne pas casser un éventuel ordre métier (l'ordre de
+    ramassage des départs est calculé ensuite par _route_departure).
     """
     rel = getattr(fiche, "dossiers", None)
     if rel is None:
@@ -143,6 +151,35 @@ def _group_hotels_from_dossiers(fiche: FicheMouvement) -> List[Dict[str, Any]]:
     return [{"hotel": k, "pax": agg.get(k, 0)} for k in order]
 
 
+def _route_departure(fiche: FicheMouvement, rows: List[Dict[str, Any]], optimize: bool = True):
+    """
+    Départ : ordre de ramassage géographique (apps.services.routing) se terminant
+    à l'aéroport, et minutes de chaque hôtel jusqu'à l'arrêt suivant.
+    Un pickup_minutes saisi sur la ligne l'emporte sur l'estimation ; tronçon
+    non géolocalisé => DEFAULT_PICKUP_PER_HOTEL_MIN.
+    -> [(ligne, minutes), ...] dans l'ordre de ramassage
+    """
+    route = sequence_pickups(
+        [it["hotel"] for it in rows], fiche.destination or fiche.provenance, optimize=optimize
+    )
+    out = []
+    for i, leg in zip(route.order, route.leg_minutes):
+        minutes = rows[i].get("pickup_minutes")
+        if minutes is None:
+            minutes = leg if leg is not None else DEFAULT_PICKUP_PER_HOTEL_MIN
+        out.append((rows[i], minutes))
+    return out
+
+
+def _arrival_route_minutes(fiche: FicheMouvement, hotels: List[str]) -> List[int]:
+    """
+    Arrivée : minutes aéroport -> hôtel de chaque ligne, depuis la matrice des
+    temps de trajet (apps.services.travel_times) ; inconnu => DEFAULT_ARR_BUFFER_MIN.
+    """
+    known = travel_times.minutes_from(fiche.provenance or fiche.destination, hotels)
+    return [DEFAULT_ARR_BUFFER_MIN if m is None else m for m in known]
+
+
 def _ensure_schedule_exists_for_fiche(f: FicheMouvement) -> None:
     """
     Si hotel_schedule est vide => on le génère automatiquement (fallback dossiers).
@@ -168,15 +205,15 @@ def _ensure_schedule_exists_for_fiche(f: FicheMouvement) -> None:
 
         total = 0
         out = []
-        for it in reversed(rows):
-            total += DEFAULT_PICKUP_PER_HOTEL_MIN
+        for it, minutes in reversed(_route_departure(f, rows)):
+            total += minutes
             pickup_dt = dt_airport - timedelta(minutes=total)
 
             out.append(
                 {
                     "hotel": it["hotel"],
                     "pax": it.get("pax", 0),
-                    "pickup_minutes": DEFAULT_PICKUP_PER_HOTEL_MIN,
+                    "pickup_minutes": minutes,
                     "heure_vol": _time_to_hhmm(f.horaires),
                     "heure_aeroport": dt_airport.strftime("%H:%M"),
                     "heure_pickup": pickup_dt.strftime("%H:%M"),
@@ -195,12 +232,11 @@ def _ensure_schedule_exists_for_fiche(f: FicheMouvement) -> None:
     # Arrivée
     if type_mvt in ARRIVEE_TYPES:
         arr_wait = DEFAULT_ARR_WAIT_MIN
-        route_min = DEFAULT_ARR_BUFFER_MIN
         dt_aeroport = base_dt + timedelta(minutes=arr_wait)
-        dt_depot_default = dt_aeroport + timedelta(minutes=route_min)
 
         out = []
-        for it in rows:
+        for it, route_min in zip(rows, _arrival_route_minutes(f, [it["hotel"] for it in rows])):
+            dt_depot_default = dt_aeroport + timedelta(minutes=route_min)
             out.append(
                 {
                     "hotel": it["hotel"],
@@ -307,6 +343,153 @@ def _infer_window_and_lieux_from_fiches(fiches: list[FicheMouvement], mission: M
     return start_dt, end_dt, aeroport, last_depot_hotel
 
 
+# =========================
+# Conversion en lot (fiches -> missions)
+# =========================
+def _fleet_conflicts(groups: List[Dict[str, Any]]) -> Dict[int, str]:
+    """
+    Conflits véhicule / chauffeur de tout le lot (base + intra-lot) : ressources
+    verrouillées puis UNE requête par type, dans la transaction appelante.
+    """
+    availability.lock_resources(
+        [g["vehicule"].pk for g in groups if g.get("vehicule") is not None],
+        [g["chauffeur"].pk for g in groups if g.get("chauffeur") is not None],
+    )
+    errors: Dict[int, str] = {}
+    for kind, attr, label in (
+        (availability.VEHICULE, "vehicule", "Véhicule"),
+        (availability.CHAUFFEUR, "chauffeur", "Chauffeur"),
+    ):
+        positions = [i for i, g in enumerate(groups) if g.get(attr) is not None]
+        items = [(groups[i][attr].pk, groups[i]["start"], groups[i]["end"]) for i in positions]
+        for pos, found in availability.batch_conflicts(kind, items).items():
+            if any(origin == "affectation" for origin, _ in found):
+                message = f"{label} déjà occupé sur ce créneau."
+            else:
+                message = f"{label} sur des créneaux qui se chevauchent dans le lot."
+            errors.setdefault(positions[pos], message)
+    return errors
+
+
+def _create_missions_bulk(agence, groups: List[Dict[str, Any]], user):
+    """
+    groups : [{fiches, vehicule, chauffeur, start, end, lieu_depart, lieu_arrivee}, ...]
+    Missions + affectations en insertions groupées. bulk_create ne passe ni par
+    save() ni par les signaux : références, fenêtres, index de disponibilité,
+    versions et position des véhicules sont donc tenus ici.
+    -> ({position: mission}, {position: erreur})
+    """
+    errors = _fleet_conflicts(groups)
+    valid = [(i, g) for i, g in enumerate(groups) if i not in errors]
+    if not valid:
+        return {}, errors
+
+    # références : un bloc réservé par jour (une seule mise à jour du compteur)
+    days = Counter(g["fiches"][0].date for _, g in valid)
+    refs = {day: iter(reserve_daily_references("M", day, n)) for day, n in days.items()}
+
+    missions = []
+    for _, g in valid:
+        first = g["fiches"][0]
+        observations = [f.observation.strip() for f in g["fiches"] if f.observation]
+        missions.append(Mission(
+            agence=agence,
+            type="T",
+            reference=next(refs[first.date]),
+            date=first.date,
+            horaires=first.horaires,
+            numero_vol=first.numero_vol,
+            aeroport=g.get("aeroport") or first.provenance or first.destination,
+            observation="\n".join(dict.fromkeys(observations)),
+            created_by=user,
+            is_converted_from_fiche=True,
+            vehicule=g.get("vehicule"),
+            chauffeur=g.get("chauffeur"),
+        ))
+    Mission.objects.bulk_create(missions)
+    if missions[0].pk is None:
+        # MySQL : bulk_create ne renvoie pas les pk -> relecture par référence
+        ids = dict(Mission.objects.filter(reference__in=[m.reference for m in missions]).values_list("reference", "id"))
+        for m in missions:
+            m.pk = ids[m.reference]
+            m._state.adding = False
+
+    fiches, affectations = [], []
+    for m, (_, g) in zip(missions, valid):
+        for f in g["fiches"]:
+            f.mission = m
+            fiches.append(f)
+        affectations.append(MissionRessource(
+            mission=m,
+            vehicule=g.get("vehicule"),
+            chauffeur=g.get("chauffeur"),
+            date_heure_debut=g["start"],
+            date_heure_fin=g["end"],
+            lieu_depart=g.get("lieu_depart"),
+            lieu_arrivee=g.get("lieu_arrivee"),
+        ))
+    FicheMouvement.objects.bulk_update(fiches, ["mission"], batch_size=500)
+    MissionRessource.objects.bulk_create(affectations)
+
+    mission_ids = [m.pk for m in missions]
+    availability.notify_affectations_changed(
+        list(MissionRessource.objects.filter(mission_id__in=mission_ids).values_list("id", flat=True))
+    )
+    sync_mission_windows(mission_ids)
+    versions.bump_versions([agence.id], [versions.MISSION, versions.FICHE, versions.AFFECTATION])
+
+    # position des véhicules : lieu de leur dernière affectation du lot (cf. signal post_save)
+    last: Dict[int, MissionRessource] = {}
+    for a in affectations:
+        if a.vehicule_id and (a.lieu_arrivee or a.lieu_depart):
+            if a.vehicule_id not in last or a.date_heure_fin > last[a.vehicule_id].date_heure_fin:
+                last[a.vehicule_id] = a
+    for a in last.values():
+        a.vehicule.update_position(a.lieu_arrivee or a.lieu_depart)
+
+    return {i: m for m, (i, _) in zip(missions, valid)}, errors
+
+
+def _auto_assign_jobs(fiches: List[FicheMouvement]):
+    """
+    Fiches -> courses pour apps.services.auto_assign (schedule généré au besoin,
+    fenêtre et lieux comme to_mission).
+    -> (jobs, {fiche_id: (debut, fin, lieu_depart, lieu_arrivee)}, {fiche_id: erreur})
+    """
+    jobs, windows, errors = [], {}, {}
+    for f in fiches:
+        try:
+            _ensure_schedule_exists_for_fiche(f)
+        except ValueError as e:
+            errors[f.id] = str(e)
+            continue
+
+        aeroport = f.provenance or f.destination
+        start_dt, end_dt, lieu_depart, lieu_arrivee = _infer_window_and_lieux_from_fiches(
+            [f], Mission(date=f.date, horaires=f.horaires, aeroport=aeroport)
+        )
+        if end_dt <= start_dt:
+            end_dt = start_dt + timedelta(minutes=30)
+        windows[f.id] = (start_dt, end_dt, lieu_depart, lieu_arrivee)
+
+        hotels = [(it.get("hotel") or "").strip() for it in (f.hotel_schedule or []) if isinstance(it, dict)]
+        hotels = [h for h in hotels if h] or ([f.hotel.nom] if f.hotel_id else [])
+        if _kind_from_fiche(f) in DEPART_TYPES:
+            start_label, end_label = (hotels[0] if hotels else None), lieu_arrivee
+        else:
+            start_label, end_label = lieu_depart, lieu_arrivee or (hotels[-1] if hotels else None)
+
+        jobs.append(auto_assign.Job(
+            key=f.id,
+            pax=f.pax or 0,
+            start=start_dt,
+            end=end_dt,
+            start_label=start_label,
+            end_label=end_label,
+        ))
+    return jobs, windows, errors
+
+
 # =========================
 # API Create fiche
 # =========================
@@ -377,10 +560,12 @@ class UpdateHorairesRamassageAPIView(APIView):
 # =========================
 # ViewSet FicheMouvement
 # =========================
-class FicheMouvementViewSet(viewsets.ModelViewSet):
+class FicheMouvementViewSet(VersionedListMixin, viewsets.ModelViewSet):
     queryset = FicheMouvement.objects.all()
     serializer_class = FicheMouvementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    etag_resources = (versions.FICHE, versions.DOSSIER)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -401,6 +586,10 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
             if agence_id_int:
                 _ensure_same_agence_or_superadmin(self.request, agence_id_int)
                 qs = qs.filter(agence_id=agence_id_int)
+        elif _user_role(self.request.user) != "superadmin":
+            # admin agence sans ?agence= : sa seule agence (listes ET actions détail)
+            agence_user = _user_agence(self.request.user)
+            qs = qs.filter(agence=agence_user) if agence_user else qs.none()
 
         if mission_isnull in ("true", "1", "yes"):
             if _has_field(FicheMouvement, "mission"):
@@ -423,6 +612,7 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
             fiche_mouvement=None,
             is_transformed=False,
         )
+        versions.bump_versions([fiche.agence_id], [versions.DOSSIER])
 
         fiche.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -455,21 +645,26 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
         # ARRIVÉE (A/L)
         if type_mvt in ARRIVEE_TYPES:
             arr_wait = _as_int(request.data.get("arr_wait_minutes"), DEFAULT_ARR_WAIT_MIN)
-            route_min = _as_int(request.data.get("route_minutes"), DEFAULT_ARR_BUFFER_MIN)
+            # route_minutes saisi : même durée pour tous les hôtels ; sinon matrice par hôtel
+            forced_route = _as_int(request.data.get("route_minutes"), None)
 
             dt_vol = base_dt
             dt_aeroport = base_dt + timedelta(minutes=arr_wait)
-            dt_depot_default = dt_aeroport + timedelta(minutes=route_min)
 
-            cleaned = []
-            for it in rows:
-                if not isinstance(it, dict):
-                    continue
+            rows = [
+                it for it in rows
+                if isinstance(it, dict) and (it.get("hotel") or "").strip()
+            ]
+            hotels = [(it.get("hotel") or "").strip() for it in rows]
+            if forced_route is not None:
+                route_minutes = [forced_route] * len(hotels)
+            else:
+                route_minutes = _arrival_route_minutes(fiche, hotels)
 
-                hotel = (it.get("hotel") or "").strip()
+            cleaned = []
+            for it, hotel, route_min in zip(rows, hotels, route_minutes):
                 pax = _as_int(it.get("pax"), 0)
-                if not hotel:
-                    continue
+                dt_depot_default = dt_aeroport + timedelta(minutes=route_min)
 
                 forced = _pick_hhmm(it)
                 if _is_hhmm(forced):
@@ -506,68 +701,48 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
             dt_vol = base_dt
             dt_airport = base_dt - timedelta(minutes=airport_minutes)
 
-            if has_forced_times:
-                cleaned = []
-                for it in rows:
-                    if not isinstance(it, dict):
-                        continue
-                    hotel = (it.get("hotel") or "").strip()
-                    if not hotel:
-                        continue
-                    pax = _as_int(it.get("pax"), 0)
-
-                    hhmm_val = _pick_hhmm(it)
-                    hhmm_val = hhmm_val[:5] if _is_hhmm(hhmm_val) else None
-                    dt_pickup = _hhmm_to_dt_near(hhmm_val, dt_airport) if hhmm_val else None
-
-                    cleaned.append(
-                        {
-                            "hotel": hotel,
-                            "pax": pax,
-                            "pickup_minutes": _as_int(it.get("pickup_minutes"), DEFAULT_PICKUP_PER_HOTEL_MIN),
-                            "heure_vol": _time_to_hhmm(fiche.horaires),
-                            "heure_aeroport": dt_airport.strftime("%H:%M"),
-                            "heure_pickup": hhmm_val,
-                            "override_time": hhmm_val,
-                            "datetime_vol": _dt_to_iso(dt_vol),
-                            "datetime_airport": _dt_to_iso(dt_airport),
-                            "datetime_pickup": _dt_to_iso(dt_pickup) if dt_pickup else None,
-                            "airport_minutes": airport_minutes,
-                        }
-                    )
-
-                fiche.hotel_schedule = cleaned
-                fiche.save(update_fields=["hotel_schedule"])
-                return Response(self.get_serializer(fiche).data, status=status.HTTP_200_OK)
-
             cleaned_input = []
             for it in rows:
                 if not isinstance(it, dict):
                     continue
 
                 hotel = (it.get("hotel") or "").strip()
-                pax = _as_int(it.get("pax"), 0)
-                pickup_min = _as_int(it.get("pickup_minutes"), DEFAULT_PICKUP_PER_HOTEL_MIN)
                 if not hotel:
                     continue
 
-                cleaned_input.append({"hotel": hotel, "pax": pax, "pickup_minutes": pickup_min})
+                hhmm_val = _pick_hhmm(it)
+                cleaned_input.append(
+                    {
+                        "hotel": hotel,
+                        "pax": _as_int(it.get("pax"), 0),
+                        "pickup_minutes": _as_int(it.get("pickup_minutes"), None),
+                        "forced": hhmm_val[:5] if _is_hhmm(hhmm_val) else None,
+                    }
+                )
+
+            # heures saisies par l'agent : ordre reçu conservé, heures gardées,
+            # les autres hôtels calés sur l'arrêt suivant (durées estimées)
+            optimize = not has_forced_times and request.data.get("optimize_route", True) not in (False, "false", "0", 0)
+            legs = _route_departure(fiche, cleaned_input, optimize=optimize)
 
-            total = 0
-            reversed_out = []
-            for it in reversed(cleaned_input):
-                total += it["pickup_minutes"]
-                pickup_dt = dt_airport - timedelta(minutes=total)
+            out = []
+            t_next = dt_airport
+            for it, minutes in reversed(legs):
+                if it["forced"]:
+                    pickup_dt = _hhmm_to_dt_near(it["forced"], dt_airport)
+                else:
+                    pickup_dt = t_next - timedelta(minutes=minutes)
+                t_next = pickup_dt
 
-                reversed_out.append(
+                out.append(
                     {
                         "hotel": it["hotel"],
                         "pax": it["pax"],
-                        "pickup_minutes": it["pickup_minutes"],
+                        "pickup_minutes": minutes,
                         "heure_vol": _time_to_hhmm(fiche.horaires),
                         "heure_aeroport": dt_airport.strftime("%H:%M"),
                         "heure_pickup": pickup_dt.strftime("%H:%M"),
-                        "override_time": pickup_dt.strftime("%H:%M"),
+                        "override_time": it["forced"] if has_forced_times else pickup_dt.strftime("%H:%M"),
                         "datetime_vol": _dt_to_iso(dt_vol),
                         "datetime_airport": _dt_to_iso(dt_airport),
                         "datetime_pickup": _dt_to_iso(pickup_dt),
@@ -575,8 +750,8 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
                     }
                 )
 
-            reversed_out.reverse()
-            fiche.hotel_schedule = reversed_out
+            out.reverse()
+            fiche.hotel_schedule = out
             fiche.save(update_fields=["hotel_schedule"])
             return Response(self.get_serializer(fiche).data, status=status.HTTP_200_OK)
 
@@ -753,6 +928,7 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
 
         if _has_field(FicheMouvement, "mission"):
             qs.update(mission=mission)
+            versions.bump_versions([first.agence_id], [versions.FICHE])
 
         # =========================
         # ✅ Fenêtre + lieux métier
@@ -788,6 +964,273 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
 
         return Response(MissionSerializer(mission, context={"request": request}).data, status=201)
 
+    # =====================================================
+    # TO MISSION en lot : plusieurs groupes en une requête
+    # - validation commune, UNE vérification de disponibilité
+    # - missions / affectations en insertions groupées
+    # =====================================================
+    @action(detail=False, methods=["post"], url_path="to-mission/bulk")
+    @transaction.atomic
+    def to_mission_bulk(self, request):
+        """
+        groups : [{fiche_ids, vehicule_id, chauffeur_ids, date_heure_debut?, date_heure_fin?, aeroport?}, ...]
+        Les groupes valides sont créés, les autres rapportés (index du groupe + erreur).
+        """
+        groups = (request.data or {}).get("groups")
+        if not isinstance(groups, list) or not groups:
+            return Response({"detail": "groups doit être une liste non vide."}, status=400)
+
+        errors: Dict[int, str] = {}
+        wanted: Dict[int, List[int]] = {}
+        fleet: Dict[int, tuple] = {}
+        owner: Dict[int, int] = {}
+        for i, g in enumerate(groups):
+            ids = g.get("fiche_ids") if isinstance(g, dict) else None
+            if not isinstance(ids, list) or not ids:
+                errors[i] = "fiche_ids doit être une liste non vide."
+                continue
+            ids = [_as_int(x, 0) for x in ids]
+            dup = next((x for x in ids if x in owner), None)
+            if dup is not None:
+                errors[i] = f"Fiche {dup} déjà présente dans le groupe {owner[dup]}."
+                continue
+            owner.update({x: i for x in ids})
+            wanted[i] = ids
+            chauffeur_ids = g.get("chauffeur_ids")
+            fleet[i] = (
+                _as_int(g.get("vehicule_id"), 0),
+                _as_int(chauffeur_ids[0], 0) if isinstance(chauffeur_ids, list) and chauffeur_ids else 0,
+            )
+
+        qs = FicheMouvement.objects.filter(id__in=list(owner)).select_related("agence").select_for_update(of=("self",))
+        if _has_field(FicheMouvement, "is_deleted"):
+            qs = qs.filter(is_deleted=False)
+        fiches = {f.id: f for f in qs}
+        if not fiches:
+            return Response({"detail": "Aucune fiche trouvée."}, status=400)
+
+        agence = next(iter(fiches.values())).agence
+        if any(f.agence_id != agence.id for f in fiches.values()):
+            return Response({"detail": "Toutes les fiches doivent appartenir à la même agence."}, status=400)
+        _ensure_same_agence_or_superadmin(request, agence.id)
+
+        # même ordre de verrouillage que availability.lock_resources (véhicules puis chauffeurs, pk croissant)
+        vehicules = {v.pk: v for v in Vehicule.objects.select_for_update().filter(
+            agence_id=agence.id, id__in=[v for v, _ in fleet.values() if v]
+        ).order_by("pk")}
+        chauffeurs = {c.pk: c for c in Chauffeur.objects.select_for_update().filter(
+            agence_id=agence.id, id__in=[c for _, c in fleet.values() if c]
+        ).order_by("pk")}
+
+        # hotel_schedule vides au départ : générés puis enregistrés par _ensure_schedule_exists_for_fiche
+        blank = {f.id: f.hotel_schedule for f in fiches.values() if not f.hotel_schedule}
+        batch, positions = [], []
+        for i, ids in wanted.items():
+            g = groups[i]
+            missing = [x for x in ids if x not in fiches]
+            if missing:
+                errors[i] = f"Fiche(s) introuvable(s) : {', '.join(map(str, missing))}."
+                continue
+            taken = [fiches[x].ref for x in ids if fiches[x].mission_id]
+            if taken:
+                errors[i] = f"Fiche(s) déjà rattachée(s) à une mission : {', '.join(taken)}."
+                continue
+
+            vehicule_id, chauffeur_id = fleet[i]
+            vehicule, chauffeur = vehicules.get(vehicule_id), chauffeurs.get(chauffeur_id)
+            if vehicule_id and vehicule is None:
+                errors[i] = f"Véhicule introuvable ou hors agence (id={vehicule_id})."
+                continue
+            if chauffeur_id and chauffeur is None:
+                errors[i] = f"Chauffeur introuvable ou hors agence (id={chauffeur_id})."
+                continue
+            if vehicule is None and chauffeur is None:
+                errors[i] = "Sélectionne au moins un véhicule ou un chauffeur."
+                continue
+
+            group_fiches = [fiches[x] for x in ids]
+            try:
+                for f in group_fiches:
+                    _ensure_schedule_exists_for_fiche(f)
+            except ValueError as e:
+                errors[i] = str(e)
+                continue
+
+            first = group_fiches[0]
+            aeroport = g.get("aeroport") or first.provenance or first.destination
+            start_dt, end_dt, lieu_depart, lieu_arrivee = _infer_window_and_lieux_from_fiches(
+                group_fiches, Mission(date=first.date, horaires=first.horaires, aeroport=aeroport)
+            )
+            start_dt = _parse_dt_safe(g.get("date_heure_debut") or "") or start_dt
+            end_dt = _parse_dt_safe(g.get("date_heure_fin") or "") or end_dt
+            if end_dt <= start_dt:
+                end_dt = start_dt + timedelta(minutes=30)
+
+            batch.append({
+                "fiches": group_fiches,
+                "vehicule": vehicule,
+                "chauffeur": chauffeur,
+                "start": start_dt,
+                "end": end_dt,
+                "lieu_depart": lieu_depart,
+                "lieu_arrivee": lieu_arrivee,
+                "aeroport": aeroport,
+            })
+            positions.append(i)
+
+        created, conflicts = _create_missions_bulk(agence, batch, request.user) if batch else ({}, {})
+        errors.update({positions[k]: e for k, e in conflicts.items()})
+        if not created:
+            # rien de créé : schedules générés pour les groupes refusés annulés avec le reste
+            transaction.set_rollback(True)
+        else:
+            rejected = [fiches[x] for i in errors for x in wanted.get(i, ()) if x in blank and x in fiches]
+            for f in rejected:
+                f.hotel_schedule = blank[f.id]
+            if rejected:
+                FicheMouvement.objects.bulk_update(rejected, ["hotel_schedule"])
+        position_of = {i: k for k, i in enumerate(positions)}
+
+        resultats = []
+        for i in range(len(groups)):
+            if i in errors:
+                resultats.append({"index": i, "erreur": errors[i]})
+                continue
+            m = created[position_of[i]]
+            resultats.append({
+                "index": i,
+                "mission_id": m.pk,
+                "reference": m.reference,
+                "fiche_ids": wanted[i],
+                "vehicule_id": m.vehicule_id,
+                "chauffeur_id": m.chauffeur_id,
+            })
+        return Response(
+            {
+                "summary": {"groupes": len(groups), "missions": len(created), "erreurs": len(errors)},
+                "resultats": resultats,
+            },
+            status=201 if created else 400,
+        )
+
+    # =====================================
+    # AFFECTATION AUTOMATIQUE (journée)
+    # =====================================
+    @action(detail=False, methods=["post"], url_path="auto-assign/preview")
+    def auto_assign_preview(self, request):
+        """Plan proposé, sans rien enregistrer (schedules générés à la volée puis annulés)."""
+        with transaction.atomic():
+            response = self._auto_assign(request, commit=False)
+            transaction.set_rollback(True)
+        return response
+
+    @action(detail=False, methods=["post"], url_path="auto-assign/commit")
+    @transaction.atomic
+    def auto_assign_commit(self, request):
+        """Recalcule le plan sous verrou et crée toutes les missions en lot."""
+        return self._auto_assign(request, commit=True)
+
+    def _auto_assign(self, request, commit: bool):
+        data = request.data or {}
+        agence_id = _as_int(data.get("agence"), 0) or getattr(_user_agence(request.user), "id", None)
+        if not agence_id:
+            return Response({"detail": "Champ 'agence' requis."}, status=400)
+        _ensure_same_agence_or_superadmin(request, agence_id)
+
+        day = parse_date(str(data.get("date") or ""))
+        if not day:
+            return Response({"detail": "Champ 'date' requis (YYYY-MM-DD)."}, status=400)
+
+        qs = FicheMouvement.objects.filter(
+            agence_id=agence_id, date=day, mission__isnull=True, is_deleted=False
+        ).select_related("hotel").order_by("id")
+        fiche_ids = data.get("fiche_ids")
+        if isinstance(fiche_ids, list) and fiche_ids:
+            qs = qs.filter(id__in=fiche_ids)
+        if commit:
+            qs = qs.select_for_update(of=("self",))
+        fiches = {f.id: f for f in qs}
+
+        jobs, windows, unassigned = _auto_assign_jobs(list(fiches.values()))
+        plan = auto_assign.plan_assignments(agence_id, jobs)
+        unassigned.update(plan.unassigned)
+
+        missions: Dict[int, Mission] = {}
+        if commit and plan.routes:
+            # plan calculé sur l'index de lecture : _create_missions_bulk verrouille les
+            # véhicules / chauffeurs retenus (pk croissant) et revérifie en base ; une
+            # course devenue en conflit est rendue comme non affectée
+            groups, keys = [], []
+            for route in plan.routes:
+                for job in route.jobs:
+                    start_dt, end_dt, lieu_depart, lieu_arrivee = windows[job.key]
+                    groups.append({
+                        "fiches": [fiches[job.key]],
+                        "vehicule": route.vehicule,
+                        "chauffeur": plan.chauffeurs.get(job.key),
+                        "start": start_dt,
+                        "end": end_dt,
+                        "lieu_depart": lieu_depart,
+                        "lieu_arrivee": lieu_arrivee,
+                    })
+                    keys.append(job.key)
+            created, errors = _create_missions_bulk(fiches[keys[0]].agence, groups, request.user)
+            missions = {keys[i]: m for i, m in created.items()}
+            unassigned.update({keys[i]: e for i, e in errors.items()})
+
+        tournees = []
+        for route in plan.routes:
+            v = route.vehicule
+            courses = []
+            for job in route.jobs:
+                if job.key in unassigned:
+                    continue
+                f = fiches[job.key]
+                start_dt, end_dt, lieu_depart, lieu_arrivee = windows[job.key]
+                c = plan.chauffeurs.get(job.key)
+                courses.append({
+                    "fiche_id": f.id,
+                    "ref": f.ref,
+                    "type": f.type,
+                    "pax": f.pax,
+                    "date_heure_debut": start_dt,
+                    "date_heure_fin": end_dt,
+                    "lieu_depart": lieu_depart,
+                    "lieu_arrivee": lieu_arrivee,
+                    "chauffeur": {"id": c.id, "nom": str(c)} if c else None,
+                    "mission_id": missions[job.key].pk if job.key in missions else None,
+                    "mission_reference": missions[job.key].reference if job.key in missions else None,
+                })
+            if courses:
+                tournees.append({
+                    "vehicule": {"id": v.id, "immatriculation": v.immatriculation, "type": v.type, "capacite": v.capacite},
+                    "km_a_vide": route.empty_km,
+                    "courses": courses,
+                })
+
+        assigned = sum(len(t["courses"]) for t in tournees)
+        return Response(
+            {
+                "agence": agence_id,
+                "date": day,
+                "dry_run": not commit,
+                "summary": {
+                    "fiches": len(fiches),
+                    "affectees": assigned,
+                    "non_affectees": len(unassigned),
+                    "vehicules": len(tournees),
+                    "km_a_vide": plan.empty_km,
+                    "sans_chauffeur": sum(1 for t in tournees for c in t["courses"] if c["chauffeur"] is None),
+                },
+                "tournees": tournees,
+                "non_affectees": [
+                    {"fiche_id": fid, "ref": fiches[fid].ref, "raison": raison}
+                    for fid, raison in sorted(unassigned.items())
+                ],
+            },
+            status=201 if commit and missions else 200,
+        )
+
     # -------------------------------------
     # Revert / Corbeille (1 fiche)
     # -------------------------------------
@@ -801,6 +1244,7 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
             fiche_mouvement=None,
             is_transformed=False,
         )
+        versions.bump_versions([fiche.agence_id], [versions.DOSSIER])
 
         if _has_field(FicheMouvement, "mission"):
             fiche.mission = None
@@ -837,6 +1281,7 @@ class FicheMouvementViewSet(viewsets.ModelViewSet):
             fiche_mouvement=None,
             is_transformed=False,
         )
+        versions.bump_versions([first.agence_id], [versions.DOSSIER, versions.FICHE])
 
         if _has_field(FicheMouvement, "mission"):
             qs.update(mission=None)
@@ -858,6 +1303,12 @@ class FichesAggregationsAPIView(APIView):
         if not agence:
             return Response({"detail": "Aucune agence associée à l'utilisateur."}, status=400)
 
+        return cached_response(
+            request, "fiches-aggregations", lambda: self._aggregations(request, agence),
+            agence_id=agence.id, depends=(versions.FICHE,), global_depends=(versions.HOTEL,),
+        )
+
+    def _aggregations(self, request, agence):
         qs = FicheMouvement.objects.filter(agence=agence)
         if _has_field(FicheMouvement, "is_deleted"):
             qs = qs.filter(is_deleted=False)
@@ -898,12 +1349,10 @@ class FichesAggregationsAPIView(APIView):
         if _has_field(FicheMouvement, "hotel"):
             hotels_agg = list(qs.values("hotel__nom").annotate(pax=Sum("pax")).order_by("hotel__nom"))
 
-        return Response(
-            {
-                "dates": dates_agg,
-                "aeroports": {"provenance": aero_prov, "destination": aero_dest},
-                "vols": vols_agg,
-                "client_to": tos_agg,
-                "hotels": hotels_agg,
-            }
-        )
+        return {
+            "dates": dates_agg,
+            "aeroports": {"provenance": aero_prov, "destination": aero_dest},
+            "vols": vols_agg,
+            "client_to": tos_agg,
+            "hotels": hotels_agg,
+        }
@@ -5,6 +5,8 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from apps.models import Vehicule, Zone, VehiculeTarifZone
+from apps.services import versions
+from apps.services.response_cache import cached_response
 
 
 @api_view(["GET"])
@@ -37,6 +39,36 @@ VEHICLE_KEYS = [
 ]
 
 
+def _tarifs_data(agence, aeroport):
+    all_zones = Zone.objects.all().order_by("nom")
+    zones_data = [{"id": z.id, "name": z.nom} for z in all_zones]
+
+    rows = []
+    if aeroport:
+        tarifs_qs = VehiculeTarifZone.objects.filter(
+            agence=agence,           # ✅ FILTRAGE PAR AGENCE
+            aeroport=aeroport
+        ).select_related("zone")
+
+        by_zone = {}
+        for t in tarifs_qs:
+            z = t.zone
+            if z.id not in by_zone:
+                by_zone[z.id] = {
+                    "zone_id": z.id,
+                    "zone_name": z.nom,
+                }
+
+            for key, code in VEHICLE_KEYS:
+                if t.type_code == code:
+                    by_zone[z.id][key] = float(t.prix)
+                    break
+
+        rows = list(by_zone.values())
+
+    return {"rows": rows, "zones": zones_data}
+
+
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
 def fournisseur_vehicule_tarifs(request):
@@ -51,34 +83,10 @@ def fournisseur_vehicule_tarifs(request):
     # =========================
     if request.method == "GET":
         aeroport = (request.query_params.get("aeroport") or "").strip()
-
-        all_zones = Zone.objects.all().order_by("nom")
-        zones_data = [{"id": z.id, "name": z.nom} for z in all_zones]
-
-        rows = []
-        if aeroport:
-            tarifs_qs = VehiculeTarifZone.objects.filter(
-                agence=agence,           # ✅ FILTRAGE PAR AGENCE
-                aeroport=aeroport
-            ).select_related("zone")
-
-            by_zone = {}
-            for t in tarifs_qs:
-                z = t.zone
-                if z.id not in by_zone:
-                    by_zone[z.id] = {
-                        "zone_id": z.id,
-                        "zone_name": z.nom,
-                    }
-
-                for key, code in VEHICLE_KEYS:
-                    if t.type_code == code:
-                        by_zone[z.id][key] = float(t.prix)
-                        break
-
-            rows = list(by_zone.values())
-
-        return Response({"rows": rows, "zones": zones_data})
+        return cached_response(
+            request, "fournisseur-tarifs", lambda: _tarifs_data(agence, aeroport),
+            agence_id=agence.id, depends=(versions.TARIF,), global_depends=(versions.ZONE,),
+        )
 
     # =========================
     # POST : écriture des tarifs
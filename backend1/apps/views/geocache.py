@@ -0,0 +1,36 @@
+# backend1/apps/views/geocache.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.models import GeocodeCache
+from apps.services.geocache import geocache_stats
+from apps.views.helpers import IsSuperAdminRole
+
+
+class GeocodeCacheStatsAPIView(APIView):
+    """
+    GET /api/geocode-cache/stats/
+    -> process : hits LRU / base, misses (= appels externes), taux de hit
+       base    : entrées par fournisseur, négatives, expirées, hits cumulés
+    """
+    permission_classes = [IsAuthenticated, IsSuperAdminRole]
+
+    def get(self, request):
+        now = timezone.now()
+        rows = (
+            GeocodeCache.objects.values("provider", "kind")
+            .annotate(
+                entries=Count("id"),
+                negatives=Count("id", filter=Q(result__isnull=True)),
+                expired=Count("id", filter=Q(expires_at__lte=now)),
+                hits=Sum("hits"),
+            )
+            .order_by("provider", "kind")
+        )
+        return Response({"process": geocache_stats(), "db": list(rows)})
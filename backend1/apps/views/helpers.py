@@ -6,10 +6,15 @@ import re
 import unicodedata
 from datetime import datetime, timedelta
 
+import hashlib
+
 import pandas as pd
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
 from decimal import Decimal
 from uuid import UUID
 
@@ -72,6 +77,77 @@ def _ensure_same_agence_or_superadmin(request, agence_obj_or_id: Any):
         raise PermissionDenied("Vous n'avez pas accès à cette agence.")
 
 
+# ============================================================================
+# ETag / 304 des listes (compteurs de version par agence)
+# ============================================================================
+
+
+class VersionedListMixin:
+    """
+    ETag des listes dérivé des compteurs ResourceVersion (apps.services.versions).
+    If-None-Match identique => 304 AVANT tout queryset (une requête agrégée).
+
+      etag_resources   : ressources dont dépend la réponse
+      etag_time_bucket : réponse dépendant de "maintenant" (sans ?debut=) =>
+                         ETag renouvelé toutes les N secondes (ETAG_TIME_BUCKET_SECONDS)
+
+    Les vues qui redéfinissent list() appellent not_modified_response() en tête.
+    """
+    etag_resources: Tuple[str, ...] = ()
+    etag_time_bucket: bool = False
+
+    def _etag_agence_id(self, request) -> Tuple[bool, Optional[int]]:
+        """-> (etag possible, agence) ; agence None = toutes (superadmin sans filtre)."""
+        param = request.query_params.get("agence")
+        if _user_role(request.user) == "superadmin":
+            if not param:
+                return True, None
+            try:
+                return True, int(param)
+            except (TypeError, ValueError):
+                return False, None
+        agence = _user_agence(request.user)
+        if agence is None or (param and str(param) != str(agence.id)):
+            return False, None  # la vue normale tranche (403 / filtre)
+        return True, agence.id
+
+    def list_etag(self, request) -> Optional[str]:
+        if not self.etag_resources:
+            return None
+        ok, agence_id = self._etag_agence_id(request)
+        if not ok:
+            return None
+        from apps.services.versions import current_version
+
+        parts = [
+            self.__class__.__name__,
+            str(request.user.pk),
+            str(agence_id),
+            current_version(self.etag_resources, agence_id),
+            request.GET.urlencode(),
+        ]
+        if self.etag_time_bucket and not request.query_params.get("debut"):
+            bucket = max(1, int(getattr(settings, "ETAG_TIME_BUCKET_SECONDS", 60)))
+            parts.append(str(int(timezone.now().timestamp()) // bucket))
+        return quote_etag(hashlib.md5("|".join(parts).encode("utf-8")).hexdigest())
+
+    def not_modified_response(self, request) -> Optional[Response]:
+        self._list_etag = self.list_etag(request)
+        if self._list_etag and self._list_etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=304, headers={"ETag": self._list_etag})
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, "_list_etag", None)
+        if etag and response.status_code == 200:
+            response["ETag"] = etag
+        return response
+
+
 # ============================================================================
 # Génération de références
 # ============================================================================
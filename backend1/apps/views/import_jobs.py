@@ -0,0 +1,112 @@
+# backend1/apps/views/import_jobs.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.models import AgenceVoyage, ImportJob
+from apps.serializers import ImportJobSerializer
+from apps.services.import_jobs import IMPORTERS, ensure_recovered, submit_import_job
+from apps.views.helpers import _ensure_same_agence_or_superadmin, _user_agence, _user_role
+
+
+def _visible_jobs(user):
+    ensure_recovered()  # jobs laissés par un process arrêté (une fois par process)
+    qs = ImportJob.objects.select_related("agence")
+    if _user_role(user) == "superadmin":
+        return qs
+    agence = _user_agence(user)
+    if not agence:
+        return qs.none()
+    return qs.filter(agence=agence)
+
+
+class ImportJobListCreateAPIView(APIView):
+    """
+    POST /api/import-jobs/
+    Form-Data:
+      - kind : dossiers | fiches | vehicules | chauffeurs
+      - file, agence (défaut : agence du compte)
+      - + les champs habituels de l'importeur (mapping, mode, ...)
+    -> 202 { id, status: "pending", ... } ; le traitement se fait en arrière-plan.
+
+    GET /api/import-jobs/?kind=&status=
+    -> derniers jobs visibles par l'utilisateur.
+    """
+    parser_classes = [MultiPartParser]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        qs = _visible_jobs(request.user)
+        kind = (request.query_params.get("kind") or "").strip()
+        st = (request.query_params.get("status") or "").strip()
+        if kind:
+            qs = qs.filter(kind=kind)
+        if st:
+            qs = qs.filter(status=st)
+        return Response(ImportJobSerializer(qs[:50], many=True).data)
+
+    def post(self, request):
+        kind = (request.data.get("kind") or "").strip().lower()
+        fichier = request.FILES.get("file")
+
+        if kind not in IMPORTERS:
+            return Response(
+                {"error": f"Paramètre 'kind' invalide (attendu : {', '.join(IMPORTERS)})."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not fichier:
+            return Response({"error": "Aucun fichier envoyé."}, status=status.HTTP_400_BAD_REQUEST)
+
+        agence_id = request.data.get("agence") or getattr(_user_agence(request.user), "id", None)
+        if not agence_id:
+            return Response({"error": "Paramètre 'agence' requis."}, status=status.HTTP_400_BAD_REQUEST)
+
+        _ensure_same_agence_or_superadmin(request, int(agence_id))
+        agence = get_object_or_404(AgenceVoyage, id=agence_id)
+
+        ensure_recovered()
+        params = {k: v for k, v in request.data.items() if k not in ("file", "kind")}
+        job = submit_import_job(kind=kind, upload=fichier, agence=agence, user=request.user, params=params)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobDetailAPIView(APIView):
+    """
+    GET /api/import-jobs/<id>/
+    -> avancement : statut + compteurs (lignes traitées, créés, mis à jour, ignorés, erreurs).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk: int):
+        job = get_object_or_404(_visible_jobs(request.user), pk=pk)
+        return Response(ImportJobSerializer(job).data)
+
+
+class ImportJobReportAPIView(APIView):
+    """
+    GET /api/import-jobs/<id>/report/
+    -> rapport final (même contenu que la réponse de l'import synchrone).
+       409 tant que le job n'est pas terminé.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk: int):
+        job = get_object_or_404(_visible_jobs(request.user), pk=pk)
+        if not job.is_finished:
+            return Response(
+                {"error": "Import en cours.", **ImportJobSerializer(job).data},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(
+            {
+                **ImportJobSerializer(job).data,
+                "erreurs": job.erreurs,
+                "report": job.report,
+            }
+        )
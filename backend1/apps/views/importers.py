@@ -2,22 +2,30 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import os
 import re
 import unicodedata
 from datetime import datetime, date, time
-from typing import Any, Dict, List, Optional, Set, Tuple
+from itertools import chain
+from typing import Any, Dict, List, Optional, Set
 
 import pandas as pd
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from openpyxl import load_workbook
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.services.upload_reader import iter_upload_chunks, read_upload
+from apps.services.import_columns import (
+    date_column,
+    empty_column,
+    int_column,
+    map_unique,
+    str_column,
+    time_column,
+)
 from apps.views.helpers import _ensure_same_agence_or_superadmin
 from apps.models import (
     AgenceVoyage,
@@ -254,96 +262,16 @@ COL_MAP_FICHE = {
 }
 
 # =====================================================================
-# Lecture fichier robuste (évite l'utf-8 decode d'un Excel)
+# Lecture fichier (compat)
 # =====================================================================
 
-def _peek(upload, n: int = 8) -> bytes:
-    pos = upload.tell()
-    b = upload.read(n)
-    upload.seek(pos)
-    return b or b""
-
-
-def _is_xlsx(upload) -> bool:
-    # XLSX = ZIP => "PK"
-    head = _peek(upload, 4)
-    return head[:2] == b"PK"
-
-
-def _is_xls(upload) -> bool:
-    # XLS (OLE) => D0 CF 11 E0 A1 B1 1A E1
-    head = _peek(upload, 8)
-    return head.startswith(b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1")
-
-
-def _read_csv_df(upload) -> pd.DataFrame:
-    """
-    CSV robuste:
-    - tente plusieurs encodages
-    - tente plusieurs séparateurs (souvent ';' en FR)
-    """
-    last_err = None
-    for enc in ("utf-8-sig", "cp1252", "latin1"):
-        for sep in (None, ";", ",", "\t"):
-            try:
-                upload.seek(0)
-                if sep is None:
-                    # sep=None + python engine => sniff
-                    return pd.read_csv(upload, encoding=enc, sep=None, engine="python")
-                return pd.read_csv(upload, encoding=enc, sep=sep)
-            except UnicodeDecodeError as e:
-                last_err = e
-                continue
-            except Exception as e:
-                # si sniff/sep foire, on continue
-                last_err = e
-                continue
-    upload.seek(0)
-    # fallback "brutal" : remplace les caractères illisibles
-    return pd.read_csv(upload, encoding="latin1", errors="replace", sep=None, engine="python")
-
-
 def read_upload_to_df(upload) -> pd.DataFrame:
     """
-    IMPORTANT: NE JAMAIS essayer de décoder un Excel en UTF-8.
-    Stratégie:
-      1) Détection par signature binaire (xlsx/xls)
-      2) Sinon: lire comme CSV avec encodages/separateurs robustes
-      3) En dernier recours: on tente read_excel quand même (certains serveurs altèrent le nom)
+    Tout le fichier en un DataFrame (valeurs natives).
+    Les importeurs passent par `iter_upload_chunks` (lecture en flux) ;
+    ceci reste pour les petits fichiers / usages ponctuels.
     """
-    if upload is None:
-        raise ValueError("Aucun fichier fourni.")
-
-    name = (getattr(upload, "name", "") or "").lower()
-    ext = os.path.splitext(name)[1]
-
-    # 1) Détection binaire (fiable)
-    if _is_xlsx(upload):
-        upload.seek(0)
-        return pd.read_excel(upload, engine="openpyxl")
-    if _is_xls(upload):
-        upload.seek(0)
-        # nécessite xlrd si vrai .xls
-        # si xlrd absent, on aura une exception claire
-        return pd.read_excel(upload)
-
-    # 2) Détection par extension
-    if ext in (".xlsx",):
-        upload.seek(0)
-        return pd.read_excel(upload, engine="openpyxl")
-    if ext in (".xls",):
-        upload.seek(0)
-        return pd.read_excel(upload)  # xlrd requis
-
-    if ext in (".csv", ".txt"):
-        return _read_csv_df(upload)
-
-    # 3) Fallback: essayer Excel d'abord, sinon CSV
-    try:
-        upload.seek(0)
-        return pd.read_excel(upload, engine="openpyxl")
-    except Exception:
-        return _read_csv_df(upload)
+    return read_upload(upload, as_text=False)
 
 
 # =====================================================================
@@ -354,7 +282,6 @@ class ImporterFicheMouvementAPIView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser]
 
-    @transaction.atomic
     def post(self, request):
         try:
             agence = self._resolve_agence(request)
@@ -365,101 +292,142 @@ class ImporterFicheMouvementAPIView(APIView):
         if not f:
             return Response({"detail": "Aucun fichier fourni."}, status=400)
 
-        # === lecture robuste (c'est ici que l'erreur utf-8 venait) ===
+        # === lecture en flux (paquets de lignes, 1 transaction par paquet) ===
         try:
-            df = read_upload_to_df(f)
+            chunks = iter_upload_chunks(f, as_text=False)
+            first = next(chunks, None)
         except Exception as e:
             return Response({"detail": f"Fichier illisible ({e})."}, status=400)
+        if first is None:
+            first = pd.DataFrame()
 
-        df = df.fillna("")
         # normalise colonnes en MAJ
-        df.columns = [str(c).strip().upper() for c in df.columns.tolist()]
+        header = [str(c).strip().upper() for c in first.columns.tolist()]
 
         created = updated = ignored = 0
         errors: List[Dict[str, Any]] = []
         dossiers_crees: List[str] = []
         dossiers_mis_a_jour: List[str] = []
 
-        for idx, raw_row in df.iterrows():
-            line_no = int(idx) + 2  # header = ligne 1
-            try:
-                defaults: Dict[str, Any] = {"agence": agence}
-                lookup: Dict[str, Any] = {}
-                tmp: Dict[str, Any] = {}
-
-                # mapping colonnes -> champs internes
-                for col_name in df.columns:
-                    field = COL_MAP_FICHE.get(col_name)
-                    if not field:
+        # mapping colonnes -> champs internes (la dernière colonne gagne, comme avant)
+        field_cols: Dict[str, str] = {}
+        for col_name in header:
+            field = COL_MAP_FICHE.get(col_name)
+            if field:
+                field_cols[field] = col_name
+
+        def process_chunk(df):
+            nonlocal created, updated, ignored
+
+            def col(field):
+                c = field_cols.get(field)
+                return df[c] if c else empty_column(df.index)
+
+            # === normalisation par colonne (une passe vectorisée) ===
+            text_fields = [
+                "provenance", "destination", "numero_vol", "client_to", "hotel",
+                "titulaire", "ville", "code_postal", "observation", "zone_fk", "_aeroport_tmp",
+            ]
+            int_fields = ["pax", "adulte", "enfants", "bebe"]
+
+            columns: Dict[str, pd.Series] = {
+                "date": date_column(col("date"), serial_min=20000, fallback=_to_date_any),
+                "horaires": time_column(col("horaires"), fallback=_parse_time),
+                "type": map_unique(str_column(col("type")), _normalize_type_fiche),
+            }
+            for k in text_fields:
+                columns[k] = str_column(col(k)).str.normalize("NFKC").astype(object)
+            for k in int_fields:
+                raw = str_column(col(k))
+                # champ absent/vide -> None (on ne touche pas la valeur en base)
+                columns[k] = int_column(col(k)).where(raw != "", None).astype(object)
+            frame = pd.DataFrame(columns, index=df.index)
+
+            for idx, tmp in zip(frame.index, frame.to_dict("records")):
+                line_no = int(idx) + 2  # header = ligne 1
+                try:
+                    defaults: Dict[str, Any] = {"agence": agence}
+                    lookup: Dict[str, Any] = {}
+
+                    dt = tmp.get("date")
+                    hv = tmp.get("horaires")
+                    typ = tmp.get("type") or "A"
+
+                    lookup["date"] = dt
+                    lookup["hotel"] = tmp.get("hotel") or None
+                    if not (lookup["date"] and lookup["hotel"]):
+                        ignored += 1
                         continue
-                    tmp[field] = _clean_str(raw_row.get(col_name, ""))
-
-                dt = _to_date_any(tmp.get("date"))
-                hv = _parse_time(tmp.get("horaires"))
-                typ = _normalize_type_fiche(tmp.get("type")) or "A"
-
-                lookup["date"] = dt
-                lookup["hotel"] = tmp.get("hotel") or None
-                if not (lookup["date"] and lookup["hotel"]):
-                    ignored += 1
-                    continue
-
-                defaults["type"] = typ
-                if hv:
-                    defaults["horaires"] = hv
-
-                aeroport_val = tmp.get("_aeroport_tmp") or ""
-                if aeroport_val:
-                    if typ == "D":
-                        defaults["provenance"] = aeroport_val
+
+                    defaults["type"] = typ
+                    if hv:
+                        defaults["horaires"] = hv
+
+                    aeroport_val = tmp.get("_aeroport_tmp") or ""
+                    if aeroport_val:
+                        if typ == "D":
+                            defaults["provenance"] = aeroport_val
+                        else:
+                            defaults["destination"] = aeroport_val
+
+                    for k in [
+                        "provenance",
+                        "destination",
+                        "numero_vol",
+                        "client_to",
+                        "hotel",
+                        "titulaire",
+                        "ville",
+                        "code_postal",
+                        "observation",
+                    ]:
+                        v = tmp.get(k, "")
+                        if v != "":
+                            defaults[k] = v
+
+                    for k in int_fields:
+                        v = tmp.get(k)
+                        if v is not None:
+                            defaults[k] = v
+
+                    ztxt = tmp.get("zone_fk", "")
+                    if isinstance(ztxt, str):
+                        ztxt = ztxt.strip()
+                    if ztxt:
+                        z = Zone.objects.filter(nom__iexact=ztxt).first()
+                        if not z:
+                            z = Zone.objects.create(nom=ztxt)
+                        defaults["zone_fk"] = z
+
+                    defaults = purge_empty_foreign_keys(FicheMouvement, defaults)
+                    defaults = _sanitize_defaults(FicheMouvement, defaults)
+
+                    obj, was_created = FicheMouvement.objects.update_or_create(
+                        agence=agence, **lookup, defaults=defaults
+                    )
+
+                    if was_created:
+                        created += 1
+                        dossiers_crees.append(getattr(obj, "ref", str(obj.pk)))
                     else:
-                        defaults["destination"] = aeroport_val
-
-                for k in [
-                    "provenance",
-                    "destination",
-                    "numero_vol",
-                    "client_to",
-                    "hotel",
-                    "titulaire",
-                    "ville",
-                    "code_postal",
-                    "observation",
-                ]:
-                    v = tmp.get(k, "")
-                    if v != "":
-                        defaults[k] = v
-
-                for k in ["pax", "adulte", "enfants", "bebe"]:
-                    v = tmp.get(k, "")
-                    if v not in ("", None):
-                        defaults[k] = _to_int(v, default=0)
-
-                ztxt = tmp.get("zone_fk", "")
-                if isinstance(ztxt, str):
-                    ztxt = ztxt.strip()
-                if ztxt:
-                    z = Zone.objects.filter(nom__iexact=ztxt).first()
-                    if not z:
-                        z = Zone.objects.create(nom=ztxt)
-                    defaults["zone_fk"] = z
-
-                defaults = purge_empty_foreign_keys(FicheMouvement, defaults)
-                defaults = _sanitize_defaults(FicheMouvement, defaults)
-
-                obj, was_created = FicheMouvement.objects.update_or_create(
-                    agence=agence, **lookup, defaults=defaults
-                )
-
-                if was_created:
-                    created += 1
-                    dossiers_crees.append(getattr(obj, "ref", str(obj.pk)))
-                else:
-                    updated += 1
-                    dossiers_mis_a_jour.append(getattr(obj, "ref", str(obj.pk)))
+                        updated += 1
+                        dossiers_mis_a_jour.append(getattr(obj, "ref", str(obj.pk)))
 
-            except Exception as e:
-                errors.append({"ligne": line_no, "raison": f"{type(e).__name__}: {e}"})
+                except Exception as e:
+                    errors.append({"ligne": line_no, "raison": f"{type(e).__name__}: {e}"})
+
+        next_line = 2
+        try:
+            for df in chain([first], chunks):
+                df.columns = header
+                with transaction.atomic():
+                    process_chunk(df)
+                next_line = int(df.index[-1]) + 3 if len(df) else next_line
+        except Exception as e:
+            errors.append({
+                "ligne": next_line,
+                "raison": f"Lecture interrompue à partir de cette ligne ({type(e).__name__}: {e})",
+            })
 
         return Response(
             {
@@ -802,21 +770,28 @@ class ImporterVehiculesAPIView(APIView):
             return Response({"detail": "Agence non déterminée pour l'import."}, status=status.HTTP_400_BAD_REQUEST)
 
         _ensure_same_agence_or_superadmin(request, int(agence_id))
+        return self.run_import(upload, {"agence": agence_id})
 
+    def run_import(self, upload, data, *, progress=None):
+        """Import proprement dit (droits déjà vérifiés) ; aussi appelé par les jobs d'arrière-plan."""
+        agence_id = data.get("agence")
         try:
             agence = AgenceVoyage.objects.get(pk=agence_id)
         except AgenceVoyage.DoesNotExist:
             return Response({"detail": f"Agence {agence_id} introuvable."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            df = read_upload_to_df(upload).fillna("")
+            chunks = iter_upload_chunks(upload, as_text=False)
+            first = next(chunks, None)
         except Exception as e:
             return Response({"detail": f"Impossible de lire le fichier : {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if first is None:
+            first = pd.DataFrame()
 
-        # Trouver colonnes (robuste)
+        # Trouver colonnes (robuste) — toutes les paquets partagent l'en-tête
         cols = {}
         for field, candidates in self.VEH_HEADERS.items():
-            cols[field] = self._find_col(df, candidates)
+            cols[field] = self._find_col(first, candidates)
 
         # immatriculation obligatoire
         if not cols["immatriculation"]:
@@ -832,82 +807,92 @@ class ImporterVehiculesAPIView(APIView):
         ignored = 0
         errors: List[Dict[str, Any]] = []
 
-        with transaction.atomic():
-            for idx, row in df.iterrows():
-                line_no = int(idx) + 2
-
-                try:
-                    immat = self._to_str(row.get(cols["immatriculation"]))
-                    if not immat:
-                        ignored += 1
-                        errors.append({"ligne": line_no, "raison": "Immatriculation manquante"})
-                        continue
-
-                    v_type = self._normalize_type(row.get(cols["type"])) if cols["type"] else "bus"
-                    v_marque = self._to_str(row.get(cols["marque"])) if cols["marque"] else ""
-                    v_modele = self._to_str(row.get(cols["modele"])) if cols["modele"] else ""
-
-                    v_cap = self._to_int(row.get(cols["capacite"]), default=None) if cols["capacite"] else None
-                    v_year = self._to_int(row.get(cols["annee_mise_en_circulation"]), default=None) if cols["annee_mise_en_circulation"] else None
-
-                    v_addr = self._to_str(row.get(cols["adresse"])) if cols["adresse"] else ""
-                    if not v_addr:
-                        v_addr = base_addr  # ✅ adresse par défaut = agence
-
-                    v_statut = self._normalize_statut(row.get(cols["statut"])) if cols["statut"] else "disponible"
-
-                    v_lat = None
-                    v_lng = None
-                    if cols.get("last_lat"):
-                        v_lat = self._to_int(row.get(cols["last_lat"]), default=None)
-                    if cols.get("last_lng"):
-                        v_lng = self._to_int(row.get(cols["last_lng"]), default=None)
-
-                    louable = None
-                    if cols.get("louer_autres_agences"):
-                        louable = self._to_bool(row.get(cols["louer_autres_agences"]))
-
-                    # 🔥 IMPORTANT : on n’écrase PAS avec vide.
-                    defaults: Dict[str, Any] = {
-                        "agence": agence,
-                        "statut": v_statut,
-                        "type": v_type,
-                    }
-                    if v_marque != "":
-                        defaults["marque"] = v_marque
-                    if v_modele != "":
-                        defaults["modele"] = v_modele
-                    if v_cap is not None:
-                        defaults["capacite"] = v_cap
-                    if v_year is not None:
-                        # adapte le nom du champ selon ton modèle
-                        # (tu utilises déjà "annee_mise_en_circulation" côté front)
-                        defaults["annee_mise_en_circulation"] = v_year
-                    if v_addr != "":
-                        defaults["adresse"] = v_addr
-                    if v_lat is not None and "last_lat" in _allowed_fields(Vehicule):
-                        defaults["last_lat"] = v_lat
-                    if v_lng is not None and "last_lng" in _allowed_fields(Vehicule):
-                        defaults["last_lng"] = v_lng
-                    if louable is not None and "louer_autres_agences" in _allowed_fields(Vehicule):
-                        defaults["louer_autres_agences"] = louable
-
-                    # Nettoyage final : garde uniquement champs existants
-                    defaults = _sanitize_defaults(Vehicule, defaults)
-                    defaults = purge_empty_foreign_keys(Vehicule, defaults)
-
-                    vehicule, created_flag = Vehicule.objects.update_or_create(
-                        immatriculation=immat,
-                        agence=agence,
-                        defaults=defaults,
-                    )
-                    if created_flag:
-                        created += 1
-                    else:
-                        updated += 1
-
-                except Exception as e:
-                    errors.append({"ligne": line_no, "raison": f"{type(e).__name__}: {e}"})
+        # 1 transaction par paquet de lignes
+        try:
+            for df in chain([first], chunks):
+                df = df.fillna("")
+                with transaction.atomic():
+                    for idx, row in df.iterrows():
+                        line_no = int(idx) + 2
+
+                        try:
+                            immat = self._to_str(row.get(cols["immatriculation"]))
+                            if not immat:
+                                ignored += 1
+                                errors.append({"ligne": line_no, "raison": "Immatriculation manquante"})
+                                continue
+
+                            v_type = self._normalize_type(row.get(cols["type"])) if cols["type"] else "bus"
+                            v_marque = self._to_str(row.get(cols["marque"])) if cols["marque"] else ""
+                            v_modele = self._to_str(row.get(cols["modele"])) if cols["modele"] else ""
+
+                            v_cap = self._to_int(row.get(cols["capacite"]), default=None) if cols["capacite"] else None
+                            v_year = self._to_int(row.get(cols["annee_mise_en_circulation"]), default=None) if cols["annee_mise_en_circulation"] else None
+
+                            v_addr = self._to_str(row.get(cols["adresse"])) if cols["adresse"] else ""
+                            if not v_addr:
+                                v_addr = base_addr  # ✅ adresse par défaut = agence
+
+                            v_statut = self._normalize_statut(row.get(cols["statut"])) if cols["statut"] else "disponible"
+
+                            v_lat = None
+                            v_lng = None
+                            if cols.get("last_lat"):
+                                v_lat = self._to_int(row.get(cols["last_lat"]), default=None)
+                            if cols.get("last_lng"):
+                                v_lng = self._to_int(row.get(cols["last_lng"]), default=None)
+
+                            louable = None
+                            if cols.get("louer_autres_agences"):
+                                louable = self._to_bool(row.get(cols["louer_autres_agences"]))
+
+                            # 🔥 IMPORTANT : on n’écrase PAS avec vide.
+                            defaults: Dict[str, Any] = {
+                                "agence": agence,
+                                "statut": v_statut,
+                                "type": v_type,
+                            }
+                            if v_marque != "":
+                                defaults["marque"] = v_marque
+                            if v_modele != "":
+                                defaults["modele"] = v_modele
+                            if v_cap is not None:
+                                defaults["capacite"] = v_cap
+                            if v_year is not None:
+                                # adapte le nom du champ selon ton modèle
+                                # (tu utilises déjà "annee_mise_en_circulation" côté front)
+                                defaults["annee_mise_en_circulation"] = v_year
+                            if v_addr != "":
+                                defaults["adresse"] = v_addr
+                            if v_lat is not None and "last_lat" in _allowed_fields(Vehicule):
+                                defaults["last_lat"] = v_lat
+                            if v_lng is not None and "last_lng" in _allowed_fields(Vehicule):
+                                defaults["last_lng"] = v_lng
+                            if louable is not None and "louer_autres_agences" in _allowed_fields(Vehicule):
+                                defaults["louer_autres_agences"] = louable
+
+                            # Nettoyage final : garde uniquement champs existants
+                            defaults = _sanitize_defaults(Vehicule, defaults)
+                            defaults = purge_empty_foreign_keys(Vehicule, defaults)
+
+                            vehicule, created_flag = Vehicule.objects.update_or_create(
+                                immatriculation=immat,
+                                agence=agence,
+                                defaults=defaults,
+                            )
+                            if created_flag:
+                                created += 1
+                            else:
+                                updated += 1
+
+                        except Exception as e:
+                            errors.append({"ligne": line_no, "raison": f"{type(e).__name__}: {e}"})
+                if progress:
+                    progress(int(df.index[-1]) + 1 if len(df) else 0, created, updated, ignored, len(errors))
+        except Exception as e:
+            errors.append({"ligne": None, "raison": f"Lecture interrompue ({type(e).__name__}: {e})"})
+            if progress:
+                progress(created + updated + ignored, created, updated, ignored, len(errors))
 
         return Response(
             {
@@ -964,37 +949,58 @@ class ImporterChauffeursAPIView(APIView):
             return Response({"error": "Aucune agence spécifiée."}, status=400)
 
         _ensure_same_agence_or_superadmin(request, int(agence_id))
+        return self.run_import(fichier, {"agence": agence_id})
+
+    def run_import(self, fichier, data, *, progress=None):
+        """Import proprement dit (droits déjà vérifiés) ; aussi appelé par les jobs d'arrière-plan."""
+        agence_id = data.get("agence")
         agence = get_object_or_404(AgenceVoyage, id=agence_id)
 
         try:
-            df = read_upload_to_df(fichier).fillna("")
+            chunks = iter_upload_chunks(fichier, as_text=False)
+            first = next(chunks, None)
         except Exception as e:
             return Response({"error": f"Erreur lecture fichier : {e}"}, status=400)
+        if first is None:
+            first = pd.DataFrame()
 
-        col_nom = self._find_col(df, self.HEADERS["nom"])
-        col_prenom = self._find_col(df, self.HEADERS["prenom"])
-        col_cin = self._find_col(df, self.HEADERS["cin"])
+        col_nom = self._find_col(first, self.HEADERS["nom"])
+        col_prenom = self._find_col(first, self.HEADERS["prenom"])
+        col_cin = self._find_col(first, self.HEADERS["cin"])
 
         if not col_nom:
             return Response({"error": "Colonne NOM manquante."}, status=400)
 
-        created, updated, ignored = [], [], []
-        for idx, row in df.iterrows():
-            nom = self._clean_str(row.get(col_nom))
-            prenom = self._clean_str(row.get(col_prenom)) if col_prenom else ""
-            cin = self._clean_str(row.get(col_cin)) if col_cin else ""
-
-            if not nom:
-                ignored.append({"ligne": int(idx) + 2, "raison": "Nom manquant"})
-                continue
-
-            obj, was_created = Chauffeur.objects.update_or_create(
-                agence=agence,
-                nom=nom,
-                prenom=prenom or "",
-                defaults={"cin": cin or "", "agence": agence, "nom": nom, "prenom": prenom or ""},
-            )
-            (created if was_created else updated).append(f"{nom} {prenom}".strip())
+        created, updated, ignored, errors = [], [], [], []
+        total = 0
+        try:
+            for df in chain([first], chunks):
+                df = df.fillna("")
+                total += int(df.shape[0])
+                with transaction.atomic():
+                    for idx, row in df.iterrows():
+                        nom = self._clean_str(row.get(col_nom))
+                        prenom = self._clean_str(row.get(col_prenom)) if col_prenom else ""
+                        cin = self._clean_str(row.get(col_cin)) if col_cin else ""
+
+                        if not nom:
+                            ignored.append({"ligne": int(idx) + 2, "raison": "Nom manquant"})
+                            continue
+
+                        obj, was_created = Chauffeur.objects.update_or_create(
+                            agence=agence,
+                            nom=nom,
+                            prenom=prenom or "",
+                            defaults={"cin": cin or "", "agence": agence, "nom": nom, "prenom": prenom or ""},
+                        )
+                        (created if was_created else updated).append(f"{nom} {prenom}".strip())
+                if progress:
+                    progress(total, len(created), len(updated), len(ignored), len(errors))
+        except Exception as e:
+            # paquets précédents déjà écrits : la suite du fichier est illisible
+            errors.append({"ligne": None, "raison": f"Lecture interrompue ({type(e).__name__}: {e})"})
+            if progress:
+                progress(total, len(created), len(updated), len(ignored), len(errors))
 
         return Response(
             {
@@ -1002,8 +1008,11 @@ class ImporterChauffeursAPIView(APIView):
                 "agence": agence.id,
                 "chauffeurs_crees": created,
                 "chauffeurs_mis_a_jour": updated,
-                "lignes_ignorees": ignored,
-                "resume": {"crees": len(created), "mis_a_jour": len(updated), "ignores": len(ignored), "total_lues": int(df.shape[0])},
+                "lignes_ignorees": ignored + errors,
+                "resume": {
+                    "crees": len(created), "mis_a_jour": len(updated), "ignores": len(ignored),
+                    "erreurs": len(errors), "total_lues": total,
+                },
             },
             status=200,
         )
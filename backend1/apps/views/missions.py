@@ -7,7 +7,8 @@ from io import BytesIO
 
 from django.core.files.base import ContentFile
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import IntegerField, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.http import FileResponse, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -18,9 +19,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from apps.models import Mission, MissionRessource, OrdreMission, Vehicule, Chauffeur
+from apps.models import FicheMouvement, Mission, MissionRessource, OrdreMission, Vehicule, Chauffeur
+from apps.pagination import KeysetPagination
 from apps.serializers import MissionSerializer
-from apps.views.helpers import _user_role
+from apps.services.availability import notify_affectations_changed
+from apps.services import versions
+from apps.services.mission_window import sync_mission_windows
+from apps.views.helpers import VersionedListMixin, _user_role
 from .helpers import _ensure_same_agence_or_superadmin
 from .mission_pdf import build_om_pdf_response
 
@@ -183,9 +188,9 @@ def _get_mission_for_pdf(pk: int) -> Mission:
 # ViewSet
 # ============================================================
 
-class MissionViewSet(ReadOnlyModelViewSet):
+class MissionViewSet(VersionedListMixin, ReadOnlyModelViewSet):
     """
-    - list:          GET  /api/missions/
+    - list:          GET  /api/missions/  (keyset : ?cursor= &page_size= &count=1)
     - retrieve:      GET  /api/missions/<id>/
     - pdf:           GET  /api/missions/<id>/pdf/?version=2 (optionnel)
     - generate-om:   POST /api/missions/<id>/generate-om/
@@ -194,6 +199,10 @@ class MissionViewSet(ReadOnlyModelViewSet):
     """
     serializer_class = MissionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    etag_resources = (
+        versions.MISSION, versions.FICHE, versions.AFFECTATION, versions.VEHICULE, versions.CHAUFFEUR,
+    )
 
     def get_queryset(self):
         req = self.request
@@ -237,8 +246,30 @@ class MissionViewSet(ReadOnlyModelViewSet):
         else:
             qs = qs.order_by("-created_at")
 
+        if self.action in ("list", "retrieve"):
+            qs = self._with_serializer_data(qs)
         return qs
 
+    @staticmethod
+    def _with_serializer_data(qs):
+        """
+        Tout ce que lit MissionSerializer, en un nombre constant de requêtes :
+          - vehicule / chauffeur : select_related
+          - pax_total            : annotation `fiches_pax` (SUM des fiches non supprimées)
+          - kind / passage       : fiches non supprimées préchargées dans `fiches_actives`
+          - fenêtre début / fin  : colonnes dénormalisées de Mission
+        """
+        fiches = FicheMouvement.objects.filter(is_deleted=False).only(
+            "id", "mission_id", "type", "pax", "hotel_schedule", "created_at"
+        )
+        return qs.select_related("vehicule", "chauffeur").annotate(
+            fiches_pax=Coalesce(
+                Sum("fiches__pax", filter=Q(fiches__is_deleted=False)),
+                Value(0),
+                output_field=IntegerField(),
+            ),
+        ).prefetch_related(Prefetch("fiches", queryset=fiches, to_attr="fiches_actives"))
+
     # -------------------------
     # PDF endpoint (toujours le dernier, ou une version via ?version=)
     # -------------------------
@@ -360,10 +391,19 @@ class MissionViewSet(ReadOnlyModelViewSet):
         if last and last.fichier_pdf and last.fichier_pdf.name:
             _invalidate_cached_pdf(last)
 
-        MissionRessource.objects.filter(mission=mission, is_deleted=False).update(
+        affectations = MissionRessource.objects.filter(mission=mission, is_deleted=False)
+        rows = list(affectations.values_list("id", "vehicule__agence_id", "chauffeur__agence_id"))
+        affectations.update(
             is_deleted=True,
             deleted_at=timezone.now(),
         )
+        # .update() : pas de signal
+        notify_affectations_changed([r[0] for r in rows])
+        sync_mission_windows([mission.id])
+        versions.bump_versions(
+            {mission.agence_id, *(r[1] for r in rows), *(r[2] for r in rows)},
+            [versions.AFFECTATION, versions.MISSION],
+        )
 
         mission.vehicule = None
         mission.chauffeur = None
@@ -0,0 +1,21 @@
+# backend1/apps/views/response_cache.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.services.response_cache import response_cache_stats
+from apps.views.helpers import IsSuperAdminRole
+
+
+class ResponseCacheStatsAPIView(APIView):
+    """
+    GET /api/response-cache/stats/
+    -> par endpoint (process courant) : hits, misses, taux de hit
+    """
+    permission_classes = [IsAuthenticated, IsSuperAdminRole]
+
+    def get(self, request):
+        return Response(response_cache_stats())
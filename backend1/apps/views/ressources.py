@@ -1,18 +1,23 @@
 # backend1/apps/views/ressources.py
 from __future__ import annotations
 
-from django.db.models import Q, OuterRef, Subquery, DateTimeField, CharField
+import numpy as np
+from django.db.models import OuterRef, Subquery, DateTimeField, CharField
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
 from apps.models import Vehicule, Chauffeur, MissionRessource, Zone
 from apps.serializers import VehiculeSerializer, ChauffeurSerializer
-from apps.views.helpers import _user_role, _user_agence
+from apps.services import availability, versions
+from apps.services.fleet_state import drivers_state, fleet_state
+from apps.services.nearest import haversine_km, nearest_vehicles, resolve_origin
+from apps.views.helpers import VersionedListMixin, _user_role, _user_agence
 
 
 # =========================
@@ -32,11 +37,6 @@ def _parse_dt(s: str | None):
     return dt
 
 
-def _overlap_q(debut, fin):
-    # overlap: start < other_end AND end > other_start
-    return Q(date_heure_debut__lt=fin) & Q(date_heure_fin__gt=debut)
-
-
 def _safe_int(v):
     try:
         return int(v)
@@ -47,13 +47,15 @@ def _safe_int(v):
 # =========================
 # ViewSets
 # =========================
-class VehiculeViewSet(viewsets.ModelViewSet):
+class VehiculeViewSet(VersionedListMixin, viewsets.ModelViewSet):
     """
     GET /api/vehicules/?agence=<id>&debut=<iso>&fin=<iso>
     -> renvoie véhicules dispo sur le créneau + enrichissements.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = VehiculeSerializer
+    etag_resources = (versions.VEHICULE, versions.AFFECTATION, versions.MISSION, versions.CHAUFFEUR)
+    etag_time_bucket = True
 
     def _scoped_queryset(self):
         """
@@ -108,13 +110,8 @@ class VehiculeViewSet(viewsets.ModelViewSet):
         debut = _parse_dt(self.request.query_params.get("debut"))
         fin = _parse_dt(self.request.query_params.get("fin"))
         if debut and fin:
-            overlap = _overlap_q(debut, fin)
-            busy_ids = (
-                MissionRessource.objects
-                .filter(is_deleted=False, vehicule__isnull=False)
-                .filter(overlap)
-                .values_list("vehicule_id", flat=True)
-            )
+            agence_ids = qs.order_by().values_list("agence_id", flat=True).distinct()
+            busy_ids = availability.busy_resource_ids(availability.VEHICULE, agence_ids, debut, fin)
             qs = qs.exclude(id__in=busy_ids)
 
         # filtre optionnel statut
@@ -125,6 +122,10 @@ class VehiculeViewSet(viewsets.ModelViewSet):
         return qs.order_by("immatriculation")
 
     def list(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response(request)
+        if not_modified:
+            return not_modified
+
         qs = self.filter_queryset(self.get_queryset())
 
         debut = _parse_dt(self.request.query_params.get("debut"))
@@ -133,27 +134,32 @@ class VehiculeViewSet(viewsets.ModelViewSet):
         zone_id = _safe_int(self.request.query_params.get("zone_id"))
         zone = Zone.objects.filter(id=zone_id).first() if zone_id else None
 
+        # ✅ état de toute la flotte en un nombre constant de requêtes
+        vehicules = list(qs)
+        states = fleet_state(vehicules, ref_time=ref_time)
+
+        # distances au centre de la zone : une passe NumPy (NaN si coordonnées manquantes)
+        zone_dist = {}
+        if zone and zone.center_lat is not None and zone.center_lng is not None:
+            dists = haversine_km(
+                zone.center_lat, zone.center_lng,
+                [v.last_lat if v.last_lat is not None else np.nan for v in vehicules],
+                [v.last_lng if v.last_lng is not None else np.nan for v in vehicules],
+            )
+            zone_dist = {v.pk: (None if np.isnan(d) else float(d)) for v, d in zip(vehicules, dists)}
+        serializer = self.get_serializer(
+            vehicules, many=True, context={**self.get_serializer_context(), "fleet_state": states}
+        )
+
         data = []
-        for v in qs:
-            # état réel (si ton model a get_real_state)
-            try:
-                state = v.get_real_state(ref_time=ref_time)
-                location = state.get("location") or getattr(v, "adresse", None)
-                available_from = state.get("available_from") or ref_time
-                available_until = state.get("available_until")
-            except Exception:
-                location = getattr(v, "adresse", None)
-                available_from = ref_time
-                available_until = None
+        for v, row in zip(vehicules, serializer.data):
+            state = states[v.pk]
+            location = state["location"] or getattr(v, "adresse", None)
+            available_from = state["available_from"] or ref_time
+            available_until = state["available_until"]
 
             # dernier chauffeur connu via dernière affectation du véhicule
-            last_aff = (
-                MissionRessource.objects
-                .filter(is_deleted=False, vehicule_id=v.id, chauffeur__isnull=False)
-                .order_by("-date_heure_fin", "-id")
-                .first()
-            )
-            last_driver = last_aff.chauffeur if last_aff else None
+            last_driver = state["last_driver"]
             last_driver_obj = (
                 {"id": last_driver.id, "nom": last_driver.nom, "prenom": last_driver.prenom}
                 if last_driver else None
@@ -163,8 +169,6 @@ class VehiculeViewSet(viewsets.ModelViewSet):
                 if last_driver else None
             )
 
-            row = self.get_serializer(v).data
-
             # ✅ expose les annotations (sinon elles restent invisibles)
             row["last_mission_end"] = getattr(v, "last_mission_end", None)
             row["last_mission_address"] = (getattr(v, "last_mission_address", None) or None)
@@ -194,12 +198,9 @@ class VehiculeViewSet(viewsets.ModelViewSet):
 
             # tri zone optionnel
             if zone:
-                try:
-                    row["_is_near_zone"] = bool(v.is_near_zone(zone, max_km=10.0))
-                    row["_distance_km"] = v.distance_to_zone(zone)
-                except Exception:
-                    row["_is_near_zone"] = False
-                    row["_distance_km"] = None
+                dist = zone_dist.get(v.pk)
+                row["_is_near_zone"] = dist is not None and dist <= 10.0
+                row["_distance_km"] = dist
 
             data.append(row)
 
@@ -218,6 +219,57 @@ class VehiculeViewSet(viewsets.ModelViewSet):
 
         return Response(data)
 
+    @action(detail=False, methods=["get"], url_path="nearest")
+    def nearest(self, request):
+        """
+        GET /api/vehicules/nearest/?lat=..&lng=..  (ou ?zone_id= / ?hotel_id=)
+            &k=5 &pax=40 &type=bus &debut=<iso>&fin=<iso> &max_km=30
+        -> k véhicules les plus proches (last_lat / last_lng), libres sur le créneau.
+        """
+        qp = request.query_params
+        try:
+            lat = float(qp["lat"]) if qp.get("lat") else None
+            lng = float(qp["lng"]) if qp.get("lng") else None
+            max_km = float(qp["max_km"]) if qp.get("max_km") else None
+        except ValueError:
+            return Response({"detail": "lat / lng / max_km invalides."}, status=400)
+
+        origin = resolve_origin(lat, lng, _safe_int(qp.get("zone_id")), _safe_int(qp.get("hotel_id")))
+        if origin is None:
+            return Response({"detail": "Point de départ requis (lat/lng, zone_id ou hotel_id géocodé)."}, status=400)
+
+        k = max(1, min(_safe_int(qp.get("k")) or 5, 100))
+        results = nearest_vehicles(
+            self._scoped_queryset(),
+            origin,
+            k=k,
+            pax=_safe_int(qp.get("pax")),
+            type_code=(qp.get("type") or "").strip() or None,
+            debut=_parse_dt(qp.get("debut")),
+            fin=_parse_dt(qp.get("fin")),
+            max_km=max_km,
+        )
+        return Response({
+            "origin": {"lat": origin[0], "lng": origin[1]},
+            "results": [
+                {
+                    "id": v.id,
+                    "immatriculation": v.immatriculation,
+                    "marque": v.marque,
+                    "modele": v.modele,
+                    "type": v.type,
+                    "capacite": v.capacite,
+                    "statut": v.statut,
+                    "agence": v.agence_id,
+                    "adresse": v.adresse,
+                    "last_lat": v.last_lat,
+                    "last_lng": v.last_lng,
+                    "distance_km": round(dist, 3),
+                }
+                for v, dist in results
+            ],
+        })
+
     def perform_create(self, serializer):
         role = _user_role(self.request.user)
         if role == "superadmin":
@@ -231,13 +283,15 @@ class VehiculeViewSet(viewsets.ModelViewSet):
         serializer.save(agence=agence_user)
 
 
-class ChauffeurViewSet(viewsets.ModelViewSet):
+class ChauffeurViewSet(VersionedListMixin, viewsets.ModelViewSet):
     """
     GET /api/chauffeurs/?agence=<id>&debut=<iso>&fin=<iso>
     -> renvoie chauffeurs dispo sur le créneau + real_state.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = ChauffeurSerializer
+    etag_resources = (versions.CHAUFFEUR, versions.AFFECTATION)
+    etag_time_bucket = True
 
     def _scoped_queryset(self):
         qs = Chauffeur.objects.all()
@@ -262,13 +316,8 @@ class ChauffeurViewSet(viewsets.ModelViewSet):
         debut = _parse_dt(self.request.query_params.get("debut"))
         fin = _parse_dt(self.request.query_params.get("fin"))
         if debut and fin:
-            overlap = _overlap_q(debut, fin)
-            busy_ids = (
-                MissionRessource.objects
-                .filter(is_deleted=False, chauffeur__isnull=False)
-                .filter(overlap)
-                .values_list("chauffeur_id", flat=True)
-            )
+            agence_ids = qs.order_by().values_list("agence_id", flat=True).distinct()
+            busy_ids = availability.busy_resource_ids(availability.CHAUFFEUR, agence_ids, debut, fin)
             qs = qs.exclude(id__in=busy_ids)
 
         statut = self.request.query_params.get("statut")
@@ -278,42 +327,22 @@ class ChauffeurViewSet(viewsets.ModelViewSet):
         return qs.order_by("nom", "prenom")
 
     def list(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response(request)
+        if not_modified:
+            return not_modified
+
         qs = self.filter_queryset(self.get_queryset())
 
         debut = _parse_dt(self.request.query_params.get("debut"))
         ref_time = debut or timezone.now()
 
-        data = []
-        for c in qs:
-            row = self.get_serializer(c).data
-
-            last_aff = (
-                MissionRessource.objects
-                .filter(is_deleted=False, chauffeur_id=c.id, date_heure_fin__lte=ref_time)
-                .order_by("-date_heure_fin", "-id")
-                .first()
-            )
-            if last_aff:
-                location = last_aff.lieu_arrivee or last_aff.lieu_depart or getattr(c, "adresse", None)
-                available_from = last_aff.date_heure_fin
-            else:
-                location = getattr(c, "adresse", None)
-                available_from = ref_time
-
-            next_aff = (
-                MissionRessource.objects
-                .filter(is_deleted=False, chauffeur_id=c.id, date_heure_debut__gte=ref_time)
-                .order_by("date_heure_debut", "id")
-                .first()
-            )
-            available_until = next_aff.date_heure_debut if next_aff else None
-
-            row["real_state"] = {
-                "location": location,
-                "available_from": available_from,
-                "available_until": available_until,
-            }
+        # ✅ real_state de tous les chauffeurs en une requête
+        chauffeurs = list(qs.select_related("agence"))  # ChauffeurSerializer.agence_nom
+        states = drivers_state(chauffeurs, ref_time=ref_time)
 
+        data = []
+        for c, row in zip(chauffeurs, self.get_serializer(chauffeurs, many=True).data):
+            row["real_state"] = states[c.pk]
             data.append(row)
 
         return Response(data)
@@ -9,14 +9,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from apps.models import Mission, Vehicule, Chauffeur
-from apps.services.mission_planning import (
-    get_vehicle_busy_reason,
-    get_driver_busy_reason,
-    get_vehicle_last_location,
-    get_driver_last_location,
-    INACTIVE_STATUSES,
-)
+from apps.models import Mission
+from apps.services.calendar_timeline import resource_timeline
 
 def _parse_dt_or_400(s: str):
     dt = parse_datetime(s) if s else None
@@ -90,33 +84,5 @@ class CalendarResourcesAPIView(APIView):
         if not start or not end:
             return Response({"detail": "Paramètres from/to invalides (ISO datetime)."}, status=400)
 
-        vehicules = Vehicule.objects.filter(agence_id=agence_id).order_by("immatriculation")
-        chauffeurs = Chauffeur.objects.filter(agence_id=agence_id).order_by("nom", "prenom")
-
-        v_out = []
-        for v in vehicules:
-            reason = get_vehicle_busy_reason(v.id, agence_id, start, end)
-            v_out.append({
-                "id": v.id,
-                "label": str(v),
-                "type": getattr(v, "type", None),
-                "capacite": getattr(v, "capacite", None),
-                "busy": bool(reason),
-                "busy_reason": reason,
-                "location": get_vehicle_last_location(v, ref_dt=start),
-                "last_lat": getattr(v, "last_lat", None),
-                "last_lng": getattr(v, "last_lng", None),
-            })
-
-        c_out = []
-        for c in chauffeurs:
-            reason = get_driver_busy_reason(c.id, agence_id, start, end)
-            c_out.append({
-                "id": c.id,
-                "label": str(c),
-                "busy": bool(reason),
-                "busy_reason": reason,
-                "location": get_driver_last_location(c, ref_dt=start),
-            })
-
-        return Response({"vehicules": v_out, "chauffeurs": c_out}, status=200)
+        # ✅ timeline en nombre constant de requêtes (affectations de la fenêtre + dernière avant)
+        return Response(resource_timeline(agence_id, start, end), status=200)
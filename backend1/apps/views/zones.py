@@ -15,45 +15,66 @@ from rest_framework.response import Response
 
 from apps.models import Zone
 from apps.serializers import ZoneSerializer
+from apps.services import versions
+from apps.services.geocache import cached_reverse
+from apps.services.hotels import reassign_all_hotel_zones
+from apps.services.response_cache import cached_response
+from apps.services.zone_index import zone_extents
+from apps.views.helpers import IsSuperAdminRole
+
+
+# ville/code postal : 2 décimales (~1 km) suffisent et rendent le cache efficace
+REVERSE_CITY_PRECISION = 2
 
 
 # ========== Helpers Google ==========
 
 def _reverse_city(lat: float, lng: float, language: str = "fr"):
+    """(ville, code_postal) ou None ; via le cache de géocodage (coordonnées arrondies à ~1 km)."""
     api_key = getattr(settings, "GOOGLE_MAPS_API_KEY", None)
     if not api_key:
         raise RuntimeError("GOOGLE_MAPS_API_KEY n'est pas configurée dans les settings.")
 
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {"latlng": f"{lat},{lng}", "key": api_key, "language": language}
+    def fetch(r_lat: float, r_lng: float):
+        url = "https://maps.googleapis.com/maps/api/geocode/json"
+        params = {"latlng": f"{r_lat},{r_lng}", "key": api_key, "language": language}
 
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()
+        r = requests.get(url, params=params, timeout=10)
+        r.raise_for_status()
+        data = r.json()
 
-    results = data.get("results") or []
-    if not results:
-        return None
+        status = data.get("status") or "OK"
+        if status not in ("OK", "ZERO_RESULTS"):
+            raise RuntimeError(f"Google Geocoding : {status}")  # pas de cache négatif
 
-    city = None
-    postal = None
+        results = data.get("results") or []
+        if not results:
+            return None
 
-    for comp in results[0].get("address_components", []):
-        types = comp.get("types", [])
-        if "locality" in types or "postal_town" in types:
-            city = comp.get("long_name")
-        elif "administrative_area_level_3" in types and not city:
-            city = comp.get("long_name")
-        elif "administrative_area_level_2" in types and not city:
-            city = comp.get("long_name")
+        city = None
+        postal = None
 
-        if "postal_code" in types:
-            postal = comp.get("long_name")
+        for comp in results[0].get("address_components", []):
+            types = comp.get("types", [])
+            if "locality" in types or "postal_town" in types:
+                city = comp.get("long_name")
+            elif "administrative_area_level_3" in types and not city:
+                city = comp.get("long_name")
+            elif "administrative_area_level_2" in types and not city:
+                city = comp.get("long_name")
 
-    if not city:
-        return None
+            if "postal_code" in types:
+                postal = comp.get("long_name")
 
-    return city, postal
+        if not city:
+            return None
+
+        return {"city": city, "postal": postal}
+
+    res = cached_reverse("google", lat, lng, fetch, precision=REVERSE_CITY_PRECISION, variant=language)
+    if not res:
+        return None
+    return res["city"], res.get("postal")
 
 
 def _sample_points_in_circle(center_lat: float, center_lng: float, radius_m: int, n: int = 20):
@@ -99,12 +120,17 @@ def _detect_cities_by_sampling(lat: float, lng: float, radius: int, language: st
 class ZoneViewSet(viewsets.ModelViewSet):
     """
     Zones: globales (pas de champ agence dans le modèle).
-    Donc: tout le monde voit toutes les zones.
+    Donc: tout le monde voit toutes les zones ; seul le superadmin les modifie.
     """
     queryset = Zone.objects.all().order_by("nom")
     serializer_class = ZoneSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_permissions(self):
+        if self.action in ("create", "update", "partial_update", "destroy", "reassign_hotels"):
+            return [IsAuthenticated(), IsSuperAdminRole()]
+        return super().get_permissions()
+
     def get_queryset(self):
         qs = Zone.objects.all().order_by("nom")
 
@@ -115,6 +141,37 @@ class ZoneViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    def list(self, request, *args, **kwargs):
+        # zones globales : même cache pour toutes les agences
+        def build():
+            return [dict(row) for row in super(ZoneViewSet, self).list(request, *args, **kwargs).data]
+
+        return cached_response(request, "zones", build, global_depends=(versions.ZONE,))
+
+    # une zone modifiée ne change la zone que des hôtels situés dans son emprise
+    # (avant et après modification) ; hôtels à zone manuelle exclus
+    def perform_create(self, serializer):
+        zone = serializer.save()
+        reassign_all_hotel_zones(extents=zone_extents(zone))
+
+    def perform_update(self, serializer):
+        before = zone_extents(Zone.objects.get(pk=serializer.instance.pk))
+        zone = serializer.save()
+        reassign_all_hotel_zones(extents=before + zone_extents(zone), zone_ids=[zone.pk])
+
+    def perform_destroy(self, instance):
+        extents = zone_extents(instance)
+        instance.delete()
+        reassign_all_hotel_zones(extents=extents)
+
+    @action(detail=False, methods=["post"], url_path="reassign-hotels")
+    def reassign_hotels(self, request):
+        """
+        POST /api/zones/reassign-hotels/  (superadmin)
+        Recalcule la zone de tous les hôtels géocodés hors zone manuelle (+ dossiers liés).
+        """
+        return Response(reassign_all_hotel_zones())
+
     @action(detail=False, methods=["get"], url_path="suggest-villes")
     def suggest_cities(self, request):
         """
@@ -158,9 +158,58 @@ DEFAULT_FROM_EMAIL = "SMEKS <benrabah.salim.dev@gmail.com>"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# ====== Imports en arrière-plan ======
+IMPORT_JOB_WORKERS = config("IMPORT_JOB_WORKERS", default=4, cast=int)
+# job "running" sans battement depuis N secondes : process perdu -> échec (recover_import_jobs)
+IMPORT_JOB_STALE_SECONDS = config("IMPORT_JOB_STALE_SECONDS", default=900, cast=int)
+
 # ====== Clés externes ======
 GOOGLE_MAPS_API_KEY = config("GOOGLE_MAPS_API_KEY", default="")
 
+# ====== Cache géocodage ======
+GEOCODE_CACHE_TTL_DAYS = config("GEOCODE_CACHE_TTL_DAYS", default=90, cast=int)
+GEOCODE_CACHE_NEGATIVE_TTL_DAYS = config("GEOCODE_CACHE_NEGATIVE_TTL_DAYS", default=7, cast=int)
+GEOCODE_CACHE_LRU_SIZE = config("GEOCODE_CACHE_LRU_SIZE", default=2048, cast=int)
+
+# ====== Enrichissement hôtels (géocodage différé) ======
+HOTEL_ENRICH_AUTOSTART = config("HOTEL_ENRICH_AUTOSTART", default=True, cast=bool)
+# sans clé Google, tout passe par Nominatim (1 requête / s) : pas de parallélisme
+HOTEL_ENRICH_CONCURRENCY = config("HOTEL_ENRICH_CONCURRENCY", default=4 if GOOGLE_MAPS_API_KEY else 1, cast=int)
+HOTEL_ENRICH_BATCH_SIZE = config("HOTEL_ENRICH_BATCH_SIZE", default=100, cast=int)
+
+# ====== Index spatial des zones (reconstruit au plus tard après N secondes) ======
+ZONE_INDEX_TTL = config("ZONE_INDEX_TTL", default=300, cast=int)
+
+# ====== Index de disponibilité véhicules / chauffeurs (lectures seulement) ======
+# reconstruit au plus tard après N secondes ; compteur AFFECTATION relu au plus toutes les N secondes ;
+# historique chargé : N jours (les créneaux plus anciens sont lus en base)
+AVAILABILITY_INDEX_TTL = config("AVAILABILITY_INDEX_TTL", default=300, cast=int)
+AVAILABILITY_RECHECK_SECONDS = config("AVAILABILITY_RECHECK_SECONDS", default=5, cast=int)
+AVAILABILITY_HISTORY_DAYS = config("AVAILABILITY_HISTORY_DAYS", default=7, cast=int)
+
+# ====== Matrice des temps de trajet (compteurs de version relus au plus toutes les N secondes) ======
+TRAVEL_TIME_RECHECK_SECONDS = config("TRAVEL_TIME_RECHECK_SECONDS", default=60, cast=int)
+
+# ====== Pagination keyset (missions, fiches, dossiers à transformer) ======
+KEYSET_PAGE_SIZE = config("KEYSET_PAGE_SIZE", default=100, cast=int)
+KEYSET_MAX_PAGE_SIZE = config("KEYSET_MAX_PAGE_SIZE", default=500, cast=int)
+
+# ====== Cache (locmem par défaut ; CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# + CACHE_LOCATION=/chemin pour partager entre process) ======
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="b2b-default"),
+    }
+}
+
+# ====== Cache des réponses (lectures coûteuses, invalidé par les compteurs de version) ======
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TTL = config("RESPONSE_CACHE_TTL", default=300, cast=int)
+
+# ====== ETag des listes (réponses dépendant de l'heure : renouvelées toutes les N secondes) ======
+ETAG_TIME_BUCKET_SECONDS = config("ETAG_TIME_BUCKET_SECONDS", default=60, cast=int)
+
 
 # ====== Static files ======
 STATIC_URL = "/static/"
@@ -12,8 +12,9 @@ from apps.views.importers import ImporterChauffeursAPIView, ImporterVehiculesAPI
 from apps.views.missions import MissionViewSet
 from apps.views.dossiers_import import ImporterDossierAPIView
 from apps.views.Fiches_import import ImporterFicheMouvementAPIView
+from apps.views.import_jobs import ImportJobDetailAPIView, ImportJobListCreateAPIView, ImportJobReportAPIView
 from apps.views.pdf import ordre_mission_pdf
-from apps.views.dossiers_to_fiche import DossiersToFicheAPIView
+from apps.views.dossiers_to_fiche import DossiersConsolidationAPIView, DossiersToFicheAPIView
 from apps.views.agences import (
     DemandeInscriptionAgenceViewSet,
     DemandeInscriptionAgencePublicCreateAPIView,
@@ -28,6 +29,8 @@ from apps.views.agency_applications import (
 from apps.views.ressources import VehiculeViewSet, ChauffeurViewSet
 from apps.views.fiche_manual import FicheMouvementManualCreateAPIView
 from apps.views.zones import ZoneViewSet
+from apps.views.geocache import GeocodeCacheStatsAPIView
+from apps.views.response_cache import ResponseCacheStatsAPIView
 from apps.views.fournisseur import fournisseur_config, fournisseur_vehicule_tarifs
 from apps.views.rentout import RentoutAvailableVehiclesAPIView
 from apps.views.excursions import ExcursionTemplateViewSet, ExcursionStepViewSet, ExcursionEventViewSet
@@ -91,8 +94,19 @@ path("api/auth/change-password/", ChangePasswordView.as_view(), name="auth-chang
     path("api/importer-vehicules/", ImporterVehiculesAPIView.as_view(), name="importer-vehicules"),
     path("api/importer-chauffeurs/", ImporterChauffeursAPIView.as_view(), name="importer-chauffeurs"),
 
+    # Cache géocodage
+    path("api/geocode-cache/stats/", GeocodeCacheStatsAPIView.as_view(), name="geocode-cache-stats"),
+    path("api/response-cache/stats/", ResponseCacheStatsAPIView.as_view(), name="response-cache-stats"),
+
+    # Import en arrière-plan (jobs)
+    path("api/import-jobs/", ImportJobListCreateAPIView.as_view(), name="import-jobs"),
+    path("api/import-jobs/<int:pk>/", ImportJobDetailAPIView.as_view(), name="import-job-detail"),
+    path("api/import-jobs/<int:pk>/report/", ImportJobReportAPIView.as_view(), name="import-job-report"),
+
     # Dossiers -> Fiche
     path("api/dossiers/to-fiche/", DossiersToFicheAPIView.as_view(), name="dossiers_to_fiche"),
+    path("api/dossiers/to-fiche/auto/preview/", DossiersConsolidationAPIView.as_view(), name="dossiers_to_fiche_auto_preview"),
+    path("api/dossiers/to-fiche/auto/commit/", DossiersConsolidationAPIView.as_view(commit=True), name="dossiers_to_fiche_auto_commit"),
 
     # Update horaires
     path("api/fiches-mouvement/<int:fiche_id>/horaires/", UpdateHorairesRamassageAPIView.as_view(), name="fiche-horaires"),
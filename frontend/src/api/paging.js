@@ -0,0 +1,75 @@
+// src/api/paging.js
+import { useCallback, useEffect, useRef, useState } from "react";
+import api from "./client";
+
+// Une page d'une liste keyset ({next_cursor, results}) : le curseur repart
+// toujours de `url` + `params` (pas de "next" absolu reconstruit par le backend).
+// Accepte aussi une réponse non paginée (tableau) -> une seule page.
+export async function getPage(url, { params = {}, cursor = null, ...config } = {}) {
+  const { data } = await api.get(url, {
+    ...config,
+    params: cursor ? { ...params, cursor } : params,
+  });
+  if (Array.isArray(data)) return { results: data, cursor: null };
+  return {
+    results: Array.isArray(data?.results) ? data.results : [],
+    cursor: data?.next_cursor || null,
+  };
+}
+
+// Liste chargée page par page : première page au montage (et à chaque
+// changement de url / params), les suivantes sur loadMore().
+export function useCursorList(url, params, { enabled = true } = {}) {
+  const [items, setItems] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const key = JSON.stringify(params || {});
+  const generation = useRef(0);
+
+  const reload = useCallback(async () => {
+    const gen = ++generation.current;
+    setLoadingMore(false);
+    if (!enabled) {
+      setItems([]);
+      setCursor(null);
+      return;
+    }
+    setLoading(true);
+    try {
+      const page = await getPage(url, { params: JSON.parse(key) });
+      if (gen !== generation.current) return;
+      setItems(page.results);
+      setCursor(page.cursor);
+    } catch (e) {
+      console.error(e);
+      if (gen !== generation.current) return;
+      setItems([]);
+      setCursor(null);
+    } finally {
+      if (gen === generation.current) setLoading(false);
+    }
+  }, [url, key, enabled]);
+
+  const loadMore = useCallback(async () => {
+    if (!cursor || loadingMore) return;
+    const gen = generation.current;
+    setLoadingMore(true);
+    try {
+      const page = await getPage(url, { params: JSON.parse(key), cursor });
+      if (gen !== generation.current) return;
+      setItems((prev) => [...prev, ...page.results]);
+      setCursor(page.cursor);
+    } catch (e) {
+      console.error(e);
+    } finally {
+      if (gen === generation.current) setLoadingMore(false);
+    }
+  }, [url, key, cursor, loadingMore]);
+
+  useEffect(() => {
+    reload();
+  }, [reload]);
+
+  return { items, setItems, loading, loadingMore, hasMore: !!cursor, loadMore, reload };
+}
@@ -1,7 +1,7 @@
 // src/components/FicheMouvementList/FichesMouvementList.jsx
 import React, { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import { useNavigate, useLocation, useParams } from "react-router-dom";
-import api from "../../api/client";
+import { useCursorList } from "../../api/paging";
 import "./fichesList.css";
 
 /* ================= Helpers ================= */
@@ -134,6 +134,9 @@ function RightRail({
   setSelVols,
   loading,
   pageKind,
+  hasMore,
+  loadingMore,
+  onLoadMore,
 }) {
   const showAero = selDates.size > 0;
   const showVols = showAero && selAero.size > 0;
@@ -176,6 +179,16 @@ function RightRail({
             <div className="text-muted small">—</div>
           )}
         </div>
+        {/* liste triée par date : les pages suivantes apportent les dates suivantes */}
+        {hasMore && (
+          <button
+            className="btn btn-outline-secondary btn-sm w-100 mt-2"
+            onClick={onLoadMore}
+            disabled={loading || loadingMore}
+          >
+            {loadingMore ? "Chargement…" : "Charger plus"}
+          </button>
+        )}
       </div>
 
       {/* Aéroports (✅ SINGLE) */}
@@ -254,9 +267,6 @@ export default function FichesMouvementList() {
   const { agence_id } = useParams();
   const pageKind = usePageKind(); // 'depart' | 'arrivee' | null
 
-  const [items, setItems] = useState([]);
-  const [loading, setLoading] = useState(false);
-
   // Groupes haut (multi-choix) - affichage conditionnel (voir plus bas)
   const [selTOs, setSelTOs] = useState(new Set());
   const [selZones, setSelZones] = useState(new Set()); // ✅ zone = single via handler
@@ -301,30 +311,10 @@ export default function FichesMouvementList() {
     });
   };
 
-  const fetchList = useCallback(async () => {
-    if (!agence_id || !pageKind) return;
-    setLoading(true);
-    try {
-      const { data } = await api.get("dossiers/to-fiche/", {
-        params: { agence: agence_id, kind: pageKind },
-      });
-      const arr = Array.isArray(data)
-        ? data
-        : Array.isArray(data?.results)
-        ? data.results
-        : [];
-      setItems(arr);
-    } catch (e) {
-      console.error(e);
-      setItems([]);
-    } finally {
-      setLoading(false);
-    }
-  }, [agence_id, pageKind]);
-
-  useEffect(() => {
-    fetchList();
-  }, [fetchList]);
+  const listParams = useMemo(() => ({ agence: agence_id, kind: pageKind }), [agence_id, pageKind]);
+  const { items, loading, loadingMore, hasMore, loadMore } = useCursorList("dossiers/to-fiche/", listParams, {
+    enabled: !!(agence_id && pageKind),
+  });
 
   const activeTypeSet = useMemo(() => {
     if (pageKind === "depart") return DEPART_TYPES;
@@ -1112,6 +1102,9 @@ const applyRestore = useCallback(
         setSelVols={setSelVols}
         loading={loading}
         pageKind={pageKind}
+        hasMore={hasMore}
+        loadingMore={loadingMore}
+        onLoadMore={loadMore}
       />
     </div>
   );
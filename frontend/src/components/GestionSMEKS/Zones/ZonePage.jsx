@@ -188,7 +188,7 @@ export default function ZonesPage() {
         east: maxLng,
         west: minLng,
       },
-      points, // on garde les points si tu veux les stocker plus tard
+      points, // sommets envoyés au backend (Zone.polygon)
     });
 
     setSuggestedCities([]); // reset suggestions à chaque nouvelle géométrie
@@ -280,6 +280,7 @@ export default function ZonesPage() {
       south: shapeInfo.bounds?.south ?? null,
       east: shapeInfo.bounds?.east ?? null,
       west: shapeInfo.bounds?.west ?? null,
+      points: shapeInfo.type === "polygon" ? shapeInfo.points : undefined, // sommets du polygone
     };
 
     setSaving(true);
@@ -3,6 +3,7 @@ import React, { useEffect, useMemo, useRef, useState } from "react";
 import { useLocation, useNavigate, useParams, useSearchParams } from "react-router-dom";
 import { createPortal } from "react-dom";
 import api from "../../api/client";
+import { useCursorList } from "../../api/paging";
 
 /* ================= Helpers ================= */
 
@@ -1064,8 +1065,7 @@ export default function TransfertNouvelle() {
   const { state } = useLocation();
   const dateQuery = sp.get("date") || "";
 
-  const [loading, setLoading] = useState(false);
-  const [fiches, setFiches] = useState([]);
+  const [busy, setBusy] = useState(false);
   const [selected, setSelected] = useState(new Set());
 
   // modal flotte
@@ -1102,23 +1102,20 @@ export default function TransfertNouvelle() {
     setPaxMax("");
   };
 
-  /* ====== Chargement des fiches ====== */
-  useEffect(() => {
-    (async () => {
-      try {
-        setLoading(true);
-        const params = { agence: agence_id || undefined, date: dateQuery || undefined, mission__isnull: true };
-        const { data } = await api.get("/fiches-mouvement/", { params });
-        const arr = Array.isArray(data?.results) ? data.results : Array.isArray(data) ? data : [];
-        setFiches(arr);
-      } catch (e) {
-        console.error(e);
-        setFiches([]);
-      } finally {
-        setLoading(false);
-      }
-    })();
-  }, [agence_id, dateQuery]);
+  /* ====== Chargement des fiches (page par page) ====== */
+  const listParams = useMemo(
+    () => ({ agence: agence_id || undefined, date: dateQuery || undefined, mission__isnull: true }),
+    [agence_id, dateQuery]
+  );
+  const {
+    items: fiches,
+    setItems: setFiches,
+    loading: listLoading,
+    loadingMore,
+    hasMore,
+    loadMore,
+  } = useCursorList("/fiches-mouvement/", listParams);
+  const loading = busy || listLoading;
 
   // ✅ Pré-sélection si on vient du recap
   useEffect(() => {
@@ -1216,7 +1213,7 @@ export default function TransfertNouvelle() {
   const revertOneToDossier = async (id) => {
     if (!window.confirm("Mettre cette fiche à la corbeille (revient en dossier) ?")) return;
 
-    setLoading(true);
+    setBusy(true);
     try {
       await api.post(`/fiches-mouvement/${id}/revert-to-dossier/`);
       setFiches((prev) => prev.filter((x) => x.id !== id));
@@ -1229,7 +1226,7 @@ export default function TransfertNouvelle() {
       console.error(e);
       alert("Erreur corbeille: " + (e?.response?.data ? JSON.stringify(e.response.data) : e.message));
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
@@ -1238,7 +1235,7 @@ export default function TransfertNouvelle() {
     const sel = filtered.filter((r) => selected.has(r.id));
     if (!sel.length) return alert("Sélectionne au moins une fiche.");
 
-    setLoading(true);
+    setBusy(true);
     try {
       const first = sel[0];
 
@@ -1266,7 +1263,7 @@ export default function TransfertNouvelle() {
       console.error(e);
       alert("Erreur: " + (e?.response?.data ? JSON.stringify(e.response.data) : e.message));
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
@@ -1345,7 +1342,7 @@ export default function TransfertNouvelle() {
     const sel = filtered.filter((r) => selected.has(r.id));
     if (!sel.length) return alert("Sélectionne au moins une fiche.");
 
-    setLoading(true);
+    setBusy(true);
     try {
       const payload = {
         vehicule: vehicule.id,
@@ -1362,7 +1359,7 @@ export default function TransfertNouvelle() {
       console.error(e);
       alert("Erreur rentout: " + (e?.response?.data ? JSON.stringify(e.response.data) : e.message));
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
@@ -1508,6 +1505,13 @@ export default function TransfertNouvelle() {
                   </tbody>
                 </table>
               </div>
+              {hasMore && (
+                <div className="text-center mt-2">
+                  <button className="btn btn-outline-secondary btn-sm" onClick={loadMore} disabled={loading || loadingMore}>
+                    {loadingMore ? "Chargement…" : "Charger plus de fiches"}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
 
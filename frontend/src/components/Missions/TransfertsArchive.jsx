@@ -1,5 +1,5 @@
 // src/components/Missions/TransfertsArchive.jsx
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import {
   FaEdit,
@@ -15,6 +15,7 @@ import {
   FaArchive,
 } from "react-icons/fa";
 import api from "../../api/client";
+import { useCursorList } from "../../api/paging";
 
 // --- PDF ---
 async function handleDownloadPdf(missionId, numeroVol, dateMission) {
@@ -82,30 +83,17 @@ function isArchived(m) {
   return new Date() >= deadline;
 }
 
+const MISSION_PARAMS = { type: "T" };
+
 export default function TransfertsArchive() {
   const nav = useNavigate();
-  const [loading, setLoading] = useState(false);
-  const [missions, setMissions] = useState([]);
+  const { items: missions, loading, loadingMore, hasMore, loadMore } = useCursorList("/missions/", MISSION_PARAMS);
 
   const [q, setQ] = useState("");
   const [typeMission, setTypeMission] = useState("all");
   const [dateMin, setDateMin] = useState("");
   const [dateMax, setDateMax] = useState("");
 
-  useEffect(() => {
-    (async () => {
-      try {
-        setLoading(true);
-        const { data } = await api.get("/missions/", { params: { type: "T" } });
-        setMissions(Array.isArray(data?.results) ? data.results : Array.isArray(data) ? data : []);
-      } catch (e) {
-        setMissions([]);
-      } finally {
-        setLoading(false);
-      }
-    })();
-  }, []);
-
   const filtered = useMemo(() => {
     return missions.filter((m) => {
       // ✅ ici = seulement archives
@@ -302,6 +290,13 @@ export default function TransfertsArchive() {
                 </tbody>
               </table>
             </div>
+            {hasMore && (
+              <div className="text-center py-3 border-top">
+                <button className="btn btn-sm btn-outline-secondary" onClick={loadMore} disabled={loading || loadingMore}>
+                  {loadingMore ? <FaSpinner className="fa-spin" /> : "Charger plus de missions"}
+                </button>
+              </div>
+            )}
           </div>
 
           <div className="small text-muted mt-3">
@@ -1,5 +1,5 @@
 // src/components/Missions/TransfertsList.jsx
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import {
   FaDownload,
@@ -16,6 +16,7 @@ import {
   FaExchangeAlt,
 } from "react-icons/fa";
 import api from "../../api/client";
+import { useCursorList } from "../../api/paging";
 
 // --- PDF ---
 async function handleDownloadPdf(missionId, numeroVol, dateMission) {
@@ -84,40 +85,16 @@ function isArchived(m) {
   return new Date() >= deadline;
 }
 
+const MISSION_PARAMS = { type: "T" };
+
 export default function TransfertsList() {
   const nav = useNavigate();
-  const [loading, setLoading] = useState(false);
-  const [missions, setMissions] = useState([]);
+  const { items: missions, loading, loadingMore, hasMore, loadMore } = useCursorList("/missions/", MISSION_PARAMS);
   const [q, setQ] = useState("");
   const [typeMission, setTypeMission] = useState("all");
   const [dateMin, setDateMin] = useState("");
   const [dateMax, setDateMax] = useState("");
 
-  useEffect(() => {
-    let mounted = true;
-
-    (async () => {
-      try {
-        setLoading(true);
-        const { data } = await api.get("/missions/", { params: { type: "T" } });
-        const results = Array.isArray(data?.results)
-          ? data.results
-          : Array.isArray(data)
-          ? data
-          : [];
-        if (mounted) setMissions(results);
-      } catch (e) {
-        if (mounted) setMissions([]);
-      } finally {
-        if (mounted) setLoading(false);
-      }
-    })();
-
-    return () => {
-      mounted = false;
-    };
-  }, []);
-
   const filtered = useMemo(() => {
     return missions.filter((m) => {
       if (isArchived(m)) return false;
@@ -322,6 +299,13 @@ export default function TransfertsList() {
                 </tbody>
               </table>
             </div>
+            {hasMore && (
+              <div className="text-center py-3 border-top">
+                <button className="btn btn-sm btn-outline-secondary" onClick={loadMore} disabled={loading || loadingMore}>
+                  {loadingMore ? <FaSpinner className="fa-spin" /> : "Charger plus de missions"}
+                </button>
+              </div>
+            )}
           </div>
 
           <div className="small text-muted mt-3">